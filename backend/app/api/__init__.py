@@ -1,11 +1,26 @@
-from .v1 import wms_router as v1_wms_router
-from .v1 import wcs_router as v1_wcs_router
-from .v2 import wms_router as v2_wms_router
-from .v2 import wcs_router as v2_wcs_router
+# app/api/__init__.py
+# 路由按需导入: 只使用 v2 WCS 路由时不会导入 v1 模块 (v1 服务在导入时连接设备)
+import importlib
+
+_ROUTERS = {
+    "v1_wms_router": (".v1", "wms_router"),
+    "v1_wcs_router": (".v1", "wcs_router"),
+    "v2_wms_router": (".v2", "wms_router"),
+    "v2_wcs_router": (".v2", "wcs_router"),
+}
 
 __all__ = [
     "v1_wms_router",
     "v1_wcs_router",
     "v2_wms_router",
     "v2_wcs_router"
-    ]
\ No newline at end of file
+    ]
+
+
+def __getattr__(name):
+    if name not in _ROUTERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _ROUTERS[name]
+    router = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = router
+    return router
@@ -1,7 +1,7 @@
 # api/v2/wcs/decorators.py
 
 from functools import wraps
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from .response import StandardResponse
 
 def standard_response(func):
@@ -10,8 +10,8 @@ def standard_response(func):
     async def wrapper(*args, **kwargs):
         try:
             result = await func(*args, **kwargs)
-            # 如果已经返回了 StandardResponse，直接返回
-            if isinstance(result, StandardResponse):
+            # 如果已经返回了 StandardResponse 或原始响应 (如图像)，直接返回
+            if isinstance(result, (StandardResponse, Response)):
                 return result
                 
             # 否则包装为标准格式
@@ -34,8 +34,8 @@ def standard_response_sync(func):
     def wrapper(*args, **kwargs):
         try:
             result = func(*args, **kwargs)
-            # 如果已经返回了 StandardResponse，直接返回
-            if isinstance(result, StandardResponse):
+            # 如果已经返回了 StandardResponse 或原始响应 (如图像)，直接返回
+            if isinstance(result, (StandardResponse, Response)):
                 return result
                 
             # 否则包装为标准格式
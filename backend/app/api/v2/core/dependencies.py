@@ -1,4 +1,7 @@
 # /api/v1/core/dependencies.py
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
 from fastapi import Depends, Request
 # from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
@@ -10,6 +13,51 @@ from app.core.database import get_db
 def get_database():
     return Depends(get_db)
 
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """[延迟创建的服务] 首次访问属性或调用 build() 时才创建服务实例。
+
+    设备服务在构造时会创建PLC、穿梭车控制器和路径规划器, 放在模块导入时会拖慢启动;
+    路由模块中用 LazyService 包装后, 由应用 lifespan 或第一个请求创建。
+    """
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        """
+        Args:
+            factory: 创建服务实例的函数 (通常为服务类)
+            name: 服务名称, 用于日志
+        """
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", repr(factory))
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        """服务实例是否已创建。"""
+        return self._instance is not None
+
+    def build(self) -> T:
+        """创建 (或返回已创建的) 服务实例。"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    self._instance = instance
+        return instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.build(), name)
+
+    def __repr__(self) -> str:
+        state = "已创建" if self.built else "未创建"
+        return f"LazyService({self._name}, {state})"
+
 # def get_thread_pool(request: Request):
 #     """获取线程池的依赖项"""
 #     return request.app.state.thread_pool
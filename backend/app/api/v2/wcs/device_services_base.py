@@ -22,6 +22,7 @@ from app.utils.devices_logger import DevicesLogger
 from app.map_core import PathCustom
 # from app.devices.service_asyncio import DevicesService, DB_12
 from app.devices import DevicesController, AsyncDevicesController, DevicesControllerByStep
+from app.res_system import FleetCar, get_car_fleet
 from app.res_system.controller import AsyncSocketCarController
 from app.res_system.controller import ControllerBase as CarController
 from app.res_system.enum import (
@@ -56,6 +57,8 @@ class DeviceServicesBase():
         # 设备操作锁
         self.operation_lock = asyncio.Lock()
         self.operation_in_progress = False
+        # 单车服务驱动的穿梭车在车队中的条目, 操作期间持有其作业锁
+        self.fleet_car: Optional[FleetCar] = None
 
     #################################################
     # 电梯锁服务
@@ -69,6 +72,13 @@ class DeviceServicesBase():
             
         acquired = await self.operation_lock.acquire()
         if acquired:
+            # 同时占用车队中的同一台穿梭车, 避免车队在单车作业的间隙把它分派给其他作业或送去充电
+            fleet = get_car_fleet()
+            fleet_car = fleet.find(settings.CAR_IP, settings.CAR_PORT)
+            if fleet_car is not None and not await fleet.try_hold(fleet_car, "device_task"):
+                self.operation_lock.release()
+                return False
+            self.fleet_car = fleet_car
             self.operation_in_progress = True
             return True
         return False
@@ -76,6 +86,9 @@ class DeviceServicesBase():
     def release_lock(self):
         """释放电梯操作锁。"""
         self.operation_in_progress = False
+        if self.fleet_car is not None:
+            get_car_fleet().release(self.fleet_car)
+            self.fleet_car = None
         if self.operation_lock.locked():
             self.operation_lock.release()
 
@@ -87,25 +100,40 @@ class DeviceServicesBase():
     # 穿梭车服务
     #################################################
 
-    def get_car_current_location(self) -> Tuple[bool, str]:
-        """获取穿梭车当前位置信息。"""
-        msg = self.car.car_current_location()
+    def get_car_current_location(self, max_age: Optional[float] = None) -> Tuple[bool, str]:
+        """获取穿梭车当前位置信息。
+
+        Args:
+            max_age: 可接受的缓存时效 (秒), 默认为 settings.CAR_STATE_MAX_AGE, 0 表示重新查询
+        """
+        max_age = settings.CAR_STATE_MAX_AGE if max_age is None else max_age
+        msg = self.car.car_current_location(max_age=max_age)
         if msg == "error":
             return False, "操作失败，穿梭车可能未连接"
         else:
             return True, msg
     
-    def get_car_status(self) -> Tuple[bool, Dict]:
-        """获取穿梭车状态信息。"""
-        msg = self.car.car_status()
+    def get_car_status(self, max_age: Optional[float] = None) -> Tuple[bool, Dict]:
+        """获取穿梭车状态信息。
+
+        Args:
+            max_age: 可接受的缓存时效 (秒), 默认为 settings.CAR_STATE_MAX_AGE, 0 表示重新查询
+        """
+        max_age = settings.CAR_STATE_MAX_AGE if max_age is None else max_age
+        msg = self.car.car_status(max_age=max_age)
         if msg.get('car_status') == "error":
             return False, msg
         else:
             return True, msg
         
-    def get_car_info_with_power(self) -> Tuple[bool, Dict]:
-        """获取穿梭车信息并返回带电量的。"""
-        msg = self.car.car_power(times=2)
+    def get_car_info_with_power(self, max_age: Optional[float] = None) -> Tuple[bool, Dict]:
+        """获取穿梭车信息并返回带电量的。
+
+        Args:
+            max_age: 可接受的缓存时效 (秒), 默认为 settings.CAR_STATE_MAX_AGE, 0 表示重新查询
+        """
+        max_age = settings.CAR_STATE_MAX_AGE if max_age is None else max_age
+        msg = self.car.car_power(times=2, max_age=max_age)
         if msg.get('car_status') == "error":
             return False, msg
         else:
@@ -1225,6 +1253,13 @@ class DeviceServicesBase():
             # return [True, node_status]
             
             blocking_nodes = self.path_planner.find_blocking_nodes(start_location, end_location, node_status)
+
+            # 对比最少阻塞路线, 记录可以少移动的货物数量 (调试用, 需要额外一次路径搜索)
+            if settings.PATH_BLOCKING_REPORT:
+                report = self.path_planner.find_least_blocking_path(start_location, end_location, node_status)
+                if report["blockers_avoided"] > 0:
+                    logger.info(f"[SYSTEM] 最少阻塞路线 {report['path']} 需移动 {len(report['blocking_nodes'])} 个货物, "
+                                f"最短路线需移动 {len(blocking_nodes)} 个")
         
             return True, blocking_nodes
                 
@@ -1232,6 +1267,162 @@ class DeviceServicesBase():
             logger.error("❌ 库位信息获取失败")
             return False, "❌ 库位信息获取失败"
             
+    # 接驳位, 不作为入库目标
+    BUFFER_LOCATIONS = {
+        "1,3,1", "2,3,1", "3,3,1", "5,3,1",
+        "1,3,2", "2,3,2", "3,3,2", "5,3,2",
+        "1,3,3", "2,3,3", "3,3,3", "5,3,3",
+        "1,3,4", "2,3,4", "3,3,4", "5,3,4"
+    }
+
+    def recommend_inband_location(
+        self,
+        db: Session,
+        layers: Optional[List[int]] = None,
+        car_location: Optional[str] = None,
+        top_k: int = 5
+    ) -> Tuple[bool, Union[str, Dict]]:
+        """[入库库位推荐] 为新入库托盘推荐空闲库位。
+
+        按货道深度、会挡住的已存托盘数、入库路线上需要先移走的托盘数、
+        托盘从入库口 5,3,z 到库位的行驶时间以及穿梭车到入库口的时间 (含跨层) 打分。
+
+        Args:
+            db: Session 数据库会话
+            layers: 候选楼层, None 表示所有楼层
+            car_location: 穿梭车当前位置, None 时向穿梭车查询
+            top_k: 返回的库位数量
+
+        Returns:
+            Tuple: [bool, {"car_location", "items": 候选库位列表}]
+        """
+        success, location_info = self.location_service.get_locations(db)
+        if not success:
+            return False, f"{location_info}"
+        node_status = {node.location: node.status for node in location_info}
+
+        if car_location is None:
+            success, msg = self.get_car_current_location()
+            if success:
+                car_location = msg
+            else:
+                logger.warning(f"[SYSTEM] 无法获取穿梭车位置, 推荐时不计穿梭车到入库口的时间: {msg}")
+
+        try:
+            items = self.path_planner.recommend_inbound_slots(
+                node_status,
+                layers=layers,
+                car_location=car_location,
+                exclude=self.BUFFER_LOCATIONS,
+                top_k=top_k
+            )
+        except ValueError as e:
+            return False, f"❌ {e}"
+        if not items:
+            return False, "❌ 没有可用的入库库位"
+        return True, {"car_location": car_location, "items": items}
+
+    def plan_blocking_relocation(
+        self,
+        source: str,
+        target: str,
+        db: Session,
+        car_location: Optional[str] = None,
+        store_at_target: bool = True
+    ) -> Tuple[bool, Union[str, Dict]]:
+        """[移库规划] 为任务 source -> target 路线上的阻塞货物规划停放位置和移动顺序。
+
+        本层任意载货可达的空闲库位都可以作为停放点, 接驳位 1~3,3,z 只作临时停放,
+        任务完成后由规划决定每个阻塞货物留在停放位置还是移回原位。
+
+        Args:
+            source: 任务起点
+            target: 任务终点
+            db: Session 数据库会话
+            car_location: 穿梭车当前位置, 默认为 source
+            store_at_target: 任务完成后 target 是否有货 (出库时为False)
+
+        Returns:
+            Tuple: [bool, 移库计划]
+        """
+        layer = int(source.split(',')[2])
+        if int(target.split(',')[2]) != layer:
+            return False, "❌ 起点与终点楼层不一致"
+
+        success, location_info = self.location_service.get_locations(db)
+        if not success:
+            return False, f"{location_info}"
+        suffix = f",{layer}"
+        node_status = {node.location: node.status for node in location_info if node.location.endswith(suffix)}
+
+        entry = f"5,3,{layer}"
+        temporary = [f"{x},3,{layer}" for x in (1, 2, 3)]
+        try:
+            plan = self.path_planner.plan_relocation(
+                source,
+                target,
+                node_status,
+                car_location=car_location,
+                entry=entry,
+                store_at_target=store_at_target,
+                exclude=[entry],
+                temporary=temporary
+            )
+        except ValueError as e:
+            return False, f"❌ {e}"
+        logger.info(f"[SYSTEM] 阻塞货物 {plan['blocking_nodes']} 共需移动 {plan['total_moves']} 次, "
+                    f"预计耗时 {plan['estimated_time']} 秒")
+        return True, plan
+
+    def _record_pallet_move(self, db: Session, start_location: str, end_location: str) -> Tuple[bool, str]:
+        """[数据库] 记录托盘从 start_location 移动到 end_location。"""
+        success, location_info = self.location_service.get_location_by_loc(db, start_location)
+        if not success or not isinstance(location_info, LocationModel):
+            return False, f"❌ 获取({start_location})库位信息失败"
+        pallet_id = location_info.pallet_id
+        success, sql_info = self.location_service.update_pallet_by_loc(db, end_location, pallet_id)
+        if not success:
+            return False, f"{sql_info}"
+        success, sql_info = self.location_service.delete_pallet_by_loc(db, start_location)
+        if not success:
+            return False, f"{sql_info}"
+        return True, f"✅ 托盘({pallet_id})从({start_location})移动到({end_location})"
+
+    async def _execute_relocation_moves(
+        self,
+        task_no: int,
+        plan: Dict,
+        phase: str,
+        db: Session
+    ) -> Tuple[bool, str]:
+        """[移库执行] 依次执行移库计划中某一阶段的货物移动, 并同步数据库。
+
+        Args:
+            task_no: 第一条移动的任务号, 之后每条加3
+            plan: plan_blocking_relocation 返回的移库计划
+            phase: "clear" 移走阻塞货物, "return" 任务完成后的移回/归位
+            db: Session 数据库会话
+
+        Returns:
+            Tuple: [bool, 执行信息]
+        """
+        moves = [move for move in plan["moves"] if move["phase"] == phase]
+        if not moves:
+            return True, "[SYSTEM] 无需移动阻塞货物"
+        for move in moves:
+            logger.info(f"[CAR] 移动({move['start']})遮挡货物到({move['end']}), 预计 {move['duration']} 秒")
+            success, good_move_info = await self.good_move_by_start_end_no_lock(task_no, move["start"], move["end"])
+            if not success:
+                logger.error(f"{good_move_info}")
+                return False, f"{good_move_info}"
+            logger.info(f"{good_move_info}")
+            success, sql_info = self._record_pallet_move(db, move["start"], move["end"])
+            if not success:
+                logger.error(f"[SYSTEM] {sql_info}")
+                return False, f"{sql_info}"
+            task_no += 3
+        return True, f"✅ 已完成 {len(moves)} 次阻塞货物移动"
+
     async def do_task_inband_with_solve_blocking(
             self,
             task_no: int,
@@ -1339,55 +1530,15 @@ class DeviceServicesBase():
 
             logger.info("[step 3] 处理入库阻挡货物")
 
-            success, blocking_nodes = self.get_block_node(inband_location, target_location, db)
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                # step 3.1: 计算靠近高速道阻塞点(按距离排序)
-                # 找到最接近 highway 的阻塞节点
-                do_blocking_nodes = []
-                # 创建阻塞节点的副本，避免修改原始列表
-                remaining_nodes = set(blocking_nodes[1])
-                
-                # 持续查找并移除最近的节点，直到没有剩余节点
-                while remaining_nodes:
-                    # 找到最接近 highway 的阻塞节点
-                    nearest_highway_node = self.path_planner.find_nearest_highway_node(list(remaining_nodes))
-                    if nearest_highway_node:
-                        do_blocking_nodes.append(nearest_highway_node)
-                        # 从剩余节点中移除已找到的节点
-                        remaining_nodes.discard(nearest_highway_node)
-                    else:
-                        # 如果找不到最近节点，跳出循环避免无限循环
-                        break
-                        
-                logger.info(f"[SYSTEM] 靠近高速道阻塞点(按距离排序): {do_blocking_nodes}")
-
-                # 定义临时存放点
-                temp_storage_nodes = [f"1,3,{target_layer}", f"2,3,{target_layer}", f"3,3,{target_layer}"]
-                # 记录移动映射关系，用于将货物移回原位
-                move_mapping = {}
-
-                # step 3.2: 处理遮挡货物
-                block_taskno = task_no+1
-                for i, blocking_node in enumerate(do_blocking_nodes):
-                    if i < len(temp_storage_nodes):
-                        temp_node = temp_storage_nodes[i]
-                        logger.info(f"[CAR] 移动({blocking_node})遮挡货物到({temp_node})")
-                        move_mapping[blocking_node] = temp_node
-
-                        # 移动货物
-                        success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, blocking_node, temp_node)
-                        if success:
-                            logger.info(f"{good_move_info}")
-                            block_taskno += 3
-                        else:
-                            logger.error(f"{good_move_info}")
-                            return False, f"{good_move_info}"
+            success, relocation_plan = self.plan_blocking_relocation(inband_location, target_location, db)
+            if not success:
+                logger.error(f"{relocation_plan}")
+                return False, f"{relocation_plan}"
 
-                    else:
-                        logger.warning(f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})")
-                        return False, f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点，直接出库")
+            success, move_info = await self._execute_relocation_moves(task_no+1, relocation_plan, "clear", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
 
             # ---------------------------------------- #
             # step 4: 货物入库
@@ -1403,27 +1554,16 @@ class DeviceServicesBase():
                 return False, f"货物出库至({target_location})失败"
             
             # ---------------------------------------- #
-            # step 5: 移动遮挡货物返回到原位（按相反顺序）
+            # step 5: 按移库计划移回或归位遮挡货物
             # ---------------------------------------- #
 
-            logger.info(f"[step 5] 移动遮挡货物返回到原位（按相反顺序）")
-            
-            block_taskno = task_no+3
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                for blocking_node, temp_node in reversed(list(move_mapping.items())):
-                    logger.info(f"[CAR] 移动({temp_node})遮挡货物返回({blocking_node})")
-                    
-                    # 移动货物
-                    success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, temp_node, blocking_node)
-                    if success:
-                        logger.info(f"{good_move_info}")
-                        block_taskno += 3
-                    else:
-                        logger.error(f"{good_move_info}")
-                        return False, f"{good_move_info}"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点返回原位，无需处理")
+            logger.info(f"[step 5] 按移库计划移回或归位遮挡货物")
             
+            success, move_info = await self._execute_relocation_moves(task_no+3, relocation_plan, "return", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
+
             # ---------------------------------------- #
             # step 6: 数据库更新信息
             # ---------------------------------------- #
@@ -1551,55 +1691,15 @@ class DeviceServicesBase():
 
             logger.info("[step 3] 处理出库阻挡货物")
 
-            blocking_nodes = self.get_block_node(target_location, outband_location, db)
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                # step 3.1: 计算靠近高速道阻塞点(按距离排序)
-                # 找到最接近 highway 的阻塞节点
-                do_blocking_nodes = []
-                # 创建阻塞节点的副本，避免修改原始列表
-                remaining_nodes = set(blocking_nodes[1])
-                
-                # 持续查找并移除最近的节点，直到没有剩余节点
-                while remaining_nodes:
-                    # 找到最接近 highway 的阻塞节点
-                    nearest_highway_node = self.path_planner.find_nearest_highway_node(list(remaining_nodes))
-                    if nearest_highway_node:
-                        do_blocking_nodes.append(nearest_highway_node)
-                        # 从剩余节点中移除已找到的节点
-                        remaining_nodes.discard(nearest_highway_node)
-                    else:
-                        # 如果找不到最近节点，跳出循环避免无限循环
-                        break
-                        
-                logger.info(f"[SYSTEM] 靠近高速道阻塞点(按距离排序): {do_blocking_nodes}")
-
-                # 定义临时存放点
-                temp_storage_nodes = [f"1,3,{target_layer}", f"2,3,{target_layer}", f"3,3,{target_layer}"]
-                # 记录移动映射关系，用于将货物移回原位
-                move_mapping = {}
-
-                # step 3.2: 处理遮挡货物
-                block_taskno = task_no+1
-                for i, blocking_node in enumerate(do_blocking_nodes):
-                    if i < len(temp_storage_nodes):
-                        temp_node = temp_storage_nodes[i]
-                        logger.info(f"[CAR] 移动({blocking_node})遮挡货物到({temp_node})")
-                        move_mapping[blocking_node] = temp_node
-
-                        # 移动货物
-                        success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, blocking_node, temp_node)
-                        if success:
-                            logger.info(f"{good_move_info}")
-                            block_taskno += 3
-                        else:
-                            logger.error(f"{good_move_info}")
-                            return False, f"{good_move_info}"
+            success, relocation_plan = self.plan_blocking_relocation(target_location, outband_location, db, store_at_target=False)
+            if not success:
+                logger.error(f"{relocation_plan}")
+                return False, f"{relocation_plan}"
 
-                    else:
-                        logger.warning(f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})")
-                        return False, f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点，直接出库")
+            success, move_info = await self._execute_relocation_moves(task_no+1, relocation_plan, "clear", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
 
             # ---------------------------------------- #
             # step 4: 货物出库
@@ -1615,27 +1715,16 @@ class DeviceServicesBase():
                 return False, f"{target_location}货物出库失败"
 
             # ---------------------------------------- #
-            # step 5: 移动遮挡货物返回到原位（按相反顺序）
+            # step 5: 按移库计划移回或归位遮挡货物
             # ---------------------------------------- #
 
-            logger.info(f"[step 5] 移动遮挡货物返回到原位（按相反顺序）")
-            
-            block_taskno = task_no+3
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                for blocking_node, temp_node in reversed(list(move_mapping.items())):
-                    logger.info(f"[CAR] 移动({temp_node})遮挡货物返回({blocking_node})")
-                    
-                    # 移动货物
-                    success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, temp_node, blocking_node)
-                    if success:
-                        logger.info(f"{good_move_info}")
-                        block_taskno += 3
-                    else:
-                        logger.error(f"{good_move_info}")
-                        return False, f"{good_move_info}"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点返回原位，无需处理")
+            logger.info(f"[step 5] 按移库计划移回或归位遮挡货物")
             
+            success, move_info = await self._execute_relocation_moves(task_no+3, relocation_plan, "return", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
+
             # ---------------------------------------- #
             # step 6: 数据库更新信息
             # ---------------------------------------- #
@@ -1804,58 +1893,15 @@ class DeviceServicesBase():
 
             logger.info("[step 3] 处理出库阻挡货物")
 
-            blocking_nodes = self.get_block_node(start_location, end_location, db)
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                # step 3.1: 计算靠近高速道阻塞点(按距离排序)
-                # 找到最接近 highway 的阻塞节点
-                do_blocking_nodes = []
-                # 创建阻塞节点的副本，避免修改原始列表
-                remaining_nodes = set(blocking_nodes[1])
-                
-                # 持续查找并移除最近的节点，直到没有剩余节点
-                while remaining_nodes:
-                    # 找到最接近 highway 的阻塞节点
-                    nearest_highway_node = self.path_planner.find_nearest_highway_node(list(remaining_nodes))
-                    if nearest_highway_node:
-                        do_blocking_nodes.append(nearest_highway_node)
-                        # 从剩余节点中移除已找到的节点
-                        remaining_nodes.discard(nearest_highway_node)
-                    else:
-                        # 如果找不到最近节点，跳出循环避免无限循环
-                        break
-                        
-                logger.info(f"[SYSTEM] 靠近高速道阻塞点(按距离排序): {do_blocking_nodes}")
-                if len(do_blocking_nodes) > 3:
-                    logger.warning(f"❌ 没有足够的临时存储点操作货物移动 ({start_location}) -> ({end_location})")
-                    return False, f"❌ 没有足够的临时存储点操作货物移动 ({start_location}) -> ({end_location})"
-
-                # 定义临时存放点
-                temp_storage_nodes = [f"1,3,{end_layer}", f"2,3,{end_layer}", f"3,3,{end_layer}"]
-                # 记录移动映射关系，用于将货物移回原位
-                move_mapping = {}
-
-                # step 3.2: 处理遮挡货物
-                block_taskno = task_no+1
-                for i, blocking_node in enumerate(do_blocking_nodes):
-                    if i < len(temp_storage_nodes):
-                        temp_node = temp_storage_nodes[i]
-                        logger.info(f"[CAR] 移动({blocking_node})遮挡货物到({temp_node})")
-                        move_mapping[blocking_node] = temp_node
-
-                        # 移动货物
-                        success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, blocking_node, temp_node)
-                        if success:
-                            logger.info(f"{good_move_info}")
-                            block_taskno += 3
-                        else:
-                            logger.error(f"{good_move_info}")
-                            return False, f"{good_move_info}"
+            success, relocation_plan = self.plan_blocking_relocation(start_location, end_location, db, car_location=car_location)
+            if not success:
+                logger.error(f"{relocation_plan}")
+                return False, f"{relocation_plan}"
 
-                    else:
-                        logger.warning(f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})")
-                        return False, f"[SYSTEM] 没有足够的临时存储点来处理遮挡货物 ({blocking_node})"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点，直接出库")
+            success, move_info = await self._execute_relocation_moves(task_no+1, relocation_plan, "clear", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
 
             # ---------------------------------------- #
             # step 4: 货物转移
@@ -1871,27 +1917,16 @@ class DeviceServicesBase():
                 return False, f"❌ ({start_location})货物转移到({end_location})失败"
 
             # ---------------------------------------- #
-            # step 5: 移动遮挡货物返回到原位（按相反顺序）
+            # step 5: 按移库计划移回或归位遮挡货物
             # ---------------------------------------- #
 
-            logger.info(f"[step 5] 移动遮挡货物返回到原位（按相反顺序）")
-            
-            block_taskno = task_no+3
-            if blocking_nodes and blocking_nodes[0] and blocking_nodes[1]:
-                for blocking_node, temp_node in reversed(list(move_mapping.items())):
-                    logger.info(f"[CAR] 移动({temp_node})遮挡货物返回({blocking_node})")
-                    
-                    # 移动货物
-                    success, good_move_info = await self.good_move_by_start_end_no_lock(block_taskno, temp_node, blocking_node)
-                    if success:
-                        logger.info(f"{good_move_info}")
-                        block_taskno += 3
-                    else:
-                        logger.error(f"{good_move_info}")
-                        return False, f"{good_move_info}"
-            else:
-                logger.info("[SYSTEM] 无阻塞节点返回原位，无需处理")
+            logger.info(f"[step 5] 按移库计划移回或归位遮挡货物")
             
+            success, move_info = await self._execute_relocation_moves(task_no+3, relocation_plan, "return", db)
+            if not success:
+                return False, f"{move_info}"
+            logger.info(f"{move_info}")
+
             # ---------------------------------------- #
             # step 6: 数据库更新信息
             # ---------------------------------------- #
@@ -4,7 +4,7 @@ import random
 from typing import List, Optional, Any, Union, Dict
 
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from fastapi import FastAPI
 
 from app.core.config import settings
@@ -15,9 +15,10 @@ from app.api.v2.common.decorators import standard_response, standard_response_sy
 # from .services.car_commander import CarCommander
 # from .services.task_service import TaskService
 from app.api.v2.wcs import schemas
-from app.api.v2.wcs.services import TaskServices, LocationServices, PathServices, DeviceServices, InitializationService
+from app.api.v2.wcs.services import TaskServices, LocationServices, PathServices, DeviceServices, FleetServices, HistoryServices, ChargingServices, InitializationService
 from app.api.v2.wcs.device_services_base import DeviceServicesBase
-from app.api.v2.core.dependencies import get_database
+from app.api.v2.core.dependencies import get_database, LazyService
+from app.res_system.fleet import get_car_fleet
 from app.models import LocationStatus
 
 # 线程池使用以下方法
@@ -26,10 +27,40 @@ from app.models import LocationStatus
 router = APIRouter()
 task_services = TaskServices()
 location_services = LocationServices()
-path_services = PathServices()
-device_services = DeviceServices()
-device_services_base = DeviceServicesBase()
+# 路径规划和设备服务在 lifespan 或第一个请求时创建, 导入路由模块不连接设备
+path_services = LazyService(PathServices)
+device_services = LazyService(DeviceServices)
+device_services_base = LazyService(DeviceServicesBase)
 initialization_service = InitializationService()
+fleet_services = FleetServices()
+history_services = HistoryServices()
+charging_services = ChargingServices()
+
+
+def build_services() -> None:
+    """创建路径规划和设备服务 (应用启动时调用)。"""
+    for service in (path_services, device_services, device_services_base):
+        service.build()
+
+def start_car_telemetry() -> bool:
+    """开启车队中每台穿梭车的后台遥测 (应用启动时在事件循环中调用)。
+
+    车队按 settings.CAR_FLEET 创建, 不需要设备服务, 快速启动模式下同样在启动时开启。
+    """
+    if settings.USE_MOCK_PLC or not settings.CAR_TELEMETRY_ENABLED:
+        return False
+    get_car_fleet().start_telemetry()
+    if settings.CAR_CHARGE_ENABLED:
+        # 充电调度按遥测电量决策, 数据库中等待的任务也算作任务队列
+        scheduler = charging_services.scheduler
+        scheduler.add_queue_source("tasks", ChargingServices.pending_task_count)
+        scheduler.start()
+    return True
+
+async def stop_car_telemetry() -> None:
+    """停止充电调度和穿梭车后台遥测 (应用关闭时调用)。"""
+    await charging_services.scheduler.stop()
+    await get_car_fleet().stop_telemetry()
 
 #################################################
 # 任务接口
@@ -391,6 +422,32 @@ async def create_path(request: schemas.PathBase) -> StandardResponse[Union[List,
     else:
         return StandardResponse.isError(message=f"{path_info}")
 
+@router.post("/create/path/batch", response_model=StandardResponse[Union[List, Dict]])
+@standard_response
+async def create_path_batch(request: schemas.PathBatch) -> StandardResponse[Union[List, Dict]]:
+    """批量生成路径。同时返回路径、切割路径和车移动任务段, 单项失败不影响整批。"""
+
+    success, path_info = await path_services.get_path_batch(request.items)
+
+    if success:    
+        return StandardResponse.isSuccess(data=path_info)
+    else:
+        return StandardResponse.isError(message=f"{path_info}")
+
+@router.post("/create/journey", response_model=StandardResponse[Union[List, Dict]])
+@standard_response
+async def create_journey(request: schemas.JourneyBase) -> StandardResponse[Union[List, Dict]]:
+    """生成端到端行程。跨层时包含穿梭车段、电梯段和交接点, 估算时间考虑电梯当前楼层和队列。"""
+
+    success, journey = path_services.get_journey(
+        request.source, request.target, request.lift_floor, request.lift_queue, request.depart_delay
+    )
+
+    if success:    
+        return StandardResponse.isSuccess(data=journey)
+    else:
+        return StandardResponse.isError(message=f"{journey}")
+
 @router.post("/create/car_move_segments", response_model=StandardResponse[Union[List, Dict]])
 @standard_response
 async def car_move_segments(request: schemas.PathBase) -> StandardResponse[Union[List, Dict]]:
@@ -416,14 +473,169 @@ async def good_move_segments(request: schemas.PathBase) -> StandardResponse[Unio
         return StandardResponse.isError(message=f"{path_info}")
 
 
+#################################################
+# 地图接口
+#################################################
+
+@router.get("/read/map_image")
+@standard_response
+async def read_map_image(
+    request: Request,
+    layer: int = Query(..., ge=1, examples=[1], description="楼层"),
+    fmt: str = Query("svg", examples=["svg"], description="图像格式: svg 或 png"),
+    source: Optional[str] = Query(None, examples=["5,3,1"], description="叠加路径的起点"),
+    target: Optional[str] = Query(None, examples=["1,1,1"], description="叠加路径的终点"),
+    db: Session = get_database()
+    ):
+    """[地图图像接口 - 数据库] 渲染一层的库位状态图, 可叠加路径。
+
+    返回图像本身 (可直接用于 <img src>), 响应头 ETag 为图像版本号,
+    请求头 If-None-Match 与之相同时返回 304, 前端无需重新下载。
+    """
+    success, msg = path_services.render_layer_map(db, layer, fmt, source, target)
+    if not success:
+        return StandardResponse.isError(message=f"{msg}")
+    content, etag = msg
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    media_type = "image/svg+xml" if fmt == "svg" else "image/png"
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@router.post("/read/map_overlay", response_model=StandardResponse[Dict])
+@standard_response
+async def read_map_overlay() -> StandardResponse[Dict]:
+    """获取地图覆盖层。返回当前被禁用的节点和边。"""
+
+    success, overlay_info = path_services.get_map_overlay()
+
+    if success:    
+        return StandardResponse.isSuccess(data=overlay_info)
+    else:
+        return StandardResponse.isError(message=f"{overlay_info}")
+
+@router.post("/write/map_overlay/disable", response_model=StandardResponse[Dict])
+@standard_response
+async def disable_map_elements(request: schemas.MapOverlayUpdate) -> StandardResponse[Dict]:
+    """禁用节点和边。立即生效并持久化, 返回受影响的楼层和在途路径。"""
+
+    success, overlay_info = path_services.update_map_overlay(True, request.nodes, request.edges)
+
+    if success:    
+        return StandardResponse.isSuccess(data=overlay_info)
+    else:
+        return StandardResponse.isError(message=f"{overlay_info}")
+
+@router.post("/write/map_overlay/enable", response_model=StandardResponse[Dict])
+@standard_response
+async def enable_map_elements(request: schemas.MapOverlayUpdate) -> StandardResponse[Dict]:
+    """启用节点和边。立即生效并持久化。"""
+
+    success, overlay_info = path_services.update_map_overlay(False, request.nodes, request.edges)
+
+    if success:    
+        return StandardResponse.isSuccess(data=overlay_info)
+    else:
+        return StandardResponse.isError(message=f"{overlay_info}")
+
+
 #################################################
 # 穿梭车接口
 #################################################
 
+@router.get("/read/car_task_cache", response_model=StandardResponse[Dict])
+@standard_response
+async def read_car_task_cache() -> StandardResponse[Dict]:
+    """获取穿梭车任务报文缓存统计。返回命中/未命中次数、淘汰数和缓存条目数。"""
+
+    success, cache_info = path_services.get_packet_cache_stats()
+
+    if success:    
+        return StandardResponse.isSuccess(data=cache_info)
+    else:
+        return StandardResponse.isError(message=f"{cache_info}")
+
+@router.get("/read/car_fleet", response_model=StandardResponse[Dict])
+@standard_response
+async def read_car_fleet(
+    max_age: Optional[float] = Query(None, ge=0, description="可接受的缓存时效(秒), 默认为配置值")
+) -> StandardResponse[Dict]:
+    """获取穿梭车车队状态。返回每台穿梭车的位置、状态、电量、当前作业和分派统计。"""
+
+    success, fleet_info = fleet_services.get_fleet_status(max_age)
+
+    if success:    
+        return StandardResponse.isSuccess(data=fleet_info)
+    else:
+        return StandardResponse.isError(message=f"{fleet_info}")
+
+@router.post("/control/fleet_car_move", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def fleet_car_move(
+    request: schemas.CarMoveBase,
+    timeout: Optional[float] = Query(None, ge=0, description="等待空闲穿梭车的最长时间(秒), 默认 CAR_ACTION_TIMEOUT")
+) -> StandardResponse[Union[str, Dict]]:
+    """由目标楼层上最合适的空闲穿梭车 (距离近、电量高) 移动到目标位置。"""
+
+    success, car_info = await fleet_services.car_move(request.target, timeout)
+
+    if success:    
+        return StandardResponse.isSuccess(data=car_info)
+    else:
+        return StandardResponse.isError(message=f"{car_info}")
+
+@router.post("/control/fleet_good_move", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def fleet_good_move(
+    request: schemas.GoodMoveBase,
+    timeout: Optional[float] = Query(None, ge=0, description="等待空闲穿梭车的最长时间(秒), 默认 CAR_ACTION_TIMEOUT")
+) -> StandardResponse[Union[str, Dict]]:
+    """由起点楼层上最合适的空闲穿梭车把货物从起点移到终点 (同层), 不同穿梭车的作业并发执行。"""
+
+    success, car_info = await fleet_services.good_move(request.start_location, request.end_location, timeout)
+
+    if success:    
+        return StandardResponse.isSuccess(data=car_info)
+    else:
+        return StandardResponse.isError(message=f"{car_info}")
+
+@router.get("/read/telemetry_devices", response_model=StandardResponse[List[Dict]])
+@standard_response
+async def read_telemetry_devices() -> StandardResponse[List[Dict]]:
+    """获取有遥测历史的设备 (穿梭车、电梯) 及其行数和时间范围。"""
+
+    success, devices = history_services.list_devices()
+
+    if success:    
+        return StandardResponse.isSuccess(data=devices)
+    else:
+        return StandardResponse.isError(message=f"{devices}")
+
+@router.get("/read/telemetry_history", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def read_telemetry_history(
+    device: str = Query(..., description="设备名称, 如 car:192.168.8.20:2504、lift:192.168.8.10"),
+    start: Optional[float] = Query(None, description="开始时间戳(秒)"),
+    end: Optional[float] = Query(None, description="结束时间戳(秒), 默认为最新"),
+    last: Optional[float] = Query(600, gt=0, description="未给出开始时间时, 查询最近多少秒"),
+    step: Optional[float] = Query(None, gt=0, description="降采样间隔(秒), 每个间隔保留最后一行"),
+    max_points: Optional[int] = Query(2000, gt=0, description="最多返回的行数, 超过时自动降采样")
+) -> StandardResponse[Union[str, Dict]]:
+    """按时间窗口查询设备遥测历史。返回按列的数据 (t 为时间戳), 用于分析节拍时间。"""
+
+    success, history = history_services.query(device, start, end, last, step, max_points)
+
+    if success:    
+        return StandardResponse.isSuccess(data=history)
+    else:
+        return StandardResponse.isError(message=f"{history}")
+
 @router.get("/control/get_car_location", response_model=StandardResponse[Union[str, Dict]])
 @standard_response
-async def get_car_location() -> StandardResponse[Union[str, Dict]]:
-    """获取穿梭车当前位置。"""
+async def get_car_location(
+    max_age: Optional[float] = Query(None, ge=0, description="可接受的缓存时效(秒), 默认为配置值, 0 表示重新查询")
+) -> StandardResponse[Union[str, Dict]]:
+    """获取穿梭车当前位置。优先读取后台遥测的缓存。"""
 
     if settings.USE_MOCK_PLC:
         if settings.MOCK_BOOL:
@@ -433,7 +645,7 @@ async def get_car_location() -> StandardResponse[Union[str, Dict]]:
             success = False
             car_info = "error"
     else:
-        success, car_info = device_services_base.get_car_current_location()
+        success, car_info = device_services_base.get_car_current_location(max_age)
 
     if success:    
         return StandardResponse.isSuccess(data=car_info)
@@ -442,8 +654,10 @@ async def get_car_location() -> StandardResponse[Union[str, Dict]]:
     
 @router.get("/control/get_car_status", response_model=StandardResponse[Union[str, Dict]])
 @standard_response
-async def get_car_status() -> StandardResponse[Union[str, Dict]]:
-    """获取穿梭车当前状态信息。"""
+async def get_car_status(
+    max_age: Optional[float] = Query(None, ge=0, description="可接受的缓存时效(秒), 默认为配置值, 0 表示重新查询")
+) -> StandardResponse[Union[str, Dict]]:
+    """获取穿梭车当前状态信息。优先读取后台遥测的缓存。"""
 
     if settings.USE_MOCK_PLC:
         if settings.MOCK_BOOL:
@@ -461,7 +675,7 @@ async def get_car_status() -> StandardResponse[Union[str, Dict]]:
                 'description': "error"
             }
     else:
-        success, car_info = device_services_base.get_car_status()
+        success, car_info = device_services_base.get_car_status(max_age)
 
     if success:    
         return StandardResponse.isSuccess(data=car_info)
@@ -470,8 +684,10 @@ async def get_car_status() -> StandardResponse[Union[str, Dict]]:
 
 @router.get("/control/get_car_info_with_power", response_model=StandardResponse[Union[str, Dict]])
 @standard_response
-async def get_car_info_with_power() -> StandardResponse[Union[str, Dict]]:
-    """获取穿梭车当前信息（带电量信息）。"""
+async def get_car_info_with_power(
+    max_age: Optional[float] = Query(None, ge=0, description="可接受的缓存时效(秒), 默认为配置值, 0 表示重新查询")
+) -> StandardResponse[Union[str, Dict]]:
+    """获取穿梭车当前信息（带电量信息）。优先读取后台遥测的缓存。"""
 
     if settings.USE_MOCK_PLC:
         if settings.MOCK_BOOL:
@@ -509,7 +725,7 @@ async def get_car_info_with_power() -> StandardResponse[Union[str, Dict]]:
                 'power': 'error'
             }
     else:
-        success, car_info = device_services_base.get_car_info_with_power()
+        success, car_info = device_services_base.get_car_info_with_power(max_age)
 
     if success:    
         return StandardResponse.isSuccess(data=car_info)
@@ -573,6 +789,48 @@ async def stop_car_charge() -> StandardResponse[Union[str, Dict]]:
     else:
         return StandardResponse.isError(message=f"{car_info}", data=car_info)
     
+@router.get("/read/charge_schedule", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def read_charge_schedule(
+    car_id: Optional[int] = Query(None, description="穿梭车设备ID, 不填为全部")
+) -> StandardResponse[Union[str, Dict]]:
+    """获取充电调度最近一次的决策及原因 (电量、放电速率、预计剩余时间、任务队列), 以及阈值和充电记录。"""
+
+    success, schedule = charging_services.explain(car_id)
+
+    if success:    
+        return StandardResponse.isSuccess(data=schedule)
+    else:
+        return StandardResponse.isError(message=f"{schedule}")
+
+@router.get("/control/charge_check", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def charge_check(
+    act: bool = Query(False, description="是否执行决策 (开始或结束充电), 默认只预览")
+) -> StandardResponse[Union[str, Dict]]:
+    """立即检查一次充电调度, 返回每台穿梭车的决策。"""
+
+    success, decisions = await charging_services.check(act)
+
+    if success:    
+        return StandardResponse.isSuccess(data=decisions)
+    else:
+        return StandardResponse.isError(message=f"{decisions}")
+
+@router.get("/control/charge_auto", response_model=StandardResponse[Union[str, Dict]])
+@standard_response
+async def charge_auto(
+    enabled: bool = Query(..., description="是否由后台充电调度自动送穿梭车充电")
+) -> StandardResponse[Union[str, Dict]]:
+    """开启或关闭自动充电; 关闭时后台仍按遥测做出决策, 可在充电调度接口查看。"""
+
+    success, data = charging_services.set_auto(enabled)
+
+    if success:    
+        return StandardResponse.isSuccess(data=data)
+    else:
+        return StandardResponse.isError(message=f"{data}")
+
 @router.get("/control/car_move_to_charge", response_model=StandardResponse[Union[str, Dict]])
 @standard_response
 async def car_move_to_charge() -> StandardResponse[Union[str, Dict]]:
@@ -788,6 +1046,41 @@ async def control_task_outband(request: schemas.CarMoveBase):
         return StandardResponse.isError(message=f"{msg}")
 
 
+@router.post("/read/inband_location", response_model=StandardResponse[Dict])
+@standard_response
+async def read_inband_location(
+    request: schemas.InbandLocationRecommend,
+    db: Session = get_database()
+    ):
+    """[入库库位推荐接口 - 数据库] 按货道深度、阻塞和行驶时间推荐入库库位。"""
+    success, msg = device_services_base.recommend_inband_location(
+        db,
+        request.layers,
+        request.car_location,
+        request.top_k
+        )
+    if success:
+        return StandardResponse.isSuccess(data=msg)
+    return StandardResponse.isError(message=f"{msg}")
+
+@router.post("/read/relocation_plan", response_model=StandardResponse[Dict])
+@standard_response
+async def read_relocation_plan(
+    request: schemas.RelocationPlanBase,
+    db: Session = get_database()
+    ):
+    """[移库规划接口 - 数据库] 预览任务路线上阻塞货物的停放位置、移动顺序和预计耗时。"""
+    success, msg = device_services_base.plan_blocking_relocation(
+        request.source,
+        request.target,
+        db,
+        request.car_location,
+        request.store_at_target
+        )
+    if success:
+        return StandardResponse.isSuccess(data=msg)
+    return StandardResponse.isError(message=f"{msg}")
+
 @router.post("/control/task_inband_with_solve_blocking")
 @standard_response
 async def control_task_inband_with_solve_blocking(
@@ -111,6 +111,12 @@ class GoodTask(BaseModel):
     location: str = Field(..., examples=["1,1,4"], description="库位坐标")
     new_pallet_id: str = Field(..., examples=["P1001"], description="托盘号")
 
+class InbandLocationRecommend(BaseModel):
+    """WCS入库库位推荐模型"""
+    layers: Optional[List[int]] = Field(default=None, examples=[[1, 2]], description="候选楼层, 为空时所有楼层")
+    car_location: Optional[str] = Field(default=None, examples=["6,3,1"], description="穿梭车当前位置, 为空时向穿梭车查询")
+    top_k: int = Field(default=5, ge=1, le=50, examples=[5], description="返回的库位数量")
+
 class GoodMoveTask(BaseModel):
     """WCS带托盘号入库"""
     pallet_id: str = Field(..., examples=["P1001"], description="托盘号")
@@ -131,6 +137,26 @@ class PathBase(BaseModel):
     source: str = Field(..., examples=["1,1,1"], description="起始点")
     target: str = Field(..., examples=["6,3,1"], description="目标点")
 
+class PathBatch(BaseModel):
+    """WCS批量路径模型"""
+    items: List[PathBase] = Field(..., min_length=1, examples=[[{"source": "1,1,1", "target": "6,3,1"}]], description="路径请求列表, 超过 PATH_BATCH_MAX_ITEMS 的项不规划, 在结果中标明失败")
+
+class JourneyBase(PathBase):
+    """WCS跨层行程模型"""
+    lift_floor: Optional[int] = Field(default=None, ge=1, examples=[1], description="电梯当前所在楼层")
+    lift_queue: int = Field(default=0, ge=0, examples=[0], description="电梯队列中待执行的任务数")
+    depart_delay: float = Field(default=0.0, ge=0, examples=[0.0], description="穿梭车延迟出发的时间(秒)")
+
+class RelocationPlanBase(PathBase):
+    """WCS阻塞货物移库规划模型"""
+    car_location: Optional[str] = Field(default=None, examples=["5,3,1"], description="穿梭车当前位置, 为空时为起点")
+    store_at_target: bool = Field(default=True, examples=[True], description="任务完成后终点是否有货, 出库时为false")
+
+class MapOverlayUpdate(BaseModel):
+    """WCS地图覆盖层更新模型"""
+    nodes: List[str] = Field(default=[], examples=[["5,5,1"]], description="节点列表")
+    edges: List[List[str]] = Field(default=[], examples=[[["4,5,1", "5,5,1"]]], description="边列表")
+
 class ResponsePathBase(BaseModel):
     """WCS路径模型"""
     path: List[str] = Field(..., examples=[["1,1,1", "1,1,2", "1,1,3", "1,1,4"]], description="路径点列表")
@@ -14,13 +14,17 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app.models.base_model import TaskList as TaskModel
 from app.models.base_model import LocationList as LocationModel
-from app.models.base_enum import LocationStatus
+from app.models.base_enum import LocationStatus, TaskStatus
+from app.core.database import SessionLocal
 from . import schemas
 # from app.utils.devices_logger import DevicesLogger
 
-from app.map_core import PathCustom
+from app.map_core import PathCustom, get_map_overlay, update_map_overlay, get_map_renderer
 # from app.devices.service_asyncio import DevicesService, DB_12
 from app.devices import DevicesController, AsyncDevicesController, DevicesControllerByStep
+from app.res_system import CarFleet, FleetCar, get_car_fleet, get_packet_cache
+from app.res_system import ChargeScheduler, get_charge_scheduler
+from app.utils.telemetry_history import find_history, list_histories
 from app.res_system.controller import AsyncSocketCarController
 from app.plc_system.controller import PLCController
 from app.plc_system.enum import (
@@ -844,6 +848,127 @@ class PathServices:
             return False, "路径不存在"
         return True, path
 
+    async def get_path_batch(self, items: List[schemas.PathBase]) -> Tuple[bool, Union[str, Dict]]:
+        """[异步] 批量获取路径、切割路径和车辆移动任务段。
+
+        同一起点的请求共用一次搜索, 单项失败在结果中标明, 不影响其他项;
+        超过 settings.PATH_BATCH_MAX_ITEMS 的项不规划, 标明超出上限。
+        """
+        limit = settings.PATH_BATCH_MAX_ITEMS
+        results = self.path_planner.plan_batch([(item.source, item.target) for item in items[:limit]])
+        for item in items[limit:]:
+            results.append({
+                "source": item.source,
+                "target": item.target,
+                "success": False,
+                "message": f"超过单次批量上限 {limit} 项, 请分批请求",
+                "path": None,
+                "cut_path": None,
+                "segments": None
+            })
+        failed = sum(1 for result in results if not result["success"])
+        return True, {
+            "total": len(results),
+            "failed": failed,
+            "items": results
+        }
+
+    def get_journey(
+        self,
+        source: str,
+        target: str,
+        lift_floor: Optional[int] = None,
+        lift_queue: int = 0,
+        depart_delay: float = 0.0
+    ) -> Tuple[bool, Union[str, Dict]]:
+        """获取端到端行程 (穿梭车段、电梯段、交接点和估算时间), 支持跨层。
+
+        Args:
+            source: 起点
+            target: 终点
+            lift_floor: 电梯当前所在楼层
+            lift_queue: 电梯队列中待执行的任务数
+            depart_delay: 穿梭车延迟出发的时间, 用于比较调度方案
+
+        Returns:
+            Tuple: [bool, 行程]
+        """
+        try:
+            journey = self.path_planner.plan_journey(source, target, lift_floor, lift_queue, depart_delay)
+        except ValueError as e:
+            return False, f"❌ {e}"
+        if journey is None:
+            return False, "路径不存在"
+        return True, journey
+
+    def render_layer_map(
+        self,
+        db: Session,
+        layer: int,
+        fmt: str = "svg",
+        source: Optional[str] = None,
+        target: Optional[str] = None
+    ) -> Tuple[bool, Union[str, Tuple[bytes, str]]]:
+        """渲染一层的库位状态图, 可叠加 source -> target 的路径。
+
+        底图按楼层缓存, 库位状态不变时直接返回缓存的图像。
+
+        Args:
+            db: Session 数据库会话
+            layer: 楼层号
+            fmt: "svg" 或 "png"
+            source: 路径起点
+            target: 路径终点
+
+        Returns:
+            Tuple: [bool, (图像内容, 图像版本号)]
+        """
+        path = None
+        if source or target:
+            if not (source and target):
+                return False, "❌ 路径起点和终点需要同时提供"
+            try:
+                path = self.path_planner.find_shortest_path(source, target)
+            except ValueError as e:
+                return False, f"❌ {e}"
+            if not path:
+                return False, "路径不存在"
+
+        success, location_info = LocationServices().get_locations(db)
+        if not success:
+            return False, f"{location_info}"
+        node_status = {node.location: node.status for node in location_info}
+        try:
+            return True, get_map_renderer().render(self.path_planner.graph, layer, node_status, fmt, path)
+        except ValueError as e:
+            return False, f"❌ {e}"
+
+    def get_packet_cache_stats(self) -> Tuple[bool, Union[str, Dict]]:
+        """获取穿梭车任务报文缓存的命中统计。"""
+        return True, get_packet_cache().stats
+
+    def get_map_overlay(self) -> Tuple[bool, Union[str, Dict]]:
+        """获取地图覆盖层 (被禁用的节点和边)。"""
+        return True, get_map_overlay()
+
+    def update_map_overlay(self, disable: bool, nodes: List[str], edges: List[List[str]]) -> Tuple[bool, Union[str, Dict]]:
+        """禁用或启用节点和边, 无需重启服务。
+
+        Args:
+            disable: True 禁用, False 启用
+            nodes: 节点列表
+            edges: 边列表
+
+        Returns:
+            Tuple: [bool, 更新结果 (新地图版本、影响楼层、受影响的在途路径)]
+        """
+        if not nodes and not edges:
+            return False, "❌ 节点和边不能同时为空"
+        try:
+            return True, update_map_overlay(disable, nodes, edges)
+        except ValueError as e:
+            return False, f"❌ {e}"
+
     # async def get_car_move_segments(self, source: str, target: str):
     #     """
     #     异步 - 获取路径任务服务 (线程池)
@@ -922,6 +1047,8 @@ class DeviceServices:
         # 设备操作锁
         self.operation_lock = asyncio.Lock()
         self.operation_in_progress = False
+        # 单车服务驱动的穿梭车在车队中的条目, 操作期间持有其作业锁
+        self.fleet_car: Optional[FleetCar] = None
 
     # @property
     # def loop(self):
@@ -942,6 +1069,13 @@ class DeviceServices:
             
         acquired = await self.operation_lock.acquire()
         if acquired:
+            # 同时占用车队中的同一台穿梭车, 避免车队在单车作业的间隙把它分派给其他作业或送去充电
+            fleet = get_car_fleet()
+            fleet_car = fleet.find(settings.CAR_IP, settings.CAR_PORT)
+            if fleet_car is not None and not await fleet.try_hold(fleet_car, "device_task"):
+                self.operation_lock.release()
+                return False
+            self.fleet_car = fleet_car
             self.operation_in_progress = True
             return True
         return False
@@ -949,6 +1083,9 @@ class DeviceServices:
     def release_lock(self):
         """释放电梯操作锁。"""
         self.operation_in_progress = False
+        if self.fleet_car is not None:
+            get_car_fleet().release(self.fleet_car)
+            self.fleet_car = None
         if self.operation_lock.locked():
             self.operation_lock.release()
 
@@ -2262,4 +2399,188 @@ class DeviceServices:
                     return [False, f"获取到未知的成功响应类型: {type(location_info)}"]
 
         finally:
-            self.release_lock()
\ No newline at end of file
+            self.release_lock()
+
+class FleetServices:
+    """穿梭车车队服务: 同层作业分派给最合适的空闲穿梭车, 不同穿梭车的作业并发执行。"""
+
+    def __init__(self, fleet: Optional[CarFleet] = None):
+        # 车队在第一次使用时按 settings.CAR_FLEET 创建
+        self._fleet = fleet
+
+    @property
+    def fleet(self) -> CarFleet:
+        if self._fleet is None:
+            self._fleet = get_car_fleet()
+        return self._fleet
+
+    def get_fleet_status(self, max_age: Optional[float] = None) -> Tuple[bool, Dict]:
+        """获取车队中每台穿梭车的位置、状态、电量和当前作业。"""
+        return True, self.fleet.status(max_age)
+
+    async def _move_and_wait(self, car: FleetCar, task_no: int, target: str, with_goods: bool = False) -> bool:
+        """下发移动 (或带货移动) 任务并等待到达。"""
+        if with_goods:
+            sent = await car.controller.good_move(task_no, target)
+        else:
+            sent = await car.controller.car_move(task_no, target)
+        return sent and await car.controller.wait_car_move_complete_by_location(target)
+
+    @staticmethod
+    def _route(*locations: str):
+        """作业路线: 穿梭车当前位置依次经过 locations 的最短路径节点, 用于车队检查路线冲突。"""
+        def route(car: FleetCar) -> Optional[List[str]]:
+            if car.location is None:
+                return None
+            cells = [car.location]
+            for location in locations:
+                path = car.controller.map.find_shortest_path(cells[-1], location)
+                if path is None:
+                    return None
+                cells.extend(path[1:])
+            return cells
+        return route
+
+    def _unavailable(self, layer: str) -> str:
+        """没有分派到穿梭车时的错误信息, 附带最近一次路线冲突的原因。"""
+        if self.fleet.last_conflict:
+            return f"❌ {layer} 层没有可用的穿梭车 ({self.fleet.last_conflict})"
+        return f"❌ {layer} 层没有可用的穿梭车"
+
+    async def car_move(self, target: str, timeout: Optional[float] = None) -> Tuple[bool, Union[str, Dict]]:
+        """由目标楼层上最合适的空闲穿梭车移动到 target。
+
+        Args:
+            target: 目标位置 "x,y,z"
+            timeout: 等待空闲穿梭车的最长时间 (秒), None 表示 settings.CAR_ACTION_TIMEOUT
+        """
+        if timeout is None:
+            timeout = settings.CAR_ACTION_TIMEOUT
+        async with self.fleet.dispatch(
+            target, f"car_move {target}", same_floor=True, timeout=timeout, route=self._route(target)
+        ) as car:
+            if car is None:
+                return False, self._unavailable(target.split(',')[-1])
+            if not await self._move_and_wait(car, randint(1, 100), target):
+                return False, f"❌ 穿梭车 {car.car_id} 未到达 {target}"
+            return True, {"car_id": car.car_id, "location": target}
+
+    async def good_move(
+            self,
+            start_location: str,
+            end_location: str,
+            timeout: Optional[float] = None
+    ) -> Tuple[bool, Union[str, Dict]]:
+        """由起点楼层上最合适的空闲穿梭车把货物从 start_location 移到 end_location (同层)。
+
+        Args:
+            start_location: 货物起点 "x,y,z"
+            end_location: 货物终点 "x,y,z"
+            timeout: 等待空闲穿梭车的最长时间 (秒), None 表示 settings.CAR_ACTION_TIMEOUT
+        """
+        start_layer = start_location.split(',')[-1]
+        if start_layer != end_location.split(',')[-1]:
+            return False, "❌ 车队作业只支持同层移动货物, 跨层请使用出入库任务"
+        if timeout is None:
+            timeout = settings.CAR_ACTION_TIMEOUT
+
+        job = f"good_move {start_location}->{end_location}"
+        async with self.fleet.dispatch(
+            start_location, job, same_floor=True, timeout=timeout, route=self._route(start_location, end_location)
+        ) as car:
+            if car is None:
+                return False, self._unavailable(start_layer)
+            task_no = randint(1, 100)
+            if not await self._move_and_wait(car, task_no, start_location):
+                return False, f"❌ 穿梭车 {car.car_id} 未到达货物位置 {start_location}"
+            if not await self._move_and_wait(car, task_no % 255 + 1, end_location, with_goods=True):
+                return False, f"❌ 穿梭车 {car.car_id} 未把货物送到 {end_location}"
+            return True, {"car_id": car.car_id, "location": end_location}
+
+
+class HistoryServices:
+    """遥测历史服务: 穿梭车心跳和电梯状态的历史查询。"""
+
+    def list_devices(self) -> Tuple[bool, List[Dict]]:
+        """获取有历史记录的设备、行数和时间范围。"""
+        return True, list_histories()
+
+    def query(
+            self,
+            device: str,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+            last: Optional[float] = None,
+            step: Optional[float] = None,
+            max_points: Optional[int] = None
+    ) -> Tuple[bool, Union[str, Dict]]:
+        """查询设备在时间窗口内的历史, 可降采样。
+
+        Args:
+            device: 设备名称, 如 "car:192.168.8.20:2504"、"lift:192.168.8.10"
+            start: 开始时间戳 (秒)
+            end: 结束时间戳 (秒)
+            last: 最近多少秒, 未给出 start 时使用
+            step: 降采样间隔 (秒)
+            max_points: 最多返回的行数
+        """
+        history = find_history(device)
+        if history is None:
+            return False, f"设备 {device} 没有历史记录"
+        if start is None and last is not None:
+            start = (time.time() if end is None else end) - last
+        if start is not None and end is not None and start > end:
+            return False, "开始时间晚于结束时间"
+        rows = history.query(start, end, step, max_points)
+        return True, history.to_dict(rows)
+
+
+class ChargingServices:
+    """充电调度服务: 每台穿梭车的充电决策及原因、放电模型和充电记录。"""
+
+    def __init__(self, scheduler: Optional[ChargeScheduler] = None):
+        # 调度在第一次使用时按全局车队创建
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self) -> ChargeScheduler:
+        if self._scheduler is None:
+            self._scheduler = get_charge_scheduler()
+        return self._scheduler
+
+    @staticmethod
+    def pending_task_count() -> int:
+        """数据库中等待执行的出入库任务数 (充电调度的任务队列来源)。"""
+        db = SessionLocal()
+        try:
+            return db.query(TaskModel).filter(TaskModel.task_status == TaskStatus.PENDING.value).count()
+        finally:
+            db.close()
+
+    def explain(self, car_id: Optional[int] = None) -> Tuple[bool, Union[str, Dict]]:
+        """获取最近一次检查的充电决策和原因、阈值、放电模型和充电记录。
+
+        Args:
+            car_id: 只查询这台穿梭车, None 表示全部
+        """
+        if car_id is not None and self.scheduler.fleet.get(car_id) is None:
+            return False, f"❌ 车队中没有穿梭车 {car_id}"
+        return True, self.scheduler.explain(car_id)
+
+    async def check(self, act: bool = False) -> Tuple[bool, Dict]:
+        """立即检查一次, 返回每台穿梭车的决策。
+
+        Args:
+            act: 是否执行决策 (开始或结束充电), False 时只预览
+        """
+        decisions = await self.scheduler.check(act)
+        return True, {"queue": dict(self.scheduler.queue), "cars": decisions}
+
+    def set_auto(self, enabled: bool) -> Tuple[bool, Dict]:
+        """开启或关闭后台自动充电 (关闭时后台只记录决策, 不驱动穿梭车; 正在进行的充电不受影响)。
+
+        Args:
+            enabled: 是否自动执行充电决策
+        """
+        self.scheduler.auto = enabled
+        return True, {"auto": self.scheduler.auto}
@@ -17,8 +17,16 @@ class Settings():
     
     # ===== 设备配置 =====
     PLC_IP = "192.168.8.10"
-    CAR_IP = "192.168.8.20"
-    CAR_PORT = 2504
+    # 穿梭车车队: car_id 即报文中的设备ID, 增加穿梭车只需添加一项
+    CAR_FLEET = [
+        {"car_id": 1, "host": "192.168.8.20", "port": 2504},
+        {"car_id": 2, "host": "192.168.8.30", "port": 2504},
+    ]
+    # 穿梭车固件是否在响应中回显请求的生命值; False 时响应按顺序交给同类型最早的请求
+    CAR_ECHOES_LIFE = True
+    # 单车服务 (跨层、出入库) 使用的默认穿梭车: 车队中的第一台
+    CAR_IP = CAR_FLEET[0]["host"]
+    CAR_PORT = CAR_FLEET[0]["port"]
 
     # ====== 数据库配置 =====
     SQLITE_DB = "wcs.db"
@@ -27,6 +35,12 @@ class Settings():
     # ===== 最大连接数 =====
     MAP_SIZE = 5
 
+    # ===== 路径规划 =====
+    # True: 获取阻塞节点时额外计算最少阻塞路线并记录可少移动的货物数量 (多一次路径搜索, 用于调试)
+    PATH_BLOCKING_REPORT = False
+    # 批量路径接口一次最多规划的请求数, 超出的项在结果中标明失败
+    PATH_BATCH_MAX_ITEMS = 200
+
     # 切换为 False 连接真实 PLC
     USE_MOCK_PLC = False
     MOCK_BOOL = False  # True 切换为成功模拟，False 切换为失败模拟
@@ -35,4 +49,47 @@ class Settings():
     PLC_ACTION_TIMEOUT = 120.0
     CAR_ACTION_TIMEOUT = 300.0
 
+    # ===== 穿梭车遥测配置 =====
+    # True: 应用启动时开启后台心跳, 状态查询优先读取缓存
+    CAR_TELEMETRY_ENABLED = True
+    CAR_TELEMETRY_INTERVAL = 1.0      # 心跳间隔（秒）
+    CAR_TELEMETRY_BATTERY_EVERY = 30  # 每多少次心跳发送一次电量心跳
+    CAR_STATE_MAX_AGE = 2.0           # 状态查询接口默认接受的缓存时效（秒）
+    CAR_DISPATCH_MIN_POWER = 20       # 车队分派作业时要求的最低电量（%）
+
+    # ===== 充电调度 =====
+    # 按作业类型估计放电速率, 预计电量将在 CAR_CHARGE_HORIZON 秒内降到 CAR_DISPATCH_MIN_POWER 时,
+    # 趁任务队列空闲送去充电; 低于 CAR_CHARGE_CRITICAL 时不等空闲
+    CAR_CHARGE_ENABLED = True
+    # False: 后台只做决策 (充电调度接口可查看原因, 用于调整阈值), 不驱动穿梭车;
+    # 阈值和放电速率调好后由操作员开启 (或调用 /control/charge_auto)
+    CAR_CHARGE_AUTO = False
+    CAR_CHARGE_INTERVAL = 5.0         # 检查间隔（秒）
+    CAR_CHARGE_CRITICAL = 25          # 立即充电的电量（%）
+    CAR_CHARGE_HORIZON = 1800.0       # 预测时长（秒）
+    CAR_CHARGE_IDLE_GAP = 30.0        # 穿梭车空闲且任务队列为空多久视为空闲时段（秒）
+    CAR_CHARGE_TARGET = 95            # 充满的电量（%）
+    CAR_CHARGE_RELEASE = 60           # 有任务等待时, 充到此电量即结束充电去执行任务（%）
+    CAR_CHARGE_MAX_CONCURRENT = 1     # 同时趁空闲充电的穿梭车数 (立即充电不受限制)
+    CAR_CHARGERS = {1: "1,1,1", 2: "1,1,2"}  # 每层充电口位置
+    CAR_DISCHARGE_PRIOR = {"idle": 0.001, "default": 0.01}  # 没有样本时的放电速率（%/秒）
+
+    # ===== 遥测历史 =====
+    # 每台设备在内存中保留的行数 (穿梭车每行 24 字节), 写满后最旧的行溢出到磁盘文件
+    HISTORY_ENABLED = True
+    HISTORY_CAPACITY = 86400
+    HISTORY_SPILL_DIR = "app/data/history"  # 相对路径相对于 backend 目录; None 表示不写磁盘, 写满后覆盖最旧的行
+    # 每台设备溢出文件的上限, 超过时删去最旧的行 (None 表示不限制)
+    HISTORY_SPILL_MAX_BYTES = 256 * 1024 * 1024
+    HISTORY_SPILL_MAX_AGE = 7 * 86400.0  # 溢出文件保留的时长（秒）
+
+    # ===== 任务段流水线 =====
+    # 穿梭车执行到倒数第几个任务段, 或距离终点几格时, 提前触发后续动作 (下一个任务、电梯、输送线)
+    CAR_PIPELINE_LEAD_SEGMENTS = 1
+    CAR_PIPELINE_LEAD_CELLS = 2
+
+    # ===== 启动配置 =====
+    # True: 设备服务在第一个请求时创建, 启动最快; False: 在应用启动(lifespan)时创建
+    FAST_STARTUP = False
+
 settings = Settings()
\ No newline at end of file
@@ -6,8 +6,9 @@ logger = logging.getLogger(__name__)
 # from app.utils.devices_logger import DevicesLogger
 from app.plc_system.controller import PLCController
 from app.plc_system.enum import DB_11, DB_12, LIFT_TASK_TYPE, FLOOR_CODE
-from app.res_system.controller import AsyncSocketCarController
+from app.res_system.controller import AsyncSocketCarController, ControllerAsync
 from app.res_system.enum import CarStatus
+from .segment_pipeline import EarlyAction, LiftInterlock, SegmentPipeline
 
 class AsyncDevicesController():
     """异步设备控制器。
@@ -17,6 +18,10 @@ class AsyncDevicesController():
     !!! 注意：此为设备安全与人生安全操作首要原则，必须遵守 !!!
 
     所有穿梭车的操作都要确保电梯在穿梭车所在楼层（因为只有电梯有对穿梭车的防飞出限位保险结构），避免穿梭车到达电梯口发生冲击力过大造成飞出“跳楼”危险。
+
+    穿梭车任务按任务段进度提前触发后续动作 (电梯状态确认、输送线信号), 每个动作都经过电梯联锁守卫 (LiftInterlock),
+    守卫不通过的动作推迟到穿梭车到达后再检查, 仍不通过则中止任务。
+    提前发出的输送线进行中信号 (取货/放货) 在穿梭车最终未到达时清除, 不留下已唤醒的输送线。
     """
     
     def __init__(self, plc_ip: str, car_ip: str, car_port: int):
@@ -32,7 +37,38 @@ class AsyncDevicesController():
         self._car_ip = car_ip
         self._car_port = car_port
         self.plc = PLCController(self._plc_ip)
-        self.car = AsyncSocketCarController(self._car_ip, self._car_port)
+        # 事件驱动的穿梭车控制器: 心跳中的任务段进度用于提前触发后续动作
+        self.car = ControllerAsync(self._car_ip, self._car_port)
+        self.interlock = LiftInterlock(self.plc)
+        self.pipeline = SegmentPipeline(self.car)
+
+    async def _plc_signal(self, name: str, signal, *args) -> list:
+        """[PLC信号] 连接并校验PLC后发送一个输送线信号。
+
+        Args:
+            name: 信号名称, 用于日志
+            signal: PLCController 的信号方法, 如 self.plc.pick_in_process
+            args: 信号参数
+
+        Returns:
+            list: [bool, 描述]
+        """
+        async with self.interlock.lock:
+            if await self.plc.async_connect() and self.plc.plc_checker():
+                signal(*args)
+                await self.plc.async_disconnect()
+                logger.info(f"✅ 已发送 {name} 信号")
+                return [True, f"✅ 已发送 {name} 信号"]
+            await self.plc.async_disconnect()
+            logger.error(f"❌ PLC接收 {name} 信号异常")
+            return [False, f"❌ PLC接收 {name} 信号异常"]
+
+    async def _confirm_lift(self, layer: int) -> list:
+        """[确认电梯] 电梯停在 layer 层且空闲。"""
+        allowed, reason = await self.interlock.lift_ready(layer)({})
+        if allowed:
+            return [True, f"✅ 电梯在{layer}层待命"]
+        return [False, f"❌ {reason}"]
 
     ############################################################
     ############################################################
@@ -96,46 +132,44 @@ class AsyncDevicesController():
         ############################################################
 
         # 穿梭车先进入电梯口，不直接进入电梯，要避免冲击力过大造成危险
+        # 接近电梯口时提前查询一次电梯状态 (只用于预热和日志), 进电梯前仍重新确认联锁
         logger.info("🚧 移动空载电梯到电机口")
         car_current_lift_pre_location = f"5,3,{car_current_floor}"
         if await self.car.car_current_location() != car_current_lift_pre_location:
             logger.info("⏳ 穿梭车开始移动...")
-            if await self.car.car_move(task_no+1, car_current_lift_pre_location):
-                # 等待穿梭车移动到位
-                logger.info(f"⏳ 等待穿梭车前往 5,3,{car_current_floor} 位置...")
-                await self.car.wait_car_move_complete_by_location(car_current_lift_pre_location)
-                await asyncio.sleep(2)
-                car_status = await self.car.car_status()
-                if await self.car.car_current_location() == car_current_lift_pre_location and car_status['car_status'] == CarStatus.READY.value:
-                    logger.info(f"✅ 穿梭车已到达 {car_current_lift_pre_location} 位置")
-                else:
-                    logger.error(f"❌ 穿梭车未到达 {car_current_lift_pre_location} 位置")
-                    return [False, "❌ 穿梭车运行错误"]
+            logger.info(f"⏳ 等待穿梭车前往 5,3,{car_current_floor} 位置...")
+            arrived, early = await self.pipeline.run(
+                task_no+1,
+                car_current_lift_pre_location,
+                [EarlyAction("confirm_lift", lambda: self._confirm_lift(car_current_floor))]
+            )
+            if arrived:
+                logger.info(f"✅ 穿梭车已到达 {car_current_lift_pre_location} 位置")
             else:
                 logger.error(f"❌ 穿梭车未到达 {car_current_lift_pre_location} 位置")
                 return [False, "❌ 穿梭车运行错误"]
+            if not early.get("confirm_lift", [True])[0]:
+                logger.warning(f"⚠️ 提前确认电梯未就绪: {early['confirm_lift'][1]}")
         
         ############################################################
         # step 3: 车进电梯
         ############################################################
 
-        # 穿梭车进入电机
+        # 穿梭车进入电机, 电梯联锁: 电梯必须在本层且空闲
         logger.info("🚧 穿梭车进入电梯")
         car_current_lift_location = f"6,3,{car_current_floor}"
         
         if await self.car.car_current_location() != car_current_lift_location:
+            # 下发进电梯任务前确认, 不沿用提前确认的结果 (期间电梯可能已被调走)
+            lift_confirm = await self._confirm_lift(car_current_floor)
+            if not lift_confirm[0]:
+                logger.error(f"❌ 电梯联锁: {lift_confirm[1]}, 禁止进入电梯")
+                return [False, f"❌ 电梯联锁: {lift_confirm[1]}"]
             logger.info("⏳ 穿梭车开始移动...")
-            if await self.car.car_move(task_no+2, car_current_lift_location):
-                # 等待穿梭车进入电梯
-                logger.info(f"⏳ 等待穿梭车前往 电梯内 6,3,{car_current_floor} 位置...")
-                await self.car.wait_car_move_complete_by_location(car_current_lift_location)
-                await asyncio.sleep(2)
-                car_status = await self.car.car_status()
-                if await self.car.car_current_location() == car_current_lift_location and car_status['car_status'] == CarStatus.READY.value:
-                    logger.info(f"✅ 穿梭车已到达 电梯内 {car_current_lift_location} 位置")
-                else:
-                    logger.error(f"❌ 穿梭车未到达 电梯内 {car_current_lift_location} 位置")
-                    return [False, "❌ 穿梭车运行错误"]
+            logger.info(f"⏳ 等待穿梭车前往 电梯内 6,3,{car_current_floor} 位置...")
+            arrived, _ = await self.pipeline.run(task_no+2, car_current_lift_location)
+            if arrived:
+                logger.info(f"✅ 穿梭车已到达 电梯内 {car_current_lift_location} 位置")
             else:
                 logger.error(f"❌ 穿梭车未到达 电梯内 {car_current_lift_location} 位置")
                 return [False, "❌ 穿梭车运行错误"]
@@ -191,15 +225,12 @@ class AsyncDevicesController():
         logger.info(f"🚧 穿梭车开始离开电梯进入接驳位 {target_lift_pre_location}")
         
         logger.info("⏳ 穿梭车开始移动...")
-        await self.car.car_move(task_no+5, target_lift_pre_location)
         
         # 等待穿梭车进入接驳位
         logger.info(f"⏳ 等待穿梭车前往 接驳位 {target_lift_pre_location} 位置...")
-        await self.car.wait_car_move_complete_by_location(target_lift_pre_location)
+        arrived, _ = await self.pipeline.run(task_no+5, target_lift_pre_location)
         
-        # car_status = await self.car.car_status()
-        # if await self.car.car_current_location() == target_lift_pre_location and car_status['car_status'] == CarStatus.READY.value:
-        if await self.car.car_current_location() == target_lift_pre_location:
+        if arrived:
             logger.info(f"✅ 穿梭车已到达 指定楼层 {target_layer} 层")
         else:
             logger.error(f"❌ 穿梭车未到达 指定楼层 {target_layer} 层")
@@ -347,55 +378,47 @@ class AsyncDevicesController():
         # step 4: 车到电梯前等待
         ############################################################
 
-        # 穿梭车移动到接驳位接货
+        # 穿梭车移动到接驳位接货, 接近接驳位时提前发送取货进行中信号 (电梯在本层待命时)
         logger.info("🚧 移动空载电梯到电机口")
         car_current_lift_pre_location = f"5,3,{target_layer}"
+        pick_signal = EarlyAction(
+            "pick_in_process",
+            lambda: self._plc_signal("取货进行中", self.plc.pick_in_process, target_layer),
+            guard=self.interlock.lift_ready(target_layer),
+            undo=lambda: self._plc_signal("清除取货进行中", self.plc.pick_in_process_reset, target_layer)
+        )
         if await self.car.car_current_location() != car_current_lift_pre_location:
             logger.info("⏳ 穿梭车开始移动...")
-            await self.car.car_move(TASK_NO+3, car_current_lift_pre_location)
             
             # 等待穿梭车移动到位
             logger.info(f"⏳ 等待穿梭车前往 5,3,{target_layer} 位置...")
-            await self.car.wait_car_move_complete_by_location(car_current_lift_pre_location)
-            await asyncio.sleep(2)
-
-            # car_status = await self.car.car_status()
-            # if await self.car.car_current_location() == car_current_lift_pre_location and car_status['car_status'] == CarStatus.READY.value:
-            if await self.car.car_current_location() == car_current_lift_pre_location:
+            arrived, signals = await self.pipeline.run(TASK_NO+3, car_current_lift_pre_location, [pick_signal])
+            if arrived:
                 logger.info(f"✅ 穿梭车已到达 {car_current_lift_pre_location} 位置")
             else:
                 logger.error(f"❌ 穿梭车未到达 {car_current_lift_pre_location} 位置")
                 return [False, "❌ 穿梭车运行错误"]
+        else:
+            signals = {"pick_in_process": await self._plc_signal("取货进行中", self.plc.pick_in_process, target_layer)}
 
         ############################################################
         # step 5: 穿梭车载货进入目标位置
         ############################################################
         
-        # 发送取货进行中信号给PLC
-        await asyncio.sleep(1)
-        if await self.plc.async_connect() and self.plc.plc_checker():
-            logger.info(f"🚧 穿梭车开始取货...")
-            await asyncio.sleep(1)
-            self.plc.pick_in_process(target_layer)
-            await self.plc.async_disconnect()
-        else:
-            await self.plc.async_disconnect()
+        # 取货进行中信号已在穿梭车接近接驳位时发送
+        if not signals["pick_in_process"][0]:
             logger.error("❌ PLC接收取货信号异常")
             return [False, "❌ PLC接收取货信号异常"]
         
         # 穿梭车将货物移动到目标位置
         logger.info(f"🚧 穿梭车将货物移动到目标位置 {TARGET_LOCATION}")
         logger.info("⏳ 穿梭车开始移动...")
-        await self.car.good_move(TASK_NO+4, TARGET_LOCATION)
         
         # 等待穿梭车进入接驳位
         logger.info(f"⏳ 等待穿梭车前往 {TARGET_LOCATION} 位置...")
-        await self.car.wait_car_move_complete_by_location(TARGET_LOCATION)
-        await asyncio.sleep(2)
+        arrived, _ = await self.pipeline.run(TASK_NO+4, TARGET_LOCATION, with_goods=True)
         
-        # car_status = await self.car.car_status()
-        # if await self.car.car_current_location() == TARGET_LOCATION and car_status['car_status'] == CarStatus.READY.value:
-        if await self.car.car_current_location() == TARGET_LOCATION:
+        if arrived:
             logger.info(f"✅ 货物已到达 目标位置 {TARGET_LOCATION}")
         else:
             logger.error(f"❌ 货物未到达 目标位置 {TARGET_LOCATION}")
@@ -488,33 +511,31 @@ class AsyncDevicesController():
         
         logger.info(f"▶️ 出库开始")
 
-        # 穿梭车将货物移动到目标位置
+        # 穿梭车前往货物位置, 接近货物时提前发送放货进行中信号 (电梯在本层待命时)
         logger.info(f"🚧 穿梭车前往货物位置 {TARGET_LOCATION}")
+        feed_signal = EarlyAction(
+            "feed_in_process",
+            lambda: self._plc_signal("放货进行中", self.plc.feed_in_process, target_layer),
+            guard=self.interlock.lift_ready(target_layer),
+            undo=lambda: self._plc_signal("清除放货进行中", self.plc.feed_in_process_reset, target_layer)
+        )
         if await self.car.car_current_location() != TARGET_LOCATION:
             logger.info("⏳ 穿梭车开始移动...")
-            await self.car.car_move(TASK_NO+2, TARGET_LOCATION)
             
             # 等待穿梭车进入接驳位
             logger.info(f"⏳ 等待穿梭车前往 {TARGET_LOCATION} 位置...")
-            await self.car.wait_car_move_complete_by_location(TARGET_LOCATION)
-            await asyncio.sleep(2)
+            arrived, signals = await self.pipeline.run(TASK_NO+2, TARGET_LOCATION, [feed_signal])
             
-            # car_status = await self.car.car_status()
-            # if await self.car.car_current_location() == TARGET_LOCATION and car_status['car_status'] == CarStatus.READY.value:
-            if await self.car.car_current_location() == TARGET_LOCATION:
+            if arrived:
                 logger.info(f"✅ 穿梭车已到达 货物位置 {TARGET_LOCATION}")
             else:
                 logger.error(f"❌ 穿梭车未到达 货物位置 {TARGET_LOCATION}")
                 return [False, "❌ 穿梭车运行错误"]
-
-        # 发送放货进行中信号给PLC
-        if await self.plc.async_connect() and self.plc.plc_checker():
-            logger.info(f"🚧 穿梭车开始取货...")
-            await asyncio.sleep(1)
-            self.plc.feed_in_process(target_layer)
-            await self.plc.async_disconnect()
         else:
-            await self.plc.async_disconnect()
+            signals = {"feed_in_process": await self._plc_signal("放货进行中", self.plc.feed_in_process, target_layer)}
+
+        # 放货进行中信号已在穿梭车接近货物时发送
+        if not signals["feed_in_process"][0]:
             logger.error("❌ PLC 运行错误")
             return [False, "❌ PLC 运行错误"]
         
@@ -522,16 +543,12 @@ class AsyncDevicesController():
         target_lift_pre_location = f"5,3,{target_layer}"
         logger.info(f"🚧 穿梭车将货物移动到楼层接驳位输送线 {target_lift_pre_location}")
         logger.info("⏳ 穿梭车开始移动...")
-        await self.car.good_move(TASK_NO+3, target_lift_pre_location)
         
         # 等待穿梭车进入接驳位
         logger.info(f"⏳ 等待穿梭车前往 {target_lift_pre_location} 位置...")
-        await self.car.wait_car_move_complete_by_location(target_lift_pre_location)
-        await asyncio.sleep(2)
+        arrived, _ = await self.pipeline.run(TASK_NO+3, target_lift_pre_location, with_goods=True)
         
-        # car_status = await self.car.car_status()
-        # if await self.car.car_current_location() == target_lift_pre_location and car_status['car_status'] == CarStatus.READY.value:
-        if await self.car.car_current_location() == target_lift_pre_location:
+        if arrived:
             logger.info(f"✅ 货物已到达 楼层接驳输送线位置 {target_lift_pre_location}")
         else:
             logger.error(f"❌ 货物未到达 楼层接驳输送线位置 {target_lift_pre_location}")
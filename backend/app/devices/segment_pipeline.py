@@ -0,0 +1,213 @@
+# app/devices/segment_pipeline.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from app.res_system.telemetry import approaching
+
+Guard = Callable[[Dict], Awaitable[Tuple[bool, str]]]
+
+
+class EarlyAction:
+    """提前触发的后续动作: 穿梭车接近终点时, 安全守卫通过则立即开始, 否则推迟到到达后。"""
+
+    def __init__(
+            self,
+            name: str,
+            action: Callable[[], Awaitable[Any]],
+            guard: Optional[Guard] = None,
+            undo: Optional[Callable[[], Awaitable[Any]]] = None
+    ):
+        """
+        Args:
+            name: 动作名称, 用于日志和结果
+            action: 执行动作的协程函数, 返回值作为动作结果
+            guard: 安全守卫, 参数为触发时的心跳字典, 返回 (是否允许, 原因); None 表示总是允许
+            undo: 撤销动作的协程函数, 动作已提前成功执行但穿梭车未到达时调用 (如清除PLC信号)
+        """
+        self.name = name
+        self.action = action
+        self.guard = guard
+        self.undo = undo
+
+    async def allowed(self, msg: Dict) -> Tuple[bool, str]:
+        """检查安全守卫, 守卫异常时视为不允许。"""
+        if self.guard is None:
+            return True, ""
+        try:
+            return await self.guard(msg)
+        except Exception as e:
+            logger.error(f"[PIPELINE] 动作 {self.name} 安全检查异常: {e}")
+            return False, f"安全检查异常: {e}"
+
+
+def succeeded(result: Any) -> bool:
+    """动作结果是否成功: [bool, 描述] 形式取第一项, 其他取真值。"""
+    if isinstance(result, (list, tuple)) and result:
+        return bool(result[0])
+    return bool(result)
+
+
+class LiftInterlock:
+    """电梯联锁安全守卫。
+
+    !!! 所有穿梭车的操作都要确保电梯在穿梭车所在楼层 !!!
+
+    穿梭车进入电梯、输送线取放货信号发出前, 电梯必须停在该楼层且空闲;
+    守卫在动作提前触发时和推迟到到达后都会检查。
+    """
+
+    def __init__(self, plc):
+        """
+        Args:
+            plc: PLCController
+        """
+        self.plc = plc
+        # PLC 连接在守卫和动作之间串行使用
+        self.lock = asyncio.Lock()
+
+    async def read_lift(self) -> Tuple[Optional[int], bool]:
+        """读取电梯楼层和是否空闲, PLC 未就绪时返回 (None, False)。"""
+        async with self.lock:
+            try:
+                if not (await self.plc.async_connect() and self.plc.plc_checker()):
+                    return None, False
+                return self.plc.get_lift_state()
+            finally:
+                await self.plc.async_disconnect()
+
+    def lift_ready(self, layer: int) -> Guard:
+        """守卫: 电梯停在 layer 层且空闲。"""
+        async def guard(msg: Dict) -> Tuple[bool, str]:
+            lift_layer, idle = await self.read_lift()
+            if lift_layer is None:
+                return False, "PLC未就绪"
+            if lift_layer != layer or not idle:
+                return False, f"电梯不在{layer}层或未空闲 (当前{lift_layer}层, 空闲: {idle})"
+            return True, ""
+        return guard
+
+
+class SegmentPipeline:
+    """按任务段进度提前触发后续动作的穿梭车任务。
+
+    下发任务后订阅遥测心跳, 穿梭车执行到倒数第 lead_segments 个任务段之后,
+    或距离终点不超过 lead_cells 格时, 依次检查每个动作的安全守卫:
+    通过的动作立即开始 (与穿梭车最后一段行驶并行), 未通过的推迟到到达后再检查一次。
+    穿梭车最终未到达时, 已提前成功执行的动作调用其 undo 撤销 (如输送线的进行中信号), 不留给PLC。
+    """
+
+    def __init__(
+            self,
+            car,
+            lead_segments: int = settings.CAR_PIPELINE_LEAD_SEGMENTS,
+            lead_cells: Optional[int] = settings.CAR_PIPELINE_LEAD_CELLS
+    ):
+        """
+        Args:
+            car: 穿梭车控制器 ControllerAsync (提供遥测和已下发的任务段)
+            lead_segments: 提前的任务段数
+            lead_cells: 提前的距离 (格), None 表示只按段号触发
+        """
+        self.car = car
+        self.lead_segments = lead_segments
+        self.lead_cells = lead_cells
+        self.stats = {"tasks": 0, "early": 0, "deferred": 0, "blocked": 0, "undone": 0}
+
+    def trigger_segment(self) -> Optional[int]:
+        """触发的段号 (从0开始), 没有已下发的任务段时返回None。"""
+        task = self.car.active_task
+        if task is None or not len(task.segments):
+            return None
+        return max(len(task.segments) - 1 - self.lead_segments, 0)
+
+    async def _undo(self, actions: Sequence[EarlyAction], results: Dict[str, Any], target: str) -> None:
+        """撤销已提前成功执行的动作, 撤销结果记录在 results["undo:动作名称"]。"""
+        for action in actions:
+            if action.undo is None or action.name not in results or not succeeded(results[action.name]):
+                continue
+            logger.warning(f"[PIPELINE] 穿梭车未到达 {target}, 撤销已提前执行的 {action.name}")
+            self.stats["undone"] += 1
+            try:
+                results[f"undo:{action.name}"] = await action.undo()
+            except Exception as e:
+                logger.error(f"[PIPELINE] 撤销 {action.name} 异常: {e}")
+                results[f"undo:{action.name}"] = [False, f"撤销异常: {e}"]
+
+    async def run(
+            self,
+            task_no: int,
+            target: str,
+            actions: Sequence[EarlyAction] = (),
+            with_goods: bool = False,
+            timeout: float = settings.CAR_ACTION_TIMEOUT
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """下发移动任务, 按段进度提前触发动作, 等待到达并收集动作结果。
+
+        Args:
+            task_no: 任务号
+            target: 终点 "x,y,z"
+            actions: 提前触发的动作
+            with_goods: 是否带货移动 (起点取货、终点放货)
+            timeout: 等待到达的超时时间 (秒)
+
+        Returns:
+            (是否到达, {动作名称: 动作结果}); 安全守卫始终未通过的动作结果为 [False, 原因],
+            未到达时撤销的动作另有 "undo:动作名称" 的撤销结果
+        """
+        self.stats["tasks"] += 1
+        deadline = time.monotonic() + timeout
+        if with_goods:
+            sent = await self.car.good_move(task_no, target)
+        else:
+            sent = await self.car.car_move(task_no, target)
+        if not sent:
+            return False, {}
+
+        started: Dict[str, asyncio.Task] = {}
+        deferred: List[EarlyAction] = []
+        results: Dict[str, Any] = {}
+        try:
+            if actions:
+                predicate = approaching(task_no, target, self.trigger_segment(), self.lead_cells)
+                msg = await self.car.telemetry.wait_for(predicate, timeout, max_age=0)
+                if msg is None:
+                    return False, {}
+                for action in actions:
+                    allowed, reason = await action.allowed(msg)
+                    if allowed:
+                        logger.info(f"[PIPELINE] 穿梭车接近 {target} (段 {msg['current_segment']}), 提前执行 {action.name}")
+                        self.stats["early"] += 1
+                        started[action.name] = asyncio.create_task(action.action())
+                    else:
+                        logger.info(f"[PIPELINE] {action.name} 推迟到穿梭车到达后: {reason}")
+                        deferred.append(action)
+
+            arrived = await self.car.wait_car_move_complete_by_location(target, max(deadline - time.monotonic(), 0))
+
+            for name, task in started.items():
+                results[name] = await task
+            started.clear()
+            if not arrived:
+                await self._undo(actions, results, target)
+                return False, results
+
+            msg = self.car.state.heartbeat() or {}
+            for action in deferred:
+                allowed, reason = await action.allowed(msg)
+                if allowed:
+                    self.stats["deferred"] += 1
+                    results[action.name] = await action.action()
+                else:
+                    logger.error(f"[PIPELINE] {action.name} 未通过安全检查: {reason}")
+                    self.stats["blocked"] += 1
+                    results[action.name] = [False, reason]
+            return True, results
+        finally:
+            # 提前失败退出时不留下后台动作
+            for task in started.values():
+                task.cancel()
@@ -558,8 +558,8 @@ class DevicesService():
         # 构建数据内容
         # 计算动态长度: 4字节*段数
         segment_count = self.segments_task_len(segments)
-        logger.debug("创建 任务序号: ", task_no)
-        logger.debug("创建 任务段数: ", segment_count)
+        logger.debug("创建 任务序号: %s", task_no)
+        logger.debug("创建 任务段数: %s", segment_count)
         # 添加任务数据
         payload = struct.pack('!BB', task_no, segment_count)
         # 添加路径段
@@ -570,7 +570,7 @@ class DevicesService():
             # logger.debug("位置编码: ", hex(position))
             # payload += struct.pack('!I', position)
             position = struct.pack('!BBBB', x, y, z, action)
-            logger.debug("位置编码: ", position)
+            logger.debug("位置编码: %s", position)
             payload += position
         
         # 计算数据段长度
@@ -587,7 +587,7 @@ class DevicesService():
 
         # 组装报文
         packet = data_part + crc + footer
-        logger.debug("[发送] 整体任务报文: ", packet)
+        logger.debug("[发送] 整体任务报文: %s", packet)
 
         # 返回报文
         return packet
@@ -617,8 +617,8 @@ class DevicesService():
         # 计算动态长度: 4字节*段数
         segment_count = struct.pack('>I', self.segments_task_len(segments))
         
-        logger.debug("发送 任务序号: ", task_no)
-        logger.debug("发送 任务段数: ", segment_count)
+        logger.debug("发送 任务序号: %s", task_no)
+        logger.debug("发送 任务段数: %s", segment_count)
 
         payload = task_no + cmd_info + segment_count
         
@@ -636,7 +636,7 @@ class DevicesService():
 
         # 组装报文
         packet = data_part + crc + footer
-        logger.debug("[发送] 整体任务报文: ", packet)
+        logger.debug("[发送] 整体任务报文: %s", packet)
 
         # 返回报文
         return packet
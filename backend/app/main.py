@@ -9,9 +9,21 @@ from concurrent.futures import ThreadPoolExecutor
 
 from app.core import settings
 from app.api import v2_wcs_router
+from app.api.v2.wcs.routes import build_services, start_car_telemetry, stop_car_telemetry
 
 # from daemon.scheduler import TaskScheduler
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 设备服务不在导入时创建; 快速启动模式下推迟到第一个请求
+    if not settings.FAST_STARTUP:
+        build_services()
+    # 后台心跳写入状态缓存和遥测历史, 状态查询接口优先读取缓存 (不依赖设备服务)
+    start_car_telemetry()
+    yield
+    await stop_car_telemetry()
+
+
 # @asynccontextmanager
 # async def lifespan(app: FastAPI):
 #     # 启动时创建线程池
@@ -34,7 +46,7 @@ app = FastAPI(
     openapi_url="/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
-    # lifespan=lifespan
+    lifespan=lifespan
 )
 
 # # 包含 WMS 路由 (v1)
@@ -0,0 +1,200 @@
+# /map_core/JourneyPlanner.py
+# 多楼层统一路径规划: 电梯作为带时间代价的垂直边
+import heapq
+from typing import Dict, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+from .TravelPlanner import TravelProfile, TravelTimePlanner, _DIR_NONE, _DIR_Z
+from . import SegmentCompiler
+
+
+class JourneyPlanner(TravelTimePlanner):
+    """[跨层规划器] 在完整的多层地图上规划穿梭车的端到端行程。
+
+    电梯井的层间边是垂直边, 上电梯时的代价包含:
+    电梯排队时间 + 电梯空驶到接车层的时间(与穿梭车前往电梯口的时间重叠, 只计等待部分)
+    + 交接时间 + 载车升降时间。下电梯时另计交接时间。
+    估算时间可以用于比较 "现在出发" 与 "等待一段时间再出发" 等调度方案。
+    """
+
+    def __init__(
+        self,
+        graph: MapGraph,
+        profile: Optional[TravelProfile] = None,
+        lift_floor: Optional[int] = None,
+        lift_queue: int = 0
+    ):
+        """
+        Args:
+            graph: 编译地图
+            profile: 行驶参数, 默认为 TravelProfile()
+            lift_floor: 电梯当前所在楼层, None 表示电梯已在接车层
+            lift_queue: 电梯队列中待执行的任务数
+        """
+        super().__init__(graph, profile)
+        self.lift_floor = lift_floor
+        self.lift_queue = lift_queue
+
+    def lift_ready_time(self, floor: int) -> float:
+        """电梯空闲并到达指定楼层的时间 (从现在起)。"""
+        profile = self.profile
+        ready = self.lift_queue * profile.lift_queue_time
+        if self.lift_floor is not None:
+            ready += abs(self.lift_floor - floor) * profile.lift_time
+        return ready
+
+    def _journey_step(self, u: int, v: int, prev_dir: int, direction: int, t: float) -> float:
+        """在 t 时刻从 u 移动到 v 的时间 (含等待电梯)。"""
+        coords = self.graph.coords
+        profile = self.profile
+        if direction == _DIR_Z:
+            cost = abs(coords.item(u, 2) - coords.item(v, 2)) * profile.lift_time
+            if prev_dir != _DIR_Z:
+                # 上电梯: 等电梯到位 + 交接
+                wait = max(0.0, self.lift_ready_time(coords.item(u, 2)) - t)
+                cost += wait + profile.handover_time
+            return cost
+        if prev_dir == _DIR_Z:
+            # 下电梯: 交接 + 起步, 不计换向
+            cells = abs(coords.item(u, 0) - coords.item(v, 0)) + abs(coords.item(u, 1) - coords.item(v, 1))
+            return cells * profile.cell_time + profile.accel_overhead + profile.handover_time
+        return self._step_cost(u, v, prev_dir, direction)
+
+    def path_ids(self, source_id: int, target_id: int, depart_delay: float = 0.0) -> Optional[List[int]]:
+        """A*搜索到达时间最早的路径。
+
+        Args:
+            source_id: 起点ID
+            target_id: 终点ID
+            depart_delay: 穿梭车延迟出发的时间
+
+        Returns:
+            List[int]: 路径节点ID列表, 不可达时返回None
+        """
+        if source_id == target_id:
+            return [source_id]
+        graph = self.graph
+        start = (source_id, _DIR_NONE)
+        best = {start: depart_delay}
+        parent = {start: None}
+        counter = 0
+        heap = [(depart_delay + self._heuristic(source_id, target_id), depart_delay, counter, start)]
+        while heap:
+            _, t, _, state = heapq.heappop(heap)
+            if best.get(state) != t:
+                continue
+            u, prev_dir = state
+            if u == target_id:
+                path = []
+                while state is not None:
+                    path.append(state[0])
+                    state = parent[state]
+                path.reverse()
+                return path
+            for v in graph.neighbors(u):
+                direction = self._direction(u, v)
+                new_t = t + self._journey_step(u, v, prev_dir, direction, t)
+                new_state = (v, direction)
+                old = best.get(new_state)
+                if old is not None and old <= new_t:
+                    continue
+                best[new_state] = new_t
+                parent[new_state] = state
+                counter += 1
+                heapq.heappush(heap, (new_t + self._heuristic(v, target_id), new_t, counter, new_state))
+        return None
+
+    def plan(self, source: str, target: str, depart_delay: float = 0.0) -> Optional[Dict]:
+        """规划端到端行程。
+
+        行程被拆分为若干段: 穿梭车段 (可直接下发的任务段) 和电梯段;
+        穿梭车在电梯口 (上电梯前一个点) 停车等待, 与现有跨层流程一致。
+
+        Args:
+            source: 起点, 如 "1,1,1"
+            target: 终点, 如 "8,7,3"
+            depart_delay: 穿梭车延迟出发的时间
+
+        Returns:
+            dict: {
+                "source", "target", "path": 完整路径,
+                "legs": [{"type": "car", "layer", "path", "segments", "start", "duration"},
+                         {"type": "lift", "from_layer", "to_layer", "entry", "exit", "start", "wait", "duration"}],
+                "handover_points": [{"layer", "wait_point", "lift_point"}],
+                "lift_wait": 等待电梯总时间,
+                "total_time": 从现在起到达终点的估算时间
+            }
+            不可达时返回None
+        """
+        graph = self.graph
+        path_ids = self.path_ids(graph.node_id(source), graph.node_id(target), depart_delay)
+        if path_ids is None:
+            return None
+        names = graph.names
+        coords = graph.coords
+
+        # 按边分类: 垂直边属于电梯段, 其余属于穿梭车段
+        # 上电梯前的一条边 (电梯口 -> 电梯) 单独成段, 穿梭车先在电梯口停车
+        edge_kinds = []
+        for i in range(len(path_ids) - 1):
+            u, v = path_ids[i], path_ids[i + 1]
+            if coords.item(u, 2) != coords.item(v, 2):
+                edge_kinds.append("lift")
+            elif i + 2 < len(path_ids) and coords.item(v, 2) != coords.item(path_ids[i + 2], 2):
+                edge_kinds.append("enter")
+            else:
+                edge_kinds.append("car")
+
+        legs = []
+        handover_points = []
+        t = depart_delay
+        lift_wait = 0.0
+        prev_dir = _DIR_NONE
+        for i, kind in enumerate(edge_kinds):
+            u, v = path_ids[i], path_ids[i + 1]
+            direction = self._direction(u, v)
+            step = self._journey_step(u, v, prev_dir, direction, t)
+            leg_type = "lift" if kind == "lift" else "car"
+            new_leg = not legs or legs[-1]["type"] != leg_type or kind == "enter" or edge_kinds[i - 1] == "enter"
+            if new_leg:
+                if leg_type == "lift":
+                    legs.append({"type": "lift", "from_layer": coords.item(u, 2), "to_layer": coords.item(v, 2),
+                                 "entry": names[u], "exit": names[v], "start": t, "wait": 0.0, "duration": 0.0})
+                    handover_points.append({"layer": coords.item(u, 2), "wait_point": names[path_ids[i - 1]] if i else names[u],
+                                            "lift_point": names[u]})
+                else:
+                    legs.append({"type": "car", "layer": coords.item(u, 2), "path": [names[u]],
+                                 "start": t, "duration": 0.0})
+            leg = legs[-1]
+            if leg_type == "lift":
+                if prev_dir != _DIR_Z:
+                    wait = max(0.0, self.lift_ready_time(coords.item(u, 2)) - t)
+                    leg["wait"] = wait
+                    lift_wait += wait
+                leg["to_layer"] = coords.item(v, 2)
+                leg["exit"] = names[v]
+            else:
+                leg["path"].append(names[v])
+            leg["duration"] += step
+            t += step
+            prev_dir = direction
+
+        for leg in legs:
+            if leg["type"] == "car":
+                segments = SegmentCompiler.compile_segments(
+                    coords[[graph.node_id(node) for node in leg["path"]]]
+                )
+                leg["segments"] = SegmentCompiler.segments_to_list(segments)
+
+        return {
+            "source": source,
+            "target": target,
+            "path": [names[node_id] for node_id in path_ids],
+            "legs": legs,
+            "handover_points": handover_points,
+            "lift_wait": lift_wait,
+            "total_time": t
+        }
@@ -1,41 +1,49 @@
 # /map_core/MapBase.py
 # 用于地图的构建
-import networkx as nx
-import matplotlib.pyplot as plt
+import json
 import logging
 logger = logging.getLogger(__name__)
 
+from .MapGraph import DEFAULT_MAP_CONFIG, get_map_graph
+
 class MapBase:
-    """地图基类，提供地图的基本功能。"""
-    def __init__(self):
-        import os
-        import json
+    """地图基类，提供地图的基本功能。
+
+    地图只在进程内编译一次 (见 MapGraph.get_map_graph)，所有实例共享同一个编译地图。
+    """
+    def __init__(self, config_path: str = None):
         # 动态获取地图配置文件路径 'map_core/data/map_config.json'
-        config_path = os.path.join(os.path.dirname(__file__), 'data', 'map_config copy.json')
+        config_path = config_path or DEFAULT_MAP_CONFIG
         # print("Config path: ",config_path)
-        # 读取地图配置文件
+        self.config_path = config_path
+        # 预先编译共享地图, 尽早暴露配置文件错误
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                map_info = json.load(f)
-            # 获取节点和边的定义
-            self.nodes_form = map_info["nodes"]
-            self.edges_form = map_info["edges"]
+            get_map_graph(config_path)
         except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
             raise RuntimeError(f"错误: 无法读取地图配置文件 {config_path} - {e}")
+
+    @property
+    def graph(self):
+        """当前共享的编译地图 (地图重新加载后自动指向新地图)。"""
+        return get_map_graph(self.config_path)
+
+    @property
+    def nodes_form(self):
+        """节点定义列表。"""
+        return list(self.graph.names)
+
+    @property
+    def edges_form(self):
+        """边定义列表。"""
+        return [list(edge) for edge in self.graph.edges()]
         
     def create_map(self):
-        """创建地图并返回图对象和坐标映射。"""
-        # 创建一个无向图
-        G = nx.Graph()
-        G.add_nodes_from(self.nodes_form)
-        G.add_edges_from(self.edges_form)
-
-        # 使用节点名称解析坐标
-        # 使用更安全的方式解析节点名称中的坐标
-        self.pos = {
-            node: self._parse_node_coords(node)
-            for node in G.nodes()
-        }
+        """创建地图并返回图对象和坐标映射。
+
+        返回的图对象为共享的只读 networkx 图，仅用于绘图和兼容旧接口。
+        """
+        G = self.graph.to_networkx()
+        self.pos = self.graph.positions()
         return G, self.pos
     
     def map_info(self):
@@ -78,6 +86,10 @@ class MapBase:
             G: 图对象
             pos: 节点位置字典
         """
+        # 绘图库只在绘图时导入, 不影响服务启动时间
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(10, 8))
         nx.draw(G, pos, with_labels=True, node_size=800, node_color='lightblue', font_size=14, font_color='black', edge_color='gray')
         plt.title("Map Visualization")
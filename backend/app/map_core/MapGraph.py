@@ -0,0 +1,599 @@
+# /map_core/MapGraph.py
+# 编译后的地图对象，进程内只加载一次并在所有路径规划实例间共享
+import os
+import json
+import hashlib
+import threading
+from collections import deque
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapOverlay import MapOverlay, active_plans, overlay_path_for
+
+def pack_coord(x: int, y: int, z: int) -> int:
+    """坐标打包为整数: X(8位) | Y(8位) | Z(8位)。"""
+    return (x << 16) | (y << 8) | z
+
+
+def unpack_coord(packed: int) -> Tuple[int, int, int]:
+    """整数 -> 坐标 (x, y, z)。"""
+    return (packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF
+
+
+# 默认地图配置文件路径 'map_core/data/map_config copy.json'
+DEFAULT_MAP_CONFIG = os.path.join(os.path.dirname(__file__), 'data', 'map_config copy.json')
+_DEFAULT_KEY = os.path.abspath(DEFAULT_MAP_CONFIG)
+# 编译地图文件格式版本, 修改 save_artifact 的内容时递增
+_ARTIFACT_FORMAT = 1
+
+
+def artifact_path_for(config_path: str) -> str:
+    """地图配置文件对应的编译地图文件路径, 如 'map_config copy.compiled.npz'。"""
+    return os.path.splitext(config_path)[0] + '.compiled.npz'
+
+
+class MapGraph:
+    """[编译地图] 不可变的数组化地图。
+
+    节点使用整数ID, 邻接关系以CSR数组(indptr/indices)存储,
+    "x,y,z" 字符串只作为查找层使用。路径规划的热路径只访问整数和数组,
+    不再读取JSON, 也不再依赖networkx。
+    """
+
+    def __init__(self, nodes: List[str], edges: List[List[str]]):
+        """编译节点和边。
+
+        Args:
+            nodes: 节点名称列表, 如 ["1,1,1", "1,2,1"]
+            edges: 边列表, 如 [["1,1,1", "2,1,1"]]
+        """
+        # 节点名称 <-> 整数ID
+        names = []
+        index = {}
+        for node in nodes:
+            name = node.strip()
+            if name in index:
+                continue
+            index[name] = len(names)
+            names.append(name)
+
+        # 一次性解析所有坐标
+        coords = np.empty((len(names), 3), dtype=np.int32)
+        for node_id, name in enumerate(names):
+            coords[node_id] = self._parse_node_coords(name)
+
+        # 打包坐标 -> 节点ID
+        packed = (coords[:, 0].astype(np.int64) << 16) | (coords[:, 1].astype(np.int64) << 8) | coords[:, 2]
+        packed_index = {int(p): node_id for node_id, p in enumerate(packed)}
+
+        # 无向边去重后构建CSR邻接数组
+        neighbor_sets = [set() for _ in names]
+        for edge in edges:
+            u, v = edge[0].strip(), edge[1].strip()
+            if u not in index or v not in index:
+                raise ValueError(f"边 {edge} 引用了不存在的节点")
+            if u == v:
+                continue
+            neighbor_sets[index[u]].add(index[v])
+            neighbor_sets[index[v]].add(index[u])
+
+        adj = tuple(tuple(sorted(s)) for s in neighbor_sets)
+        indptr = np.zeros(len(names) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(a) for a in adj])
+        indices = np.fromiter((v for a in adj for v in a), dtype=np.int32, count=int(indptr[-1]))
+
+        self._setup(tuple(names), index, coords, packed, packed_index, indptr, indices, adj)
+        self.version = self._make_version(self.names, self.edges())
+        self.layer_versions = MappingProxyType(
+            {z: self._make_layer_version(layer_ids) for z, layer_ids in self.layers.items()}
+        )
+
+    def _setup(
+        self,
+        names: Tuple[str, ...],
+        index: Dict[str, int],
+        coords: np.ndarray,
+        packed: np.ndarray,
+        packed_index: Dict[int, int],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        adj: Tuple[Tuple[int, ...], ...]
+    ) -> None:
+        """设置编译结果 (版本号由调用方设置)。"""
+        # 按楼层分组的节点ID
+        layers = {}
+        for z in np.unique(coords[:, 2]) if len(names) else []:
+            layer_ids = np.flatnonzero(coords[:, 2] == z).astype(np.int32)
+            layer_ids.flags.writeable = False
+            layers[int(z)] = layer_ids
+
+        for arr in (coords, packed, indptr, indices):
+            arr.flags.writeable = False
+
+        self.names: Tuple[str, ...] = names
+        self.index = MappingProxyType(index)
+        self.coords = coords
+        self.packed = packed
+        self._packed_index = packed_index
+        self.indptr = indptr
+        self.indices = indices
+        self.layers = MappingProxyType(layers)
+        self._adj = adj
+        self._nx_graph = None
+        self._pos = None
+
+    @classmethod
+    def from_config(cls, config_path: str = DEFAULT_MAP_CONFIG, overlay: Optional[MapOverlay] = None) -> "MapGraph":
+        """从地图配置文件编译地图。
+
+        Args:
+            config_path: 地图配置文件路径
+            overlay: 地图覆盖层, 被禁用的节点和边不参与编译
+
+        Returns:
+            MapGraph: 编译后的地图
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            map_info = json.load(f)
+        edges = map_info["edges"]
+        if overlay is not None:
+            edges = overlay.apply(edges)
+        return cls(map_info["nodes"], edges)
+
+    def save_artifact(self, path: str, stamp: str) -> None:
+        """把编译结果保存为 npz 文件, 下次启动时无需重新解析JSON和编译。
+
+        Args:
+            path: 文件路径, 如 'map_config copy.compiled.npz'
+            stamp: 来源标记 (配置文件和覆盖层的摘要), 不一致时文件失效
+        """
+        layers = sorted(self.layer_versions)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                format=np.array(_ARTIFACT_FORMAT),
+                stamp=np.array(stamp),
+                version=np.array(self.version),
+                names=np.array(self.names),
+                coords=self.coords,
+                indptr=self.indptr,
+                indices=self.indices,
+                layer_keys=np.array(layers, dtype=np.int32),
+                layer_versions=np.array([self.layer_versions[z] for z in layers])
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_artifact(cls, path: str, stamp: str) -> Optional["MapGraph"]:
+        """从 save_artifact 保存的文件加载编译地图。
+
+        Args:
+            path: 文件路径
+            stamp: 期望的来源标记
+
+        Returns:
+            MapGraph: 编译地图, 文件不存在、格式不符或已过期时返回None
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["format"]) != _ARTIFACT_FORMAT or str(data["stamp"]) != stamp:
+                    return None
+                names = tuple(data["names"].tolist())
+                coords = data["coords"].astype(np.int32)
+                indptr = data["indptr"].astype(np.int32)
+                indices = data["indices"].astype(np.int32)
+                version = str(data["version"])
+                layer_versions = dict(zip(data["layer_keys"].tolist(), data["layer_versions"].tolist()))
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"[MAP] 编译地图文件 {path} 无法读取, 重新编译 - {e}")
+            return None
+
+        graph = cls.__new__(cls)
+        index = {name: node_id for node_id, name in enumerate(names)}
+        packed = (coords[:, 0].astype(np.int64) << 16) | (coords[:, 1].astype(np.int64) << 8) | coords[:, 2]
+        packed_index = {p: node_id for node_id, p in enumerate(packed.tolist())}
+        bounds = indptr.tolist()
+        flat = indices.tolist()
+        adj = tuple(tuple(flat[bounds[i]:bounds[i + 1]]) for i in range(len(names)))
+        graph._setup(names, index, coords, packed, packed_index, indptr, indices, adj)
+        graph.version = version
+        graph.layer_versions = MappingProxyType(layer_versions)
+        return graph
+
+    @staticmethod
+    def _parse_node_coords(node: str) -> Tuple[int, int, int]:
+        """解析节点名称中的坐标。
+
+        Args:
+            node: 节点名称, 如 "1,2,1"
+
+        Returns:
+            Tuple: (x, y, z)
+        """
+        try:
+            coords = [int(coord) for coord in node.split(',')]
+        except ValueError as e:
+            raise ValueError(f"节点 {node} 的坐标格式错误 - {e}")
+        if len(coords) != 3:
+            raise ValueError(f"节点 {node} 的坐标格式错误，需要x,y,z三个坐标值")
+        return coords[0], coords[1], coords[2]
+
+    @staticmethod
+    def _make_version(names: Tuple[str, ...], edges: Iterator[Tuple[str, str]]) -> str:
+        """根据拓扑结构生成地图版本号。"""
+        digest = hashlib.sha1()
+        digest.update("|".join(names).encode('utf-8'))
+        for u, v in edges:
+            digest.update(f"{u}-{v};".encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    def _make_layer_version(self, layer_ids: np.ndarray) -> str:
+        """根据楼层内的节点和层内边生成楼层版本号, 用于按层失效缓存。"""
+        digest = hashlib.sha1()
+        members = set(layer_ids.tolist())
+        for u in layer_ids.tolist():
+            digest.update(f"{u}:{self.names[u]}|".encode('utf-8'))
+            for v in self._adj[u]:
+                if v > u and v in members:
+                    digest.update(f"{u}-{v};".encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    ########################################
+    # 查找层
+    ########################################
+
+    @property
+    def number_of_nodes(self) -> int:
+        """节点数量。"""
+        return len(self.names)
+
+    @property
+    def number_of_edges(self) -> int:
+        """边数量。"""
+        return int(self.indptr[-1]) // 2
+
+    def has_node(self, name: str) -> bool:
+        """判断节点是否在地图中。"""
+        return name in self.index
+
+    def node_id(self, name: str) -> int:
+        """节点名称 -> 整数ID。
+
+        Raises:
+            ValueError: 节点不在地图中
+        """
+        node_id = self.index.get(name)
+        if node_id is None:
+            raise ValueError(f"节点 {name} 不在地图节点中")
+        return node_id
+
+    def node_id_at(self, x: int, y: int, z: int) -> int:
+        """坐标 -> 整数ID, 不经过字符串。
+
+        Raises:
+            ValueError: 坐标不在地图中
+        """
+        node_id = self._packed_index.get(pack_coord(x, y, z))
+        if node_id is None:
+            raise ValueError(f"节点 {x},{y},{z} 不在地图节点中")
+        return node_id
+
+    def node_name(self, node_id: int) -> str:
+        """整数ID -> 节点名称。"""
+        return self.names[node_id]
+
+    def coord(self, node_id: int) -> Tuple[int, int, int]:
+        """获取节点坐标 (x, y, z)。"""
+        x, y, z = self.coords[node_id]
+        return int(x), int(y), int(z)
+
+    def neighbors(self, node_id: int) -> Tuple[int, ...]:
+        """获取相邻节点ID。"""
+        return self._adj[node_id]
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        """遍历所有边(每条无向边只输出一次)。"""
+        for u, nbrs in enumerate(self._adj):
+            for v in nbrs:
+                if u < v:
+                    yield self.names[u], self.names[v]
+
+    ########################################
+    # 路径搜索
+    ########################################
+
+    def bfs_path_ids(self, source_id: int, target_id: int) -> Optional[List[int]]:
+        """广度优先搜索最少步数路径。
+
+        Args:
+            source_id: 起点ID
+            target_id: 终点ID
+
+        Returns:
+            List[int]: 路径节点ID列表, 不可达时返回None
+        """
+        if source_id == target_id:
+            return [source_id]
+        adj = self._adj
+        parent = {source_id: source_id}
+        queue = deque([source_id])
+        while queue:
+            u = queue.popleft()
+            for v in adj[u]:
+                if v in parent:
+                    continue
+                parent[v] = u
+                if v == target_id:
+                    path = [v]
+                    while v != source_id:
+                        v = parent[v]
+                        path.append(v)
+                    path.reverse()
+                    return path
+                queue.append(v)
+        return None
+
+    def bfs_tree(self, source_id: int) -> np.ndarray:
+        """从起点做一次完整的广度优先搜索, 返回搜索树。
+
+        Args:
+            source_id: 起点ID
+
+        Returns:
+            np.ndarray: 父节点数组, parent[source_id] == source_id, 不可达为 -1
+        """
+        adj = self._adj
+        parent = np.full(len(self.names), -1, dtype=np.int32)
+        parent[source_id] = source_id
+        queue = deque([source_id])
+        while queue:
+            u = queue.popleft()
+            for v in adj[u]:
+                if parent[v] < 0:
+                    parent[v] = u
+                    queue.append(v)
+        return parent
+
+    @staticmethod
+    def tree_path_ids(parent: np.ndarray, target_id: int) -> Optional[List[int]]:
+        """沿搜索树回溯到起点的路径。
+
+        Args:
+            parent: bfs_tree() 返回的父节点数组
+            target_id: 终点ID
+
+        Returns:
+            List[int]: 路径节点ID列表, 不可达时返回None
+        """
+        if parent.item(target_id) < 0:
+            return None
+        path = [target_id]
+        node_id = target_id
+        while parent.item(node_id) != node_id:
+            node_id = parent.item(node_id)
+            path.append(node_id)
+        path.reverse()
+        return path
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """查找两个节点间的最少步数路径。
+
+        Args:
+            source: 起点, 如 "1,1,1"
+            target: 终点, 如 "5,3,1"
+
+        Returns:
+            List[str]: 路径节点名称列表, 不可达时返回None
+        """
+        path_ids = self.bfs_path_ids(self.node_id(source), self.node_id(target))
+        if path_ids is None:
+            return None
+        names = self.names
+        return [names[i] for i in path_ids]
+
+    ########################################
+    # 兼容层 (绘图 / 旧接口)
+    ########################################
+
+    def positions(self) -> Dict[str, List[int]]:
+        """节点绘图坐标 {name: [x, y]}。"""
+        if self._pos is None:
+            self._pos = {name: [int(x), int(y)] for name, (x, y, _) in zip(self.names, self.coords)}
+        return self._pos
+
+    def to_networkx(self):
+        """构建只读的networkx图, 仅用于绘图和兼容旧接口。"""
+        if self._nx_graph is None:
+            import networkx as nx
+            G = nx.Graph()
+            G.add_nodes_from(self.names)
+            G.add_edges_from(self.edges())
+            self._nx_graph = nx.freeze(G)
+        return self._nx_graph
+
+
+_graph_cache: Dict[str, MapGraph] = {}
+_overlay_cache: Dict[str, MapOverlay] = {}
+_graph_lock = threading.Lock()
+
+
+def _cache_key(config_path: Optional[str]) -> str:
+    """地图缓存键 (配置文件绝对路径)。"""
+    if config_path is None or config_path == DEFAULT_MAP_CONFIG:
+        return _DEFAULT_KEY
+    return os.path.abspath(config_path)
+
+
+def _get_overlay(key: str) -> MapOverlay:
+    """获取配置文件对应的覆盖层 (调用方持有 _graph_lock)。"""
+    overlay = _overlay_cache.get(key)
+    if overlay is None:
+        overlay = MapOverlay(overlay_path_for(key))
+        _overlay_cache[key] = overlay
+    return overlay
+
+
+def _source_stamp(key: str, overlay: MapOverlay) -> str:
+    """配置文件内容和覆盖层的摘要, 用于判断编译地图文件是否过期。"""
+    digest = hashlib.sha1()
+    with open(key, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps(overlay.to_dict(), sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _save_artifact(key: str, overlay: MapOverlay, graph: MapGraph) -> None:
+    """保存编译地图文件, 目录不可写时只记录警告。"""
+    path = artifact_path_for(key)
+    try:
+        graph.save_artifact(path, _source_stamp(key, overlay))
+    except OSError as e:
+        logger.warning(f"[MAP] 编译地图文件 {path} 保存失败 - {e}")
+
+
+def _load_or_compile(key: str, overlay: MapOverlay) -> MapGraph:
+    """优先加载未过期的编译地图文件, 否则解析配置文件编译并保存 (调用方持有 _graph_lock)。"""
+    graph = MapGraph.load_artifact(artifact_path_for(key), _source_stamp(key, overlay))
+    if graph is not None:
+        return graph
+    graph = MapGraph.from_config(key, overlay)
+    _save_artifact(key, overlay, graph)
+    return graph
+
+
+def get_map_graph(config_path: Optional[str] = None) -> MapGraph:
+    """获取进程内共享的编译地图, 同一配置文件只编译一次。
+
+    Args:
+        config_path: 地图配置文件路径, 默认为 DEFAULT_MAP_CONFIG
+
+    Returns:
+        MapGraph: 共享的编译地图 (已应用地图覆盖层)
+    """
+    key = _cache_key(config_path)
+    graph = _graph_cache.get(key)
+    if graph is not None:
+        return graph
+    with _graph_lock:
+        graph = _graph_cache.get(key)
+        if graph is None:
+            graph = _load_or_compile(key, _get_overlay(key))
+            _graph_cache[key] = graph
+            logger.info(f"[MAP] 地图已编译: {graph.number_of_nodes} 个节点, {graph.number_of_edges} 条边, 版本 {graph.version}")
+    return graph
+
+
+def clear_map_graph_cache() -> None:
+    """清空共享地图缓存, 下次获取时重新编译。"""
+    with _graph_lock:
+        _graph_cache.clear()
+        _overlay_cache.clear()
+
+
+def reload_map_graph(config_path: Optional[str] = None) -> MapGraph:
+    """重新编译地图配置文件并替换共享地图。
+
+    已创建的路径规划实例会在下次查询时使用新地图, 路由表随地图版本自动重建。
+
+    Args:
+        config_path: 地图配置文件路径, 默认为 DEFAULT_MAP_CONFIG
+
+    Returns:
+        MapGraph: 新的共享编译地图
+    """
+    key = _cache_key(config_path)
+    with _graph_lock:
+        overlay = _get_overlay(key)
+        graph = MapGraph.from_config(key, overlay)
+        _save_artifact(key, overlay, graph)
+        _graph_cache[key] = graph
+    logger.info(f"[MAP] 地图已重新加载: 版本 {graph.version}")
+    return graph
+
+
+def get_map_overlay(config_path: Optional[str] = None) -> Dict[str, List]:
+    """获取当前地图覆盖层内容。
+
+    Args:
+        config_path: 地图配置文件路径, 默认为 DEFAULT_MAP_CONFIG
+
+    Returns:
+        dict: {"disabled_nodes": [...], "disabled_edges": [[u, v], ...]}
+    """
+    key = _cache_key(config_path)
+    with _graph_lock:
+        return _get_overlay(key).to_dict()
+
+
+def update_map_overlay(
+    disable: bool,
+    nodes: List[str] = (),
+    edges: List[List[str]] = (),
+    config_path: Optional[str] = None
+) -> Dict:
+    """运行时禁用或启用节点和边, 持久化覆盖层并替换共享地图。
+
+    只有拓扑发生变化的楼层需要重建路由表 (见 RouteTable.get_route_table)。
+
+    Args:
+        disable: True 禁用, False 启用
+        nodes: 节点列表, 如 ["5,5,1"]
+        edges: 边列表, 如 [["4,5,1", "5,5,1"]]
+        config_path: 地图配置文件路径, 默认为 DEFAULT_MAP_CONFIG
+
+    Returns:
+        dict: {
+            "version": 新地图版本,
+            "overlay": 覆盖层内容,
+            "affected_layers": 拓扑变化的楼层,
+            "affected_plans": 经过禁用节点/边的在途路径
+        }
+
+    Raises:
+        ValueError: 节点或边不在基础地图中
+    """
+    key = _cache_key(config_path)
+    with open(key, 'r', encoding='utf-8') as f:
+        map_info = json.load(f)
+    base_nodes = {node.strip() for node in map_info["nodes"]}
+    base_edges = {frozenset((u.strip(), v.strip())) for u, v in map_info["edges"]}
+    for node in nodes:
+        if node.strip() not in base_nodes:
+            raise ValueError(f"节点 {node} 不在地图节点中")
+    for edge in edges:
+        if len(edge) != 2 or frozenset(e.strip() for e in edge) not in base_edges:
+            raise ValueError(f"边 {edge} 不在地图中")
+
+    with _graph_lock:
+        old_graph = _graph_cache.get(key)
+        overlay = _get_overlay(key).copy()
+        overlay.update(disable, nodes, edges)
+        graph = MapGraph(map_info["nodes"], overlay.apply(map_info["edges"]))
+        overlay.save()
+        _save_artifact(key, overlay, graph)
+        _overlay_cache[key] = overlay
+        _graph_cache[key] = graph
+
+    affected_layers = sorted(
+        z for z, layer_version in graph.layer_versions.items()
+        if old_graph is None or old_graph.layer_versions.get(z) != layer_version
+    )
+    affected_plans = active_plans.affected_by(overlay) if disable else []
+    action = "禁用" if disable else "启用"
+    logger.info(f"[MAP] 地图覆盖层已更新: {action} 节点 {list(nodes)} 边 {list(edges)}, "
+                f"影响楼层 {affected_layers}, 版本 {graph.version}")
+    for plan in affected_plans:
+        logger.warning(f"[MAP] 在途路径 {plan['plan_id']} 经过被禁用的节点 {plan['disabled_nodes']} / 边 {plan['disabled_edges']}")
+    return {
+        "version": graph.version,
+        "overlay": overlay.to_dict(),
+        "affected_layers": affected_layers,
+        "affected_plans": affected_plans
+    }
@@ -0,0 +1,170 @@
+# /map_core/MapOverlay.py
+# 运行时地图覆盖层: 禁用/启用节点和边, 持久化到地图配置文件旁, 无需重启服务
+import os
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def overlay_path_for(config_path: str) -> str:
+    """地图配置文件对应的覆盖层文件路径, 如 'map_config copy.overlay.json'。"""
+    return os.path.splitext(config_path)[0] + '.overlay.json'
+
+
+def _edge_key(u: str, v: str) -> Tuple[str, str]:
+    """无向边的规范表示。"""
+    u, v = u.strip(), v.strip()
+    return (u, v) if u <= v else (v, u)
+
+
+class MapOverlay:
+    """[地图覆盖层] 记录被禁用的节点和边。
+
+    被禁用的节点保留在地图中, 但与它相连的边全部失效 (节点不可达);
+    被禁用的边直接失效。基础地图配置文件保持不变。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 覆盖层持久化文件路径, 为None时只保存在内存中
+        """
+        self.path = path
+        self.disabled_nodes = set()
+        self.disabled_edges = set()
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self) -> None:
+        """从文件加载覆盖层。"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.disabled_nodes = {node.strip() for node in data.get("disabled_nodes", [])}
+        self.disabled_edges = {_edge_key(u, v) for u, v in data.get("disabled_edges", [])}
+        logger.info(f"[MAP] 已加载地图覆盖层: 禁用 {len(self.disabled_nodes)} 个节点, {len(self.disabled_edges)} 条边")
+
+    def save(self) -> None:
+        """保存覆盖层到文件 (先写临时文件再替换, 避免写一半)。"""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def to_dict(self) -> Dict[str, List]:
+        """覆盖层内容。"""
+        return {
+            "disabled_nodes": sorted(self.disabled_nodes),
+            "disabled_edges": [list(edge) for edge in sorted(self.disabled_edges)]
+        }
+
+    def copy(self) -> "MapOverlay":
+        """复制覆盖层 (不复制文件路径以外的状态)。"""
+        overlay = MapOverlay()
+        overlay.path = self.path
+        overlay.disabled_nodes = set(self.disabled_nodes)
+        overlay.disabled_edges = set(self.disabled_edges)
+        return overlay
+
+    def update(
+        self,
+        disable: bool,
+        nodes: Iterable[str] = (),
+        edges: Iterable[Iterable[str]] = ()
+    ) -> None:
+        """禁用或启用节点和边。
+
+        Args:
+            disable: True 禁用, False 启用
+            nodes: 节点列表, 如 ["5,5,1"]
+            edges: 边列表, 如 [["4,5,1", "5,5,1"]]
+        """
+        node_keys = {node.strip() for node in nodes}
+        edge_keys = {_edge_key(*edge) for edge in edges}
+        if disable:
+            self.disabled_nodes |= node_keys
+            self.disabled_edges |= edge_keys
+        else:
+            self.disabled_nodes -= node_keys
+            self.disabled_edges -= edge_keys
+
+    def apply(self, edges: Iterable[Iterable[str]]) -> List[List[str]]:
+        """过滤基础地图的边。
+
+        Args:
+            edges: 基础地图边列表
+
+        Returns:
+            List: 生效的边列表
+        """
+        active = []
+        for edge in edges:
+            u, v = edge[0].strip(), edge[1].strip()
+            if u in self.disabled_nodes or v in self.disabled_nodes:
+                continue
+            if _edge_key(u, v) in self.disabled_edges:
+                continue
+            active.append([u, v])
+        return active
+
+    def touches(self, path: List[str]) -> Dict[str, List]:
+        """检查路径是否经过被禁用的节点或边。
+
+        Args:
+            path: 路径节点列表
+
+        Returns:
+            dict: {"nodes": 经过的禁用节点, "edges": 经过的禁用边}
+        """
+        nodes = [node for node in path if node in self.disabled_nodes]
+        edges = [list(_edge_key(u, v)) for u, v in zip(path, path[1:]) if _edge_key(u, v) in self.disabled_edges]
+        return {"nodes": nodes, "edges": edges}
+
+
+class PlanRegistry:
+    """[在途路径登记] 记录已下发但尚未到达的路径, 用于地图变更时报告受影响的任务。"""
+
+    def __init__(self):
+        self._plans: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, plan_id: str, path: List[str]) -> None:
+        """登记路径, 同一 plan_id (如同一台穿梭车) 的新路径会替换旧路径。"""
+        with self._lock:
+            self._plans[plan_id] = {"plan_id": plan_id, "path": list(path)}
+
+    def release(self, plan_id: str, target: Optional[str] = None) -> None:
+        """注销路径。
+
+        Args:
+            plan_id: 路径标识
+            target: 到达的位置, 只有与登记路径的终点一致时才注销
+        """
+        with self._lock:
+            plan = self._plans.get(plan_id)
+            if plan is None:
+                return
+            if target is None or plan["path"][-1] == target:
+                del self._plans[plan_id]
+
+    def plans(self) -> List[Dict]:
+        """当前在途路径。"""
+        with self._lock:
+            return [dict(plan) for plan in self._plans.values()]
+
+    def affected_by(self, overlay: MapOverlay) -> List[Dict]:
+        """找出经过禁用节点或边的在途路径。"""
+        affected = []
+        for plan in self.plans():
+            touched = overlay.touches(plan["path"])
+            if touched["nodes"] or touched["edges"]:
+                affected.append({**plan, "disabled_nodes": touched["nodes"], "disabled_edges": touched["edges"]})
+        return affected
+
+
+# 进程内共享的在途路径登记
+active_plans = PlanRegistry()
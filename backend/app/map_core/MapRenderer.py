@@ -0,0 +1,329 @@
+# /map_core/MapRenderer.py
+# 服务端地图渲染: 每层静态底图缓存, 只重新绘制库位状态和路径覆盖层
+import hashlib
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+
+# 库位状态颜色 (RGB)
+STATUS_COLORS: Dict[str, Tuple[int, int, int]] = {
+    "free": (200, 230, 201),
+    "occupied": (239, 154, 154),
+    "highway": (207, 216, 220),
+    "lift": (144, 202, 249),
+}
+UNKNOWN_COLOR = (238, 238, 238)
+PATH_COLOR = (211, 47, 47)
+
+RENDER_FORMATS = ("svg", "png")
+
+
+def inventory_version(node_status: Dict[str, str], layer: Optional[int] = None) -> str:
+    """库位状态摘要, 状态不变时版本号不变。
+
+    Args:
+        node_status: 节点状态字典
+        layer: 只计算该楼层的节点, None 表示全部
+
+    Returns:
+        str: 12位版本号
+    """
+    suffix = f",{layer}" if layer is not None else ""
+    digest = hashlib.sha1()
+    for node in sorted(node_status):
+        if node.endswith(suffix):
+            digest.update(f"{node}={node_status[node]};".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def _rgb_hex(color: Tuple[int, int, int]) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """把 (H, W, 3) 的 uint8 图像编码为PNG (不依赖绘图库)。"""
+    height, width, _ = image.shape
+    # 每行前加滤波类型 0
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+class _LayerLayout:
+    """一层节点的像素布局: 每个节点占一个格子, Y轴向上 (与 draw_map 一致)。"""
+
+    def __init__(self, graph: MapGraph, layer: int, cell: int, margin: int):
+        node_ids = graph.layers[layer]
+        coords = graph.coords[node_ids]
+        xmin, ymin = int(coords[:, 0].min()), int(coords[:, 1].min())
+        xmax, ymax = int(coords[:, 0].max()), int(coords[:, 1].max())
+        self.node_ids = node_ids
+        self.names = [graph.names[node_id] for node_id in node_ids]
+        self.cell = cell
+        self.width = (xmax - xmin + 1) * cell + 2 * margin
+        self.height = (ymax - ymin + 1) * cell + 2 * margin
+        # 每个节点格子的左上角像素坐标
+        self.left = margin + (coords[:, 0] - xmin) * cell
+        self.top = margin + (ymax - coords[:, 1]) * cell
+        self.local = {name: i for i, name in enumerate(self.names)}
+        members = set(node_ids.tolist())
+        self.edges = [
+            (i, self.local[graph.names[v]])
+            for i, node_id in enumerate(node_ids.tolist())
+            for v in graph.neighbors(node_id)
+            if v > node_id and v in members
+        ]
+
+    def center(self, i: int) -> Tuple[int, int]:
+        half = self.cell // 2
+        return int(self.left[i]) + half, int(self.top[i]) + half
+
+
+class MapRenderer:
+    """[地图渲染器] 按楼层输出库位状态图 (SVG/PNG)。
+
+    - 底图 (格子、连线、坐标标签) 只依赖地图拓扑, 按 (楼层, 楼层版本) 缓存;
+    - 覆盖层 (库位状态颜色、路径) 每次在底图上叠加, PNG 覆盖层用numpy直接写像素;
+    - 完整图像按 (格式, 楼层, 楼层版本, 库存版本, 路径) 缓存, 状态不变的请求直接返回缓存。
+    """
+
+    def __init__(self, cell: int = 64, margin: int = 24, max_frames: int = 64):
+        """
+        Args:
+            cell: 每个格子的像素边长
+            margin: 图像边距
+            max_frames: 最多缓存的完整图像数量
+        """
+        self.cell = cell
+        self.margin = margin
+        self.max_frames = max_frames
+        self._layouts: Dict[Tuple[int, str], _LayerLayout] = {}
+        self._svg_bases: Dict[Tuple[int, str], Tuple[str, str]] = {}
+        self._png_bases: Dict[Tuple[int, str], np.ndarray] = {}
+        self._frames: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"frame_hits": 0, "frame_misses": 0, "base_renders": 0}
+
+    def _layout(self, graph: MapGraph, layer: int) -> _LayerLayout:
+        key = (layer, graph.layer_versions[layer])
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = _LayerLayout(graph, layer, self.cell, self.margin)
+            self._layouts[key] = layout
+        return layout
+
+    ########################################
+    # SVG
+    ########################################
+
+    def _svg_base(self, graph: MapGraph, layer: int) -> Tuple[str, str]:
+        """SVG底图, 分为覆盖层之下 (背景、连线) 和之上 (格子边框、标签) 两部分。"""
+        key = (layer, graph.layer_versions[layer])
+        base = self._svg_bases.get(key)
+        if base is not None:
+            return base
+        layout = self._layout(graph, layer)
+        cell = layout.cell
+        below = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width}" height="{layout.height}" '
+            f'viewBox="0 0 {layout.width} {layout.height}">',
+            f'<rect width="{layout.width}" height="{layout.height}" fill="#ffffff"/>',
+            '<g stroke="#9e9e9e" stroke-width="3">'
+        ]
+        for i, j in layout.edges:
+            (x1, y1), (x2, y2) = layout.center(i), layout.center(j)
+            below.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}"/>')
+        below.append('</g>')
+
+        above = ['<g fill="none" stroke="#616161" stroke-width="1">']
+        for i in range(len(layout.names)):
+            above.append(
+                f'<rect x="{int(layout.left[i]) + 4}" y="{int(layout.top[i]) + 4}" width="{cell - 8}" height="{cell - 8}"/>'
+            )
+        above.append('</g><g font-family="sans-serif" font-size="12" text-anchor="middle" fill="#212121">')
+        for i, name in enumerate(layout.names):
+            x, y = layout.center(i)
+            above.append(f'<text x="{x}" y="{y + 4}">{name}</text>')
+        above.append(f'</g><text x="{self.margin}" y="{self.margin - 6}" font-family="sans-serif" font-size="14">第 {layer} 层</text>')
+        base = ("".join(below), "".join(above))
+        self._svg_bases[key] = base
+        self.stats["base_renders"] += 1
+        return base
+
+    def _render_svg(self, graph: MapGraph, layer: int, node_status: Dict[str, str], path: Sequence[str]) -> bytes:
+        below, above = self._svg_base(graph, layer)
+        layout = self._layout(graph, layer)
+        cell = layout.cell
+        overlay = []
+        for i, name in enumerate(layout.names):
+            color = _rgb_hex(STATUS_COLORS.get(node_status.get(name), UNKNOWN_COLOR))
+            overlay.append(
+                f'<rect x="{int(layout.left[i]) + 4}" y="{int(layout.top[i]) + 4}" '
+                f'width="{cell - 8}" height="{cell - 8}" fill="{color}"/>'
+            )
+        points = [layout.center(layout.local[node]) for node in path if node in layout.local]
+        path_svg = ""
+        if points:
+            color = _rgb_hex(PATH_COLOR)
+            coords = " ".join(f"{x},{y}" for x, y in points)
+            (sx, sy), (ex, ey) = points[0], points[-1]
+            path_svg = (
+                f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="6" stroke-linejoin="round"/>'
+                f'<circle cx="{sx}" cy="{sy}" r="8" fill="{color}"/>'
+                f'<rect x="{ex - 8}" y="{ey - 8}" width="16" height="16" fill="{color}"/>'
+            )
+        return (below + "".join(overlay) + above + path_svg + "</svg>").encode('utf-8')
+
+    ########################################
+    # PNG
+    ########################################
+
+    def _png_base(self, graph: MapGraph, layer: int) -> np.ndarray:
+        """PNG底图 (RGB数组), 用matplotlib绘制一次后缓存。"""
+        key = (layer, graph.layer_versions[layer])
+        base = self._png_bases.get(key)
+        if base is not None:
+            return base
+        # 绘图库只在第一次绘制底图时导入
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.patches import Rectangle
+
+        layout = self._layout(graph, layer)
+        cell = layout.cell
+        dpi = 100
+        fig = Figure(figsize=(layout.width / dpi, layout.height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_xlim(0, layout.width)
+        ax.set_ylim(layout.height, 0)
+        ax.axis("off")
+        for i, j in layout.edges:
+            (x1, y1), (x2, y2) = layout.center(i), layout.center(j)
+            ax.plot([x1, x2], [y1, y2], color="#9e9e9e", linewidth=2)
+        for i, name in enumerate(layout.names):
+            ax.add_patch(Rectangle(
+                (int(layout.left[i]) + 4, int(layout.top[i]) + 4), cell - 8, cell - 8,
+                fill=False, edgecolor="#616161", linewidth=0.8
+            ))
+            x, y = layout.center(i)
+            ax.text(x, y, name, ha="center", va="center", fontsize=8, color="#212121")
+        ax.text(self.margin, self.margin - 6, f"Layer {layer}", fontsize=10)
+        canvas.draw()
+        base = np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+        base.flags.writeable = False
+        self._png_bases[key] = base
+        self.stats["base_renders"] += 1
+        return base
+
+    def _render_png(self, graph: MapGraph, layer: int, node_status: Dict[str, str], path: Sequence[str]) -> bytes:
+        base = self._png_base(graph, layer)
+        layout = self._layout(graph, layer)
+        image = base.astype(np.float32)
+        inset, cell = 5, layout.cell
+        alpha = 0.6
+        for i, name in enumerate(layout.names):
+            color = np.array(STATUS_COLORS.get(node_status.get(name), UNKNOWN_COLOR), dtype=np.float32)
+            top, left = int(layout.top[i]) + inset, int(layout.left[i]) + inset
+            region = image[top:top + cell - 2 * inset, left:left + cell - 2 * inset]
+            # 颜色与底图按 alpha 混合, 保留坐标标签
+            region *= 1 - alpha
+            region += alpha * color
+        image = image.astype(np.uint8)
+
+        points = [layout.center(layout.local[node]) for node in path if node in layout.local]
+        color = np.array(PATH_COLOR, dtype=np.uint8)
+        w = 3
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            image[min(y1, y2) - w:max(y1, y2) + w + 1, min(x1, x2) - w:max(x1, x2) + w + 1] = color
+        for x, y in points[:1] + points[-1:]:
+            image[y - 8:y + 9, x - 8:x + 9] = color
+        return encode_png(image)
+
+    ########################################
+    # 对外接口
+    ########################################
+
+    def render(
+        self,
+        graph: MapGraph,
+        layer: int,
+        node_status: Dict[str, str],
+        fmt: str = "svg",
+        path: Optional[Sequence[str]] = None
+    ) -> Tuple[bytes, str]:
+        """渲染一层的库位状态图。
+
+        Args:
+            graph: 编译地图
+            layer: 楼层号
+            node_status: 节点状态字典, 值为 "free"/"occupied"/"highway"/"lift"
+            fmt: "svg" 或 "png"
+            path: 叠加显示的路径节点列表
+
+        Returns:
+            Tuple: (图像内容, 图像版本号), 版本号可用作 HTTP ETag
+
+        Raises:
+            ValueError: 楼层不在地图中或格式不支持
+        """
+        if layer not in graph.layers:
+            raise ValueError(f"楼层 {layer} 不在地图中")
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"不支持的图像格式 {fmt}, 可选 {list(RENDER_FORMATS)}")
+        path = tuple(path or ())
+        layer_version = graph.layer_versions[layer]
+        frame_key = (fmt, layer, layer_version, inventory_version(node_status, layer), path)
+        etag = hashlib.sha1(repr(frame_key).encode('utf-8')).hexdigest()[:16]
+
+        with self._lock:
+            frame = self._frames.get(frame_key)
+            if frame is not None:
+                self._frames.move_to_end(frame_key)
+                self.stats["frame_hits"] += 1
+                return frame, etag
+            self.stats["frame_misses"] += 1
+            if fmt == "svg":
+                frame = self._render_svg(graph, layer, node_status, path)
+            else:
+                frame = self._render_png(graph, layer, node_status, path)
+            self._frames[frame_key] = frame
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+            # 只保留当前楼层版本的底图
+            for cache in (self._layouts, self._svg_bases, self._png_bases):
+                for key in [key for key in cache if key[0] == layer and key[1] != layer_version]:
+                    del cache[key]
+        return frame, etag
+
+
+_renderer: Optional[MapRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_map_renderer() -> MapRenderer:
+    """进程内共享的地图渲染器。"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = MapRenderer()
+    return _renderer
@@ -3,20 +3,44 @@ import logging
 logger = logging.getLogger(__name__)
 
 # 用于路径规划
-import networkx as nx
-import matplotlib.pyplot as plt
 from .MapBase import MapBase
+from .RouteTable import get_route_table
 
 class PathBase:
     """路径基类，提供路径规划的基本功能。"""
 
-    def __init__(self):
-        # 创建地图
-        self.map_base = MapBase()
-        self.G, self.pos = self.map_base.create_map()
+    def __init__(self, config_path: str = None):
+        # 获取共享的编译地图 (进程内只加载一次)
+        self.map_base = MapBase(config_path)
+        # 启动时预计算分层路由表
+        get_route_table(self.graph)
+
+    @property
+    def graph(self):
+        """共享的编译地图。"""
+        return self.map_base.graph
+
+    @property
+    def routes(self):
+        """与当前地图版本对应的路由表, 地图变化后自动重建。"""
+        return get_route_table(self.graph)
+
+    @property
+    def G(self):
+        """只读 networkx 图 (仅用于绘图和兼容旧接口)。"""
+        return self.graph.to_networkx()
+
+    @property
+    def pos(self):
+        """节点绘图坐标。"""
+        return self.graph.positions()
 
     def draw_path(self, PATH):
         """[绘制地图和路径] 通过 NetworkX 和 Matplotlib 绘制地图。"""
+        # 绘图库只在绘图时导入, 不影响服务启动时间
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(10, 10))
         # 高亮显示路径
         path_edges = list(zip(PATH, PATH[1:]))  # 获取路径的边列表 (path为路径列表 path[1:]为路径列表的后半部分)
@@ -43,27 +67,22 @@ class PathBase:
         Returns:
             PATH: 最短路径列表
         """
+        routes = self.routes
         # 检查节点是否在图中
-        if SOURCE not in self.G.nodes():
+        if not routes.graph.has_node(SOURCE):
             raise ValueError(f"起点 {SOURCE} 不在地图节点中")
         
-        if TARGET not in self.G.nodes():
+        if not routes.graph.has_node(TARGET):
             raise ValueError(f"终点 {TARGET} 不在地图节点中")
             
-        try:
-            path = nx.shortest_path(self.G, source=SOURCE, target=TARGET)
-            return path
-        except nx.NetworkXNoPath:
+        # 同层查询走预计算路由表, 跨层回退到BFS
+        path = routes.shortest_path(SOURCE, TARGET)
+        if path is None:
             logger.warning(f"从 {SOURCE} 到 {TARGET} 没有可达路径")
-            return None
-        except nx.NodeNotFound as e:
-            logger.warning(f"节点未找到: {e}")
-            return None
-        except Exception as e:
-            logger.warning(f"计算路径时发生未知错误: {e}")
-            return None
+        return path
 
 if __name__ == "__main__":
+    import networkx as nx
     # 创建路径基类实例
     pathbase = PathBase()
     # print(pathbase.G.number_of_edges())
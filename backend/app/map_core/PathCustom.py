@@ -3,14 +3,106 @@ import logging
 logger = logging.getLogger(__name__)
 
 # 用于自定义路径规划
-import networkx as nx
+import heapq
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
 
 from .PathBase import PathBase
+from .TravelPlanner import TravelProfile, TravelTimePlanner
+from .JourneyPlanner import JourneyPlanner
+from .SlotRecommender import SlotRecommender, SlotScoring
+from .RelocationPlanner import RelocationPlanner
+from .MapOverlay import active_plans
+from . import SegmentCompiler
+
+# 路径规划策略
+STRATEGY_SHORTEST = "shortest"        # 最少步数
+STRATEGY_TRAVEL_TIME = "travel_time"  # 最短估算行驶时间 (惩罚换向)
+STRATEGY_LEAST_BLOCKING = "least_blocking"  # 最少阻塞货物 (需要节点状态)
+PATH_STRATEGIES = (STRATEGY_SHORTEST, STRATEGY_TRAVEL_TIME, STRATEGY_LEAST_BLOCKING)
 
 class PathCustom(PathBase):
     """[自定义路径类] 继承自PathBase, 可以添加更多自定义方法和属性。"""
-    def __init__(self):
-        super().__init__()  # 调用父类的初始化方法
+    def __init__(self, travel_profile: TravelProfile = None, config_path: str = None):
+        super().__init__(config_path)  # 调用父类的初始化方法
+        self.travel_profile = travel_profile or TravelProfile()
+
+    def plan_path(self, source: str, target: str, strategy: str = STRATEGY_SHORTEST, node_status: dict = None):
+        """按策略规划路径。
+
+        Args:
+            source: 起点
+            target: 终点
+            strategy: 路径规划策略, "shortest" 最少步数, "travel_time" 最短估算行驶时间,
+                "least_blocking" 最少阻塞货物
+            node_status: 节点状态字典, "least_blocking" 策略必填
+
+        Returns:
+            list: 路径列表, 不可达时返回None
+        """
+        if strategy == STRATEGY_SHORTEST:
+            return self.find_shortest_path(source, target)
+        elif strategy in (STRATEGY_TRAVEL_TIME, STRATEGY_LEAST_BLOCKING):
+            if not self.graph.has_node(source):
+                raise ValueError(f"起点 {source} 不在地图节点中")
+            if not self.graph.has_node(target):
+                raise ValueError(f"终点 {target} 不在地图节点中")
+            if strategy == STRATEGY_TRAVEL_TIME:
+                path = TravelTimePlanner(self.graph, self.travel_profile).find_path(source, target)
+            else:
+                if node_status is None:
+                    raise ValueError("least_blocking 策略需要提供节点状态 node_status")
+                path = self.find_least_blocking_path(source, target, node_status)["path"]
+            if path is None:
+                logger.warning(f"从 {source} 到 {target} 没有可达路径")
+            return path
+        raise ValueError(f"未知的路径规划策略 {strategy}, 可选: {PATH_STRATEGIES}")
+
+    def _resolve_node_id(self, point: Union[str, Tuple[int, int, int]], label: str) -> int:
+        """节点名称或坐标元组 -> 整数ID。"""
+        graph = self.graph
+        if isinstance(point, str):
+            node_id = graph.index.get(point)
+        else:
+            try:
+                node_id = graph.node_id_at(*point[:3])
+            except ValueError:
+                node_id = None
+        if node_id is None:
+            raise ValueError(f"{label} {point} 不在地图节点中")
+        return node_id
+
+    def plan_path_ids(
+        self,
+        source: Union[str, Tuple[int, int, int]],
+        target: Union[str, Tuple[int, int, int]],
+        strategy: str = STRATEGY_SHORTEST,
+        node_status: dict = None
+    ) -> Optional[List[int]]:
+        """按策略规划路径, 返回整数节点ID。
+
+        Args:
+            source: 起点, 节点名称 "1,1,1" 或坐标 (1, 1, 1)
+            target: 终点, 节点名称或坐标
+            strategy: 路径规划策略, 见 PATH_STRATEGIES
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
+
+        Returns:
+            List[int]: 路径节点ID列表, 不可达时返回None
+        """
+        source_id = self._resolve_node_id(source, "起点")
+        target_id = self._resolve_node_id(target, "终点")
+        if strategy == STRATEGY_SHORTEST:
+            path_ids = self.routes.path_ids(source_id, target_id)
+            if path_ids is None:
+                logger.warning(f"从 {source} 到 {target} 没有可达路径")
+            return path_ids
+        graph = self.graph
+        path = self.plan_path(graph.names[source_id], graph.names[target_id], strategy, node_status)
+        if path is None:
+            return None
+        return [graph.index[node] for node in path]
 
     # 获取坐标x轴y轴z轴
     def get_point(self, point: str):
@@ -107,14 +199,16 @@ class PathCustom(PathBase):
             return 'x'
         return 'diagonal'
     
-    def find_path(self, source, target):
+    def find_path(self, source, target, strategy: str = STRATEGY_SHORTEST, node_status: dict = None):
         """路径生成
 
         Args:
             source: 起点
             target: 终点
+            strategy: 路径规划策略
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
         """
-        found_path = self.find_shortest_path(source, target)
+        found_path = self.plan_path(source, target, strategy, node_status)
         if found_path is None:
             print("无法找到路径")
             return
@@ -131,8 +225,8 @@ class PathCustom(PathBase):
         else:
             return False, "路径规划失败"
     
-    def find_and_cut_path(self, source, target):
-        path = self.find_path(source, target)
+    def find_and_cut_path(self, source, target, strategy: str = STRATEGY_SHORTEST):
+        path = self.find_path(source, target, strategy)
         cut_path = self.cut_path(path)
         return {
             "source": source,
@@ -181,31 +275,248 @@ class PathCustom(PathBase):
         return result
     
 
-    def build_segments(self, source: str, target: str) -> list:
+    def build_segments_array(
+        self,
+        source: Union[str, Tuple[int, int, int]],
+        target: Union[str, Tuple[int, int, int]],
+        strategy: str = STRATEGY_SHORTEST,
+        node_status: dict = None,
+        pick_drop: bool = False,
+        plan_id: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """生成任务段数组, 全程使用整数坐标。
+
+        Args:
+            source: 起点, 节点名称 "1,1,1" 或坐标 (1, 1, 1)
+            target: 终点, 节点名称或坐标
+            strategy: 路径规划策略, 见 PATH_STRATEGIES
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
+            pick_drop: 是否在起点/终点添加取货(1)/放货(2)动作
+            plan_id: 在途路径标识 (如穿梭车地址), 提供时登记该路径, 到达后用 release_plan 注销
+
+        Returns:
+            np.ndarray: 形状 (m, 4) 的 uint8 任务段 [(x, y, z, action), ...],
+                可直接传给 PacketBuilder.build_task; 不可达时返回None
+        """
+        route = self.compile_route(source, target, strategy, node_status, pick_drop)
+        if route is None:
+            return None
+        path, segments = route
+        if plan_id is not None:
+            active_plans.register(plan_id, path)
+        return segments
+
+    def compile_route(
+        self,
+        source: Union[str, Tuple[int, int, int]],
+        target: Union[str, Tuple[int, int, int]],
+        strategy: str = STRATEGY_SHORTEST,
+        node_status: dict = None,
+        pick_drop: bool = False
+    ) -> Optional[Tuple[List[str], np.ndarray]]:
+        """规划路径并编译任务段, 不登记在途路径。
+
+        Args:
+            source: 起点, 节点名称 "1,1,1" 或坐标 (1, 1, 1)
+            target: 终点, 节点名称或坐标
+            strategy: 路径规划策略, 见 PATH_STRATEGIES
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
+            pick_drop: 是否在起点/终点添加取货(1)/放货(2)动作
+
+        Returns:
+            Tuple: (路径节点名称列表, 任务段数组), 不可达时返回None
+        """
+        path_ids = self.plan_path_ids(source, target, strategy, node_status)
+        if path_ids is None:
+            return None
+        graph = self.graph
+        segments = SegmentCompiler.compile_segments(graph.coords[path_ids])
+        if pick_drop:
+            segments = SegmentCompiler.add_pick_drop_actions(segments)
+        return [graph.names[node_id] for node_id in path_ids], segments
+
+    def register_plan(self, plan_id: str, path: List[str]) -> None:
+        """登记在途路径 (已编译的路线复用时使用)。
+
+        Args:
+            plan_id: 在途路径标识
+            path: 路径节点名称列表
+        """
+        active_plans.register(plan_id, path)
+
+    def release_plan(self, plan_id: str, target: Optional[str] = None) -> None:
+        """注销在途路径。
+
+        Args:
+            plan_id: 在途路径标识
+            target: 到达的位置, 只有与路径终点一致时才注销
+        """
+        active_plans.release(plan_id, target)
+
+    def plan_journey(
+        self,
+        source: str,
+        target: str,
+        lift_floor: Optional[int] = None,
+        lift_queue: int = 0,
+        depart_delay: float = 0.0
+    ) -> Optional[dict]:
+        """规划端到端行程 (穿梭车段 + 电梯段 + 交接点), 支持跨层。
+
+        Args:
+            source: 起点
+            target: 终点
+            lift_floor: 电梯当前所在楼层, None 表示不考虑电梯空驶
+            lift_queue: 电梯队列中待执行的任务数
+            depart_delay: 穿梭车延迟出发的时间, 用于比较 "立即出发" 与 "等待" 的方案
+
+        Returns:
+            dict: 行程, 见 JourneyPlanner.plan; 不可达时返回None
+        """
+        if not self.graph.has_node(source):
+            raise ValueError(f"起点 {source} 不在地图节点中")
+        if not self.graph.has_node(target):
+            raise ValueError(f"终点 {target} 不在地图节点中")
+        planner = JourneyPlanner(self.graph, self.travel_profile, lift_floor, lift_queue)
+        journey = planner.plan(source, target, depart_delay)
+        if journey is None:
+            logger.warning(f"从 {source} 到 {target} 没有可达路径")
+        return journey
+
+    def recommend_inbound_slots(
+        self,
+        node_status: dict,
+        layers: Optional[List[int]] = None,
+        car_location: Optional[str] = None,
+        exclude: Optional[List[str]] = None,
+        top_k: int = 5,
+        scoring: Optional[SlotScoring] = None
+    ) -> List[dict]:
+        """推荐入库库位, 综合货道深度、会挡住的托盘数、入库路线上的阻塞和行驶时间。
+
+        Args:
+            node_status: 节点状态字典
+            layers: 候选楼层, None 表示所有楼层
+            car_location: 穿梭车当前位置, 用于计入穿梭车到入库口的时间
+            exclude: 不参与推荐的点 (如接驳位)
+            top_k: 返回的库位数量
+            scoring: 评分参数, 默认为 SlotScoring()
+
+        Returns:
+            List[dict]: 按总分从低到高排列的候选库位
+        """
+        if car_location is not None and not self.graph.has_node(car_location):
+            raise ValueError(f"穿梭车位置 {car_location} 不在地图节点中")
+        recommender = SlotRecommender(self.graph, self.routes, self.travel_profile, scoring)
+        return recommender.recommend(node_status, layers, car_location, exclude=exclude or (), top_k=top_k)
+
+    def plan_relocation(
+        self,
+        source: str,
+        target: str,
+        node_status: dict,
+        car_location: Optional[str] = None,
+        entry: Optional[str] = None,
+        store_at_target: bool = True,
+        exclude: Optional[List[str]] = None,
+        temporary: Optional[List[str]] = None
+    ) -> dict:
+        """规划任务路线上阻塞货物的移库顺序, 见 RelocationPlanner.plan。
+
+        Args:
+            source: 任务起点
+            target: 任务终点
+            node_status: 节点状态字典
+            car_location: 穿梭车当前位置
+            entry: 本层出入口
+            store_at_target: 任务完成后终点是否有货
+            exclude: 不能作为停放点的点
+            temporary: 只能临时停放的点
+
+        Returns:
+            dict: 移库计划和估算时间
+        """
+        planner = RelocationPlanner(self.graph, self.routes, self.travel_profile)
+        return planner.plan(
+            source, target, node_status,
+            car_location=car_location,
+            entry=entry,
+            store_at_target=store_at_target,
+            exclude=exclude or (),
+            temporary=temporary or ()
+        )
+
+    def build_segments(self, source: str, target: str, strategy: str = STRATEGY_SHORTEST, node_status: dict = None) -> list:
         """生成移动路径
 
         Args:
             source: 起点坐标 如，source = "1,1,1"
             target: 终点坐标 如，target = "1,3,1"
+            strategy: 路径规划策略, 见 PATH_STRATEGIES
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
         """
         
-        found_path = self.find_path(source, target)
-        if found_path is None:
+        task_segments = self.build_segments_array(source, target, strategy, node_status)
+        if task_segments is None:
             print("未找到路径")
             return [False, "未找到路径"]
-        # print(f"找到的路径: {found_path}")
+        if len(task_segments) == 0:
+            return [False, "起点和终点相同，无需路径规划"]
 
-        cuted_path = self.cut_path(found_path)
-        # print(f"切分之后的路径: {cuted_path}")
+        return SegmentCompiler.segments_to_list(task_segments)
+    
+    def plan_batch(self, pairs: List[Tuple[str, str]]) -> List[dict]:
+        """批量规划路径, 同一起点只做一次搜索。
 
-        task_path = self.task_path(cuted_path)
-        # print(f"任务路径: {task_path}")
+        Args:
+            pairs: [(起点, 终点), ...]
 
-        task_segments = self.generate_point_list(task_path)
-        # print(f"任务分段: {task_segments}")
+        Returns:
+            List[dict]: 与输入顺序一致的结果列表, 每项包含
+                source, target, success, message, path, cut_path, segments;
+                单项失败只影响该项
+        """
+        graph = self.graph
+        results = [None] * len(pairs)
+        groups = {}
+        for i, (source, target) in enumerate(pairs):
+            groups.setdefault(source, []).append((i, target))
+
+        for source, items in groups.items():
+            parent = None
+            if graph.has_node(source):
+                parent = graph.bfs_tree(graph.node_id(source))
+            for i, target in items:
+                result = {
+                    "source": source,
+                    "target": target,
+                    "success": False,
+                    "message": None,
+                    "path": None,
+                    "cut_path": None,
+                    "segments": None
+                }
+                results[i] = result
+                if parent is None:
+                    result["message"] = f"起点 {source} 不在地图节点中"
+                    continue
+                if not graph.has_node(target):
+                    result["message"] = f"终点 {target} 不在地图节点中"
+                    continue
+                path_ids = graph.tree_path_ids(parent, graph.node_id(target))
+                if path_ids is None:
+                    result["message"] = "路径不存在"
+                    continue
+                path = [graph.names[node_id] for node_id in path_ids]
+                segments = SegmentCompiler.compile_segments(graph.coords[path_ids])
+                result.update(
+                    success=True,
+                    path=path,
+                    cut_path=self.cut_path(path),
+                    segments=SegmentCompiler.segments_to_list(segments)
+                )
+        return results
 
-        return task_segments
-    
     def add_pick_drop_actions(self, point_list):
         """在路径列表的起点和终点添加货物操作动作。
 
@@ -230,33 +541,22 @@ class PathCustom(PathBase):
         
         return new_list
     
-    def build_pick_task(self, source: str, target: str):
+    def build_pick_task(self, source: str, target: str, strategy: str = STRATEGY_SHORTEST, node_status: dict = None):
         """生成取货/放货路径
 
         Args:
             source: 起点坐标 如，source = "1,1,1"
             target: 终点坐标 如，target = "1,3,1"
+            strategy: 路径规划策略, 见 PATH_STRATEGIES
+            node_status: 节点状态字典 (仅 "least_blocking" 策略使用)
         """
         
-        found_path = self.find_path(source, target)
-        if found_path is None:
+        pick_task_segments = self.build_segments_array(source, target, strategy, node_status, pick_drop=True)
+        if pick_task_segments is None or len(pick_task_segments) == 0:
             print("未找到路径")
             return
-        # print(f"找到的路径: {found_path}")
 
-        cuted_path = self.cut_path(found_path)
-        # print(f"切分之后的路径: {cuted_path}")
-
-        task_path = self.task_path(cuted_path)
-        # print(f"任务路径: {task_path}")
-
-        task_segments = self.generate_point_list(task_path)
-        # print(f"任务分段: {task_segments}")
-
-        pick_task_segments = self.add_pick_drop_actions(task_segments)
-        # print(f"取货放货分段: {task_segments}")
-
-        return pick_task_segments
+        return SegmentCompiler.segments_to_list(pick_task_segments)
     
     def find_blocking_nodes(self, SOURCE: str, TARGET: str, NODE_STATUS):
         """检查路径上的阻塞点。
@@ -276,6 +576,70 @@ class PathCustom(PathBase):
         blocking_nodes = [node for node in found_path[1:-1] if NODE_STATUS.get(node) == "occupied"]
         return blocking_nodes
 
+    def find_least_blocking_path(self, SOURCE: str, TARGET: str, NODE_STATUS) -> dict:
+        """查找需要移动货物最少的路径。
+
+        以 (阻塞点数量, 步数) 为代价做Dijkstra搜索: 经过一个 "occupied" 中间点的代价
+        远大于多走任意步数, 因此优先选择阻塞最少的路线, 阻塞相同时选择最短路线。
+        起点和终点不计为阻塞点, 与 find_blocking_nodes 一致。
+
+        Args:
+            SOURCE: 起点
+            TARGET: 终点
+            NODE_STATUS: 节点状态字典
+
+        Returns:
+            dict: {
+                "path": 最少阻塞路径 (不可达为None),
+                "blocking_nodes": 该路径上的阻塞点,
+                "shortest_path": 最短路径,
+                "shortest_blocking_nodes": 最短路径上的阻塞点,
+                "blockers_avoided": 相比最短路径少移动的货物数量
+            }
+        """
+        graph = self.graph
+        source_id = graph.node_id(SOURCE)
+        target_id = graph.node_id(TARGET)
+        names = graph.names
+        occupied = [NODE_STATUS.get(name) == "occupied" for name in names]
+
+        best = {source_id: (0, 0)}
+        parent = {source_id: None}
+        heap = [(0, 0, source_id)]
+        while heap:
+            blockers, hops, u = heapq.heappop(heap)
+            if best[u] != (blockers, hops):
+                continue
+            if u == target_id:
+                break
+            for v in graph.neighbors(u):
+                cost = (blockers + (occupied[v] and v != target_id), hops + 1)
+                old = best.get(v)
+                if old is None or cost < old:
+                    best[v] = cost
+                    parent[v] = u
+                    heapq.heappush(heap, (cost[0], cost[1], v))
+
+        path = None
+        if target_id in parent:
+            path = []
+            node_id = target_id
+            while node_id is not None:
+                path.append(names[node_id])
+                node_id = parent[node_id]
+            path.reverse()
+
+        shortest_path = self.find_shortest_path(SOURCE, TARGET)
+        blocking_nodes = [n for n in path[1:-1] if NODE_STATUS.get(n) == "occupied"] if path else []
+        shortest_blocking_nodes = [n for n in shortest_path[1:-1] if NODE_STATUS.get(n) == "occupied"] if shortest_path else []
+        return {
+            "path": path,
+            "blocking_nodes": blocking_nodes,
+            "shortest_path": shortest_path,
+            "shortest_blocking_nodes": shortest_blocking_nodes,
+            "blockers_avoided": len(shortest_blocking_nodes) - len(blocking_nodes)
+        }
+
     def find_free_nodes_excluding_path(self,  SOURCE: str, TARGET: str, NODE_STATUS):
         """检查非路径上的空闲点。
 
@@ -291,64 +655,91 @@ class PathCustom(PathBase):
         if found_path is None:
             print("未找到路径")
             return [False, "未找到路径"]
+        found_nodes = set(found_path)
         free_nodes_excluding_path = [node for node, status in NODE_STATUS.items()
-                                    if status == "free" and node not in found_path]
+                                    if status == "free" and node not in found_nodes]
         return free_nodes_excluding_path
 
-    def find_nearest_free_node(self, TASK_START, TASK_END, MOVE_POINT, NODE_STATUS):
-        """使用NetworkX最短路径算法找到离指定点最近的值为'free'且不在路径中的点。
-        
+    def find_nearest_free_route(self, TASK_START, TASK_END, MOVE_POINT, NODE_STATUS):
+        """从指定点出发做一次广度优先搜索, 找到最近的值为'free'且不在任务路径中的点。
+
+        搜索只穿过非 "occupied" 的点, 因此返回的路线上没有阻塞点;
+        同一距离有多个候选点时, 按 NODE_STATUS 中的顺序取第一个。
+
         Args:
-            G: 图对象
             TASK_START: 任务起点
             TASK_END: 任务终点
             MOVE_POINT: 需要移动的阻碍点
             NODE_STATUS: 节点状态字典
 
         Returns:
-            最近的free点
+            tuple: (最近的free点, 距离, 路线), 没有可用点时返回None
         """
-        
+        graph = self.graph
         # 检查指定点是否有效
-        if MOVE_POINT not in self.G.nodes():
+        if not graph.has_node(MOVE_POINT):
             raise ValueError(f"指定点 {MOVE_POINT} 不在图中")
-        
-        # 获取所有值为'free'且不在路径中的点
-        free_nodes_excluding_path = self.find_free_nodes_excluding_path(TASK_START, TASK_END, NODE_STATUS)
-        
-        # 如果没有可用的free点，返回None
-        if not free_nodes_excluding_path:
+
+        task_path = self.find_shortest_path(TASK_START, TASK_END)
+        if task_path is None:
+            logger.warning("未找到任务路径")
+            return None
+        excluded = set(task_path)
+
+        names = graph.names
+        # 候选点在 NODE_STATUS 中的顺序, 用于同距离时的取舍
+        order = {}
+        for i, (node, status) in enumerate(NODE_STATUS.items()):
+            if status == "free" and node not in excluded and graph.has_node(node):
+                order[graph.node_id(node)] = i
+        if not order:
             return None
-        
-        # 计算距离并找到最近的点
-        nearest_node = None
-        min_distance = float('inf')
-        
-        for node in free_nodes_excluding_path:
-            try:
-                # 使用NetworkX的最短路径算法计算距离
-                path = nx.shortest_path(self.G, MOVE_POINT, node)
-                distance = len(path) - 1  # 路径长度为节点数减1
-                
-                # 检查路径上是否有阻塞点(除了起点和终点)
-                blocking_nodes = [n for n in path[1:-1] if NODE_STATUS.get(n) == "occupied"]
-                
-                # 如果路径上有阻塞点，则跳过该节点
-                if blocking_nodes:
-                    continue
 
-                # 更新最近的点
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_node = node
-            except nx.NetworkXNoPath:
-                # 如果没有路径，跳过该节点
-                continue
-            except Exception:
-                # 如果其他异常，也跳过该节点
-                continue
-        
-        return nearest_node
+        source_id = graph.node_id(MOVE_POINT)
+        parent = {source_id: None}
+        frontier = [source_id]
+        distance = 0
+        while frontier:
+            found = [u for u in frontier if u in order]
+            if found:
+                node_id = min(found, key=order.__getitem__)
+                route = []
+                while node_id is not None:
+                    route.append(names[node_id])
+                    node_id = parent[node_id]
+                route.reverse()
+                return route[-1], distance, route
+
+            next_frontier = []
+            for u in frontier:
+                for v in graph.neighbors(u):
+                    if v in parent:
+                        continue
+                    parent[v] = u
+                    # 阻塞点既不能作为目标, 也不能穿过
+                    if NODE_STATUS.get(names[v]) == "occupied":
+                        continue
+                    next_frontier.append(v)
+            frontier = next_frontier
+            distance += 1
+        return None
+
+    def find_nearest_free_node(self, TASK_START, TASK_END, MOVE_POINT, NODE_STATUS):
+        """找到离指定点最近的值为'free'且不在路径中的点。
+
+        Args:
+            TASK_START: 任务起点
+            TASK_END: 任务终点
+            MOVE_POINT: 需要移动的阻碍点
+            NODE_STATUS: 节点状态字典
+
+        Returns:
+            最近的free点
+        """
+        result = self.find_nearest_free_route(TASK_START, TASK_END, MOVE_POINT, NODE_STATUS)
+        if result is None:
+            return None
+        return result[0]
     
     def find_nearest_highway_node(self, BLOCKING_NODES):
         """获取最接近的highway节点。
@@ -395,5 +786,7 @@ if __name__ == "__main__":
 # 注意⚠️ 临时删除了边 ["4,5,1", "5,5,1"],
 # 删除的文件路径为 /map_core/data/map_config copy.json
 # 因为临时需要禁用 5,5,1 这个点
+# 之后禁用/启用节点和边请使用地图覆盖层接口 (/write/map_overlay/disable, /write/map_overlay/enable),
+# 无需修改配置文件或重启服务
 
 #################################
@@ -0,0 +1,301 @@
+# /map_core/RelocationPlanner.py
+# 阻塞货物移库规划: 任意空闲可达库位都可以作为停放点, 任务完成后按需移回
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+from .RouteTable import RouteTable
+from .TravelPlanner import TravelProfile, TravelTimePlanner
+
+# 移动阶段
+PHASE_CLEAR = "clear"    # 移走阻塞货物
+PHASE_TASK = "task"      # 执行任务本身
+PHASE_RETURN = "return"  # 阻塞货物移回原位
+
+
+class RelocationPlanner:
+    """[移库规划器] 为任务路线上的阻塞货物规划停放位置和移动顺序。
+
+    - 空载穿梭车可以从货物下方通过, 只有载货路线不能经过其他货物;
+    - 每一步在剩余阻塞货物中选择 "穿梭车空驶 + 载货" 距离最短且有可用停放点的一个,
+      停放点为载货可达的空闲库位 (不在任务路线上、不在排除列表中), 不挡其他货物、
+      货道由里向外、距离近者优先, 临时停放点只在没有普通库位时使用;
+    - 每个阻塞货物只移动一次, 任务完成后只有停放位置比原位更差时才移回,
+      因此移动次数不超过 2 * 阻塞数, 通常等于阻塞数。
+    """
+
+    def __init__(
+        self,
+        graph: MapGraph,
+        routes: RouteTable,
+        profile: Optional[TravelProfile] = None,
+        pick_drop_time: float = 8.0
+    ):
+        """
+        Args:
+            graph: 编译地图
+            routes: 与地图对应的路由表
+            profile: 行驶参数
+            pick_drop_time: 每次取货或放货的时间 (秒)
+        """
+        self.graph = graph
+        self.routes = routes
+        self.planner = TravelTimePlanner(graph, profile)
+        self.pick_drop_time = pick_drop_time
+
+    def _loaded_search(self, start: str, occupied: Set[str], is_goal) -> Optional[List[str]]:
+        """载货BFS: 从 start 出发只经过无货的点, 返回到第一个满足条件的点的路线。"""
+        graph = self.graph
+        names = graph.names
+        start_id = graph.node_id(start)
+        layer = graph.coords.item(start_id, 2)
+        parent = {start_id: -1}
+        queue = deque([start_id])
+        while queue:
+            u = queue.popleft()
+            if u != start_id and is_goal(names[u]):
+                route = []
+                while u != -1:
+                    route.append(names[u])
+                    u = parent[u]
+                route.reverse()
+                return route
+            for v in graph.neighbors(u):
+                if v in parent or graph.coords.item(v, 2) != layer or names[v] in occupied:
+                    continue
+                parent[v] = u
+                queue.append(v)
+        return None
+
+    def _behind_counts(self, layer: int, entry: str, marked: Set[str]) -> Dict[str, int]:
+        """以出入口为根的最短路径树上, 每个点子孙节点中属于 marked 的点数。"""
+        graph = self.graph
+        routes = self.routes.layers[layer]
+        node_ids = routes.node_ids
+        names = graph.names
+        e = routes.local[graph.node_id(entry)]
+        dist = routes.dist[e].astype(np.int64)
+        pred = routes.pred[e].astype(np.int64)
+        flag = np.fromiter((names[node_id] in marked for node_id in node_ids), dtype=np.int64, count=len(node_ids))
+        behind = np.zeros(len(node_ids), dtype=np.int64)
+        max_dist = int(dist.max()) if len(node_ids) else 0
+        for d in range(max_dist, 0, -1):
+            level = np.flatnonzero(dist == d)
+            np.add.at(behind, pred[level], behind[level] + flag[level])
+        return {names[node_id]: int(count) for node_id, count in zip(node_ids, behind)}
+
+    def _find_parking(
+        self,
+        start: str,
+        occupied: Set[str],
+        free: Set[str],
+        forbidden: Set[str],
+        temporary: Set[str],
+        entry: str,
+        allow_temporary: bool = True
+    ) -> Optional[List[str]]:
+        """选择停放点: 优先普通库位, 没有时才使用临时停放点。
+
+        候选点为载货可达的空闲点, 依次比较: 会挡住的货物数、是否挡住其他空闲库位 (货道由里向外存放)、载货步数。
+        """
+        graph = self.graph
+        names = graph.names
+        start_id = graph.node_id(start)
+        layer = graph.coords.item(start_id, 2)
+        parent = {start_id: -1}
+        hops = {start_id: 0}
+        queue = deque([start_id])
+        while queue:
+            u = queue.popleft()
+            for v in graph.neighbors(u):
+                if v in parent or graph.coords.item(v, 2) != layer or names[v] in occupied:
+                    continue
+                parent[v] = u
+                hops[v] = hops[u] + 1
+                queue.append(v)
+
+        available = {
+            node_id for node_id in parent
+            if node_id != start_id and names[node_id] in free and names[node_id] not in forbidden
+        }
+        candidates = [node_id for node_id in available if names[node_id] not in temporary]
+        if not candidates and allow_temporary:
+            candidates = [node_id for node_id in available if names[node_id] in temporary]
+        if not candidates:
+            return None
+
+        blocked = self._behind_counts(layer, entry, occupied)
+        spare = self._behind_counts(layer, entry, {names[node_id] for node_id in available})
+        best = min(candidates, key=lambda node_id: (
+            blocked[names[node_id]], spare[names[node_id]] > 0, hops[node_id], names[node_id]
+        ))
+        route = []
+        while best != -1:
+            route.append(names[best])
+            best = parent[best]
+        route.reverse()
+        return route
+
+    def _blocked_count(self, node: str, occupied: Set[str], entry: str) -> int:
+        """node 处的货物挡住的其他货物数 (这些货物到出入口的路线经过 node)。"""
+        layer = self.graph.coords.item(self.graph.node_id(node), 2)
+        return self._behind_counts(layer, entry, occupied - {node}).get(node, 0)
+
+    def _move_time(self, car: str, start: str, end: str, loaded_route: List[str]) -> float:
+        """穿梭车空驶到 start, 取货, 沿载货路线到 end, 放货的估算时间。"""
+        empty_route = self.routes.shortest_path(car, start) if car != start else [car]
+        return (
+            self.planner.estimate(empty_route or [car])
+            + self.planner.estimate(loaded_route)
+            + 2 * self.pick_drop_time
+        )
+
+    def plan(
+        self,
+        source: str,
+        target: str,
+        node_status: Dict[str, str],
+        car_location: Optional[str] = None,
+        entry: Optional[str] = None,
+        store_at_target: bool = True,
+        exclude: Iterable[str] = (),
+        temporary: Iterable[str] = ()
+    ) -> Dict:
+        """规划任务 source -> target 的移库顺序。
+
+        Args:
+            source: 任务起点 (入库时为入库口)
+            target: 任务终点 (出库时为出库口)
+            node_status: 节点状态字典, "occupied" 表示有货, "free" 表示空闲
+            car_location: 穿梭车当前位置, 默认为 source
+            entry: 本层出入口, 用于判断货物是否挡住其他货物, 默认为穿梭车位置 (不在本层时为 source)
+            store_at_target: 任务完成后 target 是否有货 (出库时为False)
+            exclude: 不能作为停放点的点 (如入库口)
+            temporary: 只能临时停放、任务完成后必须移走的点 (如接驳位)
+
+        Returns:
+            dict: {
+                "source", "target", "path": 任务路线, "blocking_nodes": 阻塞货物,
+                "moves": [{"step", "phase", "start", "end", "route", "duration"}],
+                "kept": {原位: 停放位置}, "returned": {原位: 停放位置},
+                "total_moves", "estimated_time"
+            }
+
+        Raises:
+            ValueError: 节点不在地图中、任务不可达或阻塞货物没有可用停放点
+        """
+        graph = self.graph
+        for label, node in (("起点", source), ("终点", target)):
+            if not graph.has_node(node):
+                raise ValueError(f"{label} {node} 不在地图节点中")
+        car = car_location or source
+        if not graph.has_node(car):
+            raise ValueError(f"穿梭车位置 {car} 不在地图节点中")
+        if entry is None:
+            same_layer = graph.coords.item(graph.node_id(car), 2) == graph.coords.item(graph.node_id(source), 2)
+            entry = car if same_layer else source
+        path = self.routes.shortest_path(source, target)
+        if path is None:
+            raise ValueError(f"从 {source} 到 {target} 没有可达路径")
+
+        occupied = {node for node, status in node_status.items() if status == "occupied"}
+        free = {node for node, status in node_status.items() if status == "free"}
+        blocking_nodes = [node for node in path[1:-1] if node in occupied]
+        forbidden = set(path) | set(exclude)
+        temporary = set(temporary)
+
+        moves = []
+        parked: Dict[str, str] = {}
+
+        def add_move(phase: str, start: str, end: str, route: List[str]) -> None:
+            nonlocal car
+            duration = self._move_time(car, start, end, route)
+            moves.append({
+                "step": len(moves) + 1,
+                "phase": phase,
+                "start": start,
+                "end": end,
+                "route": route,
+                "duration": round(duration, 3)
+            })
+            car = end
+
+        # 1. 移走阻塞货物: 每次选择代价最小的一个
+        remaining = list(blocking_nodes)
+        while remaining:
+            best = None
+            for blocker in remaining:
+                route = self._find_parking(blocker, occupied - {blocker}, free, forbidden, temporary, entry)
+                if route is None:
+                    continue
+                empty = self.routes.distance(graph.node_id(car), graph.node_id(blocker))
+                cost = max(empty, 0) + len(route) - 1
+                if best is None or cost < best[0]:
+                    best = (cost, blocker, route)
+            if best is None:
+                raise ValueError(f"阻塞货物 {remaining} 没有可用的停放位置")
+            _, blocker, route = best
+            parking = route[-1]
+            add_move(PHASE_CLEAR, blocker, parking, route)
+            occupied.discard(blocker)
+            occupied.add(parking)
+            parked[blocker] = parking
+            remaining.remove(blocker)
+
+        # 2. 执行任务
+        add_move(PHASE_TASK, source, target, path)
+        occupied.discard(source)
+        if store_at_target:
+            occupied.add(target)
+        else:
+            occupied.discard(target)
+
+        # 3. 按停放的相反顺序决定每个阻塞货物的最终位置:
+        #    留在停放位置 / 移回原位 / 从临时停放点移到最近的普通库位,
+        #    取挡住其他货物最少、移动次数最少的方案
+        kept: Dict[str, str] = {}
+        returned: Dict[str, str] = {}
+        for origin, parking in reversed(list(parked.items())):
+            others = occupied - {parking}
+            options = []
+            if parking not in temporary:
+                options.append((self._blocked_count(parking, occupied, entry), 0, parking, None))
+            route = self._loaded_search(parking, others, lambda node: node == origin)
+            if route is not None:
+                options.append((self._blocked_count(origin, others | {origin}, entry), 1, origin, route))
+            if parking in temporary:
+                route = self._find_parking(
+                    parking, others, free - {origin}, forbidden, temporary, entry, allow_temporary=False
+                )
+                if route is not None:
+                    end = route[-1]
+                    options.append((self._blocked_count(end, others | {end}, entry), 1, end, route))
+            if not options:
+                raise ValueError(f"临时停放在 {parking} 的货物 (原位 {origin}) 无法移走")
+            _, _, end, route = min(options, key=lambda option: option[:2])
+            if route is None:
+                kept[origin] = parking
+                continue
+            add_move(PHASE_RETURN, parking, end, route)
+            occupied.discard(parking)
+            occupied.add(end)
+            if end == origin:
+                returned[origin] = parking
+            else:
+                kept[origin] = end
+
+        return {
+            "source": source,
+            "target": target,
+            "path": path,
+            "blocking_nodes": blocking_nodes,
+            "moves": moves,
+            "kept": kept,
+            "returned": returned,
+            "total_moves": len(moves),
+            "estimated_time": round(sum(move["duration"] for move in moves), 3)
+        }
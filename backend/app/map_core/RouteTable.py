@@ -0,0 +1,184 @@
+# /map_core/RouteTable.py
+# 分层全源最短路径表，启动时预计算，查询复杂度为 O(路径长度)
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+
+
+class LayerRoutes:
+    """[单层路由] 一个楼层内的前驱矩阵和距离矩阵。
+
+    pred[s, t] 为从 s 到 t 的最短路径上 t 的前一个节点(层内局部下标), -1 表示不可达;
+    dist[s, t] 为步数, -1 表示不可达。
+    """
+
+    def __init__(self, graph: MapGraph, layer: int):
+        """预计算楼层内所有节点对的最短路径。
+
+        Args:
+            graph: 编译地图
+            layer: 楼层号
+        """
+        node_ids = graph.layers[layer]
+        k = len(node_ids)
+        local = {int(node_id): i for i, node_id in enumerate(node_ids)}
+        # 层内邻接表(局部下标), 跨层的电梯边不参与
+        adj = [
+            [local[v] for v in graph.neighbors(int(node_id)) if v in local]
+            for node_id in node_ids
+        ]
+
+        dtype = np.int16 if k < np.iinfo(np.int16).max else np.int32
+        pred = np.full((k, k), -1, dtype=dtype)
+        dist = np.full((k, k), -1, dtype=dtype)
+        for s in range(k):
+            pred_row = pred[s]
+            dist_row = dist[s]
+            dist_row[s] = 0
+            pred_row[s] = s
+            queue = deque([s])
+            while queue:
+                u = queue.popleft()
+                du = dist_row[u] + 1
+                for v in adj[u]:
+                    if dist_row[v] < 0:
+                        dist_row[v] = du
+                        pred_row[v] = u
+                        queue.append(v)
+
+        pred.flags.writeable = False
+        dist.flags.writeable = False
+        self.layer = layer
+        self.node_ids = node_ids
+        self.local = local
+        self.pred = pred
+        self.dist = dist
+
+    def path_ids(self, source_id: int, target_id: int) -> Optional[List[int]]:
+        """沿前驱矩阵回溯路径。
+
+        Args:
+            source_id: 起点全局ID
+            target_id: 终点全局ID
+
+        Returns:
+            List[int]: 路径全局ID列表, 不可达时返回None
+        """
+        s = self.local[source_id]
+        t = self.local[target_id]
+        pred = self.pred
+        if pred.item(s, t) < 0:
+            return None
+        node_ids = self.node_ids
+        path = [target_id]
+        while t != s:
+            t = pred.item(s, t)
+            path.append(int(node_ids[t]))
+        path.reverse()
+        return path
+
+
+class RouteTable:
+    """[路由表] 按楼层预计算的全源最短路径表。
+
+    同层查询直接回溯前驱矩阵; 跨层查询(经电梯)回退到编译地图的BFS。
+    路由表与地图版本绑定, 地图变化后由 get_route_table 自动重建。
+    """
+
+    def __init__(self, graph: MapGraph, previous: Optional["RouteTable"] = None):
+        """为编译地图的每一层构建路由表。
+
+        Args:
+            graph: 编译地图
+            previous: 旧地图的路由表, 楼层版本未变化的楼层直接复用
+        """
+        self.graph = graph
+        self.version = graph.version
+        self.layers: Dict[int, LayerRoutes] = {}
+        self.rebuilt_layers: List[int] = []
+        for layer in graph.layers:
+            if previous is not None and previous.graph.layer_versions.get(layer) == graph.layer_versions[layer]:
+                self.layers[layer] = previous.layers[layer]
+            else:
+                self.layers[layer] = LayerRoutes(graph, layer)
+                self.rebuilt_layers.append(layer)
+
+    def path_ids(self, source_id: int, target_id: int) -> Optional[List[int]]:
+        """查询最短路径(整数ID)。
+
+        Args:
+            source_id: 起点ID
+            target_id: 终点ID
+
+        Returns:
+            List[int]: 路径ID列表, 不可达时返回None
+        """
+        coords = self.graph.coords
+        layer = coords.item(source_id, 2)
+        if layer == coords.item(target_id, 2):
+            return self.layers[layer].path_ids(source_id, target_id)
+        return self.graph.bfs_path_ids(source_id, target_id)
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """查询最短路径(节点名称)。
+
+        Args:
+            source: 起点, 如 "1,1,1"
+            target: 终点, 如 "5,3,1"
+
+        Returns:
+            List[str]: 路径节点名称列表, 不可达时返回None
+        """
+        graph = self.graph
+        path_ids = self.path_ids(graph.node_id(source), graph.node_id(target))
+        if path_ids is None:
+            return None
+        names = graph.names
+        return [names[i] for i in path_ids]
+
+    def distance(self, source_id: int, target_id: int) -> int:
+        """查询两点间步数, 不可达返回 -1。"""
+        coords = self.graph.coords
+        layer = coords.item(source_id, 2)
+        if layer == coords.item(target_id, 2):
+            routes = self.layers[layer]
+            return routes.dist.item(routes.local[source_id], routes.local[target_id])
+        path = self.graph.bfs_path_ids(source_id, target_id)
+        return -1 if path is None else len(path) - 1
+
+
+_table_cache: Dict[str, RouteTable] = {}
+_table_lock = threading.Lock()
+
+
+def get_route_table(graph: MapGraph) -> RouteTable:
+    """获取地图对应的共享路由表, 地图版本变化时自动重建。
+
+    Args:
+        graph: 编译地图
+
+    Returns:
+        RouteTable: 共享路由表
+    """
+    table = _table_cache.get(graph.version)
+    if table is not None and table.graph is graph:
+        return table
+    with _table_lock:
+        table = _table_cache.get(graph.version)
+        if table is None or table.graph is not graph:
+            # 复用上一张路由表中拓扑未变化的楼层
+            previous = next(iter(_table_cache.values()), None)
+            if previous is not None and previous.graph.names != graph.names:
+                previous = None
+            table = RouteTable(graph, previous)
+            # 只保留当前地图的路由表
+            _table_cache.clear()
+            _table_cache[graph.version] = table
+            logger.info(f"[MAP] 路由表已构建: 重建楼层 {table.rebuilt_layers}, 地图版本 {graph.version}")
+    return table
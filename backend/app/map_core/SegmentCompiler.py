@@ -0,0 +1,79 @@
+# /map_core/SegmentCompiler.py
+# 向量化的路径 -> 穿梭车任务段编译器
+import numpy as np
+
+# 任务段动作
+ACTION_NONE = 0    # 无动作
+ACTION_PICK = 1    # 提起货物
+ACTION_DROP = 2    # 放下货物
+ACTION_MOVE_X = 5  # X轴移动
+ACTION_MOVE_Y = 6  # Y轴移动
+
+# 移动方向编码, 与 PathCustom.get_direction 一致
+_DIR_X, _DIR_Y, _DIR_DIAGONAL = 0, 1, 2
+
+
+def compile_segments(coords) -> np.ndarray:
+    """把路径坐标一次性编译为任务段。
+
+    等价于 cut_path -> task_path -> generate_point_list:
+    在X/Y方向变化处切割路径, 每段只保留端点, 端点动作为该段的移动方向(5/6),
+    起点和终点动作为0。
+
+    Args:
+        coords: 路径坐标, 形状 (n, 3) 的 [x, y, z]
+
+    Returns:
+        np.ndarray: 形状 (m, 4) 的 uint8 数组 [(x, y, z, action), ...],
+            可直接传给 PacketBuilder.build_task; 路径少于2个点时为空数组
+    """
+    coords = np.asarray(coords, dtype=np.int32).reshape(-1, 3)
+    n = len(coords)
+    if n < 2:
+        return np.empty((0, 4), dtype=np.uint8)
+    if coords.min() < 0 or coords.max() > 0xFF:
+        raise ValueError("坐标超出任务报文范围 (0-255)")
+
+    # 每一步的移动方向
+    delta = np.diff(coords, axis=0)
+    dirs = np.where(delta[:, 0] == 0, _DIR_Y, np.where(delta[:, 1] == 0, _DIR_X, _DIR_DIAGONAL))
+
+    # 方向变化处切割 (保留交界点), 斜线移动后不切割
+    cuts = np.flatnonzero((dirs[1:] != dirs[:-1]) & (dirs[:-1] != _DIR_DIAGONAL)) + 1
+    ends = np.concatenate(([0], cuts, [n - 1]))
+    points = coords[ends]
+
+    # 每段终点的动作
+    seg = np.diff(points, axis=0)
+    moves_x = (seg[:, 0] != 0) & (seg[:, 1] == 0)
+    moves_y = (seg[:, 1] != 0) & (seg[:, 0] == 0)
+    actions = np.where(moves_x, ACTION_MOVE_X, np.where(moves_y, ACTION_MOVE_Y, ACTION_NONE))
+    actions[-1] = ACTION_NONE
+
+    segments = np.empty((len(points), 4), dtype=np.uint8)
+    segments[:, :3] = points
+    segments[0, 3] = ACTION_NONE
+    segments[1:, 3] = actions
+    return segments
+
+
+def add_pick_drop_actions(segments: np.ndarray) -> np.ndarray:
+    """在任务段起点和终点添加货物操作动作 (起点=1提起, 终点=2放下)。
+
+    Args:
+        segments: compile_segments() 生成的任务段
+
+    Returns:
+        np.ndarray: 新的任务段数组
+    """
+    segments = np.array(segments, dtype=np.uint8)
+    if len(segments) < 2:
+        return segments
+    segments[0, 3] = ACTION_PICK
+    segments[-1, 3] = ACTION_DROP
+    return segments
+
+
+def segments_to_list(segments: np.ndarray) -> list:
+    """任务段数组 -> [(x, y, z, action), ...] (Python int, 便于JSON输出)。"""
+    return [tuple(row) for row in segments.tolist()]
@@ -0,0 +1,212 @@
+# /map_core/SlotRecommender.py
+# 入库库位推荐: 按楼层对所有空闲库位一次性向量化打分
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+from .RouteTable import RouteTable
+from .TravelPlanner import TravelProfile, TravelTimePlanner
+from .JourneyPlanner import JourneyPlanner
+
+
+class SlotScoring:
+    """[库位评分参数] 各项指标折算为秒, 总分越低越好。
+
+    总分 = 穿梭车到入库口的时间 + 托盘从入库口到库位的时间
+           + blocker_penalty * 会挡住的已存托盘数
+           + relocation_penalty * 现在需要先移走的托盘数
+           - depth_bonus * 距主干道的深度
+    """
+
+    def __init__(
+        self,
+        blocker_penalty: float = 60.0,
+        relocation_penalty: float = 90.0,
+        depth_bonus: float = 3.0
+    ):
+        """
+        Args:
+            blocker_penalty: 每挡住一个已存托盘的代价 (将来出库时需要移库)
+            relocation_penalty: 入库路线上每个需要先移走的托盘的代价
+            depth_bonus: 每深入货道一格的奖励 (由里向外存放)
+        """
+        if min(blocker_penalty, relocation_penalty, depth_bonus) < 0:
+            raise ValueError("评分参数不能为负数")
+        self.blocker_penalty = blocker_penalty
+        self.relocation_penalty = relocation_penalty
+        self.depth_bonus = depth_bonus
+
+    def __repr__(self) -> str:
+        return (
+            f"SlotScoring(blocker_penalty={self.blocker_penalty}, "
+            f"relocation_penalty={self.relocation_penalty}, depth_bonus={self.depth_bonus})"
+        )
+
+
+class SlotRecommender:
+    """[入库库位推荐] 在每一层的路由表上对空闲库位打分。
+
+    以入库口为根的最短路径树上:
+    - 库位的子孙节点是出库时必须经过该库位的点, 其中已存托盘数即 "会挡住的托盘数";
+    - 库位的祖先节点是入库时经过的点, 其中已存托盘数即 "需要先移走的托盘数"。
+    两项均按层(距离)逐层向量化累加, 深度取距最近主干道节点的步数。
+    """
+
+    def __init__(
+        self,
+        graph: MapGraph,
+        routes: RouteTable,
+        profile: Optional[TravelProfile] = None,
+        scoring: Optional[SlotScoring] = None
+    ):
+        """
+        Args:
+            graph: 编译地图
+            routes: 与地图对应的路由表
+            profile: 行驶参数
+            scoring: 评分参数
+        """
+        self.graph = graph
+        self.routes = routes
+        self.profile = profile or TravelProfile()
+        self.scoring = scoring or SlotScoring()
+
+    def score_layer(
+        self,
+        layer: int,
+        node_status: Dict[str, str],
+        entry: str,
+        exclude: Iterable[str] = (),
+        approach_time: float = 0.0
+    ) -> List[Dict]:
+        """对一层的空闲库位打分。
+
+        Args:
+            layer: 楼层号
+            node_status: 节点状态字典, 值为 "free"/"occupied"/"highway"/"lift"
+            entry: 该层入库口, 如 "5,3,1"
+            exclude: 不参与推荐的点 (如接驳位)
+            approach_time: 穿梭车到达入库口的时间
+
+        Returns:
+            List[dict]: 候选库位评分, 未排序
+        """
+        graph = self.graph
+        routes = self.routes.layers[layer]
+        node_ids = routes.node_ids
+        names = graph.names
+        k = len(node_ids)
+        e = routes.local[graph.node_id(entry)]
+
+        status = [node_status.get(names[node_id]) for node_id in node_ids]
+        occupied = np.fromiter((s == "occupied" for s in status), dtype=bool, count=k)
+        highway = np.fromiter((s == "highway" for s in status), dtype=bool, count=k)
+        excluded = set(exclude)
+        candidate = np.fromiter(
+            (s == "free" and names[node_id] not in excluded for s, node_id in zip(status, node_ids)),
+            dtype=bool, count=k
+        )
+
+        dist = routes.dist[e].astype(np.int64)
+        pred = routes.pred[e].astype(np.int64)
+        reachable = dist >= 0
+        candidate &= reachable
+        candidate[e] = False
+
+        # 按到入库口的距离分层, 逐层向量化累加
+        max_dist = int(dist.max()) if k else 0
+        levels = [np.flatnonzero(dist == d) for d in range(max_dist + 1)]
+        occ = occupied.astype(np.int64)
+        # 入库路线上(不含入库口和库位本身)的已存托盘数
+        relocations = np.zeros(k, dtype=np.int64)
+        for level in levels[2:]:
+            parent = pred[level]
+            relocations[level] = relocations[parent] + occ[parent]
+        # 子孙节点中的已存托盘数
+        behind = np.zeros(k, dtype=np.int64)
+        for level in reversed(levels[1:]):
+            np.add.at(behind, pred[level], behind[level] + occ[level])
+
+        # 距最近主干道节点的步数
+        if highway.any():
+            hw_dist = routes.dist[highway].astype(np.float64)
+            hw_dist[hw_dist < 0] = np.inf
+            depth = hw_dist.min(axis=0)
+            depth[~np.isfinite(depth)] = 0.0
+        else:
+            depth = np.zeros(k)
+
+        travel = TravelTimePlanner(graph, self.profile).times_from(graph.node_id(entry))[node_ids]
+
+        scoring = self.scoring
+        score = (
+            approach_time
+            + travel
+            + scoring.blocker_penalty * behind
+            + scoring.relocation_penalty * relocations
+            - scoring.depth_bonus * depth
+        )
+
+        results = []
+        for i in np.flatnonzero(candidate):
+            results.append({
+                "location": names[node_ids[i]],
+                "layer": layer,
+                "score": round(float(score[i]), 3),
+                "depth": int(depth[i]),
+                "blockers_created": int(behind[i]),
+                "relocations": int(relocations[i]),
+                "travel_time": round(float(travel[i]), 3),
+                "approach_time": round(float(approach_time), 3)
+            })
+        return results
+
+    def recommend(
+        self,
+        node_status: Dict[str, str],
+        layers: Optional[Iterable[int]] = None,
+        car_location: Optional[str] = None,
+        entry_xy: tuple = (5, 3),
+        exclude: Iterable[str] = (),
+        top_k: int = 5
+    ) -> List[Dict]:
+        """推荐入库库位。
+
+        Args:
+            node_status: 节点状态字典
+            layers: 候选楼层, None 表示所有有入库口的楼层
+            car_location: 穿梭车当前位置, 用于计入穿梭车到入库口的时间 (含跨层)
+            entry_xy: 入库口的 (x, y) 坐标, 每层的入库口为 "x,y,层"
+            exclude: 不参与推荐的点
+            top_k: 返回的库位数量
+
+        Returns:
+            List[dict]: 按总分从低到高排列的候选库位
+        """
+        graph = self.graph
+        if layers is None:
+            layers = sorted(graph.layers)
+        exclude = set(exclude)
+        journey = JourneyPlanner(graph, self.profile) if car_location else None
+
+        results = []
+        for layer in layers:
+            if layer not in graph.layers:
+                raise ValueError(f"楼层 {layer} 不在地图中")
+            entry = f"{entry_xy[0]},{entry_xy[1]},{layer}"
+            if not graph.has_node(entry):
+                continue
+            approach_time = 0.0
+            if journey is not None and car_location != entry:
+                plan = journey.plan(car_location, entry)
+                if plan is None:
+                    logger.warning(f"穿梭车 {car_location} 无法到达第 {layer} 层入库口 {entry}")
+                    continue
+                approach_time = plan["total_time"]
+            results.extend(self.score_layer(layer, node_status, entry, exclude, approach_time))
+
+        results.sort(key=lambda item: (item["score"], item["location"]))
+        return results[:top_k]
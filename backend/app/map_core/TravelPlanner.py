@@ -0,0 +1,230 @@
+# /map_core/TravelPlanner.py
+# 按行驶时间估算的A*路径规划，对换向/转弯进行惩罚
+import heapq
+from typing import List, Optional
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+from .MapGraph import MapGraph
+
+
+class TravelProfile:
+    """[行驶参数] 穿梭车行驶时间估算参数 (单位: 秒)。
+
+    每条路径的估算时间 = 格数 * cell_time + 段数 * accel_overhead
+                        + 换向次数 * turn_penalty + 电梯层数 * lift_time
+    其中一"段"对应 generate_point_list 生成的一条X/Y轴连续移动指令。
+    跨层时另计电梯排队、电梯空驶到接车层以及穿梭车进出电梯的交接时间 (见 JourneyPlanner)。
+    """
+
+    def __init__(
+        self,
+        cell_time: float = 1.0,
+        turn_penalty: float = 4.0,
+        accel_overhead: float = 2.0,
+        lift_time: float = 10.0,
+        lift_queue_time: float = 30.0,
+        handover_time: float = 5.0
+    ):
+        """
+        Args:
+            cell_time: 匀速行驶一个格子的时间
+            turn_penalty: X/Y轴换向(停车、换向)的额外时间
+            accel_overhead: 每段移动的起步/减速额外时间
+            lift_time: 电梯升降一层的时间
+            lift_queue_time: 电梯队列中每个待执行任务的平均耗时
+            handover_time: 穿梭车进出电梯的交接时间 (确认到位、状态检查)
+        """
+        if min(cell_time, turn_penalty, accel_overhead, lift_time, lift_queue_time, handover_time) < 0:
+            raise ValueError("行驶参数不能为负数")
+        self.cell_time = cell_time
+        self.turn_penalty = turn_penalty
+        self.accel_overhead = accel_overhead
+        self.lift_time = lift_time
+        self.lift_queue_time = lift_queue_time
+        self.handover_time = handover_time
+
+    def __repr__(self) -> str:
+        return (
+            f"TravelProfile(cell_time={self.cell_time}, turn_penalty={self.turn_penalty}, "
+            f"accel_overhead={self.accel_overhead}, lift_time={self.lift_time}, "
+            f"lift_queue_time={self.lift_queue_time}, handover_time={self.handover_time})"
+        )
+
+
+# 移动方向编码
+_DIR_NONE, _DIR_X, _DIR_Y, _DIR_Z = 0, 1, 2, 3
+
+
+class TravelTimePlanner:
+    """[行驶时间规划器] 在编译地图上用A*搜索估算行驶时间最短的路径。
+
+    搜索状态为 (节点, 进入方向), 因此可以对方向变化计费;
+    估算时间相同时选择换向次数更少的路径。
+    """
+
+    def __init__(self, graph: MapGraph, profile: Optional[TravelProfile] = None):
+        """
+        Args:
+            graph: 编译地图
+            profile: 行驶参数, 默认为 TravelProfile()
+        """
+        self.graph = graph
+        self.profile = profile or TravelProfile()
+
+    def _direction(self, u: int, v: int) -> int:
+        """两个相邻节点间的移动方向。"""
+        coords = self.graph.coords
+        if coords.item(u, 2) != coords.item(v, 2):
+            return _DIR_Z
+        if coords.item(u, 0) != coords.item(v, 0):
+            return _DIR_X
+        return _DIR_Y
+
+    def _heuristic(self, u: int, target_id: int) -> float:
+        """曼哈顿距离下界 (不计换向和起步)。"""
+        coords = self.graph.coords
+        profile = self.profile
+        dxy = abs(coords.item(u, 0) - coords.item(target_id, 0)) + abs(coords.item(u, 1) - coords.item(target_id, 1))
+        dz = abs(coords.item(u, 2) - coords.item(target_id, 2))
+        return dxy * profile.cell_time + dz * profile.lift_time
+
+    def _step_cost(self, u: int, v: int, prev_dir: int, direction: int) -> float:
+        """从 u 移动到 v 的时间 (含换向和起步)。"""
+        coords = self.graph.coords
+        profile = self.profile
+        if direction == _DIR_Z:
+            cost = abs(coords.item(u, 2) - coords.item(v, 2)) * profile.lift_time
+        else:
+            cells = abs(coords.item(u, 0) - coords.item(v, 0)) + abs(coords.item(u, 1) - coords.item(v, 1))
+            cost = cells * profile.cell_time
+        if direction != prev_dir:
+            # 新的一段: 起步开销, 若为X/Y换向再加换向惩罚
+            cost += profile.accel_overhead
+            if prev_dir != _DIR_NONE:
+                cost += profile.turn_penalty
+        return cost
+
+    def path_ids(self, source_id: int, target_id: int) -> Optional[List[int]]:
+        """A*搜索行驶时间最短的路径。
+
+        Args:
+            source_id: 起点ID
+            target_id: 终点ID
+
+        Returns:
+            List[int]: 路径节点ID列表, 不可达时返回None
+        """
+        if source_id == target_id:
+            return [source_id]
+        graph = self.graph
+        start = (source_id, _DIR_NONE)
+        best = {start: (0.0, 0)}
+        parent = {start: None}
+        # 堆元素: (估算总时间, 换向次数, 已用时间, 序号, 状态)
+        counter = 0
+        heap = [(self._heuristic(source_id, target_id), 0, 0.0, counter, start)]
+        while heap:
+            _, turns, g, _, state = heapq.heappop(heap)
+            if best.get(state) != (g, turns):
+                continue
+            u, prev_dir = state
+            if u == target_id:
+                path = []
+                while state is not None:
+                    path.append(state[0])
+                    state = parent[state]
+                path.reverse()
+                return path
+            for v in graph.neighbors(u):
+                direction = self._direction(u, v)
+                new_g = g + self._step_cost(u, v, prev_dir, direction)
+                new_turns = turns + (prev_dir != _DIR_NONE and direction != prev_dir)
+                new_state = (v, direction)
+                old = best.get(new_state)
+                if old is not None and (old[0], old[1]) <= (new_g, new_turns):
+                    continue
+                best[new_state] = (new_g, new_turns)
+                parent[new_state] = state
+                counter += 1
+                heapq.heappush(heap, (new_g + self._heuristic(v, target_id), new_turns, new_g, counter, new_state))
+        return None
+
+    def times_from(self, source_id: int, same_layer: bool = True) -> np.ndarray:
+        """从起点到所有节点的最短估算行驶时间 (单源Dijkstra)。
+
+        Args:
+            source_id: 起点ID
+            same_layer: 只在起点所在楼层内搜索
+
+        Returns:
+            np.ndarray: 按节点ID索引的时间数组, 不可达为 inf
+        """
+        graph = self.graph
+        coords = graph.coords
+        layer = coords.item(source_id, 2)
+        times = np.full(graph.number_of_nodes, np.inf)
+        times[source_id] = 0.0
+        start = (source_id, _DIR_NONE)
+        best = {start: 0.0}
+        counter = 0
+        heap = [(0.0, counter, start)]
+        while heap:
+            g, _, state = heapq.heappop(heap)
+            if best.get(state) != g:
+                continue
+            u, prev_dir = state
+            if g < times[u]:
+                times[u] = g
+            for v in graph.neighbors(u):
+                if same_layer and coords.item(v, 2) != layer:
+                    continue
+                direction = self._direction(u, v)
+                new_g = g + self._step_cost(u, v, prev_dir, direction)
+                new_state = (v, direction)
+                old = best.get(new_state)
+                if old is not None and old <= new_g:
+                    continue
+                best[new_state] = new_g
+                counter += 1
+                heapq.heappush(heap, (new_g, counter, new_state))
+        return times
+
+    def find_path(self, source: str, target: str) -> Optional[List[str]]:
+        """查找行驶时间最短的路径。
+
+        Args:
+            source: 起点, 如 "1,1,1"
+            target: 终点, 如 "5,3,1"
+
+        Returns:
+            List[str]: 路径节点名称列表, 不可达时返回None
+        """
+        graph = self.graph
+        path_ids = self.path_ids(graph.node_id(source), graph.node_id(target))
+        if path_ids is None:
+            return None
+        names = graph.names
+        return [names[i] for i in path_ids]
+
+    def estimate(self, path: List[str]) -> float:
+        """估算一条路径的行驶时间 (秒)。
+
+        Args:
+            path: 路径节点名称列表
+
+        Returns:
+            float: 估算时间
+        """
+        graph = self.graph
+        total = 0.0
+        prev_dir = _DIR_NONE
+        for a, b in zip(path, path[1:]):
+            u, v = graph.node_id(a), graph.node_id(b)
+            direction = self._direction(u, v)
+            total += self._step_cost(u, v, prev_dir, direction)
+            prev_dir = direction
+        return total
@@ -1,7 +1,16 @@
 # core/__init__.py
 # 屏蔽模块
+from .MapGraph import MapGraph, get_map_graph, reload_map_graph, get_map_overlay, update_map_overlay
+from .MapOverlay import MapOverlay, active_plans
+from .RouteTable import RouteTable, get_route_table
 from .MapBase import MapBase
 from .PathBase import PathBase
-from .PathCustom import PathCustom
+from .PathCustom import PathCustom, PATH_STRATEGIES
+from .TravelPlanner import TravelProfile, TravelTimePlanner
+from .JourneyPlanner import JourneyPlanner
+from .SlotRecommender import SlotRecommender, SlotScoring
+from .RelocationPlanner import RelocationPlanner
+from .SegmentCompiler import compile_segments
+from .MapRenderer import MapRenderer, get_map_renderer
 
-__all__ = ["MapBase", "PathBase", "PathCustom"]
\ No newline at end of file
+__all__ = ["MapGraph", "get_map_graph", "reload_map_graph", "get_map_overlay", "update_map_overlay", "MapOverlay", "active_plans", "RouteTable", "get_route_table", "MapBase", "PathBase", "PathCustom", "PATH_STRATEGIES", "TravelProfile", "TravelTimePlanner", "JourneyPlanner", "SlotRecommender", "SlotScoring", "RelocationPlanner", "compile_segments", "MapRenderer", "get_map_renderer"]
\ No newline at end of file
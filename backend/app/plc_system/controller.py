@@ -1,13 +1,15 @@
 # devices/plc_controller.py
 
 import time
-from typing import Union
+from typing import Tuple, Union
 import asyncio
 import logging
 logger = logging.getLogger(__name__)
 
 import struct
 
+from app.core.config import settings
+from app.utils.telemetry_history import get_lift_history
 from .connection import ConnectionAsync
 from .enum import DB_2, DB_9, DB_11, DB_12, FLOOR_CODE, LIFT_TASK_TYPE
 
@@ -22,6 +24,8 @@ class PLCController(ConnectionAsync):
         """
         self._plc_ip = plc_ip
         super().__init__(self._plc_ip)
+        # 电梯状态读取写入遥测历史
+        self.history = get_lift_history(plc_ip) if settings.HISTORY_ENABLED else None
 
     # 二进制字符串转字节码
     def binary2bytes(self, binary_str) -> bytes:
@@ -69,11 +73,27 @@ class PLCController(ConnectionAsync):
         """
         # 读取提升机所在层
         db = self.read_db(11, DB_11.CURRENT_LAYER.value, 2)
+        layer = struct.unpack('!H', db)[0]
+        if self.history is not None:
+            self.history.record_lift(layer)
         # 返回解码的数据
-        return struct.unpack('!H', db)[0]
+        return layer
         # 返回原数据
         # return db
 
+    def get_lift_state(self) -> Tuple[int, bool]:
+        """获取电梯当前层和是否空闲 (写入遥测历史)。
+
+        Returns:
+            Tuple: (层数, 是否空闲)
+        """
+        db = self.read_db(11, DB_11.CURRENT_LAYER.value, 2)
+        layer = struct.unpack('!H', db)[0]
+        idle = self.read_bit(11, DB_11.IDLE.value) == 1
+        if self.history is not None:
+            self.history.record_lift(layer, idle)
+        return layer, idle
+
     def get_lift_last_taskno(self) -> int:
         """获取电梯上一次任务号。
 
@@ -612,6 +632,38 @@ class PLCController(ConnectionAsync):
             logger.error(f"[PLC] ❌ {floor_id} 无效的楼层")
             return False
         
+    def feed_in_process_reset(self, floor_id: int) -> bool:
+        """清除放货进行中信号。
+        
+        已发送放货进行中信号, 但穿梭车未到达货物位置、出库中止时使用
+
+        Args:
+            floor_id: 楼层ID，如1、2、3、4
+
+        Returns:
+            bool: 是否成功清除
+        """
+        # 楼层1
+        if floor_id == 1:
+            self.write_bit(12, DB_12.FEED_IN_PROGRESS_1030.value, 0)
+            return True
+        # 楼层2
+        elif floor_id == 2:
+            self.write_bit(12, DB_12.FEED_IN_PROGRESS_1040.value, 0)
+            return True
+        # 楼层3
+        elif floor_id == 3:
+            self.write_bit(12, DB_12.FEED_IN_PROGRESS_1050.value, 0)
+            return True
+        # 楼层4
+        elif floor_id == 4:
+            self.write_bit(12, DB_12.FEED_IN_PROGRESS_1060.value, 0)
+            return True
+        # 无效楼层
+        else:
+            logger.error(f"[PLC] ❌ {floor_id} 无效的楼层")
+            return False
+
     def feed_complete(self, floor_id: int) -> bool:
         """发送出库指令，放货完成，并且自动启动输送线。
         
@@ -711,6 +763,38 @@ class PLCController(ConnectionAsync):
             logger.info(f"[PLC] ❌ {floor_id} 无效的楼层")
             return False
         
+    def pick_in_process_reset(self, floor_id: int) -> bool:
+        """清除取货进行中信号。
+        
+        已发送取货进行中信号, 但穿梭车未到达接驳位、入库中止时使用
+
+        Args:
+            floor_id: 楼层ID，如1、2、3、4
+
+        Returns:
+            bool: 是否成功清除
+        """
+        # 楼层1
+        if floor_id == 1:
+            self.write_bit(12, DB_12.PICK_IN_PROGRESS_1030.value, 0)
+            return True
+        # 楼层2
+        elif floor_id == 2:
+            self.write_bit(12, DB_12.PICK_IN_PROGRESS_1040.value, 0)
+            return True
+        # 楼层3
+        elif floor_id == 3:
+            self.write_bit(12, DB_12.PICK_IN_PROGRESS_1050.value, 0)
+            return True
+        # 楼层4
+        elif floor_id == 4:
+            self.write_bit(12, DB_12.PICK_IN_PROGRESS_1060.value, 0)
+            return True
+        # 无效楼层
+        else:
+            logger.error(f"[PLC] ❌ {floor_id} 无效的楼层")
+            return False
+
     def pick_complete(self, floor_id:int) -> bool:
         """发送入库指令，取货完成。
         
@@ -4,6 +4,11 @@
 from .res_protocol import RESProtocol, FrameType, CarStatus, ImmediateCommand, WorkCommand, Debug
 from .packet_parser import PacketParser
 from .packet_builder import PacketBuilder
+from .frame_decoder import FrameDecoder, parse_frame
+from .packet_cache import TaskPacketCache, get_packet_cache
+from .telemetry import CarStateCache, CarTelemetry, get_car_state, get_car_telemetry
+from .fleet import CarConfig, CarFleet, FleetCar, car_id_for, get_car_fleet
+from .charging import ChargeScheduler, DischargeModel, get_charge_scheduler
 from .network_manager import NetworkManager
 from .heartbeat_manager import HeartbeatManager
 from .task_executor import TaskExecutor
@@ -18,6 +23,22 @@ __all__ = [
     "Debug",
     "PacketParser",
     "PacketBuilder",
+    "FrameDecoder",
+    "parse_frame",
+    "TaskPacketCache",
+    "get_packet_cache",
+    "CarStateCache",
+    "CarTelemetry",
+    "get_car_state",
+    "get_car_telemetry",
+    "CarConfig",
+    "CarFleet",
+    "FleetCar",
+    "car_id_for",
+    "get_car_fleet",
+    "ChargeScheduler",
+    "DischargeModel",
+    "get_charge_scheduler",
     "NetworkManager",
     "HeartbeatManager",
     "TaskExecutor",
@@ -0,0 +1,461 @@
+# res_system/charging.py
+import asyncio
+import threading
+import time
+from collections import deque
+from random import randint
+from typing import Callable, Deque, Dict, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from .res_protocol import CarStatus
+from .fleet import CarFleet, FleetCar, get_car_fleet
+
+# ------------------------
+# 模块: 充电调度
+# 职责: 从遥测电量估计每种作业的放电速率, 预测穿梭车何时电量不足,
+#       趁任务队列空闲时送去充电 (不等到电量危急), 每次决策记录原因供接口查询
+# ------------------------
+
+IDLE = "idle"      # 空闲
+TASK = "task"      # 执行车队以外下发的任务
+CHARGE = "charge"  # 前往充电口或充电中
+LIFT_CELL = (6, 3)  # 电梯内的位置 (x, y), 各层相同
+
+
+def job_kind(car: FleetCar, car_status: Optional[int]) -> str:
+    """
+    [作业类型] - 车队作业描述的第一个词 (如 "car_move"、"good_move"、"charge"),
+    没有车队作业但穿梭车在执行任务时为 "task", 否则为 "idle"
+    """
+    if car.job:
+        return car.job.split()[0]
+    if car_status == CarStatus.TASK_EXECUTING.value:
+        return TASK
+    return IDLE
+
+
+class DischargeModel:
+    """
+    [放电模型] - 每种作业类型的放电速率 (%/秒)
+
+    一个样本是两次电量下降之间各类型作业的时长和下降的电量, 用归一化LMS在线更新:
+    只有一种作业时即为观测速率的指数滑动平均, 混合多种作业时按时长分摊预测误差。
+    没有样本的类型使用 settings.CAR_DISCHARGE_PRIOR 中的默认速率。
+    """
+
+    def __init__(self, prior: Optional[Dict[str, float]] = None, alpha: float = 0.3):
+        """
+        ::: param :::
+            prior: 默认速率 {作业类型: %/秒}, "default" 用于未列出的类型
+            alpha: 学习率 (0-1), 越大越快跟上最近的样本
+        """
+        self.prior = dict(settings.CAR_DISCHARGE_PRIOR if prior is None else prior)
+        self.alpha = alpha
+        self.rates: Dict[str, float] = {}
+        # 样本中每种作业的累计时长, 作为预测时的作业构成
+        self.seconds: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+
+    def rate(self, kind: str) -> float:
+        if kind in self.rates:
+            return self.rates[kind]
+        return self.prior.get(kind, self.prior.get("default", 0.0))
+
+    def update(self, durations: Dict[str, float], drop: float) -> None:
+        """
+        [加入样本]
+
+        ::: param :::
+            durations: {作业类型: 秒}, 充电的时长不计入
+            drop: 这段时间内下降的电量 (%)
+        """
+        durations = {kind: seconds for kind, seconds in durations.items() if seconds > 0 and kind != CHARGE}
+        norm = sum(seconds * seconds for seconds in durations.values())
+        if not norm:
+            return
+        error = drop - sum(seconds * self.rate(kind) for kind, seconds in durations.items())
+        for kind, seconds in durations.items():
+            self.rates[kind] = max(self.rate(kind) + self.alpha * error * seconds / norm, 0.0)
+            self.seconds[kind] = self.seconds.get(kind, 0.0) + seconds
+            self.samples[kind] = self.samples.get(kind, 0) + 1
+
+    def expected_rate(self) -> float:
+        """[预测速率] 按已观测的作业构成加权的平均放电速率, 没有样本时为默认速率。"""
+        total = sum(self.seconds.values())
+        if not total:
+            return self.rate("default")
+        return sum(seconds * self.rate(kind) for kind, seconds in self.seconds.items()) / total
+
+    def as_dict(self) -> Dict:
+        kinds = sorted((set(self.prior) - {"default"}) | set(self.rates))
+        return {
+            "kinds": {
+                kind: {
+                    "rate": self.rate(kind),
+                    "samples": self.samples.get(kind, 0),
+                    "seconds": round(self.seconds.get(kind, 0.0), 3),
+                }
+                for kind in kinds
+            },
+            "expected_rate": self.expected_rate(),
+        }
+
+
+class CarBattery:
+    """[单台穿梭车的电量跟踪] 上一次电量、之后各作业类型的时长、空闲时段和充电任务。"""
+
+    def __init__(self):
+        self.power: Optional[int] = None
+        # 第一次读数和充电后的读数小数部分未知, 从下一次下降开始计时
+        self.anchored = False
+        self.durations: Dict[str, float] = {}
+        self.kind: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.idle_since: Optional[float] = None
+        self.charge_task: Optional[asyncio.Task] = None
+        self.charge_rule: Optional[str] = None
+        self.stop_charge = asyncio.Event()
+        self.decision: Optional[Dict] = None
+
+    @property
+    def charging(self) -> bool:
+        return self.charge_task is not None and not self.charge_task.done()
+
+    def observe(self, kind: str, power: Optional[int], now: float, model: DischargeModel) -> None:
+        """
+        [记录一次检查] - 上次检查以来的时长计入上次的作业类型, 电量下降时加入放电样本
+        """
+        if self.checked_at is not None and self.kind is not None:
+            self.durations[self.kind] = self.durations.get(self.kind, 0.0) + now - self.checked_at
+        self.kind, self.checked_at = kind, now
+        if power is None or power == self.power:
+            return
+        dropped = self.power is not None and power < self.power
+        if dropped and self.anchored and CHARGE not in self.durations:
+            model.update(self.durations, self.power - power)
+        self.anchored = dropped
+        self.power = power
+        self.durations = {}
+
+
+class ChargeScheduler:
+    """
+    [充电调度] - 按固定间隔检查车队中每台穿梭车, 决定是否充电
+
+    决策规则 (依次判断):
+    1. 充电中: 充到 target 结束; 任务队列有作业等待且电量已到 release 时提前结束;
+    2. 电量未知或正在执行作业: 不处理 (不打断作业);
+    3. 电量不高于 critical: 立即充电, 不等任务空闲;
+    4. 按预测速率在 horizon 秒内不会降到车队最低电量: 不充电;
+    5. 任务队列有作业等待: 推迟;
+    6. 空闲不足 idle_gap 秒, 或趁空闲充电的穿梭车已达 max_concurrent: 等待;
+    7. 否则趁空闲充电。
+    充电作业持有穿梭车的作业锁, 期间车队不会分派其他作业; 只前往本层的充电口。
+    """
+
+    def __init__(
+            self,
+            fleet: Optional[CarFleet] = None,
+            model: Optional[DischargeModel] = None,
+            interval: float = settings.CAR_CHARGE_INTERVAL,
+            critical: int = settings.CAR_CHARGE_CRITICAL,
+            horizon: float = settings.CAR_CHARGE_HORIZON,
+            idle_gap: float = settings.CAR_CHARGE_IDLE_GAP,
+            target: int = settings.CAR_CHARGE_TARGET,
+            release: int = settings.CAR_CHARGE_RELEASE,
+            max_concurrent: int = settings.CAR_CHARGE_MAX_CONCURRENT,
+            chargers: Optional[Dict[int, str]] = None,
+            log_size: int = 200,
+            auto: bool = settings.CAR_CHARGE_AUTO
+    ):
+        """
+        ::: param :::
+            fleet: 穿梭车车队, 默认为全局车队
+            model: 放电模型
+            interval: 检查间隔 (秒)
+            critical: 立即充电的电量 (%)
+            horizon: 预测时长 (秒)
+            idle_gap: 空闲时段的最短时长 (秒)
+            target: 充满的电量 (%)
+            release: 有作业等待时可结束充电的电量 (%)
+            max_concurrent: 同时趁空闲充电的穿梭车数
+            chargers: 每层充电口 {楼层: "x,y,z"}, 默认为 settings.CAR_CHARGERS
+            log_size: 保留的充电记录条数
+            auto: 后台检查是否执行决策 (开始或结束充电), False 时只记录决策
+        """
+        self.fleet = get_car_fleet() if fleet is None else fleet
+        self.model = DischargeModel() if model is None else model
+        self.interval = interval
+        self.critical = critical
+        self.horizon = horizon
+        self.idle_gap = idle_gap
+        self.target = target
+        self.release = release
+        self.max_concurrent = max_concurrent
+        self.auto = auto
+        self.chargers = {int(z): location for z, location in (settings.CAR_CHARGERS if chargers is None else chargers).items()}
+        # 任务队列深度的来源 {名称: 返回等待作业数的函数}
+        self.queue_sources: Dict[str, Callable[[], int]] = {"fleet": lambda: self.fleet.waiting}
+        self.batteries: Dict[int, CarBattery] = {}
+        self.log: Deque[Dict] = deque(maxlen=log_size)
+        self.queue: Dict[str, Optional[int]] = {}
+        self.stats = {"checks": 0, "critical": 0, "opportunistic": 0, "deferred": 0,
+                      "released": 0, "completed": 0, "failed": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_queue_source(self, name: str, source: Callable[[], int]) -> None:
+        """[登记任务队列] 如数据库中等待执行的出入库任务数, 同名来源会被替换。"""
+        self.queue_sources[name] = source
+
+    def queue_depth(self) -> Dict[str, Optional[int]]:
+        """[任务队列深度] 每个来源的等待作业数, 读取失败的来源为None。"""
+        depth = {}
+        for name, source in self.queue_sources.items():
+            try:
+                depth[name] = int(source())
+            except Exception as e:
+                logger.error(f"[CHARGE] 读取任务队列 {name} 失败: {e}")
+                depth[name] = None
+        return depth
+
+    def battery(self, car_id: int) -> CarBattery:
+        battery = self.batteries.get(car_id)
+        if battery is None:
+            battery = self.batteries[car_id] = CarBattery()
+        return battery
+
+    async def check(self, act: bool = True) -> List[Dict]:
+        """
+        [检查一次] - 更新放电模型, 为每台穿梭车做出决策
+
+        ::: param :::
+            act: 是否执行决策 (开始或结束充电), False 时只返回决策
+
+        ::: return :::
+            每台穿梭车的决策
+        """
+        now = time.monotonic()
+        self.queue = self.queue_depth()
+        pending = sum(count for count in self.queue.values() if count)
+        if act:
+            self.stats["checks"] += 1
+        decisions = []
+        for car in self.fleet.cars.values():
+            battery = self.battery(car.car_id)
+            decision = self._decide(car, battery, now, pending)
+            decisions.append(decision)
+            battery.decision = decision
+            if not act:
+                continue
+            if decision["action"] == "charge":
+                self.stats[decision["rule"]] += 1
+                logger.info(f"[CHARGE] 穿梭车 {car.car_id} 去充电: {decision['reason']}")
+                battery.stop_charge.clear()
+                battery.charge_rule = decision["rule"]
+                battery.charge_task = asyncio.create_task(self._charge(car, battery, decision))
+            elif decision["action"] == "stop":
+                if decision["rule"] == "released":
+                    self.stats["released"] += 1
+                logger.info(f"[CHARGE] 穿梭车 {car.car_id} 结束充电: {decision['reason']}")
+                battery.stop_charge.set()
+            elif decision["rule"] == "deferred":
+                self.stats["deferred"] += 1
+        return decisions
+
+    def _decide(self, car: FleetCar, battery: CarBattery, now: float, pending: int) -> Dict:
+        snapshot = car.snapshot(self.fleet.max_age)
+        decision = {
+            "car_id": car.car_id,
+            "at": time.time(),
+            "power": None,
+            "kind": None,
+            "location": None,
+            "pending": pending,
+            "rate": None,
+            "time_to_min": None,
+            "idle_for": None,
+            "charger": None,
+            "route": None,
+        }
+
+        def result(action: str, rule: str, reason: str) -> Dict:
+            decision.update(action=action, rule=rule, reason=reason)
+            return decision
+
+        if snapshot is None:
+            return result("none", "offline", "没有心跳")
+        power = snapshot["power"]
+        kind = CHARGE if battery.charging else job_kind(car, snapshot["car_status"])
+        battery.observe(kind, power, now, self.model)
+        if kind == IDLE and not pending:
+            battery.idle_since = now if battery.idle_since is None else battery.idle_since
+        else:
+            battery.idle_since = None
+
+        x, y, z = snapshot["location"]
+        rate = self.model.expected_rate()
+        time_to_min = None
+        if power is not None and rate > 0:
+            time_to_min = max(power - self.fleet.min_power, 0) / rate
+        idle_for = None if battery.idle_since is None else now - battery.idle_since
+        decision.update(
+            power=power, kind=kind, location=f"{x},{y},{z}", rate=rate,
+            time_to_min=time_to_min, idle_for=idle_for, charger=self.chargers.get(z),
+        )
+
+        if battery.charging:
+            if power is not None and power >= self.target:
+                return result("stop", "charged", f"电量 {power}% 已充满 (目标 {self.target}%)")
+            if pending and power is not None and power >= self.release:
+                return result("stop", "released", f"任务队列有 {pending} 个作业等待, 电量 {power}% 已到 {self.release}%")
+            return result("none", "charging", f"充电中, 电量 {power}%")
+        if power is None:
+            return result("none", "unknown_power", "还没有电量心跳")
+        if kind != IDLE:
+            note = f", 电量 {power}% 已危急" if power <= self.critical else ""
+            return result("none", "busy", f"执行作业 ({car.job or kind}) 中, 不打断{note}")
+        if snapshot["car_status"] != CarStatus.READY.value:
+            return result("none", "not_ready", f"穿梭车状态 {snapshot['car_status']} 不是就绪")
+        if (x, y) == LIFT_CELL:
+            # 单车跨层作业中途停在电梯内, 不从电梯出发
+            return result("none", "in_lift", f"穿梭车在电梯内 {x},{y},{z}, 不从电梯出发充电")
+
+        if power <= self.critical:
+            rule, reason = "critical", f"电量 {power}% 不高于 {self.critical}%, 立即充电"
+        elif time_to_min is None or time_to_min > self.horizon:
+            return result("none", "enough", f"按 {rate:.4f}%/秒 预计 {time_to_min or 0:.0f} 秒后降到 "
+                                             f"{self.fleet.min_power}%, 超过预测时长 {self.horizon:.0f} 秒")
+        elif pending:
+            return result("none", "deferred", f"预计 {time_to_min:.0f} 秒后需要充电, "
+                                              f"任务队列有 {pending} 个作业等待, 推迟到空闲时段")
+        elif idle_for is None or idle_for < self.idle_gap:
+            return result("none", "waiting_gap", f"预计 {time_to_min:.0f} 秒后需要充电, "
+                                                 f"已空闲 {idle_for or 0:.0f} 秒, 不足 {self.idle_gap:.0f} 秒")
+        elif self._opportunistic_charging() >= self.max_concurrent:
+            return result("none", "limit", f"已有 {self.max_concurrent} 台穿梭车趁空闲充电")
+        else:
+            rule, reason = "opportunistic", f"预计 {time_to_min:.0f} 秒后降到 {self.fleet.min_power}%, 趁任务空闲充电"
+
+        if decision["charger"] is None:
+            return result("none", "no_charger", f"{z} 层没有充电口, 需要跨层充电 (car_move_to_charge)")
+        try:
+            route = car.controller.map.find_shortest_path(decision["location"], decision["charger"])
+        except ValueError as e:
+            return result("none", "no_route", f"无法规划前往充电口的路线: {e}")
+        if route is None:
+            return result("none", "no_route", f"没有前往充电口 {decision['charger']} 的路线")
+        conflict = self.fleet.conflicts(car, route)
+        if conflict is not None:
+            return result("none", "route_conflict", f"前往充电口的{conflict}")
+        decision["route"] = route
+        return result("charge", rule, reason)
+
+    def _opportunistic_charging(self) -> int:
+        return sum(1 for battery in self.batteries.values()
+                   if battery.charging and battery.charge_rule == "opportunistic")
+
+    async def _charge(self, car: FleetCar, battery: CarBattery, decision: Dict) -> None:
+        """[充电作业] 占用穿梭车, 前往本层充电口, 开始充电, 等待结束信号后结束充电。"""
+        charger = decision["charger"]
+        started = time.monotonic()
+        record = {"car_id": car.car_id, "rule": decision["rule"], "charger": charger,
+                  "start_power": decision["power"], "started_at": decision["at"]}
+        result = "failed"
+        try:
+            if car.busy:
+                # 决策之后穿梭车已被其他作业占用
+                result = "busy"
+                logger.warning(f"[CHARGE] 穿梭车 {car.car_id} 已开始执行 {car.job}, 取消充电")
+                return
+            async with self.fleet.hold(car, f"{CHARGE} {charger}", decision["route"]):
+                controller = car.controller
+                task_no = randint(1, 100)
+                if not (await controller.car_move(task_no, charger)
+                        and await controller.wait_car_move_complete_by_location(charger)):
+                    logger.error(f"[CHARGE] 穿梭车 {car.car_id} 未到达充电口 {charger}")
+                    return
+                if not await controller.car_charge(task_no, True):
+                    return
+                result = "charging"
+                await battery.stop_charge.wait()
+                if not await controller.car_charge(task_no % 255 + 1, False):
+                    return
+                result = "completed"
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"[CHARGE] 穿梭车 {car.car_id} 充电作业异常: {e}")
+        finally:
+            if result != "cancelled":
+                self.stats["completed" if result == "completed" else "failed"] += 1
+            record.update(result=result, end_power=car.state.power(), seconds=round(time.monotonic() - started, 3))
+            self.log.append(record)
+
+    def explain(self, car_id: Optional[int] = None) -> Dict:
+        """
+        [决策说明] - 阈值、放电模型、任务队列、每台穿梭车最近一次决策和充电记录
+
+        ::: param :::
+            car_id: 只返回这台穿梭车的决策和记录, None 表示全部
+        """
+        cars = [battery.decision for cid, battery in self.batteries.items()
+                if battery.decision is not None and car_id in (None, cid)]
+        return {
+            "auto": self.auto,
+            "thresholds": {
+                "critical": self.critical,
+                "min_power": self.fleet.min_power,
+                "horizon": self.horizon,
+                "idle_gap": self.idle_gap,
+                "target": self.target,
+                "release": self.release,
+                "max_concurrent": self.max_concurrent,
+                "chargers": self.chargers,
+            },
+            "model": self.model.as_dict(),
+            "queue": dict(self.queue),
+            "cars": cars,
+            "log": [record for record in self.log if car_id in (None, record["car_id"])],
+            "stats": dict(self.stats),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check(act=self.auto)
+            except Exception as e:
+                logger.error(f"[CHARGE] 充电检查异常: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """[启动] 后台按 interval 检查, auto 为 False 时只记录决策 (需要在事件循环中调用)。"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """[停止] 停止检查并取消充电作业 (穿梭车保持当前充电状态)。"""
+        tasks = [battery.charge_task for battery in self.batteries.values() if battery.charging]
+        if self._task is not None and not self._task.done():
+            tasks.append(self._task)
+        self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_scheduler: Optional[ChargeScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_charge_scheduler() -> ChargeScheduler:
+    """全局车队的充电调度 (第一次调用时创建)。"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ChargeScheduler()
+    return _scheduler
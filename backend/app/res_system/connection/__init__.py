@@ -2,8 +2,11 @@
 
 from .connection_async import ConnectionAsync
 from .connection_base import ConnectionBase
+from .session_async import CarSession, get_car_session
 
 __all__ =[
     "ConnectionAsync",
-    "ConnectionBase"
+    "ConnectionBase",
+    "CarSession",
+    "get_car_session"
 ]
\ No newline at end of file
@@ -4,6 +4,8 @@ from typing import Optional
 import logging
 logger = logging.getLogger(__name__)
 
+from ..frame_decoder import FrameDecoder
+
 # from app.utils.devices_logger import DevicesLogger
 
 
@@ -22,6 +24,8 @@ class ConnectionAsync():
         self.reader: Optional[asyncio.StreamReader] = None
         self.writer: Optional[asyncio.StreamWriter] = None
         self._connected = False
+        # 按报文重组接收的数据, 一次读取到多个报文时剩余的留给下一次接收
+        self._decoder = FrameDecoder()
         
     def is_connected(self) -> bool:
         """检查连接状态。"""
@@ -43,6 +47,7 @@ class ConnectionAsync():
                 timeout=timeout
             )
             self._connected = True
+            self._decoder.clear()
             logger.info(f"[CAR] 已连接到服务器 {self._host}:{self._port}")
             return True
         except (ConnectionRefusedError, asyncio.TimeoutError, OSError) as e:
@@ -76,7 +81,7 @@ class ConnectionAsync():
     
     async def receive_message(self, timeout: float = 10.0) -> bytes:
     # async def receive_message(self, decode: bool = False, timeout: float = 10.0) -> Optional[bytes]:
-        """接收服务器响应。
+        """接收服务器响应, 每次返回一个完整报文。
 
         - 后续如需要使用解码，请加入decode参数
         """
@@ -88,21 +93,23 @@ class ConnectionAsync():
             logger.warning("[CAR] 读取器未初始化")
             return b'\x00'
 
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         try:
-            data = await asyncio.wait_for(self.reader.read(1024), timeout=timeout)
-            if not data:
-                logger.warning("[CAR] 连接被远程关闭")
-                self._connected = False
-                return b'\x00'
-            
-            # 返回解码的数据 (使用请解除注释)
-            # response = data.decode() if decode else data
-            # logger.info(f"[CAR] 收到回复: {response[:128]}{'...' if len(response)>128 else ''}")
-            # return response
+            # 粘包时直接返回上次读取剩下的报文, 拆包时继续读取直到报文完整
+            frame = self._decoder.next_frame()
+            while frame is None:
+                data = await asyncio.wait_for(self.reader.read(1024), timeout=max(deadline - loop.time(), 0))
+                if not data:
+                    logger.warning("[CAR] 连接被远程关闭")
+                    self._connected = False
+                    return b'\x00'
+                self._decoder.write(data)
+                frame = self._decoder.next_frame()
 
-            # 返回原始数据
-            logger.debug(f"[CAR] 收到原始字节({len(data)}字节): {data[:8]}...")
-            return data
+            # 返回原始报文
+            logger.debug(f"[CAR] 收到报文({len(frame)}字节): {frame[:8]}...")
+            return frame
 
         except (asyncio.TimeoutError, ConnectionResetError, OSError) as e:
             error_type = type(e).__name__
@@ -5,6 +5,8 @@ from typing import Optional
 import logging
 logger = logging.getLogger(__name__)
 
+from ..frame_decoder import FrameDecoder
+
 # from app.utils.devices_logger import DevicesLogger
 
 
@@ -16,6 +18,8 @@ class ConnectionBase():
         self._port = PORT
         self._socket: Optional[socket.socket] = None
         self._connected = False
+        # 按报文重组接收的数据, socket 直接写入解码器的缓冲区
+        self._decoder = FrameDecoder()
         
     def is_connected(self) -> bool:
         """检查连接状态。"""
@@ -42,6 +46,7 @@ class ConnectionBase():
                 # 尝试连接
                 self._socket.connect((self._host, self._port))
                 self._connected = True
+                self._decoder.clear()
                 
                 logger.info(f"[CAR] 连接成功 (尝试次数：{attempt})")
                 return True
@@ -90,25 +95,32 @@ class ConnectionBase():
             return False
     
     def receive_message(self, timeout: float = 10.0, max_bytes: int = 4096) -> bytes:
-        """接收服务器响应。"""
+        """接收服务器响应, 每次返回一个完整报文。"""
         if not self.is_connected() or self._socket is None:
             logger.error("[CAR] 接收失败：未建立有效连接")
             return b'\x00'
             
+        deadline = time.monotonic() + timeout
         try:
-            self._socket.settimeout(timeout)
-            data = self._socket.recv(max_bytes)
-            
-            if not data:
-                logger.warning("[CAR] 连接已由服务端关闭")
-                self.close()
-                return b'\x00'
+            # 粘包时直接返回上次读取剩下的报文, 拆包时继续读取直到报文完整
+            frame = self._decoder.next_frame()
+            while frame is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout()
+                self._socket.settimeout(remaining)
+                size = self._socket.recv_into(self._decoder.get_buffer(max_bytes), max_bytes)
+                
+                if not size:
+                    logger.warning("[CAR] 连接已由服务端关闭")
+                    self.close()
+                    return b'\x00'
+                self._decoder.buffer_updated(size)
+                frame = self._decoder.next_frame()
                 
             # 注意：当前项目直接返回原始字节数据
-            # 如果未来需要字符串，可取消以下注释：
-            # logger.info(f"[CAR] 收到({len(data)}字节): {data[:128]}{'...' if len(data)>128 else ''}")
-            logger.debug(f"[CAR] 收到原始字节({len(data)}字节): {data[:8]}...")
-            return data
+            logger.debug(f"[CAR] 收到报文({len(frame)}字节): {frame[:8]}...")
+            return frame
             
         except socket.timeout:
             logger.warning("[CAR] 接收超时，未接收到数据")
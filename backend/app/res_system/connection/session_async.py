@@ -0,0 +1,270 @@
+# res_system/connection/session_async.py
+import asyncio
+import socket
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from ..frame_decoder import FrameDecoder
+
+# 记住的超时请求数, 其迟到的响应被丢弃
+EXPIRED_KEYS = 64
+
+
+def frame_key(frame: bytes) -> Tuple[int, int, int]:
+    """报文的匹配键: (设备ID, 生命, 报文类型)。"""
+    return frame[2], frame[3], frame[4] & 0x0F
+
+
+def split_frames(buffer: bytearray) -> List[bytes]:
+    """从接收缓冲区中取出所有完整报文, 剩余的不完整数据留在缓冲区中。
+
+    一次性拆分已有数据的简便写法, 长期连接请直接使用 FrameDecoder。
+
+    Args:
+        buffer: 接收缓冲区 (原地修改)
+
+    Returns:
+        List[bytes]: 完整的报文列表
+    """
+    decoder = FrameDecoder(len(buffer))
+    frames = decoder.feed_frames(buffer)
+    del buffer[:len(buffer) - decoder.pending]
+    return frames
+
+
+class CarSession:
+    """[穿梭车长连接会话] 每台穿梭车一个TCP连接, 由单个读取任务接收所有响应。
+
+    - 请求按 (设备ID, 生命, 报文类型) 与响应匹配, 多个调用方可以同时使用同一连接;
+    - 超时请求的迟到响应被丢弃, 不交给后来的同类型请求;
+    - 固件不回显生命值 (echo_life=False) 时, 响应按顺序交给同一设备、同一类型中最早的请求
+      (先抵消已超时的请求);
+    - 连接断开后未完成的请求立即失败, 下一次请求时自动重连。
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            connect_timeout: float = 5.0,
+            request_timeout: float = 10.0,
+            echo_life: bool = settings.CAR_ECHOES_LIFE
+    ):
+        """
+        Args:
+            host: 穿梭车地址, 如 "192.168.8.30"
+            port: 穿梭车端口, 如 2504
+            connect_timeout: 连接超时 (秒)
+            request_timeout: 默认的响应超时 (秒)
+            echo_life: 固件是否在响应中回显生命值
+        """
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self.echo_life = echo_life
+        self._pending: Dict[Tuple[int, int, int], asyncio.Future] = {}
+        # 超时请求的匹配键, 按超时顺序
+        self._expired: Deque[Tuple[int, int, int]] = deque(maxlen=EXPIRED_KEYS)
+        self._decoder = FrameDecoder()
+        self.stats = {"connects": 0, "requests": 0, "responses": 0, "unmatched": 0, "timeouts": 0,
+                      "late": 0, "disconnects": 0}
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        """会话绑定到当前事件循环, 事件循环变化时 (如测试中多次 asyncio.run) 丢弃旧连接。"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._reader = None
+            self._writer = None
+            self._reader_task = None
+            self._connect_lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
+            self._pending = {}
+            self._expired.clear()
+            self._decoder.clear()
+        return loop
+
+    def is_connected(self) -> bool:
+        """检查连接状态。"""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        """[异步] 建立连接 (已连接时直接返回)。"""
+        loop = self._bind_loop()
+        if self.is_connected():
+            return True
+        async with self._connect_lock:
+            if self.is_connected():
+                return True
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port),
+                    timeout=self.connect_timeout
+                )
+            except (ConnectionRefusedError, asyncio.TimeoutError, OSError) as e:
+                logger.error(f"[CAR] 连接失败 {self.host}:{self.port} {type(e).__name__}: {e}")
+                return False
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reader, self._writer = reader, writer
+            self._decoder.clear()
+            self._reader_task = loop.create_task(self._read_loop(reader, writer))
+            self.stats["connects"] += 1
+            logger.info(f"[CAR] 已建立长连接 {self.host}:{self.port}")
+            return True
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """读取任务: 拆分报文并交给对应的请求。"""
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    logger.warning(f"[CAR] 连接被远程关闭 {self.host}:{self.port}")
+                    break
+                for frame in self._decoder.feed_frames(data):
+                    self._dispatch(frame)
+        except (ConnectionResetError, OSError) as e:
+            logger.error(f"[CAR] 接收错误 {type(e).__name__}: {e}")
+        finally:
+            self._drop_connection(writer, ConnectionError(f"连接已断开 {self.host}:{self.port}"))
+
+    def _take_expired(self, key: Tuple[int, int, int]) -> bool:
+        """响应属于已超时的请求时移除该记录并返回True; 不回显生命值时按设备和类型匹配最早的一个。"""
+        for expired_key in self._expired:
+            if expired_key == key or (not self.echo_life and expired_key[0] == key[0] and expired_key[2] == key[2]):
+                self._expired.remove(expired_key)
+                return True
+        return False
+
+    def _dispatch(self, frame: bytes) -> None:
+        """按 (设备ID, 生命, 报文类型) 找到等待该响应的请求, 超时请求的迟到响应直接丢弃。"""
+        key = frame_key(frame)
+        if self._take_expired(key):
+            self.stats["late"] += 1
+            logger.warning(f"[CAR] 丢弃已超时请求的迟到响应: {frame[:8]}...")
+            return
+        future = self._pending.pop(key, None)
+        if future is None and not self.echo_life:
+            for pending_key in self._pending:
+                if pending_key[0] == key[0] and pending_key[2] == key[2]:
+                    future = self._pending.pop(pending_key)
+                    break
+        if future is None or future.done():
+            self.stats["unmatched"] += 1
+            logger.debug(f"[CAR] 未匹配的响应报文: {frame}")
+            return
+        self.stats["responses"] += 1
+        future.set_result(frame)
+
+    def _drop_connection(self, writer: Optional[asyncio.StreamWriter], error: Exception) -> None:
+        """关闭连接并让未完成的请求失败。"""
+        if writer is None or writer is not self._writer:
+            return
+        self.stats["disconnects"] += 1
+        self._reader = None
+        self._writer = None
+        if not writer.is_closing():
+            writer.close()
+        pending, self._pending = self._pending, {}
+        # 新连接上不会收到旧连接的响应
+        self._expired.clear()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, packet: bytes, timeout: Optional[float] = None) -> Optional[bytes]:
+        """[异步] 发送请求报文并等待对应的响应报文。
+
+        Args:
+            packet: 请求报文 (PacketBuilder 生成)
+            timeout: 响应超时 (秒), 默认为 request_timeout
+
+        Returns:
+            bytes: 响应报文, 连接失败或超时返回None
+        """
+        key = frame_key(packet)
+        timeout = self.request_timeout if timeout is None else timeout
+        # 报文未写出时 (连接已失效) 重连后再发送一次
+        for attempt in range(2):
+            if not await self.connect():
+                return None
+            # 同一匹配键的请求未完成时先等待, 避免响应被错配
+            while key in self._pending and not self._pending[key].done():
+                await asyncio.wait({self._pending[key]})
+            future = self._loop.create_future()
+            self._pending[key] = future
+            if key in self._expired:
+                # 生命值循环使用, 同一匹配键的新请求替代已超时的记录
+                self._expired.remove(key)
+            writer = self._writer
+            try:
+                async with self._write_lock:
+                    writer.write(packet)
+                    await writer.drain()
+            except (BrokenPipeError, ConnectionResetError, OSError) as e:
+                logger.warning(f"[CAR] 发送失败, 重新连接: {e}")
+                self._pending.pop(key, None)
+                self._drop_connection(writer, ConnectionError(str(e)))
+                continue
+            self.stats["requests"] += 1
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                self._expired.append(key)
+                logger.error(f"[CAR] 等待响应超时 ({timeout}s): {packet[:8]}...")
+                return None
+            except ConnectionError as e:
+                logger.error(f"[CAR] 等待响应时连接断开: {e}")
+                return None
+            finally:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+        return None
+
+    async def close(self) -> None:
+        """[异步] 关闭连接。"""
+        writer, task = self._writer, self._reader_task
+        self._drop_connection(writer, ConnectionError("连接已关闭"))
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except (ConnectionResetError, OSError):
+                pass
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        logger.info(f"[CAR] 长连接已关闭 {self.host}:{self.port}")
+
+
+_sessions: Dict[Tuple[str, int], CarSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_car_session(host: str, port: int) -> CarSession:
+    """每台穿梭车 (地址, 端口) 共享一个长连接会话。"""
+    key = (host, port)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = CarSession(host, port)
+                _sessions[key] = session
+    return session
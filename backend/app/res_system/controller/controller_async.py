@@ -1,6 +1,6 @@
 # devices/car_controller.py
 
-from typing import Union, Any, Dict
+from typing import Union, Any, Dict, Optional
 import time
 import asyncio
 import logging
@@ -9,11 +9,17 @@ logger = logging.getLogger(__name__)
 from app.core.config import settings
 from app.map_core import PathCustom
 from ..connection.connection_async import ConnectionAsync
+from ..connection.session_async import get_car_session
 from ..enum import CarStatus
 from app.res_system import (
     PacketBuilder,
-    PacketParser
+    PacketParser,
+    car_id_for,
+    get_car_state,
+    get_car_telemetry,
+    get_packet_cache
 )
+from app.res_system.packet_cache import CompiledTask
 from app.res_system.res_protocol import (
     CarBaseEnum,
     Debug,
@@ -25,7 +31,7 @@ from app.res_system.res_protocol import (
 
         
 class ControllerAsync(ConnectionAsync):
-    """[穿梭车 - 高级操作类] 基于asyncio 异步。"""
+    """[穿梭车 - 高级操作类] 基于asyncio 异步, 所有报文经同一台穿梭车的长连接会话收发。"""
 
     def __init__(self, CAR_IP: str, CAR_PORT: int):
         """初始化穿梭车客户端。
@@ -41,6 +47,16 @@ class ControllerAsync(ConnectionAsync):
         self.builder = PacketBuilder(self._car_id)
         self.parser = PacketParser()
         self.map = PathCustom()
+        # 在途路径标识, 地图覆盖层变更时用于报告受影响的任务
+        self._plan_id = f"car:{CAR_IP}:{CAR_PORT}"
+        # 同一台穿梭车的所有控制器共用一个长连接
+        self.session = get_car_session(CAR_IP, CAR_PORT)
+        # 心跳结果写入共享的状态缓存 (后台遥测也写入同一缓存)
+        self.state = get_car_state(CAR_IP, CAR_PORT)
+        # 等待到达/任务完成时订阅后台遥测的心跳
+        self.telemetry = get_car_telemetry(CAR_IP, CAR_PORT, self._car_id)
+        # 最近一次下发的任务 (路径和任务段), 用于按段进度提前触发后续动作
+        self.active_task: Optional[CompiledTask] = None
 
     def set_car_id(self) -> int:
         """设置穿梭车ID。
@@ -48,12 +64,8 @@ class ControllerAsync(ConnectionAsync):
         Returns:
             final_car_id: 最终穿梭车ID
         """
-        if self._host == "192.168.8.20":
-            final_car_id = 1
-        elif self._host == "192.168.8.30":
-            final_car_id = 2
-        else:
-            final_car_id = 0
+        # 设备ID来自车队配置 settings.CAR_FLEET, 未配置的地址为0
+        final_car_id = car_id_for(self._car_ip, self._car_port)
         return final_car_id
 
     
@@ -72,23 +84,14 @@ class ControllerAsync(ConnectionAsync):
         """
         for i in range(TIMES):
             packet = self.builder.heartbeat()
-            await self.connect()
-            if self.is_connected():
-                time.sleep(1)
-                await self.send_message(packet)
-                response = await self.receive_message()
-                if response != b'\x00':
-                    msg = self.parser.parse_heartbeat_response(response)
-                    await self.close()
-                    logger.debug(msg)
-                    return msg
-                else:
-                    await self.close()
-                    logger.error("[CAR] 📰 未收到 [心跳] 响应报文！")
-                    
+            response = await self.session.request(packet)
+            if response:
+                msg = self.parser.parse_heartbeat_response(response)
+                logger.debug(msg)
+                self.state.publish(msg)
+                return msg
             else:
-                await self.close()
-                logger.error("[CAR] 🚗 穿梭车未连接！")
+                logger.error("[CAR] 📰 未收到 [心跳] 响应报文！")
         
         # 如果循环没有执行（例如 TIMES <= 0），返回默认错误信息
         logger.error("[CAR] ⚠️  心跳发送次数设置错误或未发送心跳！")
@@ -97,50 +100,64 @@ class ControllerAsync(ConnectionAsync):
             "message": "心跳发送次数设置错误或未发送心跳！"
         }
 
-    async def car_power(self, TIMES: int=2) -> Any:
+    async def read_heartbeat(self, TIMES: int=2, max_age: Optional[float]=None) -> Dict:
+        """读取心跳: 缓存在 max_age 秒内时直接返回缓存, 否则发送心跳。
+
+        Args:
+            TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
+
+        Returns:
+            Dict: 心跳报文解析后的参数
+        """
+        if max_age is not None:
+            cached = self.state.heartbeat(max_age)
+            if cached is not None:
+                return cached
+        return await self.send_heartbeat(TIMES)
+
+    async def car_power(self, TIMES: int=2, max_age: Optional[float]=None) -> Any:
         """发送电量心跳包，获取穿梭车电量。
 
         Args:
             TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送电量心跳
 
         Returns:
             car_power_msg: 返回穿梭车电量信息
         """
+        if max_age is not None:
+            cached = self.state.power(max_age)
+            if cached is not None:
+                return cached
         for i in range(TIMES):
             packet = self.builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY)
-            await self.connect()
-            if self.is_connected():
-                await self.send_message(packet)
-                response = await self.receive_message()
-                if response != b'\x00':
-                    await self.close()
-                    msg = self.parser.parse_hb_power_response(response)
-                    logger.debug(msg)
-                    car_power_msg = msg['power']
-                    return car_power_msg
-                else:
-                    await self.close()
-                    logger.error("[CAR] ⚡️ 未收到 [电量心跳] 响应报文！")
-                    
+            response = await self.session.request(packet)
+            if response:
+                msg = self.parser.parse_hb_power_response(response)
+                logger.debug(msg)
+                self.state.publish(msg)
+                car_power_msg = msg['power']
+                return car_power_msg
             else:
-                await self.close()
-                logger.error("[CAR] 🚗 穿梭车未连接！")
+                logger.error("[CAR] ⚡️ 未收到 [电量心跳] 响应报文！")
         
         # 如果循环没有执行（例如 TIMES <= 0），返回默认错误信息
         logger.error("[CAR] ⚠️  心跳发送次数设置错误或未发送心跳！")
         return None
     
-    async def car_status(self, TIMES: int=2) -> Dict:
+    async def car_status(self, TIMES: int=2, max_age: Optional[float]=None) -> Dict:
         """发送心跳报文，获取穿梭车状态信息。
 
         Args:
             TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
 
         Returns:
             Dict: 穿梭车状态信息
         """
-        heartbeat_msg = await self.send_heartbeat(TIMES)
-        if heartbeat_msg:
+        heartbeat_msg = await self.read_heartbeat(TIMES, max_age)
+        if heartbeat_msg.get('car_status') != "error":
             car_status = CarStatus.get_info_by_value(heartbeat_msg['car_status'])
             logger.debug(f"[CAR] 穿梭车状态码: {heartbeat_msg['car_status']}时, 穿梭车状态: {car_status['name']}, 状态描述: {car_status['description']}")
             return {
@@ -155,16 +172,17 @@ class ControllerAsync(ConnectionAsync):
                 'description': "未知"
                 }
 
-    async def car_current_location(self, TIMES: int=3) -> str:
+    async def car_current_location(self, TIMES: int=3, max_age: Optional[float]=None) -> str:
         """获取小车位置。
 
         Args:
             TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
         
         Returns:
             str: 小车当前位置, 例如: "6,3,1"
         """
-        heartbeat_msg = await self.send_heartbeat(TIMES)
+        heartbeat_msg = await self.read_heartbeat(TIMES, max_age)
         if heartbeat_msg["car_status"] == "error":
             return "error"
         else:
@@ -180,38 +198,40 @@ class ControllerAsync(ConnectionAsync):
             ) -> bool:
         """[异步] 等待穿梭车移动到指定位置。
 
+        订阅后台遥测的心跳, 第一个 "位置 == LOCATION 且就绪" 的心跳到达时返回,
+        不再轮询发送心跳; 多个等待方共用同一个心跳流。
+
         Args:
             LOCATION: 目标位置 如 "6,3,1"
+            TIMEOUT: 超时时间 (秒)
 
         Returns:
             bool: 用于确认等到的标志
         """
-        
-        target_loc = list(map(int, LOCATION.split(',')))
-        target_x, target_y, target_z = target_loc[0], target_loc[1], target_loc[2]
         logger.info(f"[CAR] ⏳ 等待小车移动到位置: {LOCATION}")
+        msg = await self.telemetry.wait_for_location(LOCATION, TIMEOUT)
+        if msg is None:
+            logger.error(f"❌ 超时错误: 等待🚗动作超时 ({TIMEOUT}s)")
+            return False
+        logger.info(f"[CAR] ✅ 小车已到达目标位置 {LOCATION}")
+        self.map.release_plan(self._plan_id, LOCATION)
+        return True
 
-        await asyncio.sleep(2)
-        start_time = asyncio.get_event_loop().time()
-        
-        while True:
-            # 获取小车当前位置
-            car_location = await self.car_current_location()
-            car_cur_loc = list(map(int, car_location.split(',')))
-            car_x, car_y, car_z = car_cur_loc[0], car_cur_loc[1], car_cur_loc[2]
-            
-            if (car_x == target_x) and (car_y == target_y) and (car_z == target_z):
-                logger.info(f"[CAR] ✅ 小车已到达目标位置 {LOCATION}")
-                return True
-            
-            # 检查超时
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > TIMEOUT:
-                logger.error(f"❌ 超时错误: 等待🚗动作超时 ({TIMEOUT}s)")
-                return False
-            
-            # 等待一段时间再次检查
-            await asyncio.sleep(1)
+    async def wait_task_complete(self, TASK_NO: int, TIMEOUT: float = settings.CAR_ACTION_TIMEOUT) -> bool:
+        """[异步] 等待穿梭车完成任务 (心跳中的任务序号为 TASK_NO 且就绪)。
+
+        Args:
+            TASK_NO: 任务号
+            TIMEOUT: 超时时间 (秒)
+
+        Returns:
+            bool: 用于确认等到的标志
+        """
+        msg = await self.telemetry.wait_for_task(TASK_NO, TIMEOUT)
+        if msg is None:
+            logger.error(f"❌ 超时错误: 等待任务 {TASK_NO} 完成超时 ({TIMEOUT}s)")
+            return False
+        return True
 
     async def wait_car_move_complete_by_location_sync(
             self,
@@ -242,6 +262,7 @@ class ControllerAsync(ConnectionAsync):
             
             if (car_x == target_x) and (car_y == target_y) and (car_z == target_z):
                 logger.info(f"[CAR] ✅ 小车已到达目标位置 {LOCATION}")
+                self.map.release_plan(self._plan_id, LOCATION)
                 return True
             
             # 检查超时
@@ -267,22 +288,32 @@ class ControllerAsync(ConnectionAsync):
         """
         packet = self.builder.location_change(TASK_NO, CAR_LOCATION)
         logger.debug(packet)
-        if await self.connect():
-            await self.send_message(packet)
-            response = await self.receive_message()
-            logger.debug(response)
-            if response:
-                msg = self.parser.parse_command_response(response)
-                logger.debug(msg)
-                await self.close()
-                return True
-            else:
-                logger.error("[CAR] 📰 未收到 [指令] 响应报文！")
-                await self.close()
-                return False
+        response = await self.session.request(packet)
+        logger.debug(response)
+        if response:
+            msg = self.parser.parse_command_response(response)
+            logger.debug(msg)
+            return True
+        else:
+            logger.error("[CAR] 📰 未收到 [指令] 响应报文！位置修改失败")
+            return False
+
+    async def car_charge(self, TASK_NO: int, START: bool = True) -> bool:
+        """发送指令包, 开始或结束充电 (穿梭车需要停在充电口)。
+
+        Args:
+            TASK_NO: 任务号
+            START: True 开始充电, False 结束充电
+        """
+        command = WorkCommand.START_CHARGING.value if START else WorkCommand.STOP_CHARGING.value
+        packet = self.builder.build_work_command(TASK_NO, TASK_NO, command)
+        response = await self.session.request(packet)
+        if response:
+            msg = self.parser.parse_command_response(response)
+            logger.debug(msg)
+            return True
         else:
-            logger.error("[CAR] 位置修改失败")
-            await self.close()
+            logger.error(f"[CAR] 📰 未收到 [指令] 响应报文！{'开始' if START else '结束'}充电失败")
             return False
 
     async def car_move(self, TASK_NO: int, TARGET_LOCATION: str) -> bool:
@@ -299,6 +330,7 @@ class ControllerAsync(ConnectionAsync):
         car_current_location = f"{location_info[0]},{location_info[1]},{location_info[2]}"
         logger.info(f"[CAR] 穿梭车当前位置: {car_current_location}")
         if car_current_location == TARGET_LOCATION:
+            self.active_task = None
             return True
         
         # 创建移动路径
@@ -308,39 +340,32 @@ class ControllerAsync(ConnectionAsync):
         #     (4,1,1,6),
         #     (1,1,1,0)
         #             ]
-        segments = self.map.build_segments(car_current_location, TARGET_LOCATION)
-        if isinstance(segments, list):
-            logger.info(f"[CAR] 创建移动路径: {segments}")
+        # 同一路线的任务段和报文模板已编译缓存, 只需填写生命、任务号和CRC
+        compiled = get_packet_cache().get(self.map, location_info, TARGET_LOCATION)
+        if compiled is not None and len(compiled.segments):
+            self.map.register_plan(self._plan_id, list(compiled.path))
+            logger.info(f"[CAR] 创建移动路径: {compiled.segments.tolist()}")
         else:
-            logger.error(f"[CAR] 无法创建移动路径: {segments}")
+            logger.error(f"[CAR] 无法创建移动路径: {compiled}")
+            self.active_task = None
             return False
+        self.active_task = compiled
+        task_packet, do_packet = compiled.packets(self.builder, TASK_NO)
 
         # 发送任务报文
-        task_packet = self.builder.build_task(TASK_NO, segments)
-        if await self.connect():
-            await self.send_message(task_packet)
-            task_response = self.receive_message()
-            if task_response:
-                # 发送任务确认执行报文
-                do_packet = self.builder.do_task(TASK_NO, segments)
-                await self.send_message(do_packet)
-                do_response = await self.receive_message()
-                if do_response:
-                    msg = self.parser.parse_task_response(do_response)
-                    logger.debug(msg)
-                    await self.close()
-                    return True
-                else:
-                    logger.error("[CAR] 📰 未收到 [指令] 响应报文！")
-                    await self.close()
-                    return False
+        task_response = await self.session.request(task_packet)
+        if task_response:
+            # 发送任务确认执行报文
+            do_response = await self.session.request(do_packet)
+            if do_response:
+                msg = self.parser.parse_task_response(do_response)
+                logger.debug(msg)
+                return True
             else:
-                logger.error("[CAR] 📰 未收到 [任务] 响应报文！")
-                await self.close()
+                logger.error("[CAR] 📰 未收到 [指令] 响应报文！")
                 return False
         else:
-            logger.error("[CAR] 🚗 穿梭车未连接！")
-            await self.close()
+            logger.error("[CAR] 📰 未收到 [任务] 响应报文！")
             return False
 
     def add_pick_drop_actions(self, POINT_LIST: list) -> list:
@@ -384,6 +409,7 @@ class ControllerAsync(ConnectionAsync):
         car_current_location = f"{location_info[0]},{location_info[1]},{location_info[2]}"
         logger.info(f"[CAR] 穿梭车当前位置: {car_current_location}")
         if car_current_location == TARGET_LOCATION:
+            self.active_task = None
             return True
         
         # 创建移动路径
@@ -393,45 +419,33 @@ class ControllerAsync(ConnectionAsync):
         #     (4,1,1,6),
         #     (1,1,1,0)
         #             ]
-        car_move_segments = self.map.build_segments(car_current_location, TARGET_LOCATION)
-        segments = self.add_pick_drop_actions(car_move_segments)
-        if isinstance(segments, list):
-            logger.info(f"[CAR] 创建移动路径: {segments}")
+        # 同一路线的任务段和报文模板已编译缓存, 只需填写生命、任务号和CRC
+        compiled = get_packet_cache().get(self.map, location_info, TARGET_LOCATION, pick_drop=True)
+        if compiled is not None and len(compiled.segments):
+            self.map.register_plan(self._plan_id, list(compiled.path))
+            logger.info(f"[CAR] 创建移动路径: {compiled.segments.tolist()}")
         else:
-            logger.error(f"[CAR] 无法创建移动路径: {segments}")
+            logger.error(f"[CAR] 无法创建移动路径: {compiled}")
+            self.active_task = None
             return False
-
-        # 开启连接
-        if await self.connect():
-            # 发送整体任务报文
-            task_packet = self.builder.build_task(TASK_NO, segments)
-            await self.send_message(task_packet)
-            # 接收整体任务报文
-            task_response = await self.receive_message()
-            if task_response:
-                task_msg = self.parser.parse_task_response(task_response)
-                logger.debug(f"[CAR] 解析整体任务响应结果: {task_msg}")
-                
-                # 发送任务确认执行报文
-                do_packet = self.builder.do_task(TASK_NO, segments)
-                await self.send_message(do_packet)
-                # 接收任务确认执行报文
-                do_response = await self.receive_message()
-                if do_response:
-                    do_msg = self.parser.parse_task_response(do_response)
-                    logger.debug(f"[CAR] 解析任务执行指令响应结果: {do_msg}")
-                    # 关闭连接
-                    await self.close()
-                    return True
-                else:
-                    logger.error("[CAR] 📰 未收到 [指令] 响应报文！")
-                    await self.close()
-                    return False
+        self.active_task = compiled
+        task_packet, do_packet = compiled.packets(self.builder, TASK_NO)
+
+        # 发送整体任务报文, 接收整体任务响应
+        task_response = await self.session.request(task_packet)
+        if task_response:
+            task_msg = self.parser.parse_task_response(task_response)
+            logger.debug(f"[CAR] 解析整体任务响应结果: {task_msg}")
+            
+            # 发送任务确认执行报文, 接收任务确认执行响应
+            do_response = await self.session.request(do_packet)
+            if do_response:
+                do_msg = self.parser.parse_task_response(do_response)
+                logger.debug(f"[CAR] 解析任务执行指令响应结果: {do_msg}")
+                return True
             else:
-                logger.error("[CAR] 📰 未收到 [任务] 响应报文！")
-                await self.close()
+                logger.error("[CAR] 📰 未收到 [指令] 响应报文！")
                 return False
         else:
-            logger.error("[CAR] 🚗 穿梭车未连接！")
-            await self.close()
+            logger.error("[CAR] 📰 未收到 [任务] 响应报文！")
             return False
\ No newline at end of file
@@ -12,7 +12,8 @@ from ..connection.connection_backup import ConnectionBackup
 from ..enum import CarStatus
 from app.res_system import (
     PacketBuilder,
-    PacketParser
+    PacketParser,
+    car_id_for
 )
 from app.res_system.res_protocol import (
     CarBaseEnum,
@@ -48,12 +49,8 @@ class AsyncSocketCarController(ConnectionBackup):
         Returns:
             final_car_id: 最终穿梭车ID
         """
-        if self._host == "192.168.8.20":
-            final_car_id = 1
-        elif self._host == "192.168.8.30":
-            final_car_id = 2
-        else:
-            final_car_id = 0
+        # 设备ID来自车队配置 settings.CAR_FLEET, 未配置的地址为0
+        final_car_id = car_id_for(self._car_ip, self._car_port)
         return final_car_id
 
     
@@ -10,7 +10,7 @@ from app.core.config import settings
 from app.map_core import PathCustom
 from ..connection.connection_base import ConnectionBase
 from ..enum import CarStatus, StatusDescription
-from app.res_system import PacketBuilder, PacketParser
+from app.res_system import PacketBuilder, PacketParser, car_id_for, get_car_state, get_packet_cache
 from app.res_system.res_protocol import (
     CarBaseEnum,
     Debug,
@@ -37,6 +37,10 @@ class ControllerBase(ConnectionBase):
         self.builder = PacketBuilder(self._car_id)
         self.parser = PacketParser()
         self.map = PathCustom()
+        # 在途路径标识, 地图覆盖层变更时用于报告受影响的任务
+        self._plan_id = f"car:{CAR_IP}:{CAR_PORT}"
+        # 心跳结果写入共享的状态缓存 (后台遥测也写入同一缓存)
+        self.state = get_car_state(CAR_IP, CAR_PORT)
 
     def set_car_id(self) -> int:
         """[设置_car_id] 用于设置穿梭车ID。
@@ -44,12 +48,8 @@ class ControllerBase(ConnectionBase):
         Returns:
             final_car_id: 最终穿梭车ID
         """
-        if self._host == "192.168.8.20":
-            final_car_id = 1
-        elif self._host == "192.168.8.30":
-            final_car_id = 2
-        else:
-            final_car_id = 0
+        # 设备ID来自车队配置 settings.CAR_FLEET, 未配置的地址为0
+        final_car_id = car_id_for(self._car_ip, self._car_port)
         return final_car_id
 
     
@@ -76,6 +76,7 @@ class ControllerBase(ConnectionBase):
                     msg = self.parser.parse_heartbeat_response(response)
                     self.close()
                     logger.debug(msg)
+                    self.state.publish(msg)
                     return msg
                 else:
                     self.close()
@@ -93,15 +94,54 @@ class ControllerBase(ConnectionBase):
             "message": "心跳发送次数设置错误或未发送心跳！"
         }
 
-    def car_power(self, times: int=3) -> Dict:
+    def read_heartbeat(self, TIMES: int=3, max_age: Optional[float]=None) -> Dict:
+        """读取心跳: 缓存在 max_age 秒内时直接返回缓存, 否则发送心跳。
+
+        Args:
+            TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
+
+        Returns:
+            Dict: 心跳报文解析后的参数
+        """
+        if max_age is not None:
+            cached = self.state.heartbeat(max_age)
+            if cached is not None:
+                return cached
+        return self.send_heartbeat(TIMES)
+
+    def _power_info(self, msg: Dict) -> Dict:
+        """电量心跳解析结果 -> 接口返回的穿梭车信息。"""
+        return {
+            'cmd_no': msg['cmd_no'],
+            'resluct': msg['resluct'],
+            'current_location': msg['current_location'],
+            'current_segment': msg['current_segment'],
+            'cur_barcode': msg['cur_barcode'],
+            'car_status': CarStatus.get_info_by_value(msg['car_status']).get('description'),
+            'pallet_status': msg['pallet_status'],
+            'reserve_status': msg['reserve_status'],
+            'drive_direction': msg['drive_direction'],
+            'status_description': StatusDescription.get_info_by_value(msg['status_description']).get('description'),
+            'have_pallet': msg['have_pallet'],
+            'driver_warning': msg['driver_warning'],
+            'power': msg['power'],
+        }
+
+    def car_power(self, times: int=3, max_age: Optional[float]=None) -> Dict:
         """[获取穿梭车电量] 发送电量心跳包，获取穿梭车电量。
 
         Args:
             times: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送电量心跳
 
         Returns:
             car_power_msg: 返回穿梭车电量信息
         """
+        if max_age is not None:
+            cached = self.state.power_info(max_age)
+            if cached is not None:
+                return self._power_info(cached)
         for _ in range(times):
             packet = self.builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY)
             self.connect()
@@ -112,22 +152,8 @@ class ControllerBase(ConnectionBase):
                     self.close()
                     msg = self.parser.parse_hb_power_response(response)
                     logger.debug(msg)
-                    
-                    return {
-                        'cmd_no': msg['cmd_no'],
-                        'resluct': msg['resluct'],
-                        'current_location': msg['current_location'],
-                        'current_segment': msg['current_segment'],
-                        'cur_barcode': msg['cur_barcode'],
-                        'car_status': CarStatus.get_info_by_value(msg['car_status']).get('description'),
-                        'pallet_status': msg['pallet_status'],
-                        'reserve_status': msg['reserve_status'],
-                        'drive_direction': msg['drive_direction'],
-                        'status_description': StatusDescription.get_info_by_value(msg['status_description']).get('description'),
-                        'have_pallet': msg['have_pallet'],
-                        'driver_warning': msg['driver_warning'],
-                        'power': msg['power'],
-                    }
+                    self.state.publish(msg)
+                    return self._power_info(msg)
                 else:
                     self.close()
                     logger.error("[CAR] ⚡️ 未收到 [电量心跳] 响应报文！")
@@ -153,17 +179,18 @@ class ControllerBase(ConnectionBase):
             'power': 'error'
         }
     
-    def car_status(self, times: int=3) -> Dict:
+    def car_status(self, times: int=3, max_age: Optional[float]=None) -> Dict:
         """[获取穿梭车状态] 发送心跳报文，获取穿梭车状态信息。
 
         Args:
             times: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
 
         Returns:
             Dict: 穿梭车状态信息
         """
-        heartbeat_msg = self.send_heartbeat(times)
-        if heartbeat_msg:
+        heartbeat_msg = self.read_heartbeat(times, max_age)
+        if heartbeat_msg.get('car_status') != "error":
             car_status_info = CarStatus.get_info_by_value(heartbeat_msg['car_status'])
             car_status = heartbeat_msg['car_status']
             name = car_status_info.get('description')
@@ -181,16 +208,17 @@ class ControllerBase(ConnectionBase):
                 'description': "error"
                 }
 
-    def car_current_location(self, TIMES: int=3) -> str:
+    def car_current_location(self, TIMES: int=3, max_age: Optional[float]=None) -> str:
         """获取小车位置。
 
         Args:
             TIMES: 心跳次数
+            max_age: 可接受的缓存时效 (秒), None 表示总是发送心跳
         
         Returns:
             car_location: 小车当前位置, 例如: "6,3,1"
         """
-        heartbeat_msg = self.send_heartbeat(TIMES)
+        heartbeat_msg = self.read_heartbeat(TIMES, max_age)
         if heartbeat_msg["car_status"] == "error":
             return "error"
         else:
@@ -228,6 +256,7 @@ class ControllerBase(ConnectionBase):
             
             if (car_x == target_x) and (car_y == target_y) and (car_z == target_z):
                 logger.info(f"[CAR] ✅ 小车已到达目标位置 {LOCATION}")
+                self.map.release_plan(self._plan_id, LOCATION)
                 return True
             
             # 检查超时
@@ -268,6 +297,7 @@ class ControllerBase(ConnectionBase):
             
             if (car_x == target_x) and (car_y == target_y) and (car_z == target_z):
                 logger.info(f"[CAR] ✅ 小车已到达目标位置 {LOCATION}")
+                self.map.release_plan(self._plan_id, LOCATION)
                 return True
             
             # 检查超时
@@ -377,21 +407,22 @@ class ControllerBase(ConnectionBase):
         #     (4,1,1,6),
         #     (1,1,1,0)
         #             ]
-        segments = self.map.build_segments(car_current_location, TARGET_LOCATION)
-        if isinstance(segments, list):
-            logger.info(f"[CAR] 创建移动路径: {segments}")
+        # 同一路线的任务段和报文模板已编译缓存, 只需填写生命、任务号和CRC
+        compiled = get_packet_cache().get(self.map, location_info, TARGET_LOCATION)
+        if compiled is not None and len(compiled.segments):
+            self.map.register_plan(self._plan_id, list(compiled.path))
+            logger.info(f"[CAR] 创建移动路径: {compiled.segments.tolist()}")
         else:
-            logger.error(f"[CAR] 无法创建移动路径: {segments}")
+            logger.error(f"[CAR] 无法创建移动路径: {compiled}")
             return False
+        task_packet, do_packet = compiled.packets(self.builder, TASK_NO)
 
         # 发送任务报文
-        task_packet = self.builder.build_task(TASK_NO, segments)
         if self.connect():
             self.send_message(task_packet)
             task_response = self.receive_message()
             if task_response:
                 # 发送任务确认执行报文
-                do_packet = self.builder.do_task(TASK_NO, segments)
                 self.send_message(do_packet)
                 do_response = self.receive_message()
                 if do_response:
@@ -460,18 +491,19 @@ class ControllerBase(ConnectionBase):
         #     (4,1,1,6),
         #     (1,1,1,0)
         #             ]
-        car_move_segments = self.map.build_segments(car_current_location, TARGET_LOCATION)
-        segments = self.add_pick_drop_actions(car_move_segments)
-        if isinstance(segments, list):
-            logger.info(f"[CAR] 创建移动路径: {segments}")
+        # 同一路线的任务段和报文模板已编译缓存, 只需填写生命、任务号和CRC
+        compiled = get_packet_cache().get(self.map, location_info, TARGET_LOCATION, pick_drop=True)
+        if compiled is not None and len(compiled.segments):
+            self.map.register_plan(self._plan_id, list(compiled.path))
+            logger.info(f"[CAR] 创建移动路径: {compiled.segments.tolist()}")
         else:
-            logger.error(f"[CAR] 无法创建移动路径: {segments}")
+            logger.error(f"[CAR] 无法创建移动路径: {compiled}")
             return False
+        task_packet, do_packet = compiled.packets(self.builder, TASK_NO)
 
         # 开启连接
         if self.connect():
             # 发送整体任务报文
-            task_packet = self.builder.build_task(TASK_NO, segments)
             self.send_message(task_packet)
             # 接收整体任务报文
             task_response = self.receive_message()
@@ -480,7 +512,6 @@ class ControllerBase(ConnectionBase):
                 logger.debug(f"[CAR] 解析整体任务响应结果: {task_msg}")
                 
                 # 发送任务确认执行报文
-                do_packet = self.builder.do_task(TASK_NO, segments)
                 self.send_message(do_packet)
                 # 接收任务确认执行报文
                 do_response = self.receive_message()
@@ -0,0 +1,467 @@
+# res_system/fleet.py
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from app.map_core.MapOverlay import active_plans
+from .res_protocol import CarStatus
+from .telemetry import CarStateCache, CarTelemetry, get_car_state, get_car_telemetry
+
+# ------------------------
+# 模块: 穿梭车车队
+# 职责: 按配置数据登记多台穿梭车 (每台一个长连接会话、状态缓存、遥测任务和作业锁),
+#       按楼层、距离和电量为任务选择最合适的空闲穿梭车, 不同穿梭车的作业并发执行;
+#       作业路线在作业期间预留, 经过其他穿梭车位置或路线的作业不分派
+# ------------------------
+
+Location = Union[str, Sequence[int]]
+# 作业路线: 参数为候选穿梭车, 返回它执行作业要经过的节点, 无法规划时返回None
+RouteFn = Callable[["FleetCar"], Optional[Iterable[str]]]
+
+
+def _to_location(location: Location) -> Tuple[int, int, int]:
+    if isinstance(location, str):
+        location = map(int, location.split(','))
+    x, y, z = tuple(location)[:3]
+    return x, y, z
+
+
+class CarConfig:
+    """[穿梭车配置] 设备ID (即报文中的设备ID)、地址、端口和名称。"""
+
+    __slots__ = ("car_id", "host", "port", "name")
+
+    def __init__(self, car_id: int, host: str, port: int = 2504, name: Optional[str] = None):
+        self.car_id = int(car_id)
+        self.host = host
+        self.port = int(port)
+        self.name = name or f"car-{self.car_id}"
+
+    @classmethod
+    def from_dict(cls, item: Dict) -> "CarConfig":
+        """从配置字典创建, 如 {"car_id": 1, "host": "192.168.8.20", "port": 2504}。"""
+        return cls(item["car_id"], item["host"], item.get("port", 2504), item.get("name"))
+
+    def __repr__(self) -> str:
+        return f"CarConfig({self.car_id}, {self.host}:{self.port})"
+
+
+def load_fleet_config(items: Optional[Iterable[Dict]] = None) -> List[CarConfig]:
+    """
+    [读取车队配置] - 默认读取 settings.CAR_FLEET, 设备ID或地址重复时报错
+
+    ::: param :::
+        items: 配置字典列表
+
+    ::: return :::
+        穿梭车配置列表
+    """
+    configs = [CarConfig.from_dict(item) for item in (settings.CAR_FLEET if items is None else items)]
+    ids = [config.car_id for config in configs]
+    addresses = [(config.host, config.port) for config in configs]
+    if len(set(ids)) != len(ids) or len(set(addresses)) != len(addresses):
+        raise ValueError(f"穿梭车配置重复: {configs}")
+    return configs
+
+
+def car_id_for(host: str, port: Optional[int] = None) -> int:
+    """
+    [查询设备ID] - 按地址 (和端口) 在车队配置中查找, 未配置时返回0
+
+    ::: param :::
+        host: 穿梭车地址
+        port: 穿梭车端口, None 表示只按地址匹配
+    """
+    for item in settings.CAR_FLEET:
+        if item["host"] == host and (port is None or item.get("port", 2504) == port):
+            return int(item["car_id"])
+    return 0
+
+
+class FleetCar:
+    """[车队中的穿梭车] 配置 + 共享的会话/状态缓存/遥测 + 作业锁, 控制器在第一次使用时创建。"""
+
+    def __init__(self, config: CarConfig):
+        self.config = config
+        self.state: CarStateCache = get_car_state(config.host, config.port)
+        self.telemetry: CarTelemetry = get_car_telemetry(config.host, config.port, config.car_id)
+        # 同一台穿梭车同时只执行一个作业
+        self.lock = asyncio.Lock()
+        self.job: Optional[str] = None
+        self.job_started: Optional[float] = None
+        # 作业期间预留的路线节点
+        self.route: Set[str] = set()
+        self.jobs_done = 0
+        self._controller = None
+
+    @property
+    def car_id(self) -> int:
+        return self.config.car_id
+
+    @property
+    def controller(self):
+        """穿梭车控制器 (ControllerAsync, 与遥测共用同一个长连接会话)。"""
+        if self._controller is None:
+            # 控制器会加载地图, 只在需要下发任务时创建
+            from .controller.controller_async import ControllerAsync
+            self._controller = ControllerAsync(self.config.host, self.config.port)
+        return self._controller
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    @property
+    def plan_id(self) -> str:
+        """控制器登记在途路径使用的标识。"""
+        return f"car:{self.config.host}:{self.config.port}"
+
+    @property
+    def location(self) -> Optional[str]:
+        """缓存中最近一次心跳的位置 "x,y,z", 没有心跳时返回None。"""
+        heartbeat = self.state.heartbeat()
+        if heartbeat is None:
+            return None
+        return ",".join(map(str, heartbeat["current_location"]))
+
+    def snapshot(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        [读取状态] - max_age 秒内的位置、状态码和电量, 没有心跳时返回None (电量可能为None)
+        """
+        heartbeat = self.state.heartbeat(max_age)
+        if heartbeat is None:
+            return None
+        return {
+            "location": tuple(heartbeat["current_location"]),
+            "car_status": heartbeat["car_status"],
+            "power": self.state.power(),
+        }
+
+    def status(self, max_age: Optional[float] = None) -> Dict:
+        """[车队状态条目] 配置、作业和缓存中的状态。"""
+        snapshot = self.snapshot(max_age) or {}
+        location = snapshot.get("location")
+        return {
+            "car_id": self.car_id,
+            "name": self.config.name,
+            "address": f"{self.config.host}:{self.config.port}",
+            "online": bool(snapshot),
+            "location": ",".join(map(str, location)) if location else None,
+            "car_status": snapshot.get("car_status"),
+            "power": snapshot.get("power"),
+            "busy": self.busy,
+            "job": self.job,
+            "route": sorted(self.route),
+            "jobs_done": self.jobs_done,
+        }
+
+
+class CarFleet:
+    """
+    [穿梭车车队] - 为任务选择最合适的空闲穿梭车并加锁
+
+    选择规则 (依次比较):
+    1. 与目标同一楼层的穿梭车优先 (跨层需要电梯);
+    2. 到目标的曼哈顿距离近的优先;
+    3. 电量高的优先。
+    没有心跳、状态不是就绪、正在执行作业或电量低于 min_power 的穿梭车不参与选择。
+    """
+
+    def __init__(
+            self,
+            configs: Optional[Sequence[CarConfig]] = None,
+            min_power: int = settings.CAR_DISPATCH_MIN_POWER,
+            max_age: float = settings.CAR_STATE_MAX_AGE
+    ):
+        """
+        [初始化车队]
+
+        ::: param :::
+            configs: 穿梭车配置, 默认读取 settings.CAR_FLEET
+            min_power: 接受作业的最低电量, 电量未知的穿梭车视为满足
+            max_age: 选择时可接受的状态缓存时效 (秒)
+        """
+        configs = load_fleet_config() if configs is None else list(configs)
+        self.cars: Dict[int, FleetCar] = {config.car_id: FleetCar(config) for config in configs}
+        self.min_power = min_power
+        self.max_age = max_age
+        self._released: Optional[asyncio.Event] = None
+        # 正在等待空闲穿梭车的作业数 (车队的任务队列深度)
+        self.waiting = 0
+        # 最近一次因路线冲突未能分派的原因
+        self.last_conflict: Optional[str] = None
+        self.stats = {"dispatched": 0, "waits": 0, "timeouts": 0, "unavailable": 0, "conflicts": 0}
+
+    def __len__(self) -> int:
+        return len(self.cars)
+
+    def get(self, car_id: int) -> Optional[FleetCar]:
+        return self.cars.get(car_id)
+
+    def find(self, host: str, port: int) -> Optional[FleetCar]:
+        """按地址和端口查找车队中的穿梭车, 不在车队中时返回None。"""
+        for car in self.cars.values():
+            if car.config.host == host and car.config.port == port:
+                return car
+        return None
+
+    def online(self, floor: Optional[int] = None) -> List[FleetCar]:
+        """[在线穿梭车] 状态缓存在时效内的穿梭车 (含执行作业中的), floor 不为None时只看该楼层。"""
+        cars = []
+        for car in self.cars.values():
+            snapshot = car.snapshot(self.max_age)
+            if snapshot is not None and (floor is None or snapshot["location"][2] == floor):
+                cars.append(car)
+        return cars
+
+    def conflicts(self, car: FleetCar, route: Iterable[str]) -> Optional[str]:
+        """
+        [路线冲突] - 路线经过其他穿梭车的当前位置、预留路线或在途路径时返回原因, 否则返回None
+
+        执行作业但没有预留路线的穿梭车 (如单车设备服务) 以控制器登记的在途路径为准;
+        空闲穿梭车残留的在途路径 (任务中断未注销) 和车队以外的登记不视为占用。
+
+        ::: param :::
+            car: 候选穿梭车
+            route: 候选穿梭车执行作业要经过的节点
+        """
+        cells = set(route)
+        plans = {plan["plan_id"]: set(plan["path"]) for plan in active_plans.plans()}
+        for other in self.cars.values():
+            if other is car:
+                continue
+            location = other.location
+            if location in cells:
+                return f"路线经过穿梭车 {other.car_id} 所在位置 {location}"
+            reserved = other.route or (plans.get(other.plan_id, set()) if other.busy else set())
+            overlap = reserved & cells
+            if overlap:
+                return f"路线与穿梭车 {other.car_id} 的作业路线重叠 {sorted(overlap)}"
+        return None
+
+    def rank(
+            self,
+            target: Location,
+            same_floor: bool = False,
+            max_age: Optional[float] = None
+    ) -> List[Tuple[Tuple[int, int, int], FleetCar]]:
+        """
+        [候选穿梭车] - 按 (是否跨层, 距离, -电量) 排序的空闲穿梭车
+
+        ::: param :::
+            target: 作业起点 "x,y,z"
+            same_floor: 只选择与目标同层的穿梭车
+            max_age: 状态缓存时效 (秒), 默认为车队设置
+
+        ::: return :::
+            [(排序键, 穿梭车), ...]
+        """
+        x, y, z = _to_location(target)
+        max_age = self.max_age if max_age is None else max_age
+        ranked = []
+        for car in self.cars.values():
+            if car.busy:
+                continue
+            snapshot = car.snapshot(max_age)
+            if snapshot is None or snapshot["car_status"] != CarStatus.READY.value:
+                continue
+            power = snapshot["power"]
+            if power is not None and power < self.min_power:
+                continue
+            cx, cy, cz = snapshot["location"]
+            if same_floor and cz != z:
+                continue
+            key = (int(cz != z), abs(cx - x) + abs(cy - y), -(power or 0))
+            ranked.append((key, car))
+        ranked.sort(key=lambda item: (item[0], item[1].car_id))
+        return ranked
+
+    def select(
+            self,
+            target: Location,
+            same_floor: bool = False,
+            route: Optional[RouteFn] = None
+    ) -> Optional[FleetCar]:
+        """[选择穿梭车] 最合适的空闲穿梭车, 没有时返回None。"""
+        return self._select(target, same_floor, route)[0]
+
+    def _select(
+            self,
+            target: Location,
+            same_floor: bool,
+            route: Optional[RouteFn]
+    ) -> Tuple[Optional[FleetCar], Set[str]]:
+        """按排序依次检查候选穿梭车的路线, 返回 (第一台没有冲突的穿梭车, 其路线)。"""
+        self.last_conflict = None
+        for _, car in self.rank(target, same_floor):
+            if route is None:
+                return car, set()
+            try:
+                cells = route(car)
+            except ValueError as e:
+                cells, reason = None, str(e)
+            else:
+                reason = None if cells is None else self.conflicts(car, cells)
+            if cells is None:
+                reason = f"穿梭车 {car.car_id} 无法规划路线 {reason or ''}".rstrip()
+            if reason is None:
+                return car, set(cells)
+            self.last_conflict = reason
+            self.stats["conflicts"] += 1
+        return None, set()
+
+    def _notify(self) -> None:
+        if self._released is not None:
+            self._released.set()
+
+    @asynccontextmanager
+    async def dispatch(
+            self,
+            target: Location,
+            job: str = "",
+            same_floor: bool = False,
+            timeout: Optional[float] = None,
+            route: Optional[RouteFn] = None
+    ) -> AsyncIterator[Optional[FleetCar]]:
+        """
+        [分派作业] - 选择最合适的空闲穿梭车并持有其作业锁, 退出时释放
+
+        没有可用穿梭车时等待 (其他作业结束或心跳更新), 超时得到None;
+        (该楼层) 没有在线的穿梭车时立即得到None:
+
+            async with fleet.dispatch("4,1,1", "car_move") as car:
+                if car is not None:
+                    await car.controller.car_move(task_no, "4,1,1")
+
+        ::: param :::
+            target: 作业起点 "x,y,z"
+            job: 作业描述, 显示在车队状态中
+            same_floor: 只选择与目标同层的穿梭车
+            timeout: 最长等待时间 (秒), None 表示一直等待
+            route: 作业路线, 提供时跳过路线冲突的穿梭车, 选中后在作业期间预留该路线
+        """
+        floor = _to_location(target)[2] if same_floor else None
+        if not self.online(floor):
+            self.stats["unavailable"] += 1
+            yield None
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        car, cells = None, set()
+        self.waiting += 1
+        try:
+            while True:
+                car, cells = self._select(target, same_floor, route)
+                if car is not None:
+                    break
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    break
+                self.stats["waits"] += 1
+                if self._released is None:
+                    self._released = asyncio.Event()
+                self._released.clear()
+                # 遥测更新的状态不触发事件, 按心跳间隔重新检查
+                wait = settings.CAR_TELEMETRY_INTERVAL if remaining is None else min(remaining, settings.CAR_TELEMETRY_INTERVAL)
+                try:
+                    await asyncio.wait_for(self._released.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting -= 1
+
+        if car is None:
+            yield None
+            return
+
+        async with self.hold(car, job or str(target), cells):
+            self.stats["dispatched"] += 1
+            logger.info(f"[FLEET] 作业 {car.job} 分派给穿梭车 {car.car_id}")
+            yield car
+
+    @asynccontextmanager
+    async def hold(self, car: FleetCar, job: str, route: Iterable[str] = ()) -> AsyncIterator[FleetCar]:
+        """
+        [占用指定穿梭车] - 持有其作业锁 (如充电), 期间不参与分派, 退出时释放并唤醒等待的作业
+
+        ::: param :::
+            car: 车队中的穿梭车
+            job: 作业描述, 显示在车队状态中
+            route: 作业期间预留的路线节点
+        """
+        await car.lock.acquire()
+        self._claimed(car, job, route)
+        try:
+            yield car
+        finally:
+            self.release(car)
+
+    async def try_hold(self, car: FleetCar, job: str) -> bool:
+        """
+        [立即占用] - 穿梭车空闲时占用并返回True, 正在执行作业时返回False (不等待);
+        用于单车设备服务, 结束时调用 release
+        """
+        if car.busy:
+            return False
+        await car.lock.acquire()
+        self._claimed(car, job, ())
+        return True
+
+    def _claimed(self, car: FleetCar, job: str, route: Iterable[str]) -> None:
+        car.job = job
+        car.job_started = time.monotonic()
+        car.route = set(route)
+
+    def release(self, car: FleetCar) -> None:
+        """[释放穿梭车] 结束作业并唤醒等待的作业。"""
+        car.job = None
+        car.job_started = None
+        car.route = set()
+        car.jobs_done += 1
+        car.lock.release()
+        self._notify()
+
+    def start_telemetry(self) -> None:
+        """[启动遥测] 每台穿梭车一个后台心跳任务 (需要在事件循环中调用)。"""
+        for car in self.cars.values():
+            car.telemetry.start()
+
+    async def stop_telemetry(self) -> None:
+        """[停止遥测]"""
+        await asyncio.gather(*(car.telemetry.stop() for car in self.cars.values()))
+
+    async def close(self) -> None:
+        """[关闭车队] 停止遥测并关闭每台穿梭车的长连接。"""
+        await self.stop_telemetry()
+        await asyncio.gather(*(car.telemetry.session.close() for car in self.cars.values()))
+
+    def status(self, max_age: Optional[float] = None) -> Dict:
+        """[车队状态] 每台穿梭车的状态和分派统计。"""
+        max_age = self.max_age if max_age is None else max_age
+        return {
+            "cars": [car.status(max_age) for car in self.cars.values()],
+            "waiting": self.waiting,
+            "stats": dict(self.stats),
+        }
+
+
+_fleet: Optional[CarFleet] = None
+_fleet_lock = threading.Lock()
+
+
+def get_car_fleet() -> CarFleet:
+    """按 settings.CAR_FLEET 创建的全局车队 (第一次调用时创建)。"""
+    global _fleet
+    if _fleet is None:
+        with _fleet_lock:
+            if _fleet is None:
+                _fleet = CarFleet()
+    return _fleet
@@ -0,0 +1,402 @@
+# res_system/frame_decoder.py
+import struct
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import crcmod
+import logging
+logger = logging.getLogger(__name__)
+
+from .res_protocol import FrameType, RESProtocol
+
+# ------------------------
+# 模块: 流式报文解码器
+# 职责: 在可复用的接收缓冲区上按 报文头 -> 长度 -> 报文尾 重组报文 (处理粘包、拆包),
+#       CRC在缓冲区视图上直接校验, 用预编译的 struct.Struct 解析为类型化记录
+# ------------------------
+
+HEADER = RESProtocol.HEADER.value
+FOOTER = RESProtocol.FOOTER.value
+# 报文最短为心跳请求: 报文头(2) + 设备ID(1) + 生命(1) + 版本&类型(1) + 长度(2) + CRC(2) + 报文尾(2)
+MIN_FRAME_LENGTH = 11
+# 超过该长度仍未找到合法报文尾时丢弃报文头, 防止错误数据占住缓冲区
+MAX_FRAME_LENGTH = 1024
+
+# 穿梭车响应报文按类型定长, 先按定长校验, 其他报文 (请求、调试) 按报文尾查找
+RESPONSE_LENGTHS: Dict[int, int] = {
+    FrameType.HEARTBEAT.value: 30,
+    FrameType.TASK.value: 14,
+    FrameType.COMMAND.value: 18,
+    FrameType.HEARTBEAT_WITH_BATTERY.value: 31,
+}
+
+_crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+_LENGTH = struct.Struct('!H')
+_CRC = struct.Struct('<H')
+_HEAD = struct.Struct('!2xBBB')
+# 整帧格式 (跳过报文头和报文尾), 字段顺序与 PacketParser 一致, CRC 与 PacketParser 一样按大端读出
+_HEARTBEAT = struct.Struct('!2xBBBBHBBBBIBBBBIHH2x')
+_HEARTBEAT_POWER = struct.Struct('!2xBBBBHBBBBIBBBBIBHH2x')
+_TASK = struct.Struct('!2xBBBBHHH2x')
+_COMMAND = struct.Struct('!2xBBBBHIHH2x')
+
+
+class HeartbeatRecord(NamedTuple):
+    """心跳响应 (30字节) / 带电量心跳响应 (31字节)。"""
+    device_id: int
+    life: int
+    head_info: int
+    cmd_no: int
+    result: int
+    current_location: Tuple[int, int, int]
+    current_segment: int
+    cur_barcode: int
+    car_status: int
+    pallet_status: int
+    reserve_status: int
+    drive_direction: int
+    status_description: int
+    have_pallet: int
+    driver_warning: int
+    msg_len: int
+    crc: int
+    power: Optional[int] = None
+
+    @property
+    def frame_type(self) -> int:
+        return self.head_info & 0x0F
+
+    def as_dict(self) -> Dict:
+        """转换为 PacketParser.parse_heartbeat_response / parse_hb_power_response 的字典格式。"""
+        msg = {
+            'first_frame': HEADER,
+            'device_id': self.device_id,
+            'life': self.life,
+            'head_info': self.head_info,
+            'cmd_no': self.cmd_no,
+            'resluct': self.result,
+            'current_location': self.current_location,
+            'current_segment': self.current_segment,
+            'cur_barcode': self.cur_barcode,
+            'car_status': self.car_status,
+            'pallet_status': self.pallet_status,
+            'reserve_status': self.reserve_status,
+            'drive_direction': self.drive_direction,
+            'status_description': self.status_description,
+            'have_pallet': self.have_pallet,
+            'driver_warning': self.driver_warning,
+        }
+        if self.power is not None:
+            msg['power'] = self.power
+        msg.update(msg_len=self.msg_len, crc=self.crc, end_frame=FOOTER)
+        return msg
+
+
+class TaskRecord(NamedTuple):
+    """任务响应 (14字节)。"""
+    device_id: int
+    life: int
+    head_info: int
+    task_no: int
+    result: int
+    msg_len: int
+    crc: int
+
+    @property
+    def frame_type(self) -> int:
+        return self.head_info & 0x0F
+
+    def as_dict(self) -> Dict:
+        """转换为 PacketParser.parse_task_response 的字典格式。"""
+        return {
+            'first_frame': HEADER,
+            'device_id': self.device_id,
+            'life': self.life,
+            'head_info': self.head_info,
+            'task_no': self.task_no,
+            'result': self.result,
+            'msg_len': self.msg_len,
+            'crc': self.crc,
+            'end_frame': FOOTER
+        }
+
+
+class CommandRecord(NamedTuple):
+    """指令响应 (18字节)。"""
+    device_id: int
+    life: int
+    head_info: int
+    cmd_no: int
+    result: int
+    result_param: int
+    msg_len: int
+    crc: int
+
+    @property
+    def frame_type(self) -> int:
+        return self.head_info & 0x0F
+
+    def as_dict(self) -> Dict:
+        """转换为 PacketParser.parse_command_response 的字典格式。"""
+        return {
+            'first_frame': HEADER,
+            'device_id': self.device_id,
+            'life': self.life,
+            'head_info': self.head_info,
+            'cmd_no': self.cmd_no,
+            'result': self.result,
+            'result_param': self.result_param,
+            'msg_len': self.msg_len,
+            'crc': self.crc,
+            'end_frame': FOOTER
+        }
+
+
+class RawFrame(NamedTuple):
+    """没有定长格式的报文 (请求报文、调试报文等), 保留完整报文。"""
+    device_id: int
+    life: int
+    head_info: int
+    data: bytes
+
+    @property
+    def frame_type(self) -> int:
+        return self.head_info & 0x0F
+
+    def as_dict(self) -> Dict:
+        """转换为 PacketParser.parse_header 的字典格式 (附带完整报文)。"""
+        return {
+            'first_frame': HEADER,
+            'device_id': self.device_id,
+            'life': self.life,
+            'head_info': self.head_info,
+            'data': self.data
+        }
+
+
+Record = Union[HeartbeatRecord, TaskRecord, CommandRecord, RawFrame]
+
+
+# 绕过 NamedTuple 的 __new__ (逐个关键字参数), 直接由元组构造记录
+_new = tuple.__new__
+
+
+def _heartbeat(buf, start: int) -> HeartbeatRecord:
+    (device_id, life, head_info, cmd_no, result, x, y, z, segment, barcode,
+     status, direction, description, pallet, warning, msg_len, crc) = _HEARTBEAT.unpack_from(buf, start)
+    return _new(HeartbeatRecord, (
+        device_id, life, head_info, cmd_no, result, (x, y, z), segment, barcode,
+        status >> 4, status & 0x0F, direction >> 4, direction & 0x0F,
+        description, pallet, warning, msg_len, crc, None
+    ))
+
+
+def _heartbeat_power(buf, start: int) -> HeartbeatRecord:
+    (device_id, life, head_info, cmd_no, result, x, y, z, segment, barcode,
+     status, direction, description, pallet, warning, power, msg_len, crc) = _HEARTBEAT_POWER.unpack_from(buf, start)
+    return _new(HeartbeatRecord, (
+        device_id, life, head_info, cmd_no, result, (x, y, z), segment, barcode,
+        status >> 4, status & 0x0F, direction >> 4, direction & 0x0F,
+        description, pallet, warning, msg_len, crc, power
+    ))
+
+
+def _task(buf, start: int) -> TaskRecord:
+    return _new(TaskRecord, _TASK.unpack_from(buf, start))
+
+
+def _command(buf, start: int) -> CommandRecord:
+    return _new(CommandRecord, _COMMAND.unpack_from(buf, start))
+
+
+# (报文类型, 报文长度) -> 记录解析函数
+_PARSERS = {
+    (FrameType.HEARTBEAT.value, 30): _heartbeat,
+    (FrameType.HEARTBEAT_WITH_BATTERY.value, 31): _heartbeat_power,
+    (FrameType.TASK.value, 14): _task,
+    (FrameType.COMMAND.value, 18): _command,
+}
+
+
+def _parse(view, start: int, length: int) -> Record:
+    parser = _PARSERS.get((view[start + 4] & 0x0F, length))
+    if parser is not None:
+        return parser(view, start)
+    device_id, life, head_info = _HEAD.unpack_from(view, start)
+    return RawFrame(device_id, life, head_info, bytes(view[start:start + length]))
+
+
+def _raw(view, start: int, length: int) -> bytes:
+    return bytes(view[start:start + length])
+
+
+def parse_frame(frame: bytes) -> Record:
+    """
+    [解析单个完整报文] - 不做校验, 用于 CarSession 等已经完成重组和校验的报文
+
+    ::: param :::
+        frame: 完整报文
+
+    ::: return :::
+        类型化记录, 没有定长格式的报文返回 RawFrame
+    """
+    return _parse(memoryview(frame), 0, len(frame))
+
+
+class FrameDecoder:
+    """
+    [流式报文解码器] - 每个连接一个, 接收的数据写入可复用的缓冲区, 取出完整报文
+
+    - 按 报文头 定位, 响应报文先按类型定长检查 长度字段 + 报文尾 + CRC, 其他报文按报文尾查找;
+    - CRC 在缓冲区的 memoryview 切片上计算, 解析直接从缓冲区 unpack_from, 不复制报文;
+    - 报文头前的无效数据和CRC错误的定长报文被丢弃并计数;
+    - 同步socket可通过 get_buffer / buffer_updated 直接 recv_into 缓冲区。
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        ::: param :::
+            capacity: 缓冲区初始大小 (字节), 不足时自动扩大
+        """
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self.stats = {"frames": 0, "bytes": 0, "discarded": 0, "crc_errors": 0}
+
+    @property
+    def pending(self) -> int:
+        """缓冲区中尚未组成完整报文的字节数。"""
+        return self._end - self._start
+
+    def clear(self) -> None:
+        """[清空缓冲区] 连接断开重连时调用。"""
+        self._start = self._end = 0
+
+    def _reserve(self, size: int) -> None:
+        """保证缓冲区末尾至少有 size 字节空间: 先把未处理的数据移到开头, 仍不足时换用更大的缓冲区。"""
+        if self._end + size <= len(self._buf):
+            return
+        pending = self._end - self._start
+        if pending + size > len(self._buf):
+            buf = bytearray(max(len(self._buf) * 2, pending + size))
+            buf[:pending] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        elif pending:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._start, self._end = 0, pending
+
+    def get_buffer(self, sizehint: int = 2048) -> memoryview:
+        """
+        [获取写入区] - 返回缓冲区末尾至少 sizehint 字节的可写视图, 写入后调用 buffer_updated
+
+        ::: param :::
+            sizehint: 期望写入的字节数
+        """
+        self._reserve(sizehint)
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """[确认写入] get_buffer 返回的视图中已写入 nbytes 字节。"""
+        self._end += nbytes
+        self.stats["bytes"] += nbytes
+
+    def write(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """[写入数据] 把收到的数据追加到缓冲区。"""
+        size = len(data)
+        self._reserve(size)
+        self._view[self._end:self._end + size] = data
+        self._end += size
+        self.stats["bytes"] += size
+
+    def _drain(self, emit: Callable, limit: Optional[int] = None) -> List:
+        """
+        [取出完整报文] - 依次定位缓冲区中的完整报文, 交给 emit(视图, 起始位置, 长度) 转换
+
+        ::: param :::
+            emit: 转换函数 (_parse 解析为记录, _raw 复制为 bytes)
+            limit: 最多取出的报文数, None 表示全部
+        """
+        out = []
+        buf, view, stats = self._buf, self._view, self.stats
+        start, end = self._start, self._end
+        while end - start >= MIN_FRAME_LENGTH and (limit is None or len(out) < limit):
+            if buf[start] != HEADER[0] or buf[start + 1] != HEADER[1]:
+                pos = buf.find(HEADER, start, end)
+                if pos < 0:
+                    # 保留可能是报文头前半部分的最后一个字节
+                    pos = end - 1 if buf[end - 1] == HEADER[0] else end
+                stats["discarded"] += pos - start
+                start = pos
+                continue
+
+            # 定长响应报文: 报文尾和长度字段都对上时只需校验一次CRC
+            length = RESPONSE_LENGTHS.get(buf[start + 4] & 0x0F)
+            if length is not None and end - start >= length:
+                stop = start + length
+                if (buf[stop - 2] == FOOTER[0] and buf[stop - 1] == FOOTER[1]
+                        and _LENGTH.unpack_from(buf, stop - 6)[0] == length):
+                    if _crc16(view[start:stop - 4]) == _CRC.unpack_from(buf, stop - 4)[0]:
+                        out.append(emit(view, start, length))
+                        start = stop
+                        continue
+                    stats["crc_errors"] += 1
+                    logger.warning(f"[CAR] 报文CRC校验失败, 丢弃: {bytes(view[start:stop])}")
+                    start += len(HEADER)
+                    continue
+
+            # 其他报文 (请求、调试等): 依次尝试每个报文尾, 长度字段和CRC都正确才算完整
+            limit_end = min(end, start + MAX_FRAME_LENGTH)
+            stop = buf.find(FOOTER, start + MIN_FRAME_LENGTH - 2, limit_end)
+            while stop >= 0:
+                stop += len(FOOTER)
+                if (_LENGTH.unpack_from(buf, stop - 6)[0] == stop - start
+                        and _crc16(view[start:stop - 4]) == _CRC.unpack_from(buf, stop - 4)[0]):
+                    break
+                stop = buf.find(FOOTER, stop - 1, limit_end)
+            if stop >= 0:
+                out.append(emit(view, start, stop - start))
+                start = stop
+            elif end - start >= MAX_FRAME_LENGTH:
+                logger.warning(f"[CAR] 丢弃无法解析的数据: {bytes(view[start:start + 16])}...")
+                stats["discarded"] += 1
+                start += 1
+            else:
+                break
+        self._start = start
+        stats["frames"] += len(out)
+        return out
+
+    def records(self) -> List[Record]:
+        """[取出记录] 解析缓冲区中的全部完整报文。"""
+        return self._drain(_parse)
+
+    def frames(self) -> List[bytes]:
+        """[取出报文] 返回缓冲区中的全部完整报文 (bytes)。"""
+        return self._drain(_raw)
+
+    def next_frame(self) -> Optional[bytes]:
+        """[取出一个报文] 没有完整报文时返回None。"""
+        frames = self._drain(_raw, limit=1)
+        return frames[0] if frames else None
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> List[Record]:
+        """
+        [写入并解析] - 返回本次写入后可以取出的全部记录
+
+        ::: param :::
+            data: 收到的数据 (任意切分)
+
+        ::: return :::
+            List[Record]: HeartbeatRecord / TaskRecord / CommandRecord / RawFrame
+        """
+        self.write(data)
+        return self.records()
+
+    def feed_frames(self, data: Union[bytes, bytearray, memoryview]) -> List[bytes]:
+        """
+        [写入并拆分] - 返回本次写入后可以取出的全部完整报文 (bytes)
+        """
+        self.write(data)
+        return self.frames()
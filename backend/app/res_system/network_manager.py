@@ -11,6 +11,8 @@ from typing import Union
 import logging
 logger = logging.getLogger(__name__)
 
+from .frame_decoder import FrameDecoder
+
 # from app.utils.devices_logger import DevicesLogger
 
 # ------------------------
@@ -29,6 +31,8 @@ class NetworkManager():
         self.sock = None
         self.reconnect_attempts = 0
         self.max_reconnect = 5
+        # 按报文重组接收的数据 (处理粘包、拆包)
+        self._decoder = FrameDecoder()
     
     async def connect(self) -> bool:
         """
@@ -48,6 +52,7 @@ class NetworkManager():
             await asyncio.get_event_loop().sock_connect(self.sock, server_address)
             
             self.reconnect_attempts = 0
+            self._decoder.clear()
             logger.info(f"[网络] 连接成功")
             # logger.info("[网络] 连接成功")  # 添加连接成功日志
             return True
@@ -101,14 +106,18 @@ class NetworkManager():
             # 设置接收超时时间
             self.sock.settimeout(TIMEOUT)
             
-            # 使用asyncio的read方法接收数据
+            # 使用asyncio的recv_into方法直接写入解码器缓冲区, 直到取出一个完整报文
             loop = asyncio.get_event_loop()
-            data = await loop.sock_recv(self.sock, 2048)
-            
-            if not data:  # 空数据表示连接关闭
-                logger.warning("检测到连接断开，空数据")
-                await self.reconnect()
-                return None
+            data = self._decoder.next_frame()
+            while data is None:
+                size = await loop.sock_recv_into(self.sock, self._decoder.get_buffer(2048))
+                
+                if not size:  # 空数据表示连接关闭
+                    logger.warning("检测到连接断开，空数据")
+                    await self.reconnect()
+                    return None
+                self._decoder.buffer_updated(size)
+                data = self._decoder.next_frame()
                 
             logger.info(f"收到数据包: {data}")  # 打印收到的数据包
             return data
@@ -1,6 +1,10 @@
 # res_protocol_system/PacketBuilder.py
 import struct
+from functools import lru_cache
+from typing import Tuple, Union
+
 import crcmod
+import numpy as np
 import logging
 logger = logging.getLogger(__name__)
 
@@ -17,10 +21,104 @@ from .res_protocol import (
 # 维护者: 协议开发工程师
 # ------------------------
 
+HEADER = RESProtocol.HEADER.value
+FOOTER = RESProtocol.FOOTER.value
+VERSION = RESProtocol.VERSION.value
+
+# 预编译的报文字段格式
+_PRE_INFO = struct.Struct('!2sBBB')     # 报文头 + 设备ID + 生命 + 版本&类型
+_DEVICE_INFO = struct.Struct('!BBB')    # 设备ID + 生命 + 版本&类型
+_LENGTH = struct.Struct('!H')           # 报文长度
+_CRC = struct.Struct('<H')              # CRC校验位 (小端)
+_BYTE = struct.Struct('!B')
+_TASK_HEAD = struct.Struct('!BB')       # 任务号 + 段数
+_SEGMENT = struct.Struct('!BBBB')       # X | Y | Z | 动作
+_COMMAND_HEAD = struct.Struct('!BB')    # 任务号 + 指令序号
+_PARAM_BYTES = struct.Struct('!BBBB')   # 指令参数 (4个字节)
+_PARAM_U32 = struct.Struct('>I')        # 指令参数 (32位整数)
+
+# 报文头(2) + 设备ID(1) + 生命(1) + 版本&类型(1)
+PRE_INFO_LENGTH = _PRE_INFO.size
+# 长度(2) + CRC(2) + 报文尾(2)
+TAIL_LENGTH = 6
+HEARTBEAT_LENGTH = PRE_INFO_LENGTH + TAIL_LENGTH
+
+
+def _make_crc16_table(poly: int = 0xA001) -> Tuple[int, ...]:
+    """CRC16 查找表: 多项式 0x8005 按位反转 (0xA001), 与 crcmod.mkCrcFun(0x18005, rev=True) 一致。"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _make_crc16_table()
+
+# 长报文 (任务报文) 的CRC交给 crcmod 的C实现, 同一组参数, 结果与 crc16 一致
+_crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+
+def crc16(DATA: Union[bytes, bytearray, memoryview], CRC: int = 0xFFFF) -> int:
+    """
+    [查表计算CRC16] - 参数与 crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000) 一致
+
+    ::: param :::
+        DATA: 数据
+        CRC: 初始值, 传入前一段数据的结果可以分段计算
+
+    ::: return :::
+        int: CRC16 校验值
+    """
+    table = CRC16_TABLE
+    for byte in DATA:
+        CRC = (CRC >> 8) ^ table[(CRC ^ byte) & 0xFF]
+    return CRC
+
+
+@lru_cache(maxsize=None)
+def heartbeat_packets(device_id: int, frame_type: int) -> Tuple[bytes, ...]:
+    """
+    [心跳报文模板] - 心跳报文只有生命和CRC随次数变化, 按生命值预先生成全部报文
+
+        报文头和设备ID部分的CRC只计算一次, 每个生命值在其基础上查表计算剩余4个字节
+
+    ::: param :::
+        device_id: 设备ID
+        frame_type: FrameType.HEARTBEAT.value / FrameType.HEARTBEAT_WITH_BATTERY.value
+
+    ::: return :::
+        按生命值 (0-255) 索引的心跳报文
+    """
+    template = bytearray(HEARTBEAT_LENGTH)
+    _PRE_INFO.pack_into(template, 0, HEADER, device_id, 0, (VERSION << 4) | (frame_type & 0x0F))
+    _LENGTH.pack_into(template, PRE_INFO_LENGTH, HEARTBEAT_LENGTH)
+    template[-2:] = FOOTER
+    prefix_crc = crc16(template[:PacketBuilder.LIFE_OFFSET])
+    packets = []
+    for life in range(256):
+        template[PacketBuilder.LIFE_OFFSET] = life
+        crc = crc16(template[PacketBuilder.LIFE_OFFSET:HEARTBEAT_LENGTH - 4], prefix_crc)
+        _CRC.pack_into(template, HEARTBEAT_LENGTH - 4, crc)
+        packets.append(bytes(template))
+    return tuple(packets)
+
+
 class PacketBuilder:
     """
     [报文构建器类] - 构建创建各种类型的协议报文
+
+        报文在预分配的缓冲区中按字段写入 (预编译的 struct.Struct), 完成后复制一次作为返回值;
+        心跳报文直接取预先生成的模板。
     """
+
+    # 模板中需要逐次填写的字段位置: 报文头(2) + 设备ID(1) + 生命(1) + 版本&类型(1) + 任务号(1)
+    DEVICE_ID_OFFSET = 2
+    LIFE_OFFSET = 3
+    TASK_NO_OFFSET = 5
+
     def __init__(self, device_id: int=1):
         """
         [初始化报文构建器]
@@ -30,7 +128,9 @@ class PacketBuilder:
         """
         self.device_id = device_id
         self._life_counter = 0
-        self.crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+        self.crc16 = _crc16
+        self._buffer = bytearray(256)
+        self._view = memoryview(self._buffer)
 
 
     ########################################
@@ -59,11 +159,7 @@ class PacketBuilder:
         ::: return :::
             报文前段信息字节流
         """
-        version_type = (RESProtocol.VERSION.value << 4) | (FRAME_TYPE & 0x0F)
-        return struct.pack('!BBB',
-                          self.device_id,
-                          self._increment_life(),
-                          version_type)
+        return _DEVICE_INFO.pack(self.device_id, self._increment_life(), (VERSION << 4) | (FRAME_TYPE & 0x0F))
     
     def _pack_type_info(self, FRAME_TYPE: int) -> bytes:
         """
@@ -77,8 +173,7 @@ class PacketBuilder:
         ::: return :::
             返回报文版本和报文类型组合字节流
         """
-        version_type = (RESProtocol.VERSION.value << 4) | (FRAME_TYPE & 0x0F)
-        return struct.pack('!B',version_type)
+        return _BYTE.pack((VERSION << 4) | (FRAME_TYPE & 0x0F))
     
     def _data_length(self, DATA: bytes) -> bytes:
         """
@@ -92,14 +187,7 @@ class PacketBuilder:
         ::: return :::
             paclet_length: 报文长度字段（paclet_length转化成字节后，占两个字节再返回输出）
         """
-        header_length = 2
-        data_length = len(DATA)
-        len_length = 2
-        crc_length = 2
-        footer_length = 2
-        packet_length = header_length + data_length + len_length + crc_length + footer_length
-        logger.debug(f"[CAR] 报文长度:{packet_length}")
-        return struct.pack('!H', packet_length)
+        return _LENGTH.pack(len(HEADER) + len(DATA) + TAIL_LENGTH)
     
     def _calculate_crc(self, DATA: bytes) -> bytes:
         """
@@ -107,9 +195,7 @@ class PacketBuilder:
 
         格式: 校验位(2)
         """
-        crc = self.crc16(DATA)
-        logger.debug(f"[CAR] CRC16校验值: {hex(crc)}")
-        return struct.pack('<H', crc)
+        return _CRC.pack(self.crc16(DATA))
     
 
     def _segments_task_len(self, SEGMENTS: list) -> int:
@@ -117,19 +203,60 @@ class PacketBuilder:
         [计算任务段数]
 
         ::: param :::
-            SEGMENTS: 路径段列表 [(x, y, z, action), ...]
+            SEGMENTS: 路径段列表 [(x, y, z, action), ...], 或 (n, 4) 的 uint8 数组
 
         ::: return :::
-            task_len: int, 任务段数
+            task_len: int, 任务段数 (含动作)
         """
         task_len = len(SEGMENTS)
-        logger.debug(f"[CAR] 任务段数(无动作): {task_len}")
-        for segment in SEGMENTS:
-            if segment[3] != 0:
-                task_len += 1
-        logger.debug(f"[CAR] 任务段数(含动作): {task_len}")
+        if isinstance(SEGMENTS, np.ndarray):
+            # 任务段数组 (见 map_core.SegmentCompiler)
+            task_len += int(np.count_nonzero(SEGMENTS[:, 3]))
+        else:
+            for segment in SEGMENTS:
+                if segment[3] != 0:
+                    task_len += 1
         return task_len
 
+    def _begin(
+            self,
+            FRAME_TYPE: int,
+            PAYLOAD_LENGTH: int
+    ) -> int:
+        """
+        [开始写入报文] - 在缓冲区开头写入 报文头 + 设备ID + 生命 + 版本&类型
+
+        ::: param :::
+            FRAME_TYPE: 报文类型值
+            PAYLOAD_LENGTH: 数据部分长度
+
+        ::: return :::
+            int: 报文总长度
+        """
+        length = PRE_INFO_LENGTH + PAYLOAD_LENGTH + TAIL_LENGTH
+        if length > len(self._buffer):
+            self._buffer = bytearray(max(length, 2 * len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        _PRE_INFO.pack_into(
+            self._buffer, 0,
+            HEADER, self.device_id, self._increment_life(), (VERSION << 4) | (FRAME_TYPE & 0x0F)
+        )
+        return length
+
+    def _finish(self, LENGTH: int) -> bytes:
+        """
+        [完成报文] - 写入 长度 + CRC + 报文尾, 返回报文的副本
+
+        ::: param :::
+            LENGTH: _begin 返回的报文总长度
+        """
+        buffer = self._buffer
+        _LENGTH.pack_into(buffer, LENGTH - 6, LENGTH)
+        _CRC.pack_into(buffer, LENGTH - 4, self.crc16(self._view[:LENGTH - 4]))
+        buffer[LENGTH - 2] = FOOTER[0]
+        buffer[LENGTH - 1] = FOOTER[1]
+        return bytes(self._view[:LENGTH])
+
 
     ########################################
     # 心跳报文
@@ -144,42 +271,7 @@ class PacketBuilder:
         ::: return :::
             packet: bytes 心跳报文
         """
-        # 构建基础头部
-        # 基础头字段
-        header = RESProtocol.HEADER.value
-        
-        # 设备ID
-        device_id = struct.pack('B', self.device_id)
-        
-        # 生命周期
-        life = struct.pack('B', self._increment_life())
-        
-        # 报文版本 & 报文类型
-        pack_type_info = self._pack_type_info(FrameType.HEARTBEAT.value)
-        
-        # 计算报文长度
-        data = device_id + life + pack_type_info
-        data_length = self._data_length(data)
-        
-        # 这个部份的组成是： packet_type_info(8) + data_length(16)
-        # message = b'\x10\x00\x0b'
-        
-        # 组合数据段
-        data_part = header + data + data_length
-        # data_part = header + device_id + life + message
-        
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-        
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-        
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] 心跳报文: {packet}")
-        
-        # 返回报文
-        return packet
+        return heartbeat_packets(self.device_id, FrameType.HEARTBEAT.value)[self._increment_life()]
     
     def build_heartbeat(
             self,
@@ -198,28 +290,7 @@ class PacketBuilder:
         ::: return :::
             packet: bytes, 心跳报文
         """
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FRAME_TYPE.value)
-        
-        # 计算数据段长度
-        data_length = self._data_length(pre_info)
-        
-        # 组合数据段
-        data_part = header + pre_info + data_length
-
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-        
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] {FRAME_TYPE.name} 报文: {packet}")
-
-        # 返回报文
-        return packet
+        return heartbeat_packets(self.device_id, FRAME_TYPE.value)[self._increment_life()]
     
     ########################################
     # 任务报文
@@ -235,53 +306,28 @@ class PacketBuilder:
 
         ::: param :::
             TASK_NO: 任务序号 (1-255)
-            SEGMENTS: 路径段列表 [(x, y, z, action), ...]
+            SEGMENTS: 路径段列表 [(x, y, z, action), ...], 或 (n, 4) 的 uint8 数组
 
         ::: return :::
             packet: bytes, 任务报文
         """
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FrameType.TASK.value)
-        
-        # 构建数据内容
-        logger.debug("[CAR] 任务序号: ", TASK_NO)
-
-        # 计算动态长度: 4字节*段数
-        segment_count = self._segments_task_len(SEGMENTS)
-        logger.debug("[CAR] 任务段数: ", segment_count)
-        
-        # 添加任务数据
-        payload = struct.pack('!BB', TASK_NO, segment_count)
-        
-        # 添加路径段
-        for segment in SEGMENTS:
-            x, y, z, action = segment
-            # 位置编码: X(8位) | Y(8位) | Z(8位) | 动作(8位)
-            # position = (x << 24) | (y << 16) | (z << 8) | action
-            # logger.debug("位置编码: ", hex(position))
-            # payload += struct.pack('!I', position)
-            position = struct.pack('!BBBB', x, y, z, action)
-            logger.debug(f"[CAR] 位置编码: {position}")
-            payload += position
-        
-        # 计算数据段长度
-        data_length = self._data_length(pre_info + payload)
-        
-        # 组合数据段
-        data_part = header + pre_info + payload + data_length
-
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-        
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] 整体任务报文: {packet}")
-
-        # 返回报文
+        offset = PRE_INFO_LENGTH + _TASK_HEAD.size
+        length = self._begin(FrameType.TASK.value, _TASK_HEAD.size + _SEGMENT.size * len(SEGMENTS))
+        _TASK_HEAD.pack_into(self._buffer, PRE_INFO_LENGTH, TASK_NO, self._segments_task_len(SEGMENTS))
+        
+        # 路径段: X(8位) | Y(8位) | Z(8位) | 动作(8位)
+        if isinstance(SEGMENTS, np.ndarray):
+            # 任务段数组按行展开即为 X | Y | Z | 动作 的字节序列
+            self._view[offset:length - TAIL_LENGTH] = np.ascontiguousarray(SEGMENTS, dtype=np.uint8).reshape(-1)
+        else:
+            pack_into = _SEGMENT.pack_into
+            buffer = self._buffer
+            for x, y, z, action in SEGMENTS:
+                pack_into(buffer, offset, x, y, z, action)
+                offset += _SEGMENT.size
+        
+        packet = self._finish(length)
+        logger.debug("[CAR] 整体任务报文: %s", packet)
         return packet
 
     ########################################
@@ -309,46 +355,18 @@ class PacketBuilder:
         ::: return :::
             packet: bytes, 调试指令报文
         """
-        
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FrameType.DEBUG.value)
-
-        # 任务序号
-        task_no = struct.pack('!B', TASK_NO)
-        # 指令编号
-        cmd_no = struct.pack('!B', CMD_NO)
-        
-        # 次指令ID
-        sub_cmd_id = struct.pack('!B', SUB_CMD_ID)
-        
-        # 添加调试指令数据
-        cmd_param = struct.pack(
-            '!BBBB',
-            CMD_PARAM[0],
-            CMD_PARAM[1],
-            CMD_PARAM[2],
-            CMD_PARAM[3]
-            )
-        payload = task_no + cmd_no + CMD + sub_cmd_id + cmd_param
-        
-        # 计算数据段长度
-        data_lenght = self._data_length(pre_info + payload)
-        
-        # 构建数据内容
-        data_part = header + pre_info + payload + data_lenght
-        
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-        
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] 调试指令报文: {packet}")
-        
-        # 返回报文
+        offset = PRE_INFO_LENGTH + _COMMAND_HEAD.size
+        length = self._begin(FrameType.DEBUG.value, _COMMAND_HEAD.size + len(CMD) + 1 + _PARAM_BYTES.size)
+        
+        # 任务序号 + 指令编号 + 主指令ID + 次指令ID + 参数
+        _COMMAND_HEAD.pack_into(self._buffer, PRE_INFO_LENGTH, TASK_NO, CMD_NO)
+        self._buffer[offset:offset + len(CMD)] = CMD
+        offset += len(CMD)
+        self._buffer[offset] = SUB_CMD_ID
+        _PARAM_BYTES.pack_into(self._buffer, offset + 1, *CMD_PARAM[:4])
+        
+        packet = self._finish(length)
+        logger.debug("[CAR] 调试指令报文: %s", packet)
         return packet
     
 
@@ -356,6 +374,28 @@ class PacketBuilder:
     # 工作 - 指令报文
     ########################################
 
+    def _build_command(
+            self,
+            TASK_NO: int,
+            CMD_NO: int,
+            CMD: bytes,
+            PARAM: struct.Struct,
+            *VALUES: int
+    ) -> bytes:
+        """
+        [构建指令报文] - 任务号(1) + 指令序号(1) + 指令ID + 参数(4)
+
+        ::: param :::
+            PARAM: 参数格式 (_PARAM_BYTES / _PARAM_U32)
+            VALUES: 参数值
+        """
+        offset = PRE_INFO_LENGTH + _COMMAND_HEAD.size
+        length = self._begin(FrameType.COMMAND.value, _COMMAND_HEAD.size + len(CMD) + PARAM.size)
+        _COMMAND_HEAD.pack_into(self._buffer, PRE_INFO_LENGTH, TASK_NO, CMD_NO)
+        self._buffer[offset:offset + len(CMD)] = CMD
+        PARAM.pack_into(self._buffer, offset + len(CMD), *VALUES)
+        return self._finish(length)
+
     def build_work_command(
             self,
             task_number: int,
@@ -374,46 +414,8 @@ class PacketBuilder:
         Returns:
             bytes: 工作指令报文
         """
-        
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FrameType.COMMAND.value)
-
-        # 任务号
-        task_no = struct.pack('!B', task_number)
-        logger.debug("[CAR] 任务号: ", task_no)
-        
-        # 指令编号
-        cmd_no = struct.pack('!B', command_number)
-        
-        #### 指令参数（32） ####
-        # 添加调试指令数据
-        cmd_param = struct.pack(
-            '!BBBB',
-            command_param[0],
-            command_param[1],
-            command_param[2],
-            command_param[3]
-            )
-        payload = task_no + cmd_no + command + cmd_param
-        
-        # 计算数据段长度
-        data_lenght = self._data_length(pre_info + payload)
-        
-        # 构建数据内容
-        data_part = header + pre_info + payload + data_lenght
-        
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-        
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] 工作指令报文: {packet}")
-        
-        # 返回报文
+        packet = self._build_command(task_number, command_number, command, _PARAM_BYTES, *command_param[:4])
+        logger.debug("[CAR] 工作指令报文: %s", packet)
         return packet
     
     def location_change(
@@ -433,56 +435,46 @@ class PacketBuilder:
         ::: return :::
             packet: 更改位置指令报文
         """
-        
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FrameType.COMMAND.value)
-
-        # 任务号
-        task_no = struct.pack('B', TASK_NO)
-        logger.debug("[CAR] 任务号: ", task_no)
-        
-        # 指令编号
-        cmd_no = struct.pack('B', 189)
-        # cmd_no = b'\xbd' # 第189个命令，文档上面没写，不知道有什么用
-        
-        # 指令ID
-        cmd = WorkCommand.UPDATE_CAR_COORDINATES.value
-        # cmd = b'\x50'
-        
-        # 组合指令信息
-        cmd_info = cmd_no + cmd
-
-        #### 指令参数（32） ####
-        # 位置数据
-        location = tuple(map(int, LOCATION.split(',')))
-        x, y, z = location[0], location[1], location[2]
         # 位置编码: 空占位(8位) | X(8位) | Y(8位) | Z(8位)
-        position = struct.pack('!BBBB', 0, x, y, z)
-        logger.debug(f"[CAR] 位置编码: {position}")
+        x, y, z = tuple(map(int, LOCATION.split(',')))[:3]
+        # 指令编号 189, 文档上面没写
+        packet = self._build_command(TASK_NO, 189, WorkCommand.UPDATE_CAR_COORDINATES.value, _PARAM_BYTES, 0, x, y, z)
+        logger.debug("[CAR] 位置更改指令报文: %s", packet)
+        return packet
+    
+    ########################################
+    # 报文模板
+    ########################################
 
-        # 组合数据部份
-        payload = task_no + cmd_info + position
+    def patch_packet(
+            self,
+            TEMPLATE: bytes,
+            TASK_NO: int
+    ) -> bytes:
+        """
+        [填写报文模板] - 在已编译的任务/确认执行报文上填写设备ID、生命、任务号并重新计算CRC
+            结果与 build_task / do_task 按相同参数构建的报文逐字节一致
 
-        # 计算数据报长度
-        data_lenght = self._data_length(pre_info + payload)
-        
-        # 构建数据内容
-        data_part = header + pre_info + payload + data_lenght
-        
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
+        ::: param :::
+            TEMPLATE: build_task 或 do_task 生成的报文
+            TASK_NO: 任务号 (1-255)
+
+        ::: return :::
+            packet: bytes, 可直接发送的报文
+        """
+        length = len(TEMPLATE)
+        if length > len(self._buffer):
+            self._buffer = bytearray(max(length, 2 * len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        buffer = self._buffer
+        self._view[:length] = TEMPLATE
+        buffer[self.DEVICE_ID_OFFSET] = self.device_id
+        buffer[self.LIFE_OFFSET] = self._increment_life()
+        buffer[self.TASK_NO_OFFSET] = TASK_NO
+        # CRC 覆盖 报文头 ~ 长度字段, 位于报文尾之前
+        _CRC.pack_into(buffer, length - 4, self.crc16(self._view[:length - 4]))
+        return bytes(self._view[:length])
 
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-        
-        # 组合完整报文
-        packet = data_part + crc + footer
-        logger.debug(f"[CAR] 位置更改指令报文: {packet}")
-        
-        # 返回报文
-        return packet
-    
     # 确认执行任务报文
     def do_task(
             self,
@@ -501,46 +493,9 @@ class PacketBuilder:
         ::: return :::
             packet: 确认执行任务报文
         """
-        # 构建基础头部
-        header = RESProtocol.HEADER.value
-        pre_info = self._pack_pre_info(FrameType.COMMAND.value)
-        
-        # 任务号
-        task_no = struct.pack('B', TASK_NO)
-        logger.debug("[CAR] 任务号: ", task_no)
-        
-        # 指令编号
-        cmd_no = struct.pack('B', 44)
-        
-        # 指令ID
-        cmd = ImmediateCommand.SET_SEGMENT_NO.value
-        
-        # 组合指令信息
-        cmd_info = cmd_no + cmd
-        
-        #### 指令参数（32） ####
-        # 计算动态长度: 4字节*段数
-        segment_count = struct.pack('>I', self._segments_task_len(SEGMENTS))
-        logger.debug("[CAR] 任务段数: ", segment_count)
-
-        # 组合指令所有数据
-        payload = task_no + cmd_info + segment_count
-        
-        # 计算数据段长度
-        data_length = self._data_length(pre_info + payload)
-        
-        # 组合数据段
-        data_part = header + pre_info + payload + data_length
-
-        # 计算CRC
-        crc = self._calculate_crc(data_part)
-        
-        # 基础尾部字段
-        footer = RESProtocol.FOOTER.value
-
-        # 组装报文
-        packet = data_part + crc + footer
-        logger.debug("[CAR] 任务确认报文: ", packet)
-
-        # 返回报文
-        return packet
\ No newline at end of file
+        # 指令编号 44, 指令参数为任务段数 (32位)
+        packet = self._build_command(
+            TASK_NO, 44, ImmediateCommand.SET_SEGMENT_NO.value, _PARAM_U32, self._segments_task_len(SEGMENTS)
+        )
+        logger.debug("[CAR] 任务确认报文: %s", packet)
+        return packet
@@ -0,0 +1,169 @@
+# res_system/packet_cache.py
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from .packet_builder import PacketBuilder
+
+# ------------------------
+# 模块: 任务报文缓存
+# 职责: 按路线缓存已编译的任务段和任务报文, 发送时只填写生命、任务号和CRC
+# ------------------------
+
+
+class CompiledTask:
+    """[已编译任务] 一条路线的路径、任务段和报文模板。"""
+
+    __slots__ = ("key", "path", "segments", "task_template", "do_template")
+
+    def __init__(self, key: Tuple, path: Sequence[str], segments: np.ndarray, task_template: bytes, do_template: bytes):
+        self.key = key
+        self.path = tuple(path)
+        self.segments = segments
+        self.task_template = task_template
+        self.do_template = do_template
+
+    def packets(self, builder: PacketBuilder, TASK_NO: int) -> Tuple[bytes, bytes]:
+        """
+        [生成发送报文] - 依次填写任务报文和确认执行报文, 生命计数器与 build_task + do_task 一致
+
+        ::: param :::
+            builder: 穿梭车的报文构建器 (提供设备ID和生命计数器)
+            TASK_NO: 任务号 (1-255)
+
+        ::: return :::
+            (task_packet, do_packet)
+        """
+        task_packet = builder.patch_packet(self.task_template, TASK_NO)
+        do_packet = builder.patch_packet(self.do_template, TASK_NO)
+        return task_packet, do_packet
+
+
+class TaskPacketCache:
+    """
+    [任务报文缓存类] - 按 (起点, 终点, 取放货动作, 路径策略, 地图版本) 缓存已编译的任务
+
+    - 命中时跳过路径规划、任务段编译和逐字节的报文构建;
+    - 地图版本变化 (重新加载、禁用节点/边) 后旧版本的条目全部失效;
+    - 条目数超过上限时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        [初始化任务报文缓存]
+
+        ::: param :::
+            max_entries: 最多缓存的路线数量
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CompiledTask]" = OrderedDict()
+        self._version: Optional[str] = None
+        # 模板的设备ID、生命和任务号在发送时填写
+        self._template_builder = PacketBuilder(0)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _node_name(point: Union[str, Sequence[int]]) -> str:
+        """节点名称或坐标 -> 节点名称 "x,y,z"。"""
+        if isinstance(point, str):
+            return point
+        return ",".join(str(int(value)) for value in point[:3])
+
+    def get(
+            self,
+            path_custom,
+            source: Union[str, Sequence[int]],
+            target: Union[str, Sequence[int]],
+            pick_drop: bool = False,
+            strategy: str = "shortest"
+    ) -> Optional[CompiledTask]:
+        """
+        [获取已编译任务] - 未命中时规划路径、编译任务段并构建报文模板
+
+        ::: param :::
+            path_custom: 路径规划器 (map_core.PathCustom)
+            source: 起点, 节点名称或坐标 (如心跳报文中的 current_location)
+            target: 终点
+            pick_drop: 是否在起点/终点添加取货/放货动作
+            strategy: 路径规划策略
+
+        ::: return :::
+            CompiledTask, 不可达时返回None
+
+        ::: raise :::
+            ValueError: 起点或终点不在地图中
+        """
+        version = path_custom.graph.version
+        key = (self._node_name(source), self._node_name(target), bool(pick_drop), strategy, version)
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._stats["invalidations"] += len(self._entries)
+                    logger.info(f"[CAR] 地图版本变化 {self._version} -> {version}, 清空 {len(self._entries)} 条任务报文缓存")
+                    self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+            self._stats["misses"] += 1
+
+        route = path_custom.compile_route(key[0], key[1], strategy, pick_drop=pick_drop)
+        if route is None:
+            return None
+        path, segments = route
+        segments.setflags(write=False)
+        with self._lock:
+            entry = CompiledTask(
+                key, path, segments,
+                self._template_builder.build_task(0, segments),
+                self._template_builder.do_task(0, segments)
+            )
+            if version == self._version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return entry
+
+    def clear(self) -> None:
+        """[清空缓存]"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict:
+        """
+        [缓存统计]
+
+        ::: return :::
+            dict: hits, misses, evictions, invalidations, size, max_entries, hit_rate, map_version
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["map_version"] = self._version
+        return stats
+
+
+_packet_cache: Optional[TaskPacketCache] = None
+_packet_cache_lock = threading.Lock()
+
+
+def get_packet_cache() -> TaskPacketCache:
+    """进程内共享的任务报文缓存 (各穿梭车共用, 发送时填写各自的设备ID)。"""
+    global _packet_cache
+    if _packet_cache is None:
+        with _packet_cache_lock:
+            if _packet_cache is None:
+                _packet_cache = TaskPacketCache()
+    return _packet_cache
@@ -0,0 +1,374 @@
+# res_system/simulator.py
+import argparse
+import asyncio
+import random
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import crcmod
+import logging
+logger = logging.getLogger(__name__)
+
+from .frame_decoder import FrameDecoder
+from .res_protocol import CarStatus, FrameType, ImmediateCommand, RESProtocol, WorkCommand
+
+# ------------------------
+# 模块: 穿梭车模拟器
+# 职责: 在本机按RES报文格式模拟穿梭车 (心跳、任务、指令), 按速度/转向时间/抖动逐格移动,
+#       可在不同端口同时运行多台, 用于压测控制层和测量端到端延迟
+# ------------------------
+
+HEADER = RESProtocol.HEADER.value
+FOOTER = RESProtocol.FOOTER.value
+
+_crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+_PRE_INFO = struct.Struct('!2sBBB')
+_TAIL = struct.Struct('!H')
+_CRC = struct.Struct('<H')
+# 响应数据: 心跳 / 任务 / 指令
+_HEARTBEAT = struct.Struct('!BHBBBBIBBBBI')
+_HEARTBEAT_POWER = struct.Struct('!BHBBBBIBBBBIB')
+_TASK_RESPONSE = struct.Struct('!BH')
+_COMMAND_RESPONSE = struct.Struct('!BHI')
+# 请求数据: 任务报文头 (任务号 + 段数) / 任务段 / 指令 (任务号 + 指令序号 + 指令ID + 参数)
+_TASK_HEAD = struct.Struct('!BB')
+_SEGMENT = struct.Struct('!BBBB')
+_COMMAND = struct.Struct('!BBc4s')
+
+# 任务段动作 (见 map_core.SegmentCompiler)
+ACTION_PICK = 1
+ACTION_DROP = 2
+
+# 执行结果: 0 成功, 1 拒绝 (正在执行任务 / 没有对应的任务)
+RESULT_OK = 0
+RESULT_REJECTED = 1
+
+
+def build_frame(device_id: int, life: int, frame_type: int, payload: bytes) -> bytes:
+    """
+    [组装响应报文] - 报文头 + 设备ID + 生命 + 版本&类型 + 数据 + 长度 + CRC + 报文尾
+    """
+    version_type = (RESProtocol.VERSION.value << 4) | (frame_type & 0x0F)
+    data = _PRE_INFO.pack(HEADER, device_id, life, version_type) + payload
+    data += _TAIL.pack(len(data) + 6)
+    return data + _CRC.pack(_crc16(data)) + FOOTER
+
+
+class ShuttleSimulator:
+    """
+    [穿梭车模拟器] - 一台模拟穿梭车, 一个TCP端口
+
+    - 心跳 / 电量心跳: 返回当前位置、状态、任务号 (任务执行中和完成后为当前任务号)、段序号;
+    - 任务报文: 保存任务段, 收到 "下发段序号" 指令后开始执行;
+    - 更改坐标指令: 立即修改位置; 托盘取货/放货指令: 修改有无托盘;
+    - 开始/结束充电指令: 就绪时按 charge_rate 充电到100%, 下发任务时停止充电;
+    - 执行任务时逐格移动, 每格耗时 1/speed 秒, 换向额外 turn_time 秒, 取放货 action_time 秒,
+      耗时按 jitter 比例随机浮动;
+    - 响应使用请求中的设备ID和生命值。
+    """
+
+    def __init__(
+            self,
+            location: Tuple[int, int, int] = (1, 1, 1),
+            host: str = "127.0.0.1",
+            port: int = 0,
+            speed: float = 1.0,
+            turn_time: float = 1.0,
+            action_time: float = 2.0,
+            jitter: float = 0.0,
+            power: float = 100.0,
+            power_per_cell: float = 0.05,
+            charge_rate: float = 0.1,
+            seed: Optional[int] = None
+    ):
+        """
+        ::: param :::
+            location: 初始位置 (x, y, z)
+            host: 监听地址
+            port: 监听端口, 0 表示自动分配
+            speed: 行驶速度 (格/秒)
+            turn_time: 换向时间 (秒)
+            action_time: 取货/放货时间 (秒)
+            jitter: 耗时随机浮动比例, 如 0.1 表示 ±10%
+            power: 初始电量 (%)
+            power_per_cell: 每行驶一格消耗的电量 (%)
+            charge_rate: 充电速度 (%/秒)
+            seed: 随机数种子
+        """
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.turn_time = turn_time
+        self.action_time = action_time
+        self.jitter = jitter
+        self.power_per_cell = power_per_cell
+        self.charge_rate = charge_rate
+        self.location = tuple(location)
+        self.power = power
+        self.car_status = CarStatus.READY.value
+        self.task_no = 0
+        self.segment = 0
+        self.have_pallet = 0
+        self._random = random.Random(seed)
+        self._pending: Optional[Tuple[int, List[Tuple[int, int, int, int]]]] = None
+        self._motion: Optional[asyncio.Task] = None
+        self._charger: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers = set()
+        self.stats = {"connections": 0, "frames": 0, "heartbeats": 0, "tasks": 0, "commands": 0, "completed": 0}
+
+    @property
+    def busy(self) -> bool:
+        return self._motion is not None and not self._motion.done()
+
+    @property
+    def charging(self) -> bool:
+        return self._charger is not None and not self._charger.done()
+
+    ########################################
+    # 报文处理
+    ########################################
+
+    def handle_frame(self, frame: bytes) -> Optional[bytes]:
+        """
+        [处理请求报文] - 返回响应报文, 不支持的报文类型返回None
+
+        ::: param :::
+            frame: 完整的请求报文 (已校验)
+        """
+        device_id, life, version_type = frame[2], frame[3], frame[4]
+        frame_type = version_type & 0x0F
+        self.stats["frames"] += 1
+        if frame_type == FrameType.HEARTBEAT.value:
+            self.stats["heartbeats"] += 1
+            return build_frame(device_id, life, frame_type, self._heartbeat_payload(False))
+        if frame_type == FrameType.HEARTBEAT_WITH_BATTERY.value:
+            self.stats["heartbeats"] += 1
+            return build_frame(device_id, life, frame_type, self._heartbeat_payload(True))
+        if frame_type == FrameType.TASK.value:
+            self.stats["tasks"] += 1
+            task_no, result = self._on_task(frame)
+            return build_frame(device_id, life, frame_type, _TASK_RESPONSE.pack(task_no, result))
+        if frame_type == FrameType.COMMAND.value:
+            self.stats["commands"] += 1
+            cmd_no, result = self._on_command(frame)
+            return build_frame(device_id, life, frame_type, _COMMAND_RESPONSE.pack(cmd_no, result, 0))
+        logger.debug(f"[SIM] 不支持的报文类型 {frame_type}")
+        return None
+
+    def _heartbeat_payload(self, with_power: bool) -> bytes:
+        x, y, z = self.location
+        values = (
+            self.task_no, 0, x, y, z, self.segment, 0,
+            (self.car_status << 4) | self.have_pallet, 0, 0, self.have_pallet, 0
+        )
+        if with_power:
+            return _HEARTBEAT_POWER.pack(*values, max(int(self.power), 0))
+        return _HEARTBEAT.pack(*values)
+
+    def _on_task(self, frame: bytes) -> Tuple[int, int]:
+        """保存任务段, 正在执行任务时拒绝。"""
+        task_no, _ = _TASK_HEAD.unpack_from(frame, 5)
+        if self.busy:
+            logger.warning(f"[SIM] 正在执行任务 {self.task_no}, 拒绝任务 {task_no}")
+            return task_no, RESULT_REJECTED
+        count = (len(frame) - 5 - _TASK_HEAD.size - 6) // _SEGMENT.size
+        segments = [_SEGMENT.unpack_from(frame, 5 + _TASK_HEAD.size + i * _SEGMENT.size) for i in range(count)]
+        self._pending = (task_no, segments)
+        return task_no, RESULT_OK
+
+    def _on_command(self, frame: bytes) -> Tuple[int, int]:
+        """执行指令, 返回 (指令序号, 执行结果)。"""
+        task_no, cmd_no, cmd, param = _COMMAND.unpack_from(frame, 5)
+        if cmd == ImmediateCommand.SET_SEGMENT_NO.value:
+            if self.busy or self._pending is None or self._pending[0] != task_no:
+                return cmd_no, RESULT_REJECTED
+            _, segments = self._pending
+            self._pending = None
+            self._stop_charging()
+            self.task_no = task_no
+            self.car_status = CarStatus.TASK_EXECUTING.value
+            self._motion = asyncio.get_running_loop().create_task(self._execute(segments))
+        elif cmd == WorkCommand.UPDATE_CAR_COORDINATES.value:
+            self.location = tuple(param[1:4])
+        elif cmd == WorkCommand.PALLET_PICKUP.value:
+            self.have_pallet = 1
+        elif cmd == WorkCommand.PALLET_PLACE.value:
+            self.have_pallet = 0
+        elif cmd == WorkCommand.START_CHARGING.value:
+            if self.busy:
+                return cmd_no, RESULT_REJECTED
+            if not self.charging:
+                self._charger = asyncio.get_running_loop().create_task(self._charge())
+        elif cmd == WorkCommand.STOP_CHARGING.value:
+            self._stop_charging()
+        elif cmd == ImmediateCommand.EMERGENCY_STOP.value:
+            if self.busy:
+                self._motion.cancel()
+            self.car_status = CarStatus.READY.value
+        return cmd_no, RESULT_OK
+
+    ########################################
+    # 运动模拟
+    ########################################
+
+    def _duration(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(seconds, 0.0)
+
+    async def _execute(self, segments: Sequence[Tuple[int, int, int, int]]) -> None:
+        """按任务段逐格移动, 完成后回到就绪状态。"""
+        axis = None
+        try:
+            for index, (x, y, z, action) in enumerate(segments):
+                self.segment = index
+                target = (x, y, z)
+                while self.location != target:
+                    step, step_axis = self._step(target)
+                    if axis is not None and step_axis != axis:
+                        await asyncio.sleep(self._duration(self.turn_time))
+                    axis = step_axis
+                    await asyncio.sleep(self._duration(1.0 / self.speed))
+                    self.location = step
+                    self.power -= self.power_per_cell
+                if action in (ACTION_PICK, ACTION_DROP):
+                    await asyncio.sleep(self._duration(self.action_time))
+                    self.have_pallet = 1 if action == ACTION_PICK else 0
+            self.stats["completed"] += 1
+        finally:
+            self.car_status = CarStatus.READY.value
+
+    async def _charge(self, tick: float = 0.02) -> None:
+        """充电到100%。"""
+        while self.power < 100:
+            await asyncio.sleep(tick)
+            self.power = min(self.power + self.charge_rate * tick, 100.0)
+
+    def _stop_charging(self) -> None:
+        if self.charging:
+            self._charger.cancel()
+
+    def _step(self, target: Tuple[int, int, int]) -> Tuple[Tuple[int, int, int], int]:
+        """朝目标移动一格, 返回 (新位置, 移动的坐标轴)。"""
+        position = list(self.location)
+        for axis in range(3):
+            if position[axis] != target[axis]:
+                position[axis] += 1 if target[axis] > position[axis] else -1
+                return tuple(position), axis
+        return self.location, 0
+
+    ########################################
+    # TCP服务
+    ########################################
+
+    async def start(self) -> int:
+        """[启动] 开始监听, 返回实际端口。"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"[SIM] 模拟穿梭车已启动 {self.host}:{self.port} 位置 {self.location}")
+        return self.port
+
+    async def stop(self) -> None:
+        """[停止] 关闭监听和所有连接, 取消正在执行的任务。"""
+        if self.busy:
+            self._motion.cancel()
+        self._stop_charging()
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers.add(asyncio.current_task())
+        self.stats["connections"] += 1
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                replies = [self.handle_frame(frame) for frame in decoder.feed_frames(data)]
+                writer.write(b"".join(reply for reply in replies if reply))
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+
+class SimulatorFleet:
+    """[模拟穿梭车车队] - 多台模拟穿梭车, 每台一个端口。"""
+
+    def __init__(self, locations: Sequence[Tuple[int, int, int]], base_port: int = 0, **kwargs):
+        """
+        ::: param :::
+            locations: 每台穿梭车的初始位置
+            base_port: 第一台的端口, 之后依次加1; 0 表示全部自动分配
+            kwargs: 传给 ShuttleSimulator 的运动参数 (speed, turn_time, jitter 等)
+        """
+        self.cars: List[ShuttleSimulator] = [
+            ShuttleSimulator(location, port=base_port + i if base_port else 0, **kwargs)
+            for i, location in enumerate(locations)
+        ]
+
+    @property
+    def ports(self) -> List[int]:
+        return [car.port for car in self.cars]
+
+    async def start(self) -> List[int]:
+        """[启动全部] 返回各台的端口。"""
+        return list(await asyncio.gather(*(car.start() for car in self.cars)))
+
+    async def stop(self) -> None:
+        """[停止全部]"""
+        await asyncio.gather(*(car.stop() for car in self.cars))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """各台统计之和。"""
+        total: Dict[str, int] = {}
+        for car in self.cars:
+            for key, value in car.stats.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    locations = [tuple(map(int, args.location.split(',')))] * args.cars
+    fleet = SimulatorFleet(
+        locations, base_port=args.port, speed=args.speed,
+        turn_time=args.turn_time, action_time=args.action_time, jitter=args.jitter
+    )
+    ports = await fleet.start()
+    print(f"模拟穿梭车 {len(ports)} 台, 端口: {ports}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fleet.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RES穿梭车模拟器")
+    parser.add_argument("--cars", type=int, default=1, help="穿梭车数量")
+    parser.add_argument("--port", type=int, default=2504, help="第一台的端口, 之后依次加1")
+    parser.add_argument("--location", default="1,1,1", help="初始位置 x,y,z")
+    parser.add_argument("--speed", type=float, default=1.0, help="行驶速度 (格/秒)")
+    parser.add_argument("--turn-time", type=float, default=1.0, help="换向时间 (秒)")
+    parser.add_argument("--action-time", type=float, default=2.0, help="取放货时间 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="耗时随机浮动比例")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+# res_system/telemetry.py
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+from app.utils.telemetry_history import TelemetryHistory, get_car_history
+from .packet_builder import PacketBuilder
+from .frame_decoder import HeartbeatRecord, parse_frame
+from .res_protocol import CarStatus, FrameType
+from .connection.session_async import get_car_session
+
+# ------------------------
+# 模块: 穿梭车遥测
+# 职责: 后台定时发送心跳, 把解析后的状态写入内存缓存, 查询接口按最大时效读取缓存,
+#       等待条件 (到达位置、任务完成) 的调用方订阅状态更新
+# ------------------------
+
+StatePredicate = Callable[[Dict], bool]
+
+
+def at_location(location: Union[str, Tuple[int, int, int]], status: Optional[int] = CarStatus.READY.value) -> StatePredicate:
+    """
+    [条件: 到达位置] - 心跳中的坐标等于 location, 且状态码为 status (None 表示不检查状态)
+
+    ::: param :::
+        location: 目标位置 "x,y,z" 或坐标元组
+    """
+    if isinstance(location, str):
+        location = tuple(map(int, location.split(',')))
+    target = tuple(location[:3])
+
+    def predicate(msg: Dict) -> bool:
+        return tuple(msg['current_location']) == target and (status is None or msg['car_status'] == status)
+    return predicate
+
+
+def task_finished(task_no: int) -> StatePredicate:
+    """
+    [条件: 任务完成] - 心跳中的任务序号等于 task_no 且穿梭车就绪
+    """
+    def predicate(msg: Dict) -> bool:
+        return msg['cmd_no'] == task_no and msg['car_status'] == CarStatus.READY.value
+    return predicate
+
+
+def approaching(
+        task_no: int,
+        location: Union[str, Tuple[int, int, int]],
+        segment: Optional[int] = None,
+        cells: Optional[int] = None
+) -> StatePredicate:
+    """
+    [条件: 接近终点] - 任务 task_no 执行到第 segment 段之后, 或与终点同层且距离不超过 cells 格;
+    已到达终点且就绪时也满足
+
+    ::: param :::
+        task_no: 任务号, 心跳中的任务序号不同时不看段号 (可能是上一个任务的段号)
+        location: 任务终点 "x,y,z" 或坐标元组
+        segment: 触发的段号 (心跳中的 current_segment, 从0开始), None 表示不按段号触发
+        cells: 触发的距离 (格), None 表示不按距离触发
+    """
+    arrived = at_location(location)
+    x, y, z = tuple(map(int, location.split(','))) if isinstance(location, str) else tuple(location[:3])
+
+    def predicate(msg: Dict) -> bool:
+        if arrived(msg):
+            return True
+        if msg['cmd_no'] != task_no or msg['car_status'] != CarStatus.TASK_EXECUTING.value:
+            return False
+        if segment is not None and msg['current_segment'] >= segment:
+            return True
+        cx, cy, cz = msg['current_location']
+        return cells is not None and cz == z and abs(cx - x) + abs(cy - y) <= cells
+    return predicate
+
+
+class CarStateCache:
+    """[穿梭车状态缓存] 保存最近一次心跳和电量, 线程安全 (同步控制器和异步遥测共用)。"""
+
+    def __init__(self, history: Optional[TelemetryHistory] = None):
+        """
+        ::: param :::
+            history: 遥测历史, 每次写入状态时追加一行, None 表示不记录
+        """
+        self.history = history
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[Dict] = None
+        self._heartbeat_at: Optional[float] = None
+        self._power: Optional[int] = None
+        self._power_at: Optional[float] = None
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def publish(self, msg: Dict) -> None:
+        """
+        [写入状态] - 心跳或电量心跳的解析结果, 解析失败的结果不写入
+
+        ::: param :::
+            msg: PacketParser.parse_heartbeat_response / parse_hb_power_response 的返回值
+        """
+        if not msg or msg.get("car_status") == "error" or "current_location" not in msg:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._heartbeat = dict(msg)
+            self._heartbeat_at = now
+            if "power" in msg:
+                self._power = msg["power"]
+                self._power_at = now
+            listeners = list(self._listeners)
+        if self.history is not None:
+            self.history.record_heartbeat(msg)
+        for listener in listeners:
+            listener(dict(msg))
+
+    def add_listener(self, listener: Callable[[Dict], None]) -> None:
+        """[订阅状态更新] 每次写入状态时以心跳字典调用 listener (在写入方的线程中)。"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict], None]) -> None:
+        """[取消订阅]"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    @property
+    def listener_count(self) -> int:
+        with self._lock:
+            return len(self._listeners)
+
+    @staticmethod
+    def _fresh(updated_at: Optional[float], max_age: Optional[float]) -> bool:
+        if updated_at is None:
+            return False
+        return max_age is None or time.monotonic() - updated_at <= max_age
+
+    def heartbeat(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        [读取心跳] - 缓存不存在或超过 max_age 秒时返回None
+
+        ::: param :::
+            max_age: 最大时效 (秒), None 表示不限
+        """
+        with self._lock:
+            if not self._fresh(self._heartbeat_at, max_age):
+                return None
+            return dict(self._heartbeat)
+
+    def power(self, max_age: Optional[float] = None) -> Optional[int]:
+        """
+        [读取电量] - 缓存不存在或超过 max_age 秒时返回None
+        """
+        with self._lock:
+            if not self._fresh(self._power_at, max_age):
+                return None
+            return self._power
+
+    def power_info(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        [读取带电量的心跳] - 心跳和电量都在时效内时返回心跳字典 (含 power)
+        """
+        with self._lock:
+            if not (self._fresh(self._heartbeat_at, max_age) and self._fresh(self._power_at, max_age)):
+                return None
+            return {**self._heartbeat, "power": self._power}
+
+    def age(self) -> Optional[float]:
+        """最近一次心跳距今的秒数, 没有心跳时返回None。"""
+        with self._lock:
+            if self._heartbeat_at is None:
+                return None
+            return time.monotonic() - self._heartbeat_at
+
+
+class CarTelemetry:
+    """
+    [穿梭车遥测] - 后台任务按固定间隔发送心跳, 每 battery_every 次改为电量心跳
+
+    - 经长连接会话收发, 与控制器的请求共用连接;
+    - 设备无响应时间隔逐次加倍 (不超过 max_interval), 恢复后回到正常间隔。
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            device_id: int,
+            interval: float = settings.CAR_TELEMETRY_INTERVAL,
+            battery_every: int = settings.CAR_TELEMETRY_BATTERY_EVERY,
+            max_interval: float = 30.0
+    ):
+        """
+        [初始化穿梭车遥测]
+
+        ::: param :::
+            host: 穿梭车地址
+            port: 穿梭车端口
+            device_id: 穿梭车设备ID
+            interval: 心跳间隔 (秒)
+            battery_every: 每多少次心跳发送一次电量心跳, 0 表示不发送
+            max_interval: 设备无响应时的最大间隔 (秒)
+        """
+        self.interval = interval
+        self.battery_every = battery_every
+        self.max_interval = max_interval
+        self.session = get_car_session(host, port)
+        self.state = get_car_state(host, port)
+        self.builder = PacketBuilder(device_id)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"polls": 0, "failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def poll_once(self, with_battery: bool = False) -> bool:
+        """
+        [发送一次心跳] - 结果写入状态缓存
+
+        ::: param :::
+            with_battery: 是否发送电量心跳
+
+        ::: return :::
+            bool: 是否收到响应
+        """
+        if with_battery:
+            packet = self.builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY)
+        else:
+            packet = self.builder.heartbeat()
+        response = await self.session.request(packet, timeout=max(self.interval, 1.0))
+        self.stats["polls"] += 1
+        record = parse_frame(response) if response else None
+        if not isinstance(record, HeartbeatRecord):
+            self.stats["failures"] += 1
+            return False
+        self.state.publish(record.as_dict())
+        return True
+
+    async def _run(self) -> None:
+        count = 0
+        delay = self.interval
+        online = True
+        while True:
+            with_battery = self.battery_every > 0 and count % self.battery_every == 0
+            ok = await self.poll_once(with_battery)
+            count += 1
+            if ok:
+                if not online:
+                    logger.info(f"[CAR] 遥测恢复 {self.session.host}:{self.session.port}")
+                online = True
+                delay = self.interval
+            else:
+                if online:
+                    logger.warning(f"[CAR] 遥测无响应 {self.session.host}:{self.session.port}, 降低心跳频率")
+                online = False
+                delay = min(delay * 2, self.max_interval)
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """[启动遥测] 在当前事件循环中创建后台任务 (已在运行时不重复创建)。"""
+        loop = asyncio.get_running_loop()
+        if not self.running or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+            logger.info(f"[CAR] 遥测已启动 {self.session.host}:{self.session.port}, 间隔 {self.interval}s")
+
+    async def wait_for(
+            self,
+            predicate: StatePredicate,
+            timeout: Optional[float] = None,
+            max_age: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        [等待状态条件] - 第一个满足条件的心跳到达时返回, 不额外发送报文
+
+        - 缓存中的状态在 max_age 秒内且已满足条件时立即返回;
+        - 遥测未运行时自动启动, 多个等待方共用同一个心跳流;
+        - 调用方任务被取消时自动取消订阅。
+
+        ::: param :::
+            predicate: 条件函数, 参数为心跳字典, 如 at_location("1,1,1") / task_finished(5)
+            timeout: 超时 (秒), None 表示一直等待
+            max_age: 可接受的缓存时效 (秒), 默认为一个心跳间隔
+
+        ::: return :::
+            满足条件的心跳字典, 超时返回None
+        """
+        cached = self.state.heartbeat(self.interval if max_age is None else max_age)
+        if cached is not None and predicate(cached):
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def check(msg: Dict) -> None:
+            if future.done():
+                return
+            try:
+                if predicate(msg):
+                    future.set_result(msg)
+            except Exception as e:
+                future.set_exception(e)
+
+        def on_state(msg: Dict) -> None:
+            # 状态可能由同步控制器在其他线程写入
+            try:
+                loop.call_soon_threadsafe(check, msg)
+            except RuntimeError:
+                pass
+
+        self.state.add_listener(on_state)
+        try:
+            self.start()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.state.remove_listener(on_state)
+
+    async def wait_for_location(
+            self,
+            location: str,
+            timeout: Optional[float] = None,
+            status: Optional[int] = CarStatus.READY.value
+    ) -> Optional[Dict]:
+        """
+        [等待到达位置] - 坐标等于 location 且状态为 status (默认就绪)
+        """
+        return await self.wait_for(at_location(location, status), timeout)
+
+    async def wait_for_task(self, task_no: int, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        [等待任务完成] - 心跳任务序号等于 task_no 且穿梭车就绪
+        """
+        return await self.wait_for(task_finished(task_no), timeout, max_age=0)
+
+    async def stop(self) -> None:
+        """[停止遥测]"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        # asyncio.wait_for (3.11) 在等待的响应同时完成时会吞掉取消, 任务未结束就再次取消
+        while not task.done():
+            task.cancel()
+            await asyncio.wait({task}, timeout=0.1)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[CAR] 遥测任务异常退出: {task.exception()}")
+
+
+_states: Dict[Tuple[str, int], CarStateCache] = {}
+_telemetries: Dict[Tuple[str, int], CarTelemetry] = {}
+_registry_lock = threading.Lock()
+
+
+def get_car_state(host: str, port: int) -> CarStateCache:
+    """每台穿梭车 (地址, 端口) 共享一个状态缓存。"""
+    key = (host, port)
+    with _registry_lock:
+        state = _states.get(key)
+        if state is None:
+            history = get_car_history(f"car:{host}:{port}") if settings.HISTORY_ENABLED else None
+            state = _states[key] = CarStateCache(history)
+    return state
+
+
+def get_car_telemetry(host: str, port: int, device_id: int = 0) -> CarTelemetry:
+    """每台穿梭车 (地址, 端口) 共享一个遥测任务。"""
+    key = (host, port)
+    telemetry = _telemetries.get(key)
+    if telemetry is None:
+        telemetry = CarTelemetry(host, port, device_id)
+        with _registry_lock:
+            telemetry = _telemetries.setdefault(key, telemetry)
+    return telemetry
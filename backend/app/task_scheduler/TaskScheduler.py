@@ -1,8 +1,6 @@
 # TaskScheduler.py
 # 任务调度器模块
 from queue import PriorityQueue
-import networkx as nx
-import matplotlib.pyplot as plt
 
 from app.map_core import PathCustom
 from app.models.base_model import LocationList
@@ -72,6 +70,8 @@ class TaskScheduler:
     #             return node
     
     # def visualize_graph(self, G, node_status):
+    #     import networkx as nx
+    #     import matplotlib.pyplot as plt
     #     colors = ['green' if node_status.get(n) == 'free' else 'red' for n in G.nodes]
     #     plt.figure(figsize=(10, 10))
     #     nx.draw(self.G, self.pos, node_color=colors, with_labels=True, node_size=800)
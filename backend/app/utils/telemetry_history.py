@@ -0,0 +1,304 @@
+# app/utils/telemetry_history.py
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+from app.core.config import settings
+
+# backend 目录, HISTORY_SPILL_DIR 为相对路径时以此为基准 (与启动时的工作目录无关)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 删减溢出文件时每次复制的行数
+_COPY_ROWS = 65536
+
+# 穿梭车心跳: 位置、状态码、任务序号、当前段、有无货物、电量 (-1 表示未知)
+CAR_COLUMNS: List[Tuple[str, str]] = [
+    ("x", "i2"), ("y", "i2"), ("z", "i2"),
+    ("car_status", "i2"), ("cmd_no", "i2"), ("segment", "i2"),
+    ("have_pallet", "i2"), ("power", "i2"),
+]
+# 电梯: 所在层、是否空闲 (-1 表示未读取)
+LIFT_COLUMNS: List[Tuple[str, str]] = [("layer", "i2"), ("idle", "i2")]
+
+
+class TelemetryHistory:
+    """固定内存的遥测历史环形缓冲区 (按列的 numpy 结构化数组, 带时间戳)。
+
+    - 缓冲区写满时, 最旧的 spill_rows 行追加到磁盘文件, 查询时以内存映射 (np.memmap) 读取,
+      时间戳有序, 按时间窗口查询只需二分查找;
+    - 没有磁盘文件时, 最旧的行被覆盖;
+    - 溢出文件超过 max_spill_bytes 或最旧的行超过 max_age 秒时删去最旧的行,
+      每次多删1/4的余量, 避免每次溢出都重写文件;
+    - 写入和查询线程安全 (同步控制器和异步遥测都会写入)。
+    """
+
+    def __init__(
+            self,
+            name: str,
+            columns: Sequence[Tuple[str, str]],
+            capacity: int = settings.HISTORY_CAPACITY,
+            spill_path: Optional[str] = None,
+            spill_rows: Optional[int] = None,
+            max_spill_bytes: Optional[int] = settings.HISTORY_SPILL_MAX_BYTES,
+            max_age: Optional[float] = settings.HISTORY_SPILL_MAX_AGE
+    ):
+        """
+        Args:
+            name: 设备名称, 如 "car:192.168.8.20:2504"、"lift:192.168.8.10"
+            columns: 数据列 [(列名, numpy类型), ...], 时间戳列 "t" 自动添加
+            capacity: 内存中保留的行数
+            spill_path: 溢出文件路径, None 表示不写磁盘
+            spill_rows: 每次溢出的行数, 默认为容量的1/4
+            max_spill_bytes: 溢出文件的最大字节数, None 表示不限制
+            max_age: 溢出文件保留的时长 (秒, 相对最新一行), None 表示不限制
+        """
+        self.name = name
+        self.dtype = np.dtype([("t", "f8")] + list(columns))
+        self.columns = list(self.dtype.names)
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill_rows = max(1, min(spill_rows or capacity // 4, capacity))
+        self.max_spill_rows = None if max_spill_bytes is None else max(1, max_spill_bytes // self.dtype.itemsize)
+        self.max_age = max_age
+        self._rows = np.zeros(capacity, dtype=self.dtype)
+        # 最旧一行的位置和行数
+        self._start = 0
+        self._count = 0
+        self._last_t = 0.0
+        self._lock = threading.Lock()
+        self._spilled = self._spill_file_rows()
+        if self._spilled:
+            # 重启后接着溢出文件中的最后时间, 保证时间戳有序
+            self._last_t = float(self._spilled_rows()["t"][-1])
+        self.stats = {"appended": 0, "spilled": 0, "overwritten": 0, "trimmed": 0}
+        if self._spilled:
+            self._trim()
+
+    def __len__(self) -> int:
+        return self._count + self._spilled
+
+    def _spill_file_rows(self) -> int:
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return 0
+        return os.path.getsize(self.spill_path) // self.dtype.itemsize
+
+    def append(self, t: Optional[float] = None, **values: int) -> None:
+        """
+        写入一行, 未给出的列为 -1。
+
+        Args:
+            t: 时间戳 (秒, time.time()), None 表示当前时间; 早于上一行时按上一行记录, 保证有序
+            values: 列值
+        """
+        t = time.time() if t is None else t
+        with self._lock:
+            if self._count == self.capacity:
+                self._evict()
+            index = (self._start + self._count) % self.capacity
+            row = self._rows[index]
+            self._last_t = max(t, self._last_t)
+            row["t"] = self._last_t
+            for column in self.columns[1:]:
+                row[column] = values.get(column, -1)
+            self._count += 1
+            self.stats["appended"] += 1
+
+    def _ordered(self, count: Optional[int] = None) -> np.ndarray:
+        """内存中最旧的 count 行 (按时间顺序的副本)。"""
+        count = self._count if count is None else count
+        end = self._start + count
+        if end <= self.capacity:
+            return self._rows[self._start:end].copy()
+        return np.concatenate((self._rows[self._start:], self._rows[:end - self.capacity]))
+
+    def _evict(self) -> None:
+        """缓冲区已满: 最旧的 spill_rows 行写入溢出文件 (没有文件时直接覆盖)。"""
+        count = self.spill_rows
+        if self.spill_path is not None:
+            rows = self._ordered(count)
+            try:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                with open(self.spill_path, "ab") as f:
+                    f.write(rows.tobytes())
+                self._spilled += count
+                self.stats["spilled"] += count
+            except OSError as e:
+                logger.error(f"[HISTORY] {self.name} 写入溢出文件失败: {e}")
+                self.stats["overwritten"] += count
+            else:
+                self._trim()
+        else:
+            self.stats["overwritten"] += count
+        self._start = (self._start + count) % self.capacity
+        self._count -= count
+
+    def _trim(self) -> None:
+        """溢出文件超过行数或时长上限时, 只保留上限3/4以内的最新行 (分块复制到新文件后替换)。"""
+        rows = self._spilled_rows()
+        keep = self._spilled
+        if self.max_spill_rows is not None and keep > self.max_spill_rows:
+            keep = self.max_spill_rows * 3 // 4
+        if self.max_age is not None and rows["t"][0] < self._last_t - self.max_age:
+            cutoff = self._last_t - self.max_age * 3 / 4
+            keep = min(keep, self._spilled - int(np.searchsorted(rows["t"], cutoff, "left")))
+        if keep >= self._spilled:
+            return
+        first = self._spilled - keep
+        tmp_path = self.spill_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for index in range(first, self._spilled, _COPY_ROWS):
+                    f.write(rows[index:min(index + _COPY_ROWS, self._spilled)].tobytes())
+            del rows
+            os.replace(tmp_path, self.spill_path)
+        except OSError as e:
+            logger.error(f"[HISTORY] {self.name} 删减溢出文件失败: {e}")
+            return
+        self._spilled = keep
+        self.stats["trimmed"] += first
+        logger.info(f"[HISTORY] {self.name} 溢出文件删去最旧的 {first} 行, 保留 {keep} 行")
+
+    def _spilled_rows(self) -> Optional[np.ndarray]:
+        if not self._spilled:
+            return None
+        return np.memmap(self.spill_path, dtype=self.dtype, mode="r", shape=(self._spilled,))
+
+    def query(
+            self,
+            start: Optional[float] = None,
+            end: Optional[float] = None,
+            step: Optional[float] = None,
+            max_points: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        查询时间窗口 [start, end] 内的行, 可按时间降采样。
+
+        Args:
+            start: 开始时间戳, None 表示最早
+            end: 结束时间戳, None 表示最新
+            step: 降采样间隔 (秒), 每个间隔保留最后一行
+            max_points: 最多返回的行数, 超过时自动计算降采样间隔
+
+        Returns:
+            np.ndarray: 结构化数组 (列见 self.columns)
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        with self._lock:
+            # 溢出文件和环形缓冲区的两段各自有序, 分别二分查找, 只复制窗口内的行
+            end_index = self._start + self._count
+            blocks = [self._spilled_rows(), self._rows[self._start:min(end_index, self.capacity)]]
+            if end_index > self.capacity:
+                blocks.append(self._rows[:end_index - self.capacity])
+            parts = []
+            for block in blocks:
+                if block is None or not len(block):
+                    continue
+                times = block["t"]
+                lo, hi = np.searchsorted(times, start, "left"), np.searchsorted(times, end, "right")
+                if lo < hi:
+                    parts.append(np.array(block[lo:hi]))
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=self.dtype)
+
+        if max_points and len(rows) > max_points and step is None:
+            span = rows["t"][-1] - rows["t"][0]
+            step = span / max_points if span > 0 else None
+        if step and len(rows):
+            buckets = np.floor((rows["t"] - rows["t"][0]) / step).astype(np.int64)
+            # 每个间隔的最后一行
+            last = np.flatnonzero(np.diff(buckets, append=buckets[-1] + 1))
+            rows = rows[last]
+            if max_points and len(rows) > max_points:
+                rows = rows[-max_points:]
+        return rows
+
+    def to_dict(self, rows: np.ndarray) -> Dict:
+        """查询结果转为按列的字典 (用于接口返回)。"""
+        return {
+            "device": self.name,
+            "count": int(len(rows)),
+            "columns": {name: rows[name].tolist() for name in self.columns},
+        }
+
+    def info(self) -> Dict:
+        """缓冲区信息: 行数、时间范围和写入统计。"""
+        with self._lock:
+            memory_first = self._rows[self._start]["t"] if self._count else None
+            last = self._last_t if len(self) else None
+        spilled = self._spilled_rows()
+        first = spilled["t"][0] if spilled is not None else memory_first
+        return {
+            "device": self.name,
+            "columns": self.columns,
+            "rows": len(self),
+            "memory_rows": self._count,
+            "spilled_rows": self._spilled,
+            "first": None if first is None else float(first),
+            "last": None if last is None else float(last),
+            "stats": dict(self.stats),
+        }
+
+    # ---------------- 数据源 ----------------
+
+    def record_heartbeat(self, msg: Dict) -> None:
+        """写入一条穿梭车心跳 (PacketParser / HeartbeatRecord.as_dict 的结果)。"""
+        x, y, z = msg["current_location"]
+        self.append(
+            x=x, y=y, z=z,
+            car_status=msg["car_status"],
+            cmd_no=msg.get("cmd_no", -1),
+            segment=msg.get("current_segment", -1),
+            have_pallet=msg.get("have_pallet", -1),
+            power=msg.get("power", -1),
+        )
+
+    def record_lift(self, layer: int, idle: Optional[bool] = None) -> None:
+        """写入一次电梯状态读取。"""
+        self.append(layer=layer, idle=-1 if idle is None else int(idle))
+
+
+_histories: Dict[str, TelemetryHistory] = {}
+_registry_lock = threading.Lock()
+
+
+def _spill_path(name: str) -> Optional[str]:
+    if not settings.HISTORY_SPILL_DIR:
+        return None
+    return os.path.join(BACKEND_DIR, settings.HISTORY_SPILL_DIR, name.replace(":", "_") + ".bin")
+
+
+def get_history(name: str, columns: Sequence[Tuple[str, str]]) -> TelemetryHistory:
+    """每个设备共享一个历史缓冲区 (第一次调用时创建)。"""
+    history = _histories.get(name)
+    if history is None:
+        with _registry_lock:
+            history = _histories.get(name)
+            if history is None:
+                history = _histories[name] = TelemetryHistory(name, columns, spill_path=_spill_path(name))
+    return history
+
+
+def get_car_history(name: str) -> TelemetryHistory:
+    """穿梭车历史, name 如 "car:192.168.8.20:2504"。"""
+    return get_history(name, CAR_COLUMNS)
+
+
+def get_lift_history(plc_ip: str) -> TelemetryHistory:
+    """电梯历史, 按PLC地址区分。"""
+    return get_history(f"lift:{plc_ip}", LIFT_COLUMNS)
+
+
+def list_histories() -> List[Dict]:
+    """所有设备历史的信息。"""
+    with _registry_lock:
+        histories = list(_histories.values())
+    return [history.info() for history in histories]
+
+
+def find_history(name: str) -> Optional[TelemetryHistory]:
+    """按设备名称查找历史, 不存在时返回None。"""
+    return _histories.get(name)
@@ -0,0 +1,197 @@
+# tests/bench_map_core.py
+# map_core 在不同规模合成仓库上的性能测试, 结果写入JSON报告, 可与基准报告对比
+#
+# 用法:
+#   python bench_map_core.py                          # 全部规模, 报告写入 bench_map_core.json
+#   python bench_map_core.py --quick                  # 只测小规模
+#   python bench_map_core.py --baseline old.json      # 与基准报告对比, 有退化时退出码为1
+from sys_path import setup_path
+setup_path()
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.map_core import PathCustom, MapGraph
+from app.map_core.MapGraph import clear_map_graph_cache
+
+from synthetic_warehouse import generate_warehouse, write_map_config
+
+# 测试规模, 由小到大; 第一个与现场地图规模相当
+SIZES = [
+    {"name": "site", "floors": 4, "rows": 7, "lanes": 5, "highway_columns": [4], "lift_rows": [3]},
+    {"name": "small", "floors": 4, "rows": 20, "lanes": 12, "highway_columns": [6], "lift_rows": [10]},
+    {"name": "medium", "floors": 6, "rows": 40, "lanes": 24, "highway_columns": [8, 16], "lift_rows": [10, 30]},
+    {"name": "large", "floors": 8, "rows": 60, "lanes": 40, "highway_columns": [10, 20, 30], "lift_rows": [15, 30, 45]},
+]
+QUICK_SIZES = ("site", "small")
+
+OPERATIONS = ("find_shortest_path", "find_and_cut_path", "build_pick_task", "find_blocking_nodes", "find_nearest_free_node")
+
+
+def time_calls(func: Callable, cases: Sequence[Tuple], repeat: int) -> Dict:
+    """对每组参数调用一次函数, 重复 repeat 轮, 取最快一轮的平均耗时。"""
+    best = float("inf")
+    # 旧接口会打印路径长度等信息, 计时时屏蔽输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for args in cases:
+                func(*args)
+            best = min(best, time.perf_counter() - start)
+    return {"calls": len(cases), "us_per_call": round(best / len(cases) * 1e6, 3)}
+
+
+def make_cases(warehouse: Dict, path_custom: PathCustom, samples: int, seed: int) -> Dict[str, List[Tuple]]:
+    """为每个被测接口生成参数, 同一种子生成相同的参数。"""
+    rng = random.Random(seed)
+    status = warehouse["node_status"]
+    storage = warehouse["storage"]
+    occupied = [node for node in storage if status[node] == "occupied"] or storage
+    free = [node for node in storage if status[node] == "free"] or storage
+
+    pairs = [tuple(rng.sample(warehouse["nodes"], 2)) for _ in range(samples)]
+    pick_pairs = [(rng.choice(occupied), rng.choice(free)) for _ in range(samples)]
+
+    nearest_cases = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for source, target in pick_pairs:
+            blocking = path_custom.find_blocking_nodes(source, target, status)
+            move_point = blocking[0] if blocking else source
+            nearest_cases.append((source, target, move_point, status))
+
+    return {
+        "find_shortest_path": pairs,
+        "find_and_cut_path": pairs,
+        "build_pick_task": pick_pairs,
+        "find_blocking_nodes": [(source, target, status) for source, target in pick_pairs],
+        "find_nearest_free_node": nearest_cases,
+    }
+
+
+def bench_size(size: Dict, occupancy: float, samples: int, repeat: int, seed: int, workdir: str) -> Dict:
+    """测试一种规模。"""
+    params = {key: value for key, value in size.items() if key != "name"}
+    warehouse = generate_warehouse(**params, occupancy=occupancy, seed=seed)
+    config_path = os.path.join(workdir, f"{size['name']}.json")
+    write_map_config(warehouse, config_path)
+
+    start = time.perf_counter()
+    graph = MapGraph.from_config(config_path)
+    compile_ms = (time.perf_counter() - start) * 1e3
+
+    # PathCustom 初始化包含加载地图和构建分层路由表
+    start = time.perf_counter()
+    path_custom = PathCustom(config_path=config_path)
+    startup_ms = (time.perf_counter() - start) * 1e3
+
+    cases = make_cases(warehouse, path_custom, samples, seed)
+    ops = {}
+    for op in OPERATIONS:
+        ops[op] = time_calls(getattr(path_custom, op), cases[op], repeat)
+
+    return {
+        "name": size["name"],
+        "params": {**params, "occupancy": occupancy},
+        "nodes": graph.number_of_nodes,
+        "edges": graph.number_of_edges,
+        "compile_ms": round(compile_ms, 3),
+        "startup_ms": round(startup_ms, 3),
+        "ops": ops,
+    }
+
+
+def run(sizes: Sequence[Dict], occupancy: float = 0.5, samples: int = 200, repeat: int = 5, seed: int = 0) -> Dict:
+    """运行性能测试, 返回报告。"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for size in sizes:
+                result = bench_size(size, occupancy, samples, repeat, seed, workdir)
+                results.append(result)
+                print(f"[{result['name']}] {result['nodes']} 个节点, 编译 {result['compile_ms']:.1f} ms, "
+                      f"初始化 {result['startup_ms']:.1f} ms")
+                for op, timing in result["ops"].items():
+                    print(f"    {op:<24} {timing['us_per_call']:>10.1f} us/次")
+        finally:
+            clear_map_graph_cache()
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "samples": samples,
+        "repeat": repeat,
+        "seed": seed,
+        "sizes": results,
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, tolerance: float = 0.25) -> List[Dict]:
+    """与基准报告对比, 返回耗时超过基准 (1 + tolerance) 倍的项。"""
+    base_sizes = {size["name"]: size for size in baseline.get("sizes", [])}
+    regressions = []
+    for size in report["sizes"]:
+        base = base_sizes.get(size["name"])
+        if base is None:
+            continue
+        # 只对比两份报告都有的指标
+        metrics = {key: (size[key], base[key]) for key in ("compile_ms", "startup_ms") if key in base}
+        for op, timing in size["ops"].items():
+            if op in base.get("ops", {}):
+                metrics[op] = (timing["us_per_call"], base["ops"][op]["us_per_call"])
+        for metric, (current, previous) in metrics.items():
+            if previous > 0 and current > previous * (1 + tolerance):
+                regressions.append({
+                    "size": size["name"],
+                    "metric": metric,
+                    "baseline": previous,
+                    "current": current,
+                    "ratio": round(current / previous, 2)
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="map_core 合成仓库性能测试")
+    parser.add_argument("--quick", action="store_true", help="只测小规模")
+    parser.add_argument("--sizes", nargs="+", help=f"指定规模: {[size['name'] for size in SIZES]}")
+    parser.add_argument("--occupancy", type=float, default=0.5, help="货位占用比例")
+    parser.add_argument("--samples", type=int, default=200, help="每个接口的调用次数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数, 取最快一轮")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", default="bench_map_core.json", help="报告输出路径")
+    parser.add_argument("--baseline", help="基准报告路径")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的耗时增长比例")
+    args = parser.parse_args()
+
+    names = args.sizes or (QUICK_SIZES if args.quick else [size["name"] for size in SIZES])
+    unknown = set(names) - {size["name"] for size in SIZES}
+    if unknown:
+        parser.error(f"未知的规模: {sorted(unknown)}")
+    sizes = [size for size in SIZES if size["name"] in names]
+
+    report = run(sizes, args.occupancy, args.samples, args.repeat, args.seed)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare_reports(report, json.load(f), args.tolerance)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已写入 {args.output}")
+
+    for item in report.get("regressions", []):
+        print(f"性能退化: [{item['size']}] {item['metric']} {item['baseline']} -> {item['current']} ({item['ratio']}x)")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# tests/bench_packet_builder.py
+# PacketBuilder 各类报文的构建吞吐量, 以逐字段拼接 + crcmod 的参考实现为对照
+from sys_path import setup_path
+setup_path()
+
+import struct
+import time
+
+import numpy as np
+
+from app.res_system import PacketBuilder
+from app.res_system.res_protocol import ImmediateCommand
+
+from fake_car import make_frame
+
+
+def bench(func, count=20000, repeat=5):
+    """返回每秒构建的最佳报文数。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def concat_task(task_no, segments):
+    """参考实现: 逐段拼接任务报文。"""
+    actions = sum(1 for segment in segments if segment[3])
+    payload = struct.pack('!BB', task_no, len(segments) + actions)
+    for segment in segments:
+        payload += struct.pack('!BBBB', *segment)
+    return make_frame(2, 1, 1, payload)
+
+
+def concat_do_task(task_no, segments):
+    """参考实现: 拼接确认执行报文。"""
+    actions = sum(1 for segment in segments if segment[3])
+    payload = struct.pack('!BB', task_no, 44) + ImmediateCommand.SET_SEGMENT_NO.value + struct.pack('>I', len(segments) + actions)
+    return make_frame(2, 1, 2, payload)
+
+
+def main():
+    builder = PacketBuilder(2)
+    segments = [(i % 9 + 1, 3, 1, i % 3) for i in range(20)]
+    array = np.array(segments, dtype=np.uint8)
+
+    cases = [
+        ("心跳", lambda: make_frame(2, 1, 0, b""), builder.heartbeat),
+        ("任务 20段 (列表)", lambda: concat_task(7, segments), lambda: builder.build_task(7, segments)),
+        ("任务 20段 (数组)", lambda: concat_task(7, segments), lambda: builder.build_task(7, array)),
+        ("确认执行", lambda: concat_do_task(7, segments), lambda: builder.do_task(7, segments)),
+        ("更改位置", None, lambda: builder.location_change(3, "5,3,1")),
+    ]
+    for label, reference, func in cases:
+        fps = bench(func)
+        if reference is None:
+            print(f"{label}: {fps:,.0f} 报文/秒")
+            continue
+        ref_fps = bench(reference)
+        print(f"{label}: {fps:,.0f} 报文/秒, 拼接参考 {ref_fps:,.0f} 报文/秒 ({fps / ref_fps:.1f}x)")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        PacketBuilder(2)
+    print(f"创建 PacketBuilder: {(time.perf_counter() - start) * 1e3:.2f} us/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# tests/bench_route_table.py
+# 路由表查询与 networkx.shortest_path 的性能对比
+from sys_path import setup_path
+setup_path()
+
+import itertools
+import time
+
+import networkx as nx
+
+from app.map_core import PathCustom
+
+
+def bench(func, pairs, repeat=5):
+    """返回每次查询的最佳平均耗时(微秒)。"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for source, target in pairs:
+            func(source, target)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pairs) * 1e6
+
+
+def main():
+    path_custom = PathCustom()
+    graph = path_custom.graph
+    G = path_custom.G
+
+    same_layer = [
+        (s, t) for s, t in itertools.product(graph.names, repeat=2)
+        if s.rsplit(',', 1)[1] == t.rsplit(',', 1)[1]
+    ]
+    cross_layer = [
+        (s, t) for s, t in itertools.product(graph.names, repeat=2)
+        if s.rsplit(',', 1)[1] != t.rsplit(',', 1)[1]
+    ]
+
+    start = time.perf_counter()
+    routes = type(path_custom.routes)(graph)
+    build_ms = (time.perf_counter() - start) * 1e3
+    print(f"路由表构建耗时: {build_ms:.2f} ms ({len(routes.layers)} 层, {graph.number_of_nodes} 个节点)")
+
+    for label, pairs in (("同层", same_layer), ("跨层", cross_layer)):
+        nx_us = bench(lambda s, t: nx.shortest_path(G, s, t), pairs)
+        table_us = bench(path_custom.find_shortest_path, pairs)
+        print(f"{label} {len(pairs)} 对: networkx {nx_us:.2f} us/次, 路由表 {table_us:.2f} us/次, 加速 {nx_us / table_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# tests/bench_simulator.py
+# 用模拟穿梭车压测控制层: 多台穿梭车的心跳请求延迟, 以及移动任务的端到端耗时
+from sys_path import setup_path
+setup_path()
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from app.res_system import PacketBuilder, PacketParser
+from app.res_system.connection import CarSession
+from app.res_system.controller import ControllerAsync
+from app.res_system.packet_cache import get_packet_cache
+from app.res_system.simulator import ShuttleSimulator, SimulatorFleet
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def heartbeat_load(cars: int, concurrency: int, seconds: float) -> None:
+    """每台穿梭车 concurrency 个并发请求方连续发送心跳。"""
+    fleet = SimulatorFleet([(1, 1, 1)] * cars)
+    ports = await fleet.start()
+    sessions = [CarSession("127.0.0.1", port) for port in ports]
+    parser = PacketParser()
+    latencies = []
+
+    async def worker(session):
+        builder = PacketBuilder(1)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await session.request(builder.heartbeat())
+            latencies.append(time.perf_counter() - start)
+            assert parser.parse_heartbeat_response(response)["current_location"] == (1, 1, 1)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for session in sessions for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        for session in sessions:
+            await session.close()
+        await fleet.stop()
+    print(
+        f"心跳 {cars} 台 x {concurrency} 并发: {len(latencies) / elapsed:,.0f} 次/秒, "
+        f"延迟 p50 {percentile(latencies, 0.5) * 1e3:.2f} ms, p99 {percentile(latencies, 0.99) * 1e3:.2f} ms"
+    )
+
+
+def travel_time(controller: ControllerAsync, car: ShuttleSimulator, target: str) -> float:
+    """按任务段计算模拟穿梭车的行驶时间: 格数 / 速度 + 换向次数 * 换向时间。"""
+    points = get_packet_cache().get(controller.map, car.location, target).segments[:, :3].astype(int)
+    steps = abs(points[1:] - points[:-1])
+    turns = sum(1 for a, b in zip(steps[:-1], steps[1:]) if (a[0] > 0) != (b[0] > 0))
+    return steps.sum() / car.speed + turns * car.turn_time
+
+
+async def move_latency(runs: int, speed: float, turn_time: float) -> None:
+    """car_move 下发到 wait_task_complete 返回的耗时, 与模拟的行驶时间对比。"""
+    car = ShuttleSimulator(location=(5, 3, 1), speed=speed, turn_time=turn_time)
+    port = await car.start()
+    controller = ControllerAsync("127.0.0.1", port)
+    controller.telemetry.interval = 0.01
+    overhead = []
+    try:
+        for i in range(runs):
+            target = "1,1,1" if i % 2 == 0 else "5,3,1"
+            ideal = travel_time(controller, car, target)
+            start = time.perf_counter()
+            assert await controller.car_move(i % 255 + 1, target)
+            assert await controller.wait_task_complete(i % 255 + 1, TIMEOUT=30)
+            overhead.append(time.perf_counter() - start - ideal)
+    finally:
+        await controller.telemetry.stop()
+        await controller.session.close()
+        await car.stop()
+    print(
+        f"移动任务 {runs} 次: 模拟行驶 {ideal * 1e3:.0f} ms, 额外耗时 "
+        f"中位数 {statistics.median(overhead) * 1e3:.1f} ms, 最大 {max(overhead) * 1e3:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟穿梭车压测")
+    parser.add_argument("--cars", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--moves", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(heartbeat_load(args.cars, args.concurrency, args.seconds))
+    asyncio.run(move_latency(args.moves, speed=60.0, turn_time=0.05))
+
+
+if __name__ == "__main__":
+    main()
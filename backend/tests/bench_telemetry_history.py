@@ -0,0 +1,47 @@
+# tests/bench_telemetry_history.py
+# 遥测历史的写入速度, 以及溢出文件较大时的时间窗口查询耗时
+from sys_path import setup_path
+setup_path()
+
+import argparse
+import os
+import tempfile
+import time
+
+from app.utils.telemetry_history import CAR_COLUMNS, TelemetryHistory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="遥测历史压测")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--capacity", type=int, default=86400)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    msg = {"current_location": (3, 2, 1), "car_status": 1, "cmd_no": 7, "current_segment": 2, "have_pallet": 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        history = TelemetryHistory("car:bench", CAR_COLUMNS, args.capacity, os.path.join(tmp, "car.bin"))
+        start = time.perf_counter()
+        for i in range(args.rows):
+            history.append(t=i * 0.1, x=i % 50, y=2, z=1, car_status=1, cmd_no=i % 255, segment=i % 4)
+        elapsed = time.perf_counter() - start
+        print(f"写入 {args.rows:,} 行: {args.rows / elapsed:,.0f} 行/秒, 溢出 {history.stats['spilled']:,} 行")
+
+        count = 100_000
+        start = time.perf_counter()
+        for _ in range(count):
+            history.record_heartbeat(msg)
+        print(f"写入心跳: {count / (time.perf_counter() - start):,.0f} 次/秒")
+
+        span = args.rows * 0.1
+        for window, max_points in ((60.0, None), (3600.0, 2000), (span, 2000)):
+            start = time.perf_counter()
+            for q in range(args.queries):
+                offset = (span - window) * q / args.queries
+                rows = history.query(offset, offset + window, max_points=max_points)
+            ms = (time.perf_counter() - start) / args.queries * 1e3
+            print(f"查询 {window:,.0f} 秒窗口 (max_points={max_points}): {ms:.2f} ms, {len(rows)} 行")
+
+
+if __name__ == "__main__":
+    main()
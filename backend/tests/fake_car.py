@@ -0,0 +1,103 @@
+# tests/fake_car.py
+"""测试用的穿梭车TCP服务: 按RES报文格式回复心跳、任务和指令报文。"""
+import asyncio
+import struct
+
+import crcmod
+
+from app.res_system.res_protocol import FrameType, RESProtocol
+from app.res_system.connection.session_async import split_frames
+
+crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+
+def make_frame(device_id: int, life: int, frame_type: int, payload: bytes) -> bytes:
+    """组装报文: 报文头 + 设备ID + 生命 + 版本&类型 + 数据 + 长度 + CRC + 报文尾。"""
+    version_type = (RESProtocol.VERSION.value << 4) | (frame_type & 0x0F)
+    data = RESProtocol.HEADER.value + struct.pack('!BBB', device_id, life, version_type) + payload
+    data += struct.pack('!H', len(data) + 6)
+    return data + struct.pack('<H', crc16(data)) + RESProtocol.FOOTER.value
+
+
+def heartbeat_payload(location=(5, 3, 1), car_status=3, cmd_no=0, segment=0, power=None) -> bytes:
+    """心跳响应数据 (带电量时在驱动器报警之后追加电量)。"""
+    x, y, z = location
+    payload = struct.pack('!BHBBBBIBBBBI', cmd_no, 0, x, y, z, segment, 0, car_status << 4, 0, 0, 0, 0)
+    if power is not None:
+        payload += struct.pack('!B', power)
+    return payload
+
+
+class FakeCar:
+    """[测试穿梭车] 每个连接逐个读取报文并回复, 可以设置回复延迟和断开连接。"""
+
+    def __init__(self, location=(5, 3, 1), power=80):
+        self.location = location
+        self.car_status = 3
+        self.power = power
+        self.segment = 0
+        # 心跳中的任务序号
+        self.task_no = 0
+        self.received = []
+        self.connections = 0
+        # 按生命值设置的回复延迟 (秒), 用于制造乱序响应
+        self.delays = {}
+        # 回复多少个报文后断开连接
+        self.close_after = None
+        self.echo_life = True
+        self._server = None
+        self._handlers = set()
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await self._server.wait_closed()
+
+    def reply_for(self, frame: bytes) -> bytes:
+        device_id, life, version_type = frame[2], frame[3], frame[4]
+        frame_type = version_type & 0x0F
+        if not self.echo_life:
+            life = 0
+        if frame_type == FrameType.HEARTBEAT.value:
+            payload = heartbeat_payload(self.location, self.car_status, self.task_no, self.segment)
+        elif frame_type == FrameType.HEARTBEAT_WITH_BATTERY.value:
+            payload = heartbeat_payload(self.location, self.car_status, self.task_no, self.segment, self.power)
+        elif frame_type == FrameType.TASK.value:
+            payload = struct.pack('!BH', frame[5], 0)
+        else:
+            payload = struct.pack('!BHI', frame[6], 0, 0)
+        return make_frame(device_id, life, frame_type, payload)
+
+    async def _reply(self, writer, frame: bytes) -> None:
+        await asyncio.sleep(self.delays.get(frame[3], 0))
+        writer.write(self.reply_for(frame))
+        await writer.drain()
+
+    async def _handle(self, reader, writer) -> None:
+        self._handlers.add(asyncio.current_task())
+        self.connections += 1
+        buffer = bytearray()
+        replies = []
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += data
+                for frame in split_frames(buffer):
+                    self.received.append(frame)
+                    replies.append(asyncio.create_task(self._reply(writer, frame)))
+                    if self.close_after is not None and len(self.received) >= self.close_after:
+                        await asyncio.gather(*replies)
+                        self.close_after = None
+                        return
+        except (asyncio.CancelledError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
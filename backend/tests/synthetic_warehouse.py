@@ -0,0 +1,99 @@
+# tests/synthetic_warehouse.py
+# 按参数生成合成仓库地图和节点状态, 用于性能测试
+
+import json
+import random
+from typing import Dict, List, Sequence
+
+
+def generate_warehouse(
+    floors: int = 4,
+    rows: int = 7,
+    lanes: int = 5,
+    highway_columns: Sequence[int] = (4,),
+    lift_rows: Sequence[int] = (3,),
+    occupancy: float = 0.5,
+    seed: int = 0
+) -> Dict:
+    """生成合成仓库。
+
+    布局与现场地图一致: 每层有 rows 排货道, 每排沿X轴有 lanes 个格子;
+    highway_columns 指定的X列为沿Y轴贯通的主干道; 每个 lift_rows 指定的排在
+    X=lanes+1 处设一台电梯 (X=lanes 为电梯口), 电梯井连接所有楼层。
+
+    Args:
+        floors: 楼层数
+        rows: 每层排数 (Y方向)
+        lanes: 每排格子数 (X方向)
+        highway_columns: 主干道所在的X列
+        lift_rows: 电梯所在的排
+        occupancy: 货位占用比例 (0~1)
+        seed: 随机种子, 相同参数生成相同的节点状态
+
+    Returns:
+        dict: {"nodes", "edges", "node_status", "storage", "highway", "lifts"}
+    """
+    if floors < 1 or rows < 1 or lanes < 2:
+        raise ValueError("楼层数、排数必须大于0, 每排格子数必须大于1")
+    if not highway_columns or any(not 1 <= x < lanes for x in highway_columns):
+        raise ValueError(f"主干道列必须在 1~{lanes - 1} 之间")
+    if not lift_rows or any(not 1 <= y <= rows for y in lift_rows):
+        raise ValueError(f"电梯所在排必须在 1~{rows} 之间")
+    if not 0 <= occupancy <= 1:
+        raise ValueError("货位占用比例必须在 0~1 之间")
+    if lanes + 1 > 255 or rows > 255 or floors > 255:
+        raise ValueError("坐标不能超过255")
+
+    highway_columns = sorted(set(highway_columns))
+    lift_rows = sorted(set(lift_rows))
+    lift_x = lanes + 1
+
+    nodes: List[str] = []
+    edges: List[List[str]] = []
+    for z in range(1, floors + 1):
+        for x in range(1, lanes + 1):
+            for y in range(1, rows + 1):
+                nodes.append(f"{x},{y},{z}")
+        for y in range(1, rows + 1):
+            for x in range(1, lanes):
+                edges.append([f"{x},{y},{z}", f"{x + 1},{y},{z}"])
+        for x in highway_columns:
+            for y in range(1, rows):
+                edges.append([f"{x},{y},{z}", f"{x},{y + 1},{z}"])
+        for y in lift_rows:
+            nodes.append(f"{lift_x},{y},{z}")
+            edges.append([f"{lanes},{y},{z}", f"{lift_x},{y},{z}"])
+            if z > 1:
+                edges.append([f"{lift_x},{y},{z - 1}", f"{lift_x},{y},{z}"])
+
+    rng = random.Random(seed)
+    node_status: Dict[str, str] = {}
+    storage: List[str] = []
+    highway: List[str] = []
+    lifts: List[str] = []
+    for node in nodes:
+        x, y, _ = map(int, node.split(','))
+        if x == lift_x:
+            lifts.append(node)
+            node_status[node] = "lift"
+        elif x in highway_columns or (x == lanes and y in lift_rows):
+            highway.append(node)
+            node_status[node] = "highway"
+        else:
+            storage.append(node)
+            node_status[node] = "occupied" if rng.random() < occupancy else "free"
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "node_status": node_status,
+        "storage": storage,
+        "highway": highway,
+        "lifts": lifts
+    }
+
+
+def write_map_config(warehouse: Dict, config_path: str) -> None:
+    """把合成仓库写成地图配置文件 (与 map_config copy.json 格式相同)。"""
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({"nodes": warehouse["nodes"], "edges": warehouse["edges"]}, f)
@@ -0,0 +1,137 @@
+# tests/test_arrival_wait.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+import time
+
+from app.res_system import CarTelemetry
+from app.res_system.controller import ControllerAsync
+from app.res_system.telemetry import at_location
+
+from fake_car import FakeCar
+
+INTERVAL = 0.02
+
+
+async def move_later(car, delay, location=None, car_status=None, task_no=None):
+    await asyncio.sleep(delay)
+    if location is not None:
+        car.location = location
+    if car_status is not None:
+        car.car_status = car_status
+    if task_no is not None:
+        car.task_no = task_no
+
+
+def test_concurrent_waiters_share_stream():
+    """多个等待方共用一个心跳流, 到达后在一个心跳间隔内返回。"""
+    async def run():
+        car = FakeCar(location=(5, 3, 1))
+        port = await car.start()
+        telemetry = CarTelemetry("127.0.0.1", port, device_id=1, interval=INTERVAL, battery_every=0)
+        try:
+            mover = asyncio.create_task(move_later(car, 0.2, location=(1, 1, 1)))
+            start = time.perf_counter()
+            results = await asyncio.gather(*(telemetry.wait_for_location("1,1,1", timeout=2) for _ in range(20)))
+            elapsed = time.perf_counter() - start
+            await mover
+            assert all(msg["current_location"] == (1, 1, 1) for msg in results)
+            assert elapsed < 0.2 + 5 * INTERVAL
+            # 设备只收到遥测心跳, 与等待方数量无关
+            assert len(car.received) <= telemetry.stats["polls"] + 1
+            assert len(car.received) < 0.3 / INTERVAL
+            assert telemetry.state.listener_count == 0
+        finally:
+            await telemetry.stop()
+            await telemetry.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_status_timeout_and_cancel():
+    """到达位置但未就绪时不返回; 超时返回None; 取消后不再订阅。"""
+    async def run():
+        car = FakeCar(location=(1, 1, 1))
+        car.car_status = 1
+        port = await car.start()
+        telemetry = CarTelemetry("127.0.0.1", port, device_id=1, interval=INTERVAL, battery_every=0)
+        try:
+            assert await telemetry.wait_for_location("1,1,1", timeout=0.1) is None
+            assert await telemetry.wait_for(at_location("1,1,1", status=None), timeout=1) is not None
+
+            mover = asyncio.create_task(move_later(car, 0.1, car_status=3))
+            assert (await telemetry.wait_for_location("1,1,1", timeout=1))["car_status"] == 3
+            await mover
+
+            waiter = asyncio.create_task(telemetry.wait_for_location("9,9,9"))
+            await asyncio.sleep(0.05)
+            assert telemetry.state.listener_count == 1
+            waiter.cancel()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                pass
+            assert telemetry.state.listener_count == 0
+        finally:
+            await telemetry.stop()
+            await telemetry.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_wait_task_finished():
+    """心跳中的任务序号变为 N 且就绪时, 任务完成等待返回。"""
+    async def run():
+        car = FakeCar()
+        car.task_no = 4
+        port = await car.start()
+        telemetry = CarTelemetry("127.0.0.1", port, device_id=1, interval=INTERVAL, battery_every=0)
+        try:
+            mover = asyncio.create_task(move_later(car, 0.1, task_no=5))
+            assert (await telemetry.wait_for_task(5, timeout=1))["cmd_no"] == 5
+            await mover
+        finally:
+            await telemetry.stop()
+            await telemetry.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_controller_waits_for_arrival():
+    """控制器移动后等待到达, 不再固定等待2秒。"""
+    async def run():
+        car = FakeCar(location=(5, 3, 1))
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        controller.telemetry.interval = INTERVAL
+        try:
+            assert await controller.car_move(1, "1,1,1")
+            mover = asyncio.create_task(move_later(car, 0.1, location=(1, 1, 1)))
+            start = time.perf_counter()
+            assert await controller.wait_car_move_complete_by_location("1,1,1", TIMEOUT=2)
+            assert time.perf_counter() - start < 0.5
+            await mover
+            assert not await controller.wait_car_move_complete_by_location("2,5,1", TIMEOUT=0.1)
+            assert car.connections == 1
+        finally:
+            await controller.telemetry.stop()
+            await controller.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def main():
+    test_concurrent_waiters_share_stream()
+    test_status_timeout_and_cancel()
+    test_wait_task_finished()
+    test_controller_waits_for_arrival()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# tests/test_car_fleet.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+import time
+
+from app.api.v2.wcs.services import FleetServices
+from app.res_system import CarConfig, CarFleet, car_id_for
+from app.res_system.fleet import load_fleet_config
+from app.res_system.simulator import ShuttleSimulator
+
+INTERVAL = 0.02
+
+
+async def start_fleet(simulators, **kwargs) -> CarFleet:
+    """启动模拟穿梭车, 按端口创建车队并等待每台穿梭车的第一个心跳。"""
+    configs = []
+    for car_id, car in enumerate(simulators, 1):
+        port = await car.start()
+        configs.append(CarConfig(car_id, "127.0.0.1", port))
+    fleet = CarFleet(configs, **kwargs)
+    for car in fleet.cars.values():
+        car.telemetry.interval = INTERVAL
+    fleet.start_telemetry()
+    for car in fleet.cars.values():
+        assert await car.telemetry.wait_for(lambda msg: True, timeout=2) is not None
+    return fleet
+
+
+async def stop_fleet(fleet, simulators) -> None:
+    await fleet.close()
+    for car in simulators:
+        await car.stop()
+
+
+def test_fleet_config():
+    """设备ID来自车队配置, 重复配置报错。"""
+    configs = load_fleet_config()
+    assert [config.car_id for config in configs] == [1, 2]
+    assert car_id_for("192.168.8.20") == 1 and car_id_for("192.168.8.30", 2504) == 2
+    assert car_id_for("192.168.8.30", 9999) == 0 and car_id_for("10.0.0.1") == 0
+    try:
+        load_fleet_config([{"car_id": 1, "host": "a"}, {"car_id": 1, "host": "b"}])
+    except ValueError:
+        pass
+    else:
+        assert False, "重复的设备ID应报错"
+
+
+def test_select_by_floor_distance_power():
+    """同层优先, 其次距离近, 再次电量高; 电量不足或执行中的穿梭车不参与选择。"""
+    async def run():
+        simulators = [
+            ShuttleSimulator(location=(1, 1, 1), power=90),
+            ShuttleSimulator(location=(4, 3, 1), power=50),
+            ShuttleSimulator(location=(4, 3, 2), power=100),
+            ShuttleSimulator(location=(4, 2, 1), power=10),
+        ]
+        fleet = await start_fleet(simulators, min_power=20)
+        try:
+            assert fleet.select("5,3,1").car_id == 2
+            assert fleet.select("2,1,1").car_id == 1
+            assert fleet.select("5,3,2").car_id == 3
+            # 第4台电量不足
+            assert [car.car_id for _, car in fleet.rank("4,2,1")] == [2, 1, 3]
+            assert [car.car_id for _, car in fleet.rank("4,2,1", same_floor=True)] == [2, 1]
+
+            # 距离相同时电量高的优先
+            simulators[1].location = (1, 2, 1)
+            await fleet.get(2).telemetry.wait_for(lambda msg: msg["current_location"] == (1, 2, 1), timeout=1)
+            assert fleet.select("1,3,1").car_id == 2
+            simulators[0].location = (1, 4, 1)
+            await fleet.get(1).telemetry.wait_for(lambda msg: msg["current_location"] == (1, 4, 1), timeout=1)
+            assert fleet.select("1,3,1").car_id == 1
+
+            async with fleet.dispatch("1,3,1") as car:
+                assert car.car_id == 1 and car.busy
+                assert fleet.select("1,3,1").car_id == 2
+                assert fleet.status()["cars"][0]["job"] == "1,3,1"
+            assert fleet.get(1).jobs_done == 1 and not fleet.get(1).busy
+        finally:
+            await stop_fleet(fleet, simulators)
+
+    asyncio.run(run())
+
+
+def test_dispatch_waits_and_times_out():
+    """没有空闲穿梭车时等待其他作业结束, 超时得到None。"""
+    async def run():
+        simulators = [ShuttleSimulator(location=(1, 1, 1))]
+        fleet = await start_fleet(simulators)
+        try:
+            async with fleet.dispatch("2,1,1", timeout=0.1) as first:
+                assert first is not None
+                async with fleet.dispatch("2,1,1", timeout=0.1) as second:
+                    assert second is None
+
+            async def hold():
+                async with fleet.dispatch("2,1,1") as car:
+                    await asyncio.sleep(0.2)
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            async with fleet.dispatch("2,1,1", timeout=2) as car:
+                # 作业结束时立即唤醒等待方, 不等到下一次检查
+                assert car is not None and time.perf_counter() - start < 0.3
+            await holder
+            assert fleet.stats["timeouts"] == 1 and fleet.stats["dispatched"] == 3
+        finally:
+            await stop_fleet(fleet, simulators)
+
+    asyncio.run(run())
+
+
+def test_jobs_run_concurrently_on_different_cars():
+    """两台穿梭车的同层作业并发执行, 总耗时接近单个作业。"""
+    async def run():
+        simulators = [
+            ShuttleSimulator(location=(1, 1, 1), speed=10, turn_time=0.02, action_time=0.05),
+            ShuttleSimulator(location=(6, 3, 1), speed=10, turn_time=0.02, action_time=0.05),
+        ]
+        fleet = await start_fleet(simulators)
+        services = FleetServices(fleet)
+        try:
+            # 控制器第一次使用时加载地图, 不计入耗时
+            for car in fleet.cars.values():
+                car.controller
+            start = time.perf_counter()
+            single = await services.car_move("2,1,1", timeout=1)
+            one_cell = time.perf_counter() - start
+            assert single == (True, {"car_id": 1, "location": "2,1,1"})
+
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                services.car_move("3,1,1", timeout=1),
+                services.car_move("5,3,1", timeout=1),
+            )
+            elapsed = time.perf_counter() - start
+            assert sorted(result[1]["car_id"] for result in results) == [1, 2]
+            assert all(success for success, _ in results)
+            # 两个作业各走1格, 并发时不是顺序执行的两倍
+            assert elapsed < 2 * one_cell
+
+            success, info = await services.good_move("5,3,1", "6,3,1", timeout=1)
+            assert success and info["car_id"] == 2
+            assert simulators[1].location == (6, 3, 1) and simulators[1].have_pallet == 0
+
+            assert not (await services.good_move("5,3,1", "5,3,2"))[0]
+            assert not (await services.car_move("5,3,3", timeout=0.05))[0]
+            status = services.get_fleet_status()[1]
+            assert [car["jobs_done"] for car in status["cars"]] == [2, 2]
+        finally:
+            await stop_fleet(fleet, simulators)
+
+    asyncio.run(run())
+
+
+def test_route_conflicts_and_unavailable():
+    """路线经过其他穿梭车的位置时不分派; 单车服务占用的穿梭车不参与分派; 楼层没有在线穿梭车时立即返回。"""
+    async def run():
+        simulators = [
+            ShuttleSimulator(location=(1, 1, 1), speed=20, turn_time=0.02),
+            ShuttleSimulator(location=(4, 3, 1), speed=20, turn_time=0.02),
+        ]
+        fleet = await start_fleet(simulators)
+        services = FleetServices(fleet)
+        try:
+            for car in fleet.cars.values():
+                car.controller
+            # 1,1,1 -> 4,7,1 经过停在 4,3,1 的穿梭车2
+            async with fleet.hold(fleet.get(2), "charge"):
+                success, message = await services.car_move("4,7,1", timeout=0.1)
+                assert not success and "4,3,1" in message
+                assert fleet.stats["conflicts"] >= 1 and fleet.stats["timeouts"] == 1
+
+            # 作业期间预留路线, 显示在车队状态中
+            async with fleet.dispatch("4,7,1", timeout=1, route=FleetServices._route("4,7,1")) as car:
+                assert car.car_id == 2 and "4,5,1" in fleet.status()["cars"][1]["route"]
+                assert fleet.conflicts(fleet.get(1), ["2,1,1", "4,5,1"]) is not None
+            assert fleet.get(2).route == set()
+
+            # 单车设备服务占用穿梭车时不等待, 也不参与分派
+            assert await fleet.try_hold(fleet.get(1), "device_task")
+            assert not await fleet.try_hold(fleet.get(1), "device_task")
+            assert fleet.select("2,1,1").car_id == 2
+            fleet.release(fleet.get(1))
+            assert fleet.select("2,1,1").car_id == 1
+
+            start = time.perf_counter()
+            assert not (await services.car_move("5,3,3"))[0]
+            assert time.perf_counter() - start < 0.5 and fleet.stats["unavailable"] == 1
+        finally:
+            await stop_fleet(fleet, simulators)
+
+    asyncio.run(run())
+
+
+def main():
+    test_fleet_config()
+    test_select_by_floor_distance_power()
+    test_dispatch_waits_and_times_out()
+    test_jobs_run_concurrently_on_different_cars()
+    test_route_conflicts_and_unavailable()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# tests/test_car_session.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+
+from app.res_system import PacketBuilder, PacketParser
+from app.res_system.connection import CarSession
+from app.res_system.connection.session_async import split_frames
+from app.res_system.controller import ControllerAsync
+
+from fake_car import FakeCar, heartbeat_payload, make_frame
+
+
+def test_split_frames():
+    """粘包、拆包和报文前的无效数据都能正确拆分。"""
+    first = make_frame(1, 7, 0, heartbeat_payload())
+    second = make_frame(1, 8, 2, b"\x01\x00\x00\x00\x00\x00\x00")
+    buffer = bytearray(b"\xff\x00" + first + second[:5])
+    assert split_frames(buffer) == [first]
+    assert bytes(buffer) == second[:5]
+    buffer += second[5:]
+    assert split_frames(buffer) == [second]
+    assert buffer == bytearray()
+
+    # CRC错误的报文不会被当作完整报文
+    broken = bytearray(first)
+    broken[8] ^= 0xFF
+    buffer = bytearray(broken)
+    assert split_frames(buffer) == []
+
+
+def test_concurrent_requests_share_connection():
+    """多个并发请求共用一个连接, 乱序响应按生命值匹配。"""
+    async def run():
+        car = FakeCar()
+        port = await car.start()
+        session = CarSession("127.0.0.1", port)
+        builder = PacketBuilder(1)
+        parser = PacketParser()
+        try:
+            packets = [builder.heartbeat() for _ in range(5)]
+            # 先发的请求最后回复
+            for i, packet in enumerate(packets):
+                car.delays[packet[3]] = 0.05 * (len(packets) - i)
+            responses = await asyncio.gather(*(session.request(packet) for packet in packets))
+            for packet, response in zip(packets, responses):
+                assert parser.parse_header(response)["life"] == packet[3]
+            assert car.connections == 1 and session.stats["responses"] == 5
+
+            # 后续请求不再建立连接
+            await session.request(builder.heartbeat())
+            assert car.connections == 1
+        finally:
+            await session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_transparent_reconnect():
+    """穿梭车断开连接后, 下一次请求自动重连。"""
+    async def run():
+        car = FakeCar()
+        port = await car.start()
+        session = CarSession("127.0.0.1", port, request_timeout=1.0)
+        builder = PacketBuilder(1)
+        try:
+            car.close_after = 1
+            assert await session.request(builder.heartbeat())
+            await asyncio.sleep(0.05)
+            assert await session.request(builder.heartbeat())
+            assert car.connections == 2 and session.stats["connects"] == 2
+        finally:
+            await session.close()
+            await car.stop()
+
+        # 连接失败时返回None
+        assert await session.request(builder.heartbeat()) is None
+
+    asyncio.run(run())
+
+
+def test_response_without_life_echo():
+    """固件不回显生命值时, 响应交给同类型最早的请求; 默认 (回显生命值) 不按类型匹配。"""
+    async def run():
+        car = FakeCar()
+        car.echo_life = False
+        port = await car.start()
+        session = CarSession("127.0.0.1", port, request_timeout=1.0, echo_life=False)
+        strict = CarSession("127.0.0.1", port, request_timeout=0.2, echo_life=True)
+        try:
+            assert await session.request(PacketBuilder(1).heartbeat())
+            assert session.stats["unmatched"] == 0
+            assert await strict.request(PacketBuilder(1).heartbeat()) is None
+            assert strict.stats["unmatched"] == 1
+        finally:
+            await session.close()
+            await strict.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_late_response_dropped():
+    """超时请求的迟到响应被丢弃, 不交给后来的同类型请求。"""
+    async def run():
+        for echo_life in (True, False):
+            car = FakeCar()
+            car.echo_life = echo_life
+            port = await car.start()
+            session = CarSession("127.0.0.1", port, request_timeout=1.0, echo_life=echo_life)
+            builder = PacketBuilder(1)
+            first, second = builder.heartbeat(), builder.heartbeat()
+            car.delays = {first[3]: 0.3, second[3]: 0.3}
+            try:
+                assert await session.request(first, timeout=0.1) is None
+                response = await session.request(second)
+                # 第一个请求的响应在0.3秒时迟到, 第二个请求的响应在0.4秒时到达
+                assert response is not None and session.stats["late"] == 1
+                if echo_life:
+                    assert response[3] == second[3]
+            finally:
+                await session.close()
+                await car.stop()
+
+    asyncio.run(run())
+
+
+def test_controller_uses_session():
+    """控制器的状态查询和移动任务都经过同一个长连接。"""
+    async def run():
+        car = FakeCar(location=(5, 3, 1))
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        try:
+            assert await controller.car_current_location() == "5,3,1"
+            assert (await controller.car_status())["car_status"] == 3
+            assert await controller.car_power() == 80
+            assert await controller.car_move(1, "1,1,1")
+            assert await controller.good_move(2, "1,1,1")
+            assert await controller.change_car_location(3, "5,3,1")
+            assert car.connections == 1
+            frame_types = [frame[4] & 0x0F for frame in car.received]
+            # car_move: 心跳 + 任务 + 确认执行
+            assert frame_types[3:6] == [0, 1, 2]
+        finally:
+            await controller.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def main():
+    test_split_frames()
+    test_concurrent_requests_share_connection()
+    test_transparent_reconnect()
+    test_response_without_life_echo()
+    test_late_response_dropped()
+    test_controller_uses_session()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
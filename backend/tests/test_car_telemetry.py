@@ -0,0 +1,123 @@
+# tests/test_car_telemetry.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import settings
+from app.res_system import CarStateCache, CarTelemetry, PacketParser, get_car_state
+from app.res_system.controller import ControllerAsync, ControllerBase
+
+from fake_car import FakeCar, heartbeat_payload, make_frame
+
+
+def parsed_heartbeat(location=(4, 1, 1), car_status=3, power=None):
+    parser = PacketParser()
+    if power is None:
+        return parser.parse_heartbeat_response(make_frame(1, 1, 0, heartbeat_payload(location, car_status)))
+    return parser.parse_hb_power_response(make_frame(1, 1, 10, heartbeat_payload(location, car_status, power=power)))
+
+
+def test_state_cache_max_age():
+    """缓存按最大时效返回, 解析失败的结果不写入。"""
+    state = CarStateCache()
+    assert state.heartbeat() is None and state.age() is None
+    state.publish({"car_status": "error", "message": "无数据"})
+    assert state.heartbeat() is None
+
+    state.publish(parsed_heartbeat())
+    assert state.heartbeat(10)["current_location"] == (4, 1, 1)
+    assert state.power() is None and state.power_info() is None
+    time.sleep(0.02)
+    assert state.heartbeat(0.01) is None
+    assert state.heartbeat() is not None
+
+    state.publish(parsed_heartbeat(location=(5, 3, 1), power=66))
+    assert state.power(10) == 66
+    assert state.power_info(10)["current_location"] == (5, 3, 1)
+
+
+def test_background_telemetry():
+    """后台遥测定时写入缓存, 电量心跳按设定的比例发送。"""
+    async def run():
+        car = FakeCar(location=(6, 3, 2), power=55)
+        port = await car.start()
+        telemetry = CarTelemetry("127.0.0.1", port, device_id=1, interval=0.01, battery_every=4)
+        try:
+            telemetry.start()
+            await asyncio.sleep(0.3)
+            await telemetry.stop()
+            assert not telemetry.running
+            assert telemetry.state.heartbeat(1)["current_location"] == (6, 3, 2)
+            assert telemetry.state.power(1) == 55
+            battery = sum(1 for frame in car.received if frame[4] & 0x0F == 10)
+            assert 0 < battery < len(car.received) / 2
+            assert telemetry.stats["failures"] == 0
+        finally:
+            await telemetry.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_controller_reads_cache():
+    """控制器在缓存有效时不访问设备, 缓存过期或不接受缓存时发送心跳。"""
+    async def run():
+        car = FakeCar(location=(5, 3, 1), power=70)
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        try:
+            assert await controller.car_current_location() == "5,3,1"
+            sent = len(car.received)
+            assert await controller.car_current_location(max_age=5) == "5,3,1"
+            assert (await controller.car_status(max_age=5))["car_status"] == 3
+            assert len(car.received) == sent
+
+            car.location = (4, 1, 1)
+            assert await controller.car_current_location() == "4,1,1"
+            assert await controller.car_power(max_age=5) == 70
+            assert await controller.car_power(max_age=5) == 70
+            assert len(car.received) == sent + 2
+        finally:
+            await controller.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_sync_controller_reads_cache():
+    """同步控制器共用状态缓存, 命中时不建立连接。"""
+    get_car_state("127.0.0.1", 9).publish(parsed_heartbeat(location=(2, 5, 1), power=90))
+    controller = ControllerBase("127.0.0.1", 9)
+    assert controller.car_current_location(max_age=5) == "2,5,1"
+    assert controller.car_status(max_age=5)["car_status"] == 3
+    assert controller.car_power(max_age=5)["power"] == 90
+    assert not controller.is_connected()
+
+
+def test_car_routes_read_cache():
+    """状态查询接口直接返回缓存的状态。"""
+    get_car_state(settings.CAR_IP, settings.CAR_PORT).publish(parsed_heartbeat(location=(1, 1, 1), power=45))
+    client = TestClient(app)
+    response = client.get("/api/v2/wcs/control/get_car_location", params={"max_age": 60})
+    assert response.json()["data"] == "1,1,1"
+    response = client.get("/api/v2/wcs/control/get_car_info_with_power", params={"max_age": 60})
+    assert response.json()["data"]["power"] == 45
+    assert client.get("/api/v2/wcs/control/get_car_status", params={"max_age": -1}).status_code == 422
+
+
+def main():
+    test_state_cache_max_age()
+    test_background_telemetry()
+    test_controller_reads_cache()
+    test_sync_controller_reads_cache()
+    test_car_routes_read_cache()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# tests/test_charge_scheduler.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+
+from app.api.v2.wcs.services import ChargingServices
+from app.res_system import CarConfig, CarFleet, ChargeScheduler, DischargeModel
+from app.res_system.charging import CarBattery
+from app.res_system.simulator import ShuttleSimulator
+
+INTERVAL = 0.02
+
+
+def test_discharge_model():
+    """单一作业时为观测速率的滑动平均; 混合作业时按时长分摊, 各类型速率分别收敛。"""
+    model = DischargeModel(prior={"default": 0.0})
+    for _ in range(50):
+        model.update({"car_move": 10.0}, 1.0)
+    assert abs(model.rate("car_move") - 0.1) < 1e-3
+
+    model = DischargeModel(prior={"idle": 0.0, "default": 0.0})
+    for _ in range(300):
+        model.update({"idle": 100.0}, 0.1)
+        model.update({"idle": 50.0, "good_move": 50.0}, 0.05 + 1.0)
+    assert abs(model.rate("idle") - 0.001) < 2e-4
+    assert abs(model.rate("good_move") - 0.02) < 1e-3
+    # 预测速率按观测时长加权: 每轮 idle 150 秒, good_move 50 秒
+    expected = (150 * model.rate("idle") + 50 * model.rate("good_move")) / 200
+    assert abs(model.expected_rate() - expected) < 1e-9
+
+    # 充电时长不计入, 没有样本的类型使用默认速率
+    model.update({"charge": 10.0}, 5.0)
+    assert model.samples.get("charge") is None and model.rate("task") == 0.0
+
+
+def test_battery_samples_between_drops():
+    """第一次读数和充电后的第一次下降不作为样本, 之后每次下降按作业时长加入样本。"""
+    model = DischargeModel(prior={"default": 0.0}, alpha=1.0)
+    battery = CarBattery()
+    battery.observe("idle", 80, 0.0, model)
+    battery.observe("car_move", 80, 10.0, model)
+    battery.observe("car_move", 79, 20.0, model)
+    assert not model.samples
+    battery.observe("car_move", 79, 30.0, model)
+    battery.observe("idle", 78, 40.0, model)
+    assert model.samples == {"car_move": 1} and abs(model.rate("car_move") - 0.05) < 1e-9
+
+    battery.observe("charge", 78, 50.0, model)
+    battery.observe("idle", 90, 60.0, model)
+    battery.observe("idle", 89, 70.0, model)
+    battery.observe("idle", 88, 80.0, model)
+    assert model.samples == {"car_move": 1, "idle": 1}
+
+
+async def start_fleet(simulators):
+    configs = []
+    for car_id, car in enumerate(simulators, 1):
+        configs.append(CarConfig(car_id, "127.0.0.1", await car.start()))
+    fleet = CarFleet(configs)
+    for car in fleet.cars.values():
+        car.telemetry.interval = INTERVAL
+        car.telemetry.battery_every = 1
+    fleet.start_telemetry()
+    for car in fleet.cars.values():
+        assert await car.telemetry.wait_for(lambda msg: True, timeout=2) is not None
+    return fleet
+
+
+async def wait_power(car, predicate, timeout=3.0):
+    """等待遥测中的电量满足条件。"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        power = car.state.power()
+        if power is not None and predicate(power):
+            return power
+        await asyncio.sleep(INTERVAL)
+    raise AssertionError(f"穿梭车 {car.car_id} 电量 {car.state.power()} 未满足条件")
+
+
+def test_charge_decisions():
+    """预计电量不足时趁空闲充电, 有任务等待时推迟或提前结束充电; 电量危急时不等空闲。"""
+    async def run():
+        simulators = [
+            ShuttleSimulator(location=(3, 1, 1), speed=20, turn_time=0.02, power=50, charge_rate=20),
+            ShuttleSimulator(location=(4, 3, 2), speed=20, turn_time=0.02, power=100, charge_rate=60),
+            ShuttleSimulator(location=(2, 2, 3), power=22),
+        ]
+        fleet = await start_fleet(simulators)
+        for car in fleet.cars.values():
+            car.controller
+        # 放电 1%/秒: 电量50预计30秒后降到20%, 电量100需要80秒
+        scheduler = ChargeScheduler(
+            fleet, DischargeModel(prior={"default": 1.0}), critical=25, horizon=50,
+            idle_gap=0, target=95, release=60, chargers={1: "1,1,1", 2: "1,1,2"}
+        )
+        queue = {"waiting": 0}
+        scheduler.add_queue_source("test", lambda: queue["waiting"])
+        services = ChargingServices(scheduler)
+        try:
+            def rules(decisions):
+                return [decision["rule"] for decision in decisions]
+
+            queue["waiting"] = 1
+            assert rules(await scheduler.check(act=False)) == ["deferred", "enough", "no_charger"]
+            queue["waiting"] = 0
+            async with fleet.hold(fleet.get(1), "good_move 3,1,1->5,3,1"):
+                assert rules(await scheduler.check(act=False))[0] == "busy"
+
+            # 趁空闲充电: 前往本层充电口并开始充电, 期间车队不分派
+            decisions = await scheduler.check()
+            assert decisions[0]["action"] == "charge" and decisions[0]["rule"] == "opportunistic"
+            assert "趁任务空闲" in decisions[0]["reason"] and decisions[0]["charger"] == "1,1,1"
+            battery = scheduler.battery(1)
+            while not simulators[0].charging:
+                await asyncio.sleep(INTERVAL)
+            assert simulators[0].location == (1, 1, 1) and fleet.get(1).busy
+            assert fleet.select("2,1,1", same_floor=True) is None
+            assert rules(await scheduler.check())[0] == "charging"
+
+            # 有任务等待且电量到 release 时结束充电
+            queue["waiting"] = 1
+            await wait_power(fleet.get(1), lambda power: power >= 60)
+            decisions = await scheduler.check()
+            assert decisions[0]["action"] == "stop" and decisions[0]["rule"] == "released"
+            await battery.charge_task
+            assert not simulators[0].charging and not fleet.get(1).busy
+            assert fleet.select("2,1,1", same_floor=True).car_id == 1
+
+            # 电量危急时不等任务空闲
+            simulators[1].power = 22
+            await wait_power(fleet.get(2), lambda power: power == 22)
+            decisions = await scheduler.check()
+            assert decisions[1]["rule"] == "critical" and decisions[1]["charger"] == "1,1,2"
+            while not simulators[1].charging:
+                await asyncio.sleep(INTERVAL)
+            await wait_power(fleet.get(2), lambda power: power >= 95)
+            assert rules(await scheduler.check())[1] == "charged"
+            await scheduler.battery(2).charge_task
+            assert simulators[1].location == (1, 1, 2)
+
+            success, explain = services.explain()
+            assert success and [decision["car_id"] for decision in explain["cars"]] == [1, 2, 3]
+            assert [(record["car_id"], record["rule"], record["result"]) for record in explain["log"]] == [
+                (1, "opportunistic", "completed"), (2, "critical", "completed")]
+            assert explain["stats"]["opportunistic"] == 1 and explain["stats"]["released"] == 1
+            assert explain["queue"] == {"fleet": 0, "test": 1}
+            assert services.explain(2)[1]["log"][0]["start_power"] == 22
+            assert not services.explain(9)[0]
+        finally:
+            await scheduler.stop()
+            await fleet.close()
+            for car in simulators:
+                await car.stop()
+
+    asyncio.run(run())
+
+
+def test_charge_guards():
+    """单车服务占用、停在电梯内或前往充电口的路线经过其他穿梭车时, 电量危急也不送去充电。"""
+    async def run():
+        simulators = [
+            ShuttleSimulator(location=(6, 3, 1), power=20),
+            ShuttleSimulator(location=(3, 1, 2), power=20),
+            ShuttleSimulator(location=(2, 1, 2), power=100),
+        ]
+        fleet = await start_fleet(simulators)
+        for car in fleet.cars.values():
+            car.controller
+        scheduler = ChargeScheduler(
+            fleet, DischargeModel(prior={"default": 1.0}), critical=25, horizon=50,
+            idle_gap=0, chargers={1: "1,1,1", 2: "1,1,2"}
+        )
+        try:
+            decisions = await scheduler.check(act=False)
+            assert [decision["rule"] for decision in decisions] == ["in_lift", "route_conflict", "enough"]
+            assert "2,1,2" in decisions[1]["reason"]
+
+            # 单车设备服务占用穿梭车时视为执行作业
+            assert await fleet.try_hold(fleet.get(2), "device_task")
+            assert (await scheduler.check(act=False))[1]["rule"] == "busy"
+            fleet.release(fleet.get(2))
+
+            simulators[2].location = (2, 2, 2)
+            await fleet.get(3).telemetry.wait_for(lambda msg: msg["current_location"] == (2, 2, 2), timeout=1)
+            decision = (await scheduler.check(act=False))[1]
+            assert decision["action"] == "charge" and decision["route"] == ["3,1,2", "2,1,2", "1,1,2"]
+
+            # 默认后台只记录决策, 操作员开启自动充电后才送去充电
+            services = ChargingServices(scheduler)
+            scheduler.interval = INTERVAL
+            scheduler.start()
+            await asyncio.sleep(5 * INTERVAL)
+            explain = services.explain(2)[1]
+            assert not explain["auto"] and explain["cars"][0]["action"] == "charge"
+            assert not simulators[1].charging and not fleet.get(2).busy
+            assert services.set_auto(True) == (True, {"auto": True})
+            while not simulators[1].charging:
+                await asyncio.sleep(INTERVAL)
+            assert simulators[1].location == (1, 1, 2)
+        finally:
+            await scheduler.stop()
+            await fleet.close()
+            for car in simulators:
+                await car.stop()
+
+    asyncio.run(run())
+
+
+def main():
+    test_discharge_model()
+    test_battery_samples_between_drops()
+    test_charge_decisions()
+    test_charge_guards()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
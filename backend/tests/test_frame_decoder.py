@@ -0,0 +1,101 @@
+# tests/test_frame_decoder.py
+from sys_path import setup_path
+setup_path()
+
+import random
+import socket
+import threading
+
+from app.res_system import FrameDecoder, PacketBuilder, PacketParser, parse_frame
+from app.res_system.connection import ConnectionBase
+from app.res_system.frame_decoder import CommandRecord, HeartbeatRecord, RawFrame, TaskRecord
+
+from fake_car import heartbeat_payload, make_frame
+
+HEARTBEAT = make_frame(1, 7, 0, heartbeat_payload((4, 1, 2), car_status=3, cmd_no=9, segment=2))
+POWER = make_frame(1, 8, 10, heartbeat_payload((5, 3, 1), power=66))
+TASK = make_frame(1, 9, 1, b"\x05\x00\x01")
+COMMAND = make_frame(1, 10, 2, b"\x06\x00\x02\x00\x00\x00\x07")
+FRAMES = [HEARTBEAT, POWER, TASK, COMMAND]
+
+
+def test_records_match_packet_parser():
+    """类型化记录与 PacketParser 的解析结果一致。"""
+    parser = PacketParser()
+    heartbeat, power, task, command = FrameDecoder().feed(b"".join(FRAMES))
+    assert isinstance(heartbeat, HeartbeatRecord) and heartbeat.current_location == (4, 1, 2)
+    assert heartbeat.as_dict() == parser.parse_heartbeat_response(HEARTBEAT)
+    assert power.power == 66 and power.as_dict() == parser.parse_hb_power_response(POWER)
+    assert isinstance(task, TaskRecord) and task.as_dict() == parser.parse_task_response(TASK)
+    assert isinstance(command, CommandRecord) and command.as_dict() == parser.parse_command_response(COMMAND)
+    assert parse_frame(HEARTBEAT) == heartbeat
+
+
+def test_split_and_coalesced_segments():
+    """任意切分的数据流 (粘包、拆包) 都能还原出原报文。"""
+    stream = b"".join(FRAMES * 50)
+    rng = random.Random(1)
+    decoder = FrameDecoder(capacity=64)
+    frames = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, 90)
+        frames += decoder.feed_frames(stream[pos:pos + size])
+        pos += size
+    assert frames == FRAMES * 50
+    assert decoder.pending == 0 and decoder.stats["discarded"] == 0
+
+
+def test_garbage_crc_and_request_frames():
+    """报文前的无效数据被丢弃, CRC错误的报文不输出, 变长的请求报文按报文尾拆分。"""
+    broken = bytearray(HEARTBEAT)
+    broken[8] ^= 0xFF
+    request = PacketBuilder(1).heartbeat()
+    decoder = FrameDecoder()
+    records = decoder.feed(b"\xff\x00\x02" + bytes(broken) + request + TASK)
+    assert [type(record) for record in records] == [RawFrame, TaskRecord]
+    assert records[0].data == request and records[0].frame_type == 0
+    assert decoder.stats["crc_errors"] == 1 and decoder.stats["discarded"] >= 3
+
+    # 报文头的第一个字节在数据末尾时保留
+    assert decoder.feed(b"\x00\x00" + COMMAND[:1]) == []
+    assert decoder.feed(COMMAND[1:]) == [parse_frame(COMMAND)]
+
+
+def test_sync_connection_reassembles():
+    """同步连接拆包时等待报文完整, 粘包时逐个返回。"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        conn.sendall(HEARTBEAT[:7])
+        threading.Event().wait(0.05)
+        conn.sendall(HEARTBEAT[7:] + TASK + COMMAND)
+        threading.Event().wait(0.2)
+        conn.close()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    connection = ConnectionBase("127.0.0.1", server.getsockname()[1])
+    try:
+        assert connection.connect(retry_count=1)
+        assert [connection.receive_message(timeout=1) for _ in range(3)] == [HEARTBEAT, TASK, COMMAND]
+        assert connection.receive_message(timeout=0.05) == b"\x00"
+    finally:
+        connection.close()
+        thread.join()
+        server.close()
+
+
+def main():
+    test_records_match_packet_parser()
+    test_split_and_coalesced_segments()
+    test_garbage_crc_and_request_frames()
+    test_sync_connection_reassembles()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# tests/test_journey_planner.py
+from sys_path import setup_path
+setup_path()
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.map_core import PathCustom, TravelProfile
+
+
+def test_cross_layer_legs():
+    """跨层行程按 电梯口 -> 电梯 -> 升降 -> 目标层 拆分, 与现有跨层流程一致。"""
+    path_custom = PathCustom()
+    journey = path_custom.plan_journey("1,1,1", "8,7,3", lift_floor=1)
+    assert journey["path"] == path_custom.find_shortest_path("1,1,1", "8,7,3")
+    assert [leg["type"] for leg in journey["legs"]] == ["car", "car", "lift", "car"]
+
+    to_gate, enter, lift, after = journey["legs"]
+    assert to_gate["path"][0] == "1,1,1" and to_gate["path"][-1] == "5,3,1"
+    assert enter["path"] == ["5,3,1", "6,3,1"]
+    assert (lift["from_layer"], lift["to_layer"]) == (1, 3)
+    assert (lift["entry"], lift["exit"]) == ("6,3,1", "6,3,3")
+    assert after["path"][0] == "6,3,3" and after["path"][-1] == "8,7,3"
+    assert after["segments"][-1] == (8, 7, 3, 0)
+    assert journey["handover_points"] == [{"layer": 1, "wait_point": "5,3,1", "lift_point": "6,3,1"}]
+
+    # 各段首尾相接, 总时间为各段之和
+    t = 0.0
+    for leg in journey["legs"]:
+        assert leg["start"] == t
+        t += leg["duration"]
+    assert journey["total_time"] == t
+
+
+def test_lift_wait():
+    """电梯在远处或队列繁忙时需要等待, 等待时间计入总时间。"""
+    profile = TravelProfile()
+    path_custom = PathCustom(travel_profile=profile)
+    ready = path_custom.plan_journey("1,1,1", "8,7,3", lift_floor=1)
+    assert ready["lift_wait"] == 0.0
+
+    busy = path_custom.plan_journey("1,1,1", "8,7,3", lift_floor=4, lift_queue=1)
+    arrive_gate = busy["legs"][2]["start"]
+    expected_wait = profile.lift_queue_time + 3 * profile.lift_time - arrive_gate
+    assert busy["lift_wait"] == expected_wait
+    assert busy["total_time"] == ready["total_time"] + expected_wait
+
+
+def test_depart_delay_absorbed_by_lift_wait():
+    """电梯未就绪时, 穿梭车晚出发不会推迟到达时间, 调度器可据此比较 "立即出发" 与 "等待"。"""
+    path_custom = PathCustom()
+    now = path_custom.plan_journey("1,1,1", "8,7,3", lift_floor=4, lift_queue=2)
+    later = path_custom.plan_journey("1,1,1", "8,7,3", lift_floor=4, lift_queue=2, depart_delay=now["lift_wait"])
+    assert later["total_time"] == now["total_time"]
+    assert later["lift_wait"] == 0.0
+
+
+def test_same_layer_journey():
+    """同层行程只有穿梭车段, 估算时间与行驶时间估算一致。"""
+    path_custom = PathCustom()
+    journey = path_custom.plan_journey("1,3,1", "8,7,1", lift_floor=4, lift_queue=3)
+    assert [leg["type"] for leg in journey["legs"]] == ["car"]
+    assert journey["handover_points"] == [] and journey["lift_wait"] == 0.0
+    assert journey["legs"][0]["segments"] == path_custom.build_segments("1,3,1", "8,7,1")
+    assert journey["total_time"] == path_custom.plan_journey("1,3,1", "8,7,1")["total_time"]
+
+
+def test_journey_endpoint():
+    """跨层行程接口。"""
+    client = TestClient(app)
+    response = client.post("/api/v2/wcs/create/journey", json={
+        "source": "1,1,1", "target": "8,7,3", "lift_floor": 2, "lift_queue": 0
+    })
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["path"][-1] == "8,7,3"
+    assert len(data["handover_points"]) == 1
+
+    response = client.post("/api/v2/wcs/create/journey", json={"source": "1,1,1", "target": "9,9,9"})
+    assert response.json()["success"] is False
+
+
+def main():
+    test_cross_layer_legs()
+    test_lift_wait()
+    test_depart_delay_absorbed_by_lift_wait()
+    test_same_layer_journey()
+    test_journey_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tests/test_least_blocking.py
+from sys_path import setup_path
+setup_path()
+
+import json
+import os
+import shutil
+import tempfile
+
+from app.map_core import PathCustom
+
+
+def write_map(tmp_dir, nodes, edges):
+    """写入临时地图配置文件。"""
+    config_path = os.path.join(tmp_dir, "map.json")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({"nodes": nodes, "edges": edges}, f)
+    return config_path
+
+
+def test_avoids_blockers_on_loop_map():
+    """存在绕行路线时, 选择阻塞更少的路线。"""
+    # 1,1 -> 3,1: 直行经过 2,1 (有货); 绕行 1,2 -> 2,2 -> 3,2 (无货)
+    nodes = ["1,1,1", "2,1,1", "3,1,1", "1,2,1", "2,2,1", "3,2,1"]
+    edges = [
+        ["1,1,1", "2,1,1"], ["2,1,1", "3,1,1"],
+        ["1,1,1", "1,2,1"], ["1,2,1", "2,2,1"], ["2,2,1", "3,2,1"], ["3,2,1", "3,1,1"],
+    ]
+    node_status = {"1,1,1": "free", "2,1,1": "occupied", "3,1,1": "occupied",
+                   "1,2,1": "free", "2,2,1": "free", "3,2,1": "free"}
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path_custom = PathCustom(config_path=write_map(tmp_dir, nodes, edges))
+        report = path_custom.find_least_blocking_path("1,1,1", "3,1,1", node_status)
+        assert report["shortest_path"] == ["1,1,1", "2,1,1", "3,1,1"]
+        assert report["shortest_blocking_nodes"] == ["2,1,1"]
+        assert report["path"] == ["1,1,1", "1,2,1", "2,2,1", "3,2,1", "3,1,1"]
+        assert report["blocking_nodes"] == []
+        assert report["blockers_avoided"] == 1
+
+        # 作为路径策略生成取货任务
+        segments = path_custom.build_pick_task("1,1,1", "3,1,1", strategy="least_blocking", node_status=node_status)
+        assert segments == [(1, 1, 1, 1), (1, 2, 1, 6), (3, 2, 1, 5), (3, 1, 1, 2)]
+
+        # 没有阻塞时选择最短路线
+        node_status["2,1,1"] = "free"
+        report = path_custom.find_least_blocking_path("1,1,1", "3,1,1", node_status)
+        assert report["path"] == report["shortest_path"]
+        assert report["blockers_avoided"] == 0
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_matches_find_blocking_nodes_on_default_map():
+    """默认地图为树结构, 阻塞点与 find_blocking_nodes 一致。"""
+    path_custom = PathCustom()
+    node_status = {name: "free" for name in path_custom.graph.names}
+    node_status.update({"2,3,1": "occupied", "4,7,1": "occupied", "6,7,1": "occupied"})
+    report = path_custom.find_least_blocking_path("1,3,1", "8,7,1", node_status)
+    assert report["path"] == report["shortest_path"]
+    assert report["blocking_nodes"] == path_custom.find_blocking_nodes("1,3,1", "8,7,1", node_status)
+    assert report["blockers_avoided"] == 0
+
+
+def test_strategy_requires_node_status():
+    """least_blocking 策略必须提供节点状态。"""
+    path_custom = PathCustom()
+    try:
+        path_custom.build_segments("1,3,1", "8,7,1", strategy="least_blocking")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("缺少节点状态应抛出ValueError")
+
+
+def main():
+    test_avoids_blockers_on_loop_map()
+    test_matches_find_blocking_nodes_on_default_map()
+    test_strategy_requires_node_status()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# tests/test_map_graph.py
+from sys_path import setup_path
+setup_path()
+
+import json
+
+import networkx as nx
+
+from app.map_core import MapGraph, PathCustom, get_map_graph
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG
+
+
+def load_reference_graph() -> nx.Graph:
+    """按旧方式直接从JSON构建networkx图, 作为对照。"""
+    with open(DEFAULT_MAP_CONFIG, 'r', encoding='utf-8') as f:
+        map_info = json.load(f)
+    G = nx.Graph()
+    G.add_nodes_from(map_info["nodes"])
+    G.add_edges_from(map_info["edges"])
+    return G
+
+
+def test_graph_is_shared():
+    """多个PathCustom实例共享同一个编译地图。"""
+    path_a = PathCustom()
+    path_b = PathCustom()
+    assert path_a.graph is path_b.graph
+    assert path_a.graph is get_map_graph()
+
+
+def test_graph_matches_config():
+    """编译地图与配置文件的节点和边一致。"""
+    graph = get_map_graph()
+    G = load_reference_graph()
+    assert graph.number_of_nodes == G.number_of_nodes()
+    assert graph.number_of_edges == G.number_of_edges()
+    assert set(graph.names) == set(G.nodes())
+    assert {frozenset(e) for e in graph.edges()} == {frozenset(e) for e in G.edges()}
+    node_id = graph.node_id("6,3,2")
+    assert graph.coord(node_id) == (6, 3, 2)
+    assert {graph.node_name(v) for v in graph.neighbors(node_id)} == {"5,3,2", "6,3,1", "6,3,3"}
+
+
+def test_graph_is_read_only():
+    """编译地图的数组不可写。"""
+    graph = get_map_graph()
+    for arr in (graph.coords, graph.indptr, graph.indices):
+        assert not arr.flags.writeable
+    assert nx.is_frozen(graph.to_networkx())
+
+
+def test_shortest_path_matches_networkx():
+    """所有节点对的最短路径与networkx结果一致。"""
+    graph = get_map_graph()
+    G = load_reference_graph()
+    for source in graph.names:
+        lengths = nx.single_source_shortest_path_length(G, source)
+        for target in graph.names:
+            path = graph.shortest_path(source, target)
+            assert path[0] == source and path[-1] == target
+            assert len(path) - 1 == lengths[target]
+
+
+def test_unreachable_and_unknown_nodes():
+    """不可达返回None, 未知节点抛出ValueError。"""
+    graph = MapGraph(["1,1,1", "2,1,1", "5,5,1"], [["1,1,1", "2,1,1"]])
+    assert graph.shortest_path("1,1,1", "2,1,1") == ["1,1,1", "2,1,1"]
+    assert graph.shortest_path("1,1,1", "5,5,1") is None
+    try:
+        graph.shortest_path("1,1,1", "9,9,9")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知节点应抛出ValueError")
+
+
+def main():
+    test_graph_is_shared()
+    test_graph_matches_config()
+    test_graph_is_read_only()
+    test_shortest_path_matches_networkx()
+    test_unreachable_and_unknown_nodes()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# tests/test_map_overlay.py
+from sys_path import setup_path
+setup_path()
+
+import os
+import shutil
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.map_core import PathCustom, active_plans, get_map_graph, get_map_overlay, get_route_table, update_map_overlay
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG, clear_map_graph_cache
+from app.map_core.MapOverlay import overlay_path_for
+
+
+def test_disable_and_enable_node():
+    """禁用节点后立即生效, 只重建受影响楼层, 并报告在途路径。"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(tmp_dir, "map.json")
+        shutil.copy(DEFAULT_MAP_CONFIG, config_path)
+        path_custom = PathCustom(config_path=config_path)
+        old_routes = get_route_table(path_custom.graph)
+
+        # 登记一条经过 4,5,1 的在途路径
+        segments = path_custom.build_segments_array("1,3,1", "8,7,1", plan_id="car:test")
+        assert segments is not None
+        assert any("4,5,1" in plan["path"] for plan in active_plans.plans())
+
+        report = update_map_overlay(True, nodes=["4,5,1"], config_path=config_path)
+        assert report["affected_layers"] == [1]
+        assert [plan["plan_id"] for plan in report["affected_plans"]] == ["car:test"]
+        assert report["affected_plans"][0]["disabled_nodes"] == ["4,5,1"]
+        assert os.path.exists(overlay_path_for(config_path))
+
+        # 现有实例立即使用新地图, 其他楼层的路由表直接复用
+        assert path_custom.find_shortest_path("1,3,1", "8,7,1") is None
+        new_routes = path_custom.routes
+        assert new_routes.rebuilt_layers == [1]
+        for layer in (2, 3, 4):
+            assert new_routes.layers[layer] is old_routes.layers[layer]
+
+        # 覆盖层持久化, 重新加载后依然生效
+        clear_map_graph_cache()
+        assert get_map_overlay(config_path)["disabled_nodes"] == ["4,5,1"]
+        assert get_map_graph(config_path).shortest_path("1,3,1", "8,7,1") is None
+
+        report = update_map_overlay(False, nodes=["4,5,1"], config_path=config_path)
+        assert report["affected_plans"] == []
+        assert path_custom.find_shortest_path("1,3,1", "8,7,1") is not None
+    finally:
+        active_plans.release("car:test")
+        shutil.rmtree(tmp_dir)
+        clear_map_graph_cache()
+
+
+def test_disable_edge():
+    """禁用边只影响该边。"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(tmp_dir, "map.json")
+        shutil.copy(DEFAULT_MAP_CONFIG, config_path)
+        path_custom = PathCustom(config_path=config_path)
+        update_map_overlay(True, edges=[["4,3,2", "4,2,2"]], config_path=config_path)
+        assert path_custom.find_shortest_path("4,1,2", "4,3,2") is None
+        assert path_custom.find_shortest_path("4,3,2", "4,7,2") is not None
+        assert get_map_overlay(config_path)["disabled_edges"] == [["4,2,2", "4,3,2"]]
+    finally:
+        shutil.rmtree(tmp_dir)
+        clear_map_graph_cache()
+
+
+def test_invalid_elements():
+    """不存在的节点或边抛出ValueError, 接口返回错误。"""
+    for kwargs in ({"nodes": ["9,9,9"]}, {"edges": [["1,1,1", "8,7,1"]]}):
+        try:
+            update_map_overlay(True, **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("不存在的节点或边应抛出ValueError")
+
+    client = TestClient(app)
+    response = client.post("/api/v2/wcs/write/map_overlay/disable", json={"nodes": ["9,9,9"]})
+    assert response.json()["success"] is False
+    response = client.post("/api/v2/wcs/read/map_overlay")
+    assert "disabled_nodes" in response.json()["data"]
+
+
+def main():
+    test_disable_and_enable_node()
+    test_disable_edge()
+    test_invalid_elements()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# tests/test_map_renderer.py
+from sys_path import setup_path
+setup_path()
+
+import os
+import struct
+import tempfile
+import zlib
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.database import DeclarativeBase, get_db
+from app.api.v2.wcs.services import InitializationService, LocationServices
+from app.map_core import MapRenderer, get_map_graph
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG
+from app.map_core.MapRenderer import STATUS_COLORS, inventory_version
+
+from test_slot_recommender import make_node_status
+
+
+def decode_png(data):
+    """解析PNG的尺寸和像素数据 (RGB, 无滤波)。"""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height = struct.unpack(">II", data[16:24])
+    idat_len = struct.unpack(">I", data[33:37])[0]
+    assert data[37:41] == b"IDAT"
+    raw = zlib.decompress(data[41:41 + idat_len])
+    assert len(raw) == height * (width * 3 + 1)
+    return width, height, raw
+
+
+def test_svg_overlay():
+    """SVG中包含库位状态颜色和路径。"""
+    renderer = MapRenderer()
+    graph = get_map_graph()
+    node_status = make_node_status(occupied=["1,1,1"])
+    content, _ = renderer.render(graph, 1, node_status, "svg", path=["5,3,1", "4,3,1", "4,2,1"])
+    svg = content.decode("utf-8")
+    assert svg.startswith("<svg") and svg.endswith("</svg>")
+    assert svg.count("<text") == len(graph.layers[1]) + 1
+    assert "#{:02x}{:02x}{:02x}".format(*STATUS_COLORS["occupied"]) in svg
+    assert "<polyline" in svg
+    # 其他楼层的节点不出现在图中
+    assert ">1,1,2<" not in svg
+
+
+def test_frame_cache():
+    """底图每层只绘制一次, 库位状态不变时直接返回缓存图像。"""
+    renderer = MapRenderer()
+    graph = get_map_graph()
+    node_status = make_node_status()
+    first, etag = renderer.render(graph, 1, node_status, "svg")
+    again, etag_again = renderer.render(graph, 1, node_status, "svg")
+    assert again is first and etag_again == etag
+    assert renderer.stats == {"frame_hits": 1, "frame_misses": 1, "base_renders": 1}
+
+    # 其他楼层的状态变化不影响本层图像
+    other_layer = make_node_status(occupied=["1,1,2"])
+    assert inventory_version(other_layer, 1) == inventory_version(node_status, 1)
+    assert renderer.render(graph, 1, other_layer, "svg")[1] == etag
+
+    changed = make_node_status(occupied=["1,1,1"])
+    content, etag_changed = renderer.render(graph, 1, changed, "svg")
+    assert etag_changed != etag and content != first
+    # 只重新绘制覆盖层
+    assert renderer.stats["base_renders"] == 1
+
+
+def test_png():
+    """PNG尺寸与布局一致, 覆盖层改变像素。"""
+    renderer = MapRenderer(cell=40, margin=10)
+    graph = get_map_graph()
+    free, _ = renderer.render(graph, 1, make_node_status(), "png")
+    occupied, _ = renderer.render(graph, 1, make_node_status(occupied=["1,1,1"]), "png")
+    width, height, raw_free = decode_png(free)
+    # 现场地图第1层为 8 x 7 个格子
+    assert (width, height) == (8 * 40 + 20, 7 * 40 + 20)
+    _, _, raw_occupied = decode_png(occupied)
+    assert raw_free != raw_occupied
+    assert renderer.stats["base_renders"] == 1
+
+
+def test_invalid():
+    renderer = MapRenderer()
+    graph = get_map_graph()
+    for layer, fmt in ((9, "svg"), (1, "gif")):
+        try:
+            renderer.render(graph, layer, {}, fmt)
+        except ValueError:
+            continue
+        raise AssertionError(f"楼层 {layer} 格式 {fmt} 应当报错")
+
+
+def test_map_image_endpoint():
+    """地图图像接口返回图像和 ETag, 未变化时返回 304。"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'wcs.db')}", connect_args={"check_same_thread": False})
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        DeclarativeBase.metadata.create_all(engine)
+        with Session() as db:
+            assert InitializationService(DEFAULT_MAP_CONFIG).init_locations(db)[0]
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            client = TestClient(app)
+            url = "/api/v2/wcs/read/map_image"
+            response = client.get(url, params={"layer": 2, "source": "5,3,2", "target": "1,1,2"})
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("image/svg+xml")
+            assert "<polyline" in response.text
+            etag = response.headers["etag"]
+
+            response = client.get(url, params={"layer": 2, "source": "5,3,2", "target": "1,1,2"}, headers={"If-None-Match": etag})
+            assert response.status_code == 304
+
+            # 库存变化后图像版本变化
+            with Session() as db:
+                assert LocationServices().update_pallet_by_loc(db, "1,1,2", "P1")[0]
+            response = client.get(url, params={"layer": 2, "source": "5,3,2", "target": "1,1,2"}, headers={"If-None-Match": etag})
+            assert response.status_code == 200 and response.headers["etag"] != etag
+
+            response = client.get(url, params={"layer": 2, "fmt": "png"})
+            assert response.status_code == 200 and response.headers["content-type"] == "image/png"
+            decode_png(response.content)
+
+            for params in ({"layer": 9}, {"layer": 1, "fmt": "gif"}, {"layer": 1, "source": "5,3,1"},
+                           {"layer": 1, "source": "9,9,1", "target": "1,1,1"}):
+                assert client.get(url, params=params).json()["success"] is False
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+
+def main():
+    test_svg_overlay()
+    test_frame_cache()
+    test_png()
+    test_invalid()
+    test_map_image_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
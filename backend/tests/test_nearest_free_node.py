@@ -0,0 +1,67 @@
+# tests/test_nearest_free_node.py
+from sys_path import setup_path
+setup_path()
+
+import random
+
+from app.map_core import PathCustom
+
+
+def reference_nearest_free_node(path_custom, task_start, task_end, move_point, node_status):
+    """旧实现: 对每个候选点单独求最短路径, 作为对照。"""
+    task_path = path_custom.find_shortest_path(task_start, task_end)
+    nearest_node, min_distance = None, float('inf')
+    for node, status in node_status.items():
+        if status != "free" or node in task_path:
+            continue
+        path = path_custom.graph.shortest_path(move_point, node)
+        if path is None or any(node_status.get(n) == "occupied" for n in path[1:-1]):
+            continue
+        if len(path) - 1 < min_distance:
+            nearest_node, min_distance = node, len(path) - 1
+    return nearest_node
+
+
+def test_matches_reference():
+    """随机库位状态下与逐点求路径的结果一致。"""
+    path_custom = PathCustom()
+    rng = random.Random(42)
+    layer_nodes = [name for name in path_custom.graph.names if name.endswith(",1")]
+    for _ in range(200):
+        node_status = {
+            node: rng.choice(["free", "occupied", "occupied"]) for node in layer_nodes
+            if not node.startswith("4,")
+        }
+        task_start, task_end, move_point = rng.sample(sorted(node_status), 3)
+        expected = reference_nearest_free_node(path_custom, task_start, task_end, move_point, node_status)
+        assert path_custom.find_nearest_free_node(task_start, task_end, move_point, node_status) == expected
+
+        result = path_custom.find_nearest_free_route(task_start, task_end, move_point, node_status)
+        if expected is None:
+            assert result is None
+        else:
+            node, distance, route = result
+            assert node == expected and route[0] == move_point and route[-1] == node
+            assert distance == len(route) - 1
+            assert not any(node_status.get(n) == "occupied" for n in route[1:-1])
+
+
+def test_invalid_move_point():
+    """指定点不在图中时抛出ValueError。"""
+    path_custom = PathCustom()
+    try:
+        path_custom.find_nearest_free_node("1,3,1", "8,7,1", "9,9,9", {})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知节点应抛出ValueError")
+
+
+def main():
+    test_matches_reference()
+    test_invalid_move_point()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
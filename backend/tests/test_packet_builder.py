@@ -0,0 +1,100 @@
+# tests/test_packet_builder.py
+from sys_path import setup_path
+setup_path()
+
+import random
+import struct
+
+import crcmod
+import numpy as np
+
+from app.res_system import FrameType, PacketBuilder
+from app.res_system.packet_builder import crc16, heartbeat_packets
+from app.res_system.res_protocol import ImmediateCommand, WorkCommand
+
+from fake_car import make_frame
+
+crcmod_crc16 = crcmod.mkCrcFun(0x18005, rev=True, initCrc=0xFFFF, xorOut=0x0000)
+
+SEGMENTS = [(1, 1, 1, 0), (1, 3, 1, 5), (5, 3, 1, 0)]
+
+# 改为预分配缓冲区之前 PacketBuilder(2) 依次生成的报文
+GOLDEN = [
+    "02fd020110000b151303fc",
+    "02fd02021a000b355503fc",
+    "02fd02031107040101010001030105050301000019788103fc",
+    "02fd020411080401010100010301050503010000198c0003fc",
+    "02fd020512072c90000000040012c69303fc",
+    "02fd02061203bd500005030100122ffe03fc",
+    "02fd020712040550010203040012a3f003fc",
+    "02fd02081304059d010102030400135d7303fc",
+    "02fd020a11090401010100010301050503010000192f7b03fc",
+]
+
+
+def test_golden_packets():
+    """与改动前的报文逐字节一致。"""
+    builder = PacketBuilder(2)
+    packets = [
+        builder.heartbeat(),
+        builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY),
+        builder.build_task(7, SEGMENTS),
+        builder.build_task(8, np.array(SEGMENTS, dtype=np.uint8)),
+        builder.do_task(7, SEGMENTS),
+        builder.location_change(3, "5,3,1"),
+        builder.build_work_command(4, 5, WorkCommand.UPDATE_CAR_COORDINATES.value, [1, 2, 3, 4]),
+        builder.build_debug_command(4, 5, b"\x9d", 1, [1, 2, 3, 4]),
+    ]
+    packets.append(builder.patch_packet(builder.build_task(7, SEGMENTS), 9))
+    assert [packet.hex() for packet in packets] == GOLDEN
+
+
+def test_crc_table_matches_crcmod():
+    """查表CRC与crcmod结果一致, 支持分段计算。"""
+    rng = random.Random(3)
+    for size in (0, 1, 7, 64, 513):
+        data = bytes(rng.randrange(256) for _ in range(size))
+        assert crc16(data) == crcmod_crc16(data)
+        assert crc16(data[size // 2:], crc16(data[:size // 2])) == crcmod_crc16(data)
+
+
+def test_random_packets_match_reference():
+    """随机参数下与逐字段拼接的参考报文一致, 生命值循环正确。"""
+    rng = random.Random(5)
+    builder = PacketBuilder(3)
+    for i in range(600):
+        life = i % 255 + 1
+        task_no = rng.randint(1, 255)
+        segments = [tuple(rng.randint(0, 30) for _ in range(3)) + (rng.choice([0, 0, 1, 2, 5]),)
+                    for _ in range(rng.randint(1, 120))]
+        actions = sum(1 for segment in segments if segment[3])
+        if i % 3 == 0:
+            assert builder.heartbeat() == make_frame(3, life, 0, b"")
+        elif i % 3 == 1:
+            payload = struct.pack("!BB", task_no, len(segments) + actions) + b"".join(struct.pack("!BBBB", *s) for s in segments)
+            packet = builder.build_task(task_no, segments if i % 2 else np.array(segments, dtype=np.uint8))
+            assert packet == make_frame(3, life, 1, payload)
+        else:
+            payload = struct.pack("!BB", task_no, 44) + ImmediateCommand.SET_SEGMENT_NO.value + struct.pack(">I", len(segments) + actions)
+            assert builder.do_task(task_no, segments) == make_frame(3, life, 2, payload)
+
+
+def test_heartbeat_templates_shared():
+    """心跳模板按 (设备ID, 类型) 生成一次, 修改设备ID后使用对应的模板。"""
+    builder = PacketBuilder(1)
+    assert builder.heartbeat() is heartbeat_packets(1, 0)[1]
+    builder.device_id = 4
+    assert builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY) == make_frame(4, 2, 10, b"")
+    assert len(heartbeat_packets(4, 10)) == 256
+
+
+def main():
+    test_golden_packets()
+    test_crc_table_matches_crcmod()
+    test_random_packets_match_reference()
+    test_heartbeat_templates_shared()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# tests/test_packet_cache.py
+from sys_path import setup_path
+setup_path()
+
+import json
+import os
+import shutil
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.map_core import PathCustom
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG, clear_map_graph_cache
+from app.res_system import PacketBuilder, TaskPacketCache
+
+ROUTES = [("5,3,1", "1,1,1"), ("1,1,1", "6,3,1"), ("4,1,1", "2,5,1")]
+
+
+def test_packets_match_builder():
+    """缓存报文与 build_task + do_task 逐字节一致, 包括生命计数器回绕之后。"""
+    path_custom = PathCustom()
+    cache = TaskPacketCache()
+    expected_builder = PacketBuilder(2)
+    builder = PacketBuilder(2)
+    for i in range(300):
+        source, target = ROUTES[i % len(ROUTES)]
+        pick_drop = i % 2 == 0
+        task_no = i % 255 + 1
+        segments = path_custom.build_segments_array(source, target, pick_drop=pick_drop)
+        expected = (expected_builder.build_task(task_no, segments), expected_builder.do_task(task_no, segments))
+        compiled = cache.get(path_custom, source, target, pick_drop=pick_drop)
+        assert compiled.segments.tolist() == segments.tolist()
+        assert compiled.packets(builder, task_no) == expected
+    assert cache.stats["misses"] == 2 * len(ROUTES)
+
+
+def test_hit_miss_stats():
+    """坐标和节点名称视为同一路线, 取放货动作不同视为不同路线。"""
+    path_custom = PathCustom()
+    cache = TaskPacketCache(max_entries=2)
+    first = cache.get(path_custom, "5,3,1", "1,1,1")
+    assert cache.get(path_custom, [5, 3, 1], "1,1,1") is first
+    assert first.path == tuple(path_custom.find_shortest_path("5,3,1", "1,1,1"))
+    assert cache.get(path_custom, "5,3,1", "1,1,1", pick_drop=True) is not first
+    cache.get(path_custom, "1,1,1", "6,3,1")
+    stats = cache.stats
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 3, 1, 2)
+    assert stats["hit_rate"] == 0.25
+
+    try:
+        cache.get(path_custom, "9,9,1", "1,1,1")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不存在的节点应当报错")
+
+
+def test_map_version_invalidates():
+    """地图版本变化后旧路线失效, 不可达的路线不缓存。"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(tmp_dir, "map.json")
+        shutil.copy(DEFAULT_MAP_CONFIG, config_path)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config["edges"] = [edge for edge in config["edges"] if edge != ["4,5,1", "5,5,1"]]
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+
+        cache = TaskPacketCache()
+        original = PathCustom()
+        changed = PathCustom(config_path=config_path)
+        assert cache.get(original, "5,3,1", "5,5,1") is not None
+        assert cache.get(original, "5,3,1", "5,5,1") is not None
+        assert cache.get(changed, "5,3,1", "5,5,1") is None
+        stats = cache.stats
+        assert stats["invalidations"] == 1 and stats["size"] == 0
+        assert stats["map_version"] == changed.graph.version
+    finally:
+        clear_map_graph_cache()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_cache_stats_endpoint():
+    client = TestClient(app)
+    response = client.get("/api/v2/wcs/read/car_task_cache")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert {"hits", "misses", "evictions", "size", "hit_rate"} <= set(data)
+
+
+def main():
+    test_packets_match_builder()
+    test_hit_miss_stats()
+    test_map_version_invalidates()
+    test_cache_stats_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
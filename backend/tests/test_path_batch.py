@@ -0,0 +1,68 @@
+# tests/test_path_batch.py
+from sys_path import setup_path
+setup_path()
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.map_core import PathCustom
+
+
+def test_plan_batch_matches_single_requests():
+    """批量结果与逐个请求一致, 并保持输入顺序。"""
+    path_custom = PathCustom()
+    pairs = [("1,3,1", "8,7,1"), ("5,3,1", "1,1,1"), ("1,3,1", "2,1,1"), ("1,3,1", "1,3,4")]
+    results = path_custom.plan_batch(pairs)
+    assert [(r["source"], r["target"]) for r in results] == pairs
+    for (source, target), result in zip(pairs, results):
+        assert result["success"]
+        assert result["path"] == path_custom.find_shortest_path(source, target)
+        assert result["cut_path"] == path_custom.cut_path(result["path"])
+        assert result["segments"] == path_custom.build_segments(source, target)
+
+
+def test_plan_batch_item_errors():
+    """单项错误不影响其他项。"""
+    path_custom = PathCustom()
+    results = path_custom.plan_batch([("9,9,9", "1,1,1"), ("1,3,1", "9,9,9"), ("1,3,1", "8,7,1")])
+    assert not results[0]["success"] and "9,9,9" in results[0]["message"]
+    assert not results[1]["success"] and "9,9,9" in results[1]["message"]
+    assert results[2]["success"]
+    assert results[2]["segments"] == [(1, 3, 1, 0), (4, 3, 1, 5), (4, 7, 1, 6), (8, 7, 1, 0)]
+
+
+def test_batch_endpoint():
+    """批量路径接口。"""
+    client = TestClient(app)
+    response = client.post("/api/v2/wcs/create/path/batch", json={"items": [
+        {"source": "1,3,1", "target": "8,7,1"},
+        {"source": "1,3,1", "target": "9,9,9"},
+    ]})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["total"] == 2 and data["failed"] == 1
+    assert data["items"][0]["path"][0] == "1,3,1"
+    assert data["items"][0]["segments"][-1] == [8, 7, 1, 0]
+    assert data["items"][1]["success"] is False
+
+    # 超过单次上限的项不规划, 在结果中标明
+    limit = settings.PATH_BATCH_MAX_ITEMS
+    items = [{"source": "1,3,1", "target": "8,7,1"}] * (limit + 3)
+    response = client.post("/api/v2/wcs/create/path/batch", json={"items": items})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["total"] == limit + 3 and data["failed"] == 3
+    assert data["items"][limit - 1]["success"] and not data["items"][limit]["success"]
+    assert str(limit) in data["items"][-1]["message"]
+
+
+def main():
+    test_plan_batch_matches_single_requests()
+    test_plan_batch_item_errors()
+    test_batch_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# tests/test_relocation_planner.py
+from sys_path import setup_path
+setup_path()
+
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.database import DeclarativeBase, get_db
+from app.api.v2.wcs.services import InitializationService, LocationServices
+from app.map_core import MapGraph, PathCustom, RelocationPlanner, RouteTable
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG
+
+from synthetic_warehouse import generate_warehouse
+from test_slot_recommender import make_node_status
+
+BUFFER = ["1,3,1", "2,3,1", "3,3,1"]
+
+
+def plan(path_custom, source, target, occupied, store_at_target=True):
+    node_status = make_node_status(occupied=occupied)
+    return path_custom.plan_relocation(
+        source, target, node_status,
+        entry="5,3,1", store_at_target=store_at_target, exclude=["5,3,1"], temporary=BUFFER
+    )
+
+
+def check_routes(result, occupied, store_at_target=True):
+    """按顺序回放移动, 每条载货路线都不能经过其他货物。"""
+    occupied = set(occupied)
+    for move in result["moves"]:
+        route = move["route"]
+        assert route[0] == move["start"] and route[-1] == move["end"]
+        assert not occupied & set(route[1:]), move
+        if move["phase"] == "task":
+            occupied.discard(move["start"])
+            if store_at_target:
+                occupied.add(move["end"])
+        else:
+            occupied.discard(move["start"])
+            occupied.add(move["end"])
+    return occupied
+
+
+def test_inband_keeps_blockers():
+    """入库路线上的阻塞货物停放到不挡路的空闲库位, 不再移回。"""
+    path_custom = PathCustom()
+    occupied = ["3,2,1", "2,2,1", "3,1,1"]
+    result = plan(path_custom, "5,3,1", "1,2,1", occupied)
+    assert result["blocking_nodes"] == ["3,2,1", "2,2,1"]
+    phases = [move["phase"] for move in result["moves"]]
+    assert phases == ["clear", "clear", "task"]
+    # 普通库位充足时不使用接驳位
+    assert not set(result["kept"].values()) & set(BUFFER)
+    assert result["returned"] == {}
+    final = check_routes(result, occupied)
+    assert "1,2,1" in final and not {"3,2,1", "2,2,1"} & final
+    assert result["estimated_time"] == round(sum(move["duration"] for move in result["moves"]), 3)
+
+
+def test_more_blockers_than_buffer():
+    """阻塞货物多于3个时仍然可以规划 (原流程只有3个临时存放点)。"""
+    warehouse = generate_warehouse(floors=1, rows=4, lanes=10, highway_columns=[2], lift_rows=[3], occupancy=0.0)
+    graph = MapGraph(warehouse["nodes"], warehouse["edges"])
+    planner = RelocationPlanner(graph, RouteTable(graph))
+    node_status = dict(warehouse["node_status"])
+    occupied = [f"{x},1,1" for x in range(3, 10)]
+    for node in occupied:
+        node_status[node] = "occupied"
+
+    result = planner.plan("9,1,1", "10,3,1", node_status, store_at_target=False)
+    assert result["blocking_nodes"] == [f"{x},1,1" for x in range(8, 2, -1)]
+    # 每个阻塞货物只移动一次, 从靠近主干道的一个开始
+    assert result["total_moves"] == len(result["blocking_nodes"]) + 1
+    assert result["moves"][0]["start"] == "3,1,1"
+    check_routes(result, occupied, store_at_target=False)
+
+
+def test_full_layer_returns_from_buffer():
+    """只剩接驳位可用时临时停放, 任务完成后移回原位。"""
+    path_custom = PathCustom()
+    node_status = make_node_status()
+    keep_free = set(BUFFER) | {"5,3,1", "1,2,1"}
+    occupied = [node for node, status in node_status.items()
+                if status == "free" and node.endswith(",1") and node not in keep_free]
+    result = plan(path_custom, "5,3,1", "1,2,1", occupied)
+    clear = [move for move in result["moves"] if move["phase"] == "clear"]
+    assert {move["end"] for move in clear} <= set(BUFFER)
+    assert set(result["returned"]) == set(result["blocking_nodes"])
+    final = check_routes(result, occupied)
+    assert not final & set(BUFFER)
+
+
+def test_errors():
+    """节点不存在或没有停放位置时报错。"""
+    path_custom = PathCustom()
+    for source, target in (("9,9,1", "1,2,1"), ("5,3,1", "9,9,1")):
+        try:
+            plan(path_custom, source, target, [])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("不存在的节点应当报错")
+
+    node_status = make_node_status()
+    occupied = [node for node, status in node_status.items()
+                if status == "free" and node.endswith(",1") and node not in {"5,3,1", "1,2,1"}]
+    try:
+        plan(path_custom, "5,3,1", "1,2,1", occupied)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("没有空闲库位时应当报错")
+
+
+def test_relocation_plan_endpoint():
+    """移库规划接口从数据库读取库位状态。"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'wcs.db')}", connect_args={"check_same_thread": False})
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        DeclarativeBase.metadata.create_all(engine)
+        with Session() as db:
+            assert InitializationService(DEFAULT_MAP_CONFIG).init_locations(db)[0]
+            location_service = LocationServices()
+            for i, location in enumerate(["3,2,2", "2,2,2"]):
+                assert location_service.update_pallet_by_loc(db, location, f"P{i}")[0]
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            client = TestClient(app)
+            response = client.post("/api/v2/wcs/read/relocation_plan", json={"source": "5,3,2", "target": "1,2,2"})
+            assert response.status_code == 200
+            data = response.json()["data"]
+            assert data["blocking_nodes"] == ["3,2,2", "2,2,2"]
+            assert data["total_moves"] == len(data["moves"]) == 3
+            assert data["estimated_time"] > 0
+
+            response = client.post("/api/v2/wcs/read/relocation_plan", json={"source": "5,3,2", "target": "1,2,1"})
+            assert response.json()["success"] is False
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+
+def main():
+    test_inband_keeps_blockers()
+    test_more_blockers_than_buffer()
+    test_full_layer_returns_from_buffer()
+    test_errors()
+    test_relocation_plan_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# tests/test_route_table.py
+from sys_path import setup_path
+setup_path()
+
+import json
+import os
+import shutil
+import tempfile
+
+from app.map_core import MapGraph, PathCustom, RouteTable, get_map_graph, get_route_table, reload_map_graph
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG
+
+
+def test_route_table_matches_bfs():
+    """路由表的所有节点对路径与BFS结果一致。"""
+    graph = get_map_graph()
+    routes = get_route_table(graph)
+    for source in graph.names:
+        for target in graph.names:
+            expected = graph.shortest_path(source, target)
+            path = routes.shortest_path(source, target)
+            assert path == expected, f"{source} -> {target}: {path} != {expected}"
+            source_id, target_id = graph.node_id(source), graph.node_id(target)
+            assert routes.distance(source_id, target_id) == len(expected) - 1
+
+
+def test_route_table_is_shared():
+    """同一地图版本只构建一次路由表。"""
+    graph = get_map_graph()
+    assert get_route_table(graph) is get_route_table(graph)
+    assert PathCustom().routes is get_route_table(graph)
+
+
+def test_unreachable_in_layer():
+    """层内不可达返回None。"""
+    graph = MapGraph(["1,1,1", "2,1,1", "5,5,1"], [["1,1,1", "2,1,1"]])
+    routes = RouteTable(graph)
+    assert routes.shortest_path("1,1,1", "2,1,1") == ["1,1,1", "2,1,1"]
+    assert routes.shortest_path("1,1,1", "5,5,1") is None
+    assert routes.distance(graph.node_id("1,1,1"), graph.node_id("5,5,1")) == -1
+
+
+def test_rebuild_on_map_change():
+    """地图重新加载后路由表自动重建。"""
+    with open(DEFAULT_MAP_CONFIG, 'r', encoding='utf-8') as f:
+        map_info = json.load(f)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(tmp_dir, "map.json")
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(map_info, f)
+        old_routes = get_route_table(get_map_graph(config_path))
+        assert old_routes.shortest_path("4,1,1", "4,3,1") == ["4,1,1", "4,2,1", "4,3,1"]
+
+        # 断开高速通道 4,2,1-4,3,1
+        map_info["edges"] = [
+            e for e in map_info["edges"] if {e[0].strip(), e[1].strip()} != {"4,2,1", "4,3,1"}
+        ]
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(map_info, f)
+        new_routes = get_route_table(reload_map_graph(config_path))
+        assert new_routes is not old_routes
+        assert new_routes.version != old_routes.version
+        assert new_routes.shortest_path("4,1,1", "4,3,1") is None
+    finally:
+        shutil.rmtree(tmp_dir)
+        # 恢复默认地图的路由表
+        get_route_table(get_map_graph())
+
+
+def main():
+    test_route_table_matches_bfs()
+    test_route_table_is_shared()
+    test_unreachable_in_layer()
+    test_rebuild_on_map_change()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
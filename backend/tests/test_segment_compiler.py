@@ -0,0 +1,59 @@
+# tests/test_segment_compiler.py
+from sys_path import setup_path
+setup_path()
+
+import numpy as np
+
+from app.map_core import PathCustom, compile_segments
+from app.res_system.packet_builder import PacketBuilder
+
+
+def legacy_segments(path_custom, path):
+    """旧的字符串流水线: cut_path -> task_path -> generate_point_list。"""
+    return path_custom.generate_point_list(path_custom.task_path(path_custom.cut_path(path)))
+
+
+def test_matches_legacy_pipeline():
+    """所有节点对的任务段与旧流水线一致。"""
+    path_custom = PathCustom()
+    graph = path_custom.graph
+    for source in graph.names:
+        for target in graph.names:
+            if source == target:
+                continue
+            path = graph.shortest_path(source, target)
+            expected = legacy_segments(path_custom, path)
+            coords = [path_custom.get_point(node) for node in path]
+            assert compile_segments(coords).tolist() == [list(p) for p in expected]
+            assert path_custom.build_segments(source, target) == expected
+            assert path_custom.build_pick_task(source, target) == path_custom.add_pick_drop_actions(expected)
+
+
+def test_coordinate_tuple_input():
+    """起点可以直接使用坐标元组, 不经过字符串。"""
+    path_custom = PathCustom()
+    segments = path_custom.build_segments_array((1, 3, 1), "8,7,1", pick_drop=True)
+    assert segments.dtype == np.uint8
+    assert segments.tolist() == [[1, 3, 1, 1], [4, 3, 1, 5], [4, 7, 1, 6], [8, 7, 1, 2]]
+    assert path_custom.graph.node_id_at(8, 7, 1) == path_custom.graph.node_id("8,7,1")
+    assert path_custom.build_segments("8,7,1", "8,7,1") == [False, "起点和终点相同，无需路径规划"]
+
+
+def test_build_task_accepts_array():
+    """数组形式的任务段生成与列表完全相同的报文。"""
+    path_custom = PathCustom()
+    segments = path_custom.build_segments_array("1,3,1", "8,7,1", pick_drop=True)
+    builder_list, builder_array = PacketBuilder(1), PacketBuilder(1)
+    assert builder_array.build_task(7, segments) == builder_list.build_task(7, path_custom.build_pick_task("1,3,1", "8,7,1"))
+    assert builder_array.do_task(7, segments) == builder_list.do_task(7, path_custom.build_pick_task("1,3,1", "8,7,1"))
+
+
+def main():
+    test_matches_legacy_pipeline()
+    test_coordinate_tuple_input()
+    test_build_task_accepts_array()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# tests/test_segment_pipeline.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+
+from app.devices import AsyncDevicesController
+from app.devices.segment_pipeline import EarlyAction, LiftInterlock, SegmentPipeline
+from app.res_system.controller import ControllerAsync
+from app.res_system.telemetry import approaching
+from app.res_system.simulator import ShuttleSimulator
+
+INTERVAL = 0.01
+
+
+class FakeLiftPLC:
+    """测试用PLC: 只提供电梯联锁读取的楼层和空闲位。"""
+
+    def __init__(self, layer=1, idle=True, ready=True):
+        self.layer = layer
+        self.idle = idle
+        self.ready = ready
+        self.reads = 0
+
+    async def async_connect(self):
+        return self.ready
+
+    async def async_disconnect(self):
+        return True
+
+    def plc_checker(self):
+        return self.ready
+
+    def get_lift(self):
+        self.reads += 1
+        return self.layer
+
+    def read_bit(self, db, offset):
+        return 1 if self.idle else 0
+
+    def get_lift_state(self):
+        self.reads += 1
+        return self.layer, self.idle
+
+
+def heartbeat(location, cmd_no=7, segment=0, car_status=1):
+    return {"current_location": location, "cmd_no": cmd_no, "current_segment": segment, "car_status": car_status}
+
+
+def test_approaching_predicate():
+    """按段号或距离触发, 段号只看当前任务; 到达终点且就绪时也满足。"""
+    by_segment = approaching(7, "1,1,1", segment=2)
+    assert not by_segment(heartbeat((4, 3, 1), segment=1))
+    assert by_segment(heartbeat((4, 2, 1), segment=2))
+    assert not by_segment(heartbeat((4, 2, 1), cmd_no=6, segment=3))
+    assert by_segment(heartbeat((1, 1, 1), cmd_no=6, car_status=3))
+
+    by_cells = approaching(7, "1,1,1", cells=2)
+    assert by_cells(heartbeat((3, 1, 1)))
+    assert not by_cells(heartbeat((4, 1, 1)))
+    assert not by_cells(heartbeat((1, 1, 2)))
+
+
+async def start_car(**kwargs):
+    car = ShuttleSimulator(**kwargs)
+    port = await car.start()
+    controller = ControllerAsync("127.0.0.1", port)
+    controller.telemetry.interval = INTERVAL
+    return car, controller
+
+
+async def stop_car(car, controller):
+    await controller.telemetry.stop()
+    await controller.session.close()
+    await car.stop()
+
+
+def test_action_starts_before_arrival():
+    """接近终点时动作与最后一段行驶并行开始, 到达后返回动作结果。"""
+    async def run():
+        car, controller = await start_car(location=(5, 3, 1), speed=20, turn_time=0.02)
+        pipeline = SegmentPipeline(controller, lead_segments=1, lead_cells=None)
+        seen = {}
+
+        async def prime():
+            seen["location"] = car.location
+            seen["busy"] = car.busy
+            return [True, "primed"]
+
+        try:
+            arrived, results = await pipeline.run(11, "1,1,1", [EarlyAction("prime", prime)], timeout=5)
+            assert arrived and results == {"prime": [True, "primed"]}
+            # 任务段 5,3,1 -> 4,3,1 -> 4,1,1 -> 1,1,1, 第2段开始时触发
+            assert seen["busy"] and seen["location"] != (1, 1, 1)
+            assert car.location == (1, 1, 1) and pipeline.trigger_segment() == 2
+            assert pipeline.stats == {"tasks": 1, "early": 1, "deferred": 0, "blocked": 0, "undone": 0}
+
+            # 无动作时等同于下发任务并等待到达
+            arrived, results = await pipeline.run(12, "2,1,1", timeout=5)
+            assert arrived and results == {} and car.location == (2, 1, 1)
+        finally:
+            await stop_car(car, controller)
+
+    asyncio.run(run())
+
+
+def test_guard_defers_and_blocks():
+    """守卫未通过的动作推迟到到达后再检查, 仍未通过时不执行。"""
+    async def run():
+        car, controller = await start_car(location=(1, 1, 1), speed=30, turn_time=0.02)
+        plc = FakeLiftPLC(layer=2)
+        interlock = LiftInterlock(plc)
+        pipeline = SegmentPipeline(controller, lead_cells=3)
+        calls = []
+
+        async def signal():
+            calls.append(car.location)
+            return [True, "sent"]
+
+        async def lift_arrives():
+            # 提前检查时电梯在2层, 检查之后回到1层
+            while plc.reads == 0:
+                await asyncio.sleep(0.001)
+            assert car.busy
+            plc.layer = 1
+
+        try:
+            mover = asyncio.create_task(lift_arrives())
+            action = EarlyAction("signal", signal, guard=interlock.lift_ready(1))
+            arrived, results = await pipeline.run(21, "5,3,1", [action], timeout=5)
+            await mover
+            assert arrived and results == {"signal": [True, "sent"]}
+            assert calls == [(5, 3, 1)]
+            assert pipeline.stats["deferred"] == 1
+
+            plc.idle = False
+            arrived, results = await pipeline.run(22, "1,1,1", [action], timeout=5)
+            assert arrived and not results["signal"][0] and "未空闲" in results["signal"][1]
+            assert len(calls) == 1 and pipeline.stats["blocked"] == 1
+        finally:
+            await stop_car(car, controller)
+
+    asyncio.run(run())
+
+
+def test_undo_when_not_arrived():
+    """穿梭车未到达时撤销已提前成功执行的动作, 失败的动作不撤销。"""
+    async def run():
+        car, controller = await start_car(location=(5, 3, 1), speed=2, turn_time=0.02)
+        pipeline = SegmentPipeline(controller, lead_segments=3, lead_cells=None)
+        undone = []
+
+        async def signal():
+            return [True, "sent"]
+
+        async def refused():
+            return [False, "PLC异常"]
+
+        async def undo(name):
+            undone.append(name)
+            return [True, "cleared"]
+
+        try:
+            actions = [
+                EarlyAction("signal", signal, undo=lambda: undo("signal")),
+                EarlyAction("refused", refused, undo=lambda: undo("refused")),
+            ]
+            arrived, results = await pipeline.run(41, "1,1,1", actions, timeout=0.3)
+            assert not arrived and results["signal"] == [True, "sent"]
+            assert undone == ["signal"] and results["undo:signal"] == [True, "cleared"]
+            assert "undo:refused" not in results and pipeline.stats["undone"] == 1
+        finally:
+            await stop_car(car, controller)
+
+    asyncio.run(run())
+
+
+def test_lift_interlock():
+    """电梯在本层且空闲时才通过; PLC未就绪时不通过。"""
+    async def run():
+        plc = FakeLiftPLC(layer=3)
+        guard = LiftInterlock(plc).lift_ready(3)
+        assert await guard({}) == (True, "")
+        plc.layer = 2
+        assert not (await guard({}))[0]
+        plc.layer, plc.ready = 3, False
+        assert await guard({}) == (False, "PLC未就绪")
+
+        # 守卫异常视为不允许
+        async def broken(msg):
+            raise RuntimeError("boom")
+        assert not (await EarlyAction("x", None, broken).allowed({}))[0]
+
+    asyncio.run(run())
+
+
+class CrossLayerPLC(FakeLiftPLC):
+    """跨层测试用PLC: 电梯接车时停到穿梭车楼层, 第 moved_after 次读取之后被调往4层。"""
+
+    def __init__(self, moved_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.moved_after = moved_after
+
+    async def lift_move_by_layer(self, task_no, layer):
+        self.layer = layer
+        return True
+
+    def get_lift_state(self):
+        if self.moved_after is not None and self.reads >= self.moved_after:
+            self.layer = 4
+        return super().get_lift_state()
+
+
+def test_cross_layer_rechecks_lift_before_entry():
+    """进电梯前重新确认联锁: 提前确认之后电梯被调走, 或穿梭车已在电梯口时电梯未空闲, 都不进电梯。"""
+    async def run():
+        car = ShuttleSimulator(location=(1, 1, 1), speed=30, turn_time=0.02)
+        port = await car.start()
+        devices = AsyncDevicesController("127.0.0.1", "127.0.0.1", port)
+        devices.car.telemetry.interval = INTERVAL
+        try:
+            for plc, expected_reads in ((CrossLayerPLC(moved_after=1), 2), (CrossLayerPLC(idle=False), 1)):
+                devices.plc = plc
+                devices.interlock = LiftInterlock(plc)
+                success, message = await devices.car_cross_layer(31, 2)
+                assert not success and "电梯联锁" in message
+                assert car.location == (5, 3, 1) and plc.reads == expected_reads
+        finally:
+            await stop_car(car, devices.car)
+
+    asyncio.run(run())
+
+
+def main():
+    test_approaching_predicate()
+    test_action_starts_before_arrival()
+    test_guard_defers_and_blocks()
+    test_undo_when_not_arrived()
+    test_lift_interlock()
+    test_cross_layer_rechecks_lift_before_entry()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
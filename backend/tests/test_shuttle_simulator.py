@@ -0,0 +1,121 @@
+# tests/test_shuttle_simulator.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+import time
+
+from app.res_system import PacketBuilder, PacketParser
+from app.res_system.connection import CarSession
+from app.res_system.controller import ControllerAsync
+from app.res_system.res_protocol import FrameType
+from app.res_system.simulator import ShuttleSimulator, SimulatorFleet
+
+INTERVAL = 0.02
+
+
+def test_replies_parse():
+    """模拟器的响应能被 PacketParser 正确解析。"""
+    car = ShuttleSimulator(location=(5, 3, 1), power=77)
+    builder = PacketBuilder(2)
+    parser = PacketParser()
+
+    msg = parser.parse_heartbeat_response(car.handle_frame(builder.heartbeat()))
+    assert msg["device_id"] == 2 and msg["life"] == 1
+    assert msg["current_location"] == (5, 3, 1) and msg["car_status"] == 3
+    assert parser.parse_hb_power_response(car.handle_frame(builder.build_heartbeat(FrameType.HEARTBEAT_WITH_BATTERY)))["power"] == 77
+
+    task = parser.parse_task_response(car.handle_frame(builder.build_task(7, [(5, 3, 1, 0), (1, 3, 1, 0)])))
+    assert task["task_no"] == 7 and task["result"] == 0
+
+    command = parser.parse_command_response(car.handle_frame(builder.location_change(3, "4,1,1")))
+    assert command["cmd_no"] == 189 and command["result"] == 0
+    assert car.location == (4, 1, 1)
+
+
+def test_controller_moves_simulated_car():
+    """控制器下发移动任务, 模拟穿梭车按速度逐格移动到目标。"""
+    async def run():
+        car = ShuttleSimulator(location=(5, 3, 1), speed=100, turn_time=0.02)
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        controller.telemetry.interval = INTERVAL
+        try:
+            start = time.perf_counter()
+            assert await controller.car_move(9, "1,1,1")
+            assert car.busy and car.task_no == 9
+            assert await controller.wait_task_complete(9, TIMEOUT=5)
+            elapsed = time.perf_counter() - start
+            assert car.location == (1, 1, 1) and car.stats["completed"] == 1
+            # 5,3,1 -> 4,3,1 -> 4,1,1 -> 1,1,1: 6格 + 2次换向
+            assert elapsed >= 6 / car.speed + 2 * car.turn_time
+            assert await controller.car_current_location() == "1,1,1"
+        finally:
+            await controller.telemetry.stop()
+            await controller.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_good_move_and_busy_rejection():
+    """带货移动时起点取货、终点放货; 执行中的穿梭车拒绝新任务。"""
+    async def run():
+        car = ShuttleSimulator(location=(1, 1, 1), speed=50, turn_time=0.01, action_time=0.05)
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        controller.telemetry.interval = INTERVAL
+        parser = PacketParser()
+        try:
+            assert await controller.good_move(4, "5,3,1")
+            # 起点取货完成后开始行驶
+            await asyncio.sleep(car.action_time + 0.03)
+            assert car.have_pallet == 1
+
+            busy = await controller.session.request(controller.builder.build_task(5, [(1, 1, 1, 0), (2, 1, 1, 0)]))
+            assert parser.parse_task_response(busy)["result"] == 1
+
+            assert await controller.wait_task_complete(4, TIMEOUT=5)
+            assert car.location == (5, 3, 1) and car.have_pallet == 0
+        finally:
+            await controller.telemetry.stop()
+            await controller.session.close()
+            await car.stop()
+
+    asyncio.run(run())
+
+
+def test_fleet_on_separate_ports():
+    """多台模拟穿梭车在不同端口上同时响应。"""
+    async def run():
+        fleet = SimulatorFleet([(i + 1, 1, 1) for i in range(8)], jitter=0.1, seed=1)
+        ports = await fleet.start()
+        sessions = [CarSession("127.0.0.1", port, request_timeout=2.0) for port in ports]
+        builder = PacketBuilder(1)
+        parser = PacketParser()
+        try:
+            assert len(set(ports)) == 8
+            responses = await asyncio.gather(*(
+                session.request(builder.heartbeat()) for session in sessions for _ in range(10)
+            ))
+            locations = [parser.parse_heartbeat_response(response)["current_location"] for response in responses]
+            assert locations == [(i + 1, 1, 1) for i in range(8) for _ in range(10)]
+            assert fleet.stats["heartbeats"] == 80 and fleet.stats["connections"] == 8
+        finally:
+            for session in sessions:
+                await session.close()
+            await fleet.stop()
+
+    asyncio.run(run())
+
+
+def main():
+    test_replies_parse()
+    test_controller_moves_simulated_car()
+    test_good_move_and_busy_rejection()
+    test_fleet_on_separate_ports()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
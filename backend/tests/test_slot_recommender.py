@@ -0,0 +1,141 @@
+# tests/test_slot_recommender.py
+from sys_path import setup_path
+setup_path()
+
+import os
+import json
+import tempfile
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.database import DeclarativeBase, get_db
+from app.api.v2.wcs.services import InitializationService
+from app.map_core import PathCustom, SlotScoring
+from app.map_core.MapGraph import DEFAULT_MAP_CONFIG
+
+
+def make_node_status(occupied=()):
+    """按现场地图生成节点状态: x=4 为主干道, 6,3,z 为电梯, 其余为空闲库位。"""
+    with open(DEFAULT_MAP_CONFIG, 'r', encoding='utf-8') as f:
+        nodes = json.load(f)["nodes"]
+    node_status = {}
+    for node in nodes:
+        x, y, _ = map(int, node.split(','))
+        if (x, y) == (6, 3):
+            node_status[node] = "lift"
+        elif x == 4:
+            node_status[node] = "highway"
+        else:
+            node_status[node] = "free"
+    for node in occupied:
+        node_status[node] = "occupied"
+    return node_status
+
+
+def by_location(items):
+    return {item["location"]: item for item in items}
+
+
+def test_blockers_and_relocations():
+    """库位前方的托盘计为需移走, 后方的托盘计为会挡住。"""
+    path_custom = PathCustom()
+    node_status = make_node_status(occupied=["1,1,1", "3,2,1"])
+    items = by_location(path_custom.recommend_inbound_slots(node_status, layers=[1], top_k=100))
+
+    # 2,1,1 后方有 1,1,1
+    assert items["2,1,1"]["blockers_created"] == 1 and items["2,1,1"]["relocations"] == 0
+    assert items["3,1,1"]["blockers_created"] == 1
+    # 2,2,1 入库要先移走 3,2,1
+    assert items["2,2,1"]["relocations"] == 1 and items["2,2,1"]["blockers_created"] == 0
+    # 已占用、主干道、电梯不参与推荐
+    assert not {"1,1,1", "3,2,1", "4,1,1", "6,3,1", "5,3,1"} & set(items)
+    assert items["1,2,1"]["depth"] == 3 and items["3,4,1"]["depth"] == 1
+    # 行驶时间从入库口 5,3,1 算起
+    assert items["3,3,1"]["travel_time"] < items["3,4,1"]["travel_time"]
+
+
+def test_ranking():
+    """推荐结果按总分排列, 深处且不挡货的库位优先。"""
+    path_custom = PathCustom()
+    node_status = make_node_status(occupied=["1,1,1"])
+    items = path_custom.recommend_inbound_slots(node_status, layers=[1], exclude=["1,3,1", "2,3,1", "3,3,1"], top_k=100)
+    scores = [item["score"] for item in items]
+    assert scores == sorted(scores)
+    ranked = [item["location"] for item in items]
+    # 同一货道中, 后方无货时深处优先; 后方有货时排在后面
+    assert ranked.index("1,2,1") < ranked.index("3,2,1")
+    assert ranked.index("3,1,1") > ranked.index("1,2,1")
+
+    # 不计阻塞时, 只按深度和行驶时间排序
+    loose = path_custom.recommend_inbound_slots(
+        node_status, layers=[1], top_k=100, scoring=SlotScoring(blocker_penalty=0, relocation_penalty=0, depth_bonus=0)
+    )
+    travel = [item["travel_time"] for item in loose]
+    assert travel == sorted(travel)
+
+
+def test_car_layer():
+    """穿梭车所在楼层的库位不需要跨层, 优先推荐。"""
+    path_custom = PathCustom()
+    node_status = make_node_status()
+    items = path_custom.recommend_inbound_slots(node_status, car_location="5,3,3", top_k=3)
+    assert all(item["layer"] == 3 and item["approach_time"] == 0.0 for item in items)
+
+    items = by_location(path_custom.recommend_inbound_slots(node_status, car_location="5,3,3", top_k=200))
+    assert items["1,2,1"]["approach_time"] > items["1,2,2"]["approach_time"] > 0
+
+    try:
+        path_custom.recommend_inbound_slots(node_status, layers=[9])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不存在的楼层应当报错")
+
+
+def test_recommend_endpoint():
+    """入库库位推荐接口从数据库读取库位状态。"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'wcs.db')}", connect_args={"check_same_thread": False})
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        DeclarativeBase.metadata.create_all(engine)
+        with Session() as db:
+            assert InitializationService(DEFAULT_MAP_CONFIG).init_locations(db)[0]
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            client = TestClient(app)
+            response = client.post("/api/v2/wcs/read/inband_location", json={"layers": [2], "car_location": "5,3,2", "top_k": 3})
+            assert response.status_code == 200
+            data = response.json()["data"]
+            assert data["car_location"] == "5,3,2"
+            assert len(data["items"]) == 3
+            # 接驳位不参与推荐
+            assert all(item["layer"] == 2 and item["location"] not in {"1,3,2", "2,3,2", "3,3,2"} for item in data["items"])
+
+            response = client.post("/api/v2/wcs/read/inband_location", json={"layers": [9], "car_location": "5,3,2"})
+            assert response.json()["success"] is False
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+
+def main():
+    test_blockers_and_relocations()
+    test_ranking()
+    test_car_layer()
+    test_recommend_endpoint()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# tests/test_startup.py
+from sys_path import setup_path
+setup_path()
+
+import os
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.map_core.MapGraph import (
+    DEFAULT_MAP_CONFIG, MapGraph, artifact_path_for, clear_map_graph_cache, get_map_graph
+)
+
+ROOT_DIR = str(Path(__file__).parent.parent)
+# 导入 app.main 自身的时间上限 (秒, 不含 fastapi/sqlalchemy 等框架), 可用环境变量 STARTUP_IMPORT_BUDGET 调整
+IMPORT_BUDGET = float(os.environ.get("STARTUP_IMPORT_BUDGET", "0.5"))
+
+# 先导入框架, 只计应用自身的导入时间, 减少机器差异的影响
+PROBE = """
+import sys, time, json
+import fastapi, fastapi.routing, fastapi.openapi.models, sqlalchemy.orm, pydantic, numpy
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+from app.api.v2.wcs import routes
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": [m for m in ("matplotlib", "networkx", "app.api.v1") if m in sys.modules],
+    "built": [s.built for s in (routes.path_services, routes.device_services, routes.device_services_base)]
+}))
+"""
+
+
+def run_probe():
+    """在新进程中导入 app.main, 返回耗时和导入状态。"""
+    with tempfile.TemporaryDirectory() as workdir:
+        # 在临时目录中运行, 日志目录不写入代码目录
+        env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=workdir, env=env,
+            capture_output=True, text=True, timeout=120
+        )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    """导入应用不导入绘图库和 v1 路由, 也不创建设备服务。"""
+    report = run_probe()
+    assert report["modules"] == []
+    assert report["built"] == [False, False, False]
+
+
+def test_import_time_budget():
+    """导入应用的时间不超过预算 (取3次中位数), 启动变慢时失败。"""
+    seconds = statistics.median(run_probe()["seconds"] for _ in range(3))
+    print(f"[startup] import app.main (不含框架): {seconds * 1000:.0f} ms (预算 {IMPORT_BUDGET * 1000:.0f} ms)")
+    assert seconds < IMPORT_BUDGET, f"导入耗时 {seconds:.3f}s 超过预算 {IMPORT_BUDGET}s"
+
+
+def test_lifespan_builds_services():
+    """非快速启动模式下, 应用启动时创建设备服务。"""
+    from app.main import app
+    from app.api.v2.wcs import routes
+    from app.core.config import settings
+
+    assert settings.FAST_STARTUP is False
+    with TestClient(app):
+        assert routes.device_services.built and routes.device_services_base.built
+        assert routes.path_services.built
+
+
+def test_fast_startup_starts_telemetry():
+    """快速启动模式下设备服务推迟创建, 车队遥测和充电调度仍在启动时开启。"""
+    from app.main import app
+    from app.api.v2.wcs import routes
+    from app.core.config import settings
+    from app.res_system import get_car_fleet
+
+    cars = get_car_fleet().cars.values()
+    settings.FAST_STARTUP = True
+    try:
+        with TestClient(app):
+            assert all(car.telemetry.running for car in cars)
+            assert routes.charging_services.scheduler._task is not None
+        assert not any(car.telemetry.running for car in cars)
+    finally:
+        settings.FAST_STARTUP = False
+
+
+def test_map_artifact():
+    """编译地图文件在首次加载时生成, 配置文件变化后失效并重新编译。"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        config_path = os.path.join(tmp_dir, "map.json")
+        shutil.copy(DEFAULT_MAP_CONFIG, config_path)
+        artifact = artifact_path_for(config_path)
+
+        clear_map_graph_cache()
+        compiled = get_map_graph(config_path)
+        assert os.path.exists(artifact)
+
+        clear_map_graph_cache()
+        loaded = get_map_graph(config_path)
+        assert loaded is not compiled
+        assert loaded.names == compiled.names and loaded.version == compiled.version
+        assert dict(loaded.layer_versions) == dict(compiled.layer_versions)
+        assert list(loaded.edges()) == list(compiled.edges())
+        assert loaded.shortest_path("1,1,1", "5,3,4") == compiled.shortest_path("1,1,1", "5,3,4")
+
+        # 修改配置文件后旧的编译文件失效
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config["edges"] = [edge for edge in config["edges"] if edge != ["4,5,1", "5,5,1"]]
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        clear_map_graph_cache()
+        changed = get_map_graph(config_path)
+        assert changed.version != compiled.version
+        assert changed.shortest_path("1,1,1", "5,5,1") is None
+
+        assert MapGraph.load_artifact(artifact, "stale") is None
+    finally:
+        clear_map_graph_cache()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    test_import_is_lazy()
+    test_import_time_budget()
+    test_lifespan_builds_services()
+    test_fast_startup_starts_telemetry()
+    test_map_artifact()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# tests/test_synthetic_warehouse.py
+from sys_path import setup_path
+setup_path()
+
+import copy
+
+from app.map_core import MapGraph
+
+from synthetic_warehouse import generate_warehouse
+from bench_map_core import OPERATIONS, compare_reports, run
+
+
+def test_generate_warehouse():
+    """生成的仓库连通, 节点状态与参数一致, 相同种子结果相同。"""
+    warehouse = generate_warehouse(floors=3, rows=6, lanes=8, highway_columns=[3, 6], lift_rows=[2, 5], occupancy=0.4, seed=1)
+    graph = MapGraph(warehouse["nodes"], warehouse["edges"])
+    assert graph.number_of_nodes == 3 * (6 * 8 + 2)
+    # 任意两点可达 (跨层经过电梯)
+    for target in ("1,1,3", "8,6,2", "9,5,1"):
+        assert graph.shortest_path("1,6,1", target) is not None
+    assert len(warehouse["lifts"]) == 3 * 2
+    assert "8,2,1" in warehouse["highway"] and "3,4,2" in warehouse["highway"]
+
+    status = warehouse["node_status"]
+    occupied = sum(1 for node in warehouse["storage"] if status[node] == "occupied")
+    assert 0 < occupied < len(warehouse["storage"])
+    assert generate_warehouse(floors=3, rows=6, lanes=8, highway_columns=[3, 6], lift_rows=[2, 5], occupancy=0.4, seed=1) == warehouse
+
+    empty = generate_warehouse(occupancy=0.0)
+    assert all(empty["node_status"][node] == "free" for node in empty["storage"])
+
+
+def test_generate_warehouse_invalid():
+    """参数越界时报错。"""
+    for kwargs in ({"highway_columns": [5]}, {"lift_rows": [8]}, {"occupancy": 1.5}, {"lanes": 1}):
+        try:
+            generate_warehouse(**kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"参数 {kwargs} 应当报错")
+
+
+def test_benchmark_report():
+    """性能测试报告包含每个接口的耗时, 并能与基准报告对比。"""
+    size = {"name": "tiny", "floors": 2, "rows": 4, "lanes": 5, "highway_columns": [4], "lift_rows": [2]}
+    report = run([size], samples=10, repeat=1)
+    assert [result["name"] for result in report["sizes"]] == ["tiny"]
+    result = report["sizes"][0]
+    assert result["nodes"] == 2 * (4 * 5 + 1)
+    assert set(result["ops"]) == set(OPERATIONS)
+    assert all(timing["calls"] == 10 and timing["us_per_call"] > 0 for timing in result["ops"].values())
+
+    assert compare_reports(report, report) == []
+    baseline = copy.deepcopy(report)
+    baseline["sizes"][0]["ops"]["find_shortest_path"]["us_per_call"] /= 2
+    regressions = compare_reports(report, baseline, tolerance=0.25)
+    assert [(item["size"], item["metric"]) for item in regressions] == [("tiny", "find_shortest_path")]
+
+
+def main():
+    test_generate_warehouse()
+    test_generate_warehouse_invalid()
+    test_benchmark_report()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
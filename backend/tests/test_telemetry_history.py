@@ -0,0 +1,145 @@
+# tests/test_telemetry_history.py
+from sys_path import setup_path
+setup_path()
+
+import asyncio
+import os
+import tempfile
+
+import numpy as np
+
+from app.api.v2.wcs.services import HistoryServices
+from app.res_system.controller import ControllerAsync
+from app.res_system.simulator import ShuttleSimulator
+from app.utils.telemetry_history import CAR_COLUMNS, LIFT_COLUMNS, TelemetryHistory, find_history
+
+
+def test_ring_overwrites_without_spill():
+    """没有溢出文件时, 写满后覆盖最旧的行, 内存固定。"""
+    history = TelemetryHistory("lift:test", LIFT_COLUMNS, capacity=8, spill_rows=2)
+    for i in range(11):
+        history.append(t=100.0 + i, layer=i)
+    rows = history.query()
+    # 第9、11行写入时各覆盖最旧的2行
+    assert list(rows["layer"]) == list(range(4, 11))
+    assert len(history) == 7 and history.stats["overwritten"] == 4
+    assert list(rows["idle"]) == [-1] * 7
+
+    # 时间戳早于上一行时按上一行记录, 保证有序
+    history.append(t=50.0, layer=99)
+    assert history.query(start=110.0)["layer"].tolist() == [10, 99]
+
+
+def test_spill_and_reopen():
+    """溢出到磁盘的行和内存中的行一起查询, 重启后溢出文件仍可读取。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "car.bin")
+        history = TelemetryHistory("car:test", CAR_COLUMNS, capacity=100, spill_path=path, spill_rows=25)
+        for i in range(1000):
+            history.append(t=float(i), x=i % 7, y=1, z=1, power=100 - i // 10)
+        assert len(history) == 1000 and history.stats["spilled"] == 900
+        assert os.path.getsize(path) == 900 * history.dtype.itemsize
+
+        rows = history.query(start=900.5, end=950)
+        assert rows["t"][0] == 901 and rows["t"][-1] == 950 and len(rows) == 50
+        # 跨越溢出文件和内存
+        rows = history.query(start=890, end=910)
+        assert rows["t"].tolist() == [float(t) for t in range(890, 911)]
+        assert rows["x"].tolist() == [t % 7 for t in range(890, 911)]
+
+        info = history.info()
+        assert info["first"] == 0.0 and info["last"] == 999.0 and info["memory_rows"] == 100
+
+        reopened = TelemetryHistory("car:test", CAR_COLUMNS, capacity=100, spill_path=path)
+        assert len(reopened) == 900
+        reopened.append(t=10.0, x=3)
+        rows = reopened.query(start=899)
+        assert rows["t"].tolist() == [899.0, 899.0] and rows["x"][-1] == 3
+        assert reopened.query()["power"][0] == 100
+
+
+def test_spill_file_limits():
+    """溢出文件超过大小或时长上限时删去最旧的行, 留出余量; 重新打开时同样生效。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lift.bin")
+        itemsize = np.dtype([("t", "f8")] + LIFT_COLUMNS).itemsize
+        history = TelemetryHistory(
+            "lift:limit", LIFT_COLUMNS, capacity=40, spill_path=path, spill_rows=10,
+            max_spill_bytes=100 * itemsize, max_age=None
+        )
+        for i in range(200):
+            history.append(t=float(i), layer=i)
+        # 溢出文件到110行、105行时超过100行上限, 各保留75行
+        assert history.stats["spilled"] == 160 and history.stats["trimmed"] == 35 + 30
+        assert os.path.getsize(path) == 95 * itemsize and len(history) == 95 + 40
+        assert history.query()["layer"].tolist() == list(range(65, 200))
+        assert history.info()["first"] == 65.0
+
+        # 重新打开时按时长删去超过 max_age 的行, 保留最后一行之前 max_age 的3/4以内
+        reopened = TelemetryHistory("lift:limit", LIFT_COLUMNS, capacity=40, spill_path=path, max_age=40.0)
+        assert reopened.stats["trimmed"] == 64 and len(reopened) == 31
+        assert reopened.query()["t"].tolist() == [float(t) for t in range(129, 160)]
+        assert not os.path.exists(path + ".tmp")
+
+
+def test_downsample():
+    """按时间间隔降采样保留每个间隔的最后一行, 超过 max_points 时自动计算间隔。"""
+    history = TelemetryHistory("lift:down", LIFT_COLUMNS, capacity=1000)
+    for i in range(1000):
+        history.append(t=i * 0.1, layer=i)
+    rows = history.query(step=1.0)
+    assert len(rows) == 100 and rows["layer"][0] == 9 and rows["layer"][-1] == 999
+    assert np.all(np.diff(rows["t"]) > 0)
+
+    rows = history.query(max_points=50)
+    assert 0 < len(rows) <= 50 and rows["layer"][-1] == 999
+    assert len(history.query(start=10, end=20, max_points=500)) == 101
+
+
+def test_heartbeats_recorded_and_queried():
+    """遥测心跳写入穿梭车历史, 通过服务按设备名称查询。"""
+    async def run():
+        car = ShuttleSimulator(location=(5, 3, 1), speed=20, turn_time=0.02)
+        port = await car.start()
+        controller = ControllerAsync("127.0.0.1", port)
+        controller.telemetry.interval = 0.01
+        try:
+            assert await controller.car_move(31, "1,1,1")
+            assert await controller.wait_car_move_complete_by_location("1,1,1", 5)
+        finally:
+            await controller.telemetry.stop()
+            await controller.session.close()
+            await car.stop()
+        return port
+
+    port = asyncio.run(run())
+    name = f"car:127.0.0.1:{port}"
+    history = find_history(name)
+    assert history is not None and history.spill_path is not None
+
+    services = HistoryServices()
+    success, devices = services.list_devices()
+    assert success and name in [device["device"] for device in devices]
+    success, data = services.query(name, max_points=1000)
+    assert success and data["device"] == name
+    columns = data["columns"]
+    locations = list(zip(columns["x"], columns["y"], columns["z"]))
+    # 行驶过程中的位置和任务段都被记录
+    assert locations[-1] == (1, 1, 1) and (4, 3, 1) in locations
+    assert 31 in columns["cmd_no"] and max(columns["segment"]) >= 2
+
+    assert not services.query("car:unknown")[0]
+    assert not services.query(name, start=10, end=5)[0]
+
+
+def main():
+    test_ring_overwrites_without_spill()
+    test_spill_and_reopen()
+    test_spill_file_limits()
+    test_downsample()
+    test_heartbeats_recorded_and_queried()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# tests/test_travel_planner.py
+from sys_path import setup_path
+setup_path()
+
+from app.map_core import MapGraph, PathCustom, TravelProfile, TravelTimePlanner
+
+
+def make_grid(width: int, height: int) -> MapGraph:
+    """生成单层网格地图 (非树结构, 存在多条等长路径)。"""
+    nodes = [f"{x},{y},1" for x in range(1, width + 1) for y in range(1, height + 1)]
+    edges = []
+    for x in range(1, width + 1):
+        for y in range(1, height + 1):
+            if x < width:
+                edges.append([f"{x},{y},1", f"{x + 1},{y},1"])
+            if y < height:
+                edges.append([f"{x},{y},1", f"{x},{y + 1},1"])
+    return MapGraph(nodes, edges)
+
+
+def count_turns(path):
+    """统计路径的换向次数。"""
+    dirs = ['x' if a.split(',')[0] != b.split(',')[0] else 'y' for a, b in zip(path, path[1:])]
+    return sum(1 for a, b in zip(dirs, dirs[1:]) if a != b)
+
+
+def test_fewest_turns_among_equal_length():
+    """等长路径中选择换向最少的路径。"""
+    graph = make_grid(5, 5)
+    planner = TravelTimePlanner(graph)
+    path = planner.find_path("1,1,1", "5,5,1")
+    assert len(path) - 1 == 8
+    assert count_turns(path) == 1
+    # 估算时间: 8格 + 2段起步 + 1次换向
+    profile = planner.profile
+    assert planner.estimate(path) == 8 * profile.cell_time + 2 * profile.accel_overhead + profile.turn_penalty
+
+
+def test_turn_penalty_prefers_longer_straight_route():
+    """换向惩罚足够大时, 宁可多走格子也要少换向。"""
+    # 阶梯路径 4步3次换向; 绕行路径 6步2次换向
+    stair = ["1,1,1", "2,1,1", "2,2,1", "3,2,1", "3,3,1"]
+    detour = ["1,1,1", "1,2,1", "1,3,1", "1,4,1", "2,4,1", "3,4,1", "3,3,1"]
+    nodes = sorted(set(stair + detour))
+    edges = [list(e) for e in zip(stair, stair[1:])] + [list(e) for e in zip(detour, detour[1:])]
+    graph = MapGraph(nodes, edges)
+    assert graph.shortest_path("1,1,1", "3,3,1") == stair
+
+    planner = TravelTimePlanner(graph)
+    assert planner.find_path("1,1,1", "3,3,1") == detour
+    assert planner.estimate(detour) < planner.estimate(stair)
+
+    # 不计换向和起步时退化为最少步数
+    no_penalty = TravelTimePlanner(graph, TravelProfile(turn_penalty=0.0, accel_overhead=0.0))
+    assert no_penalty.find_path("1,1,1", "3,3,1") == stair
+
+
+def test_path_custom_strategy():
+    """PathCustom 可以选择规划策略, 树形地图下两种策略结果一致。"""
+    path_custom = PathCustom()
+    shortest = path_custom.build_pick_task("1,3,1", "8,7,1")
+    travel = path_custom.build_pick_task("1,3,1", "8,7,1", strategy="travel_time")
+    assert shortest == travel == [(1, 3, 1, 1), (4, 3, 1, 5), (4, 7, 1, 6), (8, 7, 1, 2)]
+    assert path_custom.build_segments("1,3,1", "8,7,1", strategy="travel_time") == \
+        path_custom.build_segments("1,3,1", "8,7,1")
+    try:
+        path_custom.build_segments("1,3,1", "8,7,1", strategy="unknown")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知策略应抛出ValueError")
+
+
+def test_unreachable():
+    """不可达返回None。"""
+    graph = MapGraph(["1,1,1", "2,1,1", "5,5,1"], [["1,1,1", "2,1,1"]])
+    assert TravelTimePlanner(graph).find_path("1,1,1", "5,5,1") is None
+
+
+def main():
+    test_fewest_turns_among_equal_length()
+    test_turn_penalty_prefers_longer_straight_route()
+    test_path_custom_strategy()
+    test_unreachable()
+    print("全部测试通过")
+
+
+if __name__ == "__main__":
+    main()
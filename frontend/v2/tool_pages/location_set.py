@@ -5,7 +5,25 @@ import pandas as pd
 
 from api_config import API_BASE
 
-st.image("img/locations.png")    
+def show_layer_map(layer: int):
+    """显示后端渲染的楼层库位图, 图像未变化时 (304) 使用本地缓存, 不重新下载。"""
+    cache = st.session_state.setdefault("layer_map_cache", {})
+    cached = cache.get(layer)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    try:
+        resp = requests.get(API_BASE + "/read/map_image", params={"layer": layer, "fmt": "png"}, headers=headers, timeout=5)
+    except requests.RequestException:
+        resp = None
+    if resp is not None and resp.status_code == 200 and resp.headers.get("content-type") == "image/png":
+        cached = (resp.headers.get("etag"), resp.content)
+        cache[layer] = cached
+    if cached:
+        st.image(cached[1])
+    else:
+        st.image("img/locations.png")
+
+map_layer = st.selectbox("库位图楼层", list(range(1, 5)), key="map_layer_box")
+show_layer_map(map_layer)
 
 steps = [
     {